@@ -5,12 +5,19 @@ AI 自我进化引擎 - 基于交易数据进行学习和优化
 
 import json
 import logging
+import sys
 import time
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple
-import requests
 from pathlib import Path
 
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+# 与 signal_monitor 的 AI 模块共用 LLM 调用网关（连接池、并发上限、结果缓存）
+from signal_monitor.llm_gateway import chat_completion
+
 
 class AIEvolutionEngine:
     """
@@ -407,40 +414,23 @@ class AIEvolutionEngine:
 
     def _call_ai_api(self, prompt: str) -> Optional[str]:
         """调用 AI API"""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-
-        payload = {
-            "model": self.model,
-            "messages": [
+        return chat_completion(
+            self.api_url,
+            self.api_key,
+            self.model,
+            [
                 {
                     "role": "system",
                     "content": "You are a quantitative trading strategy optimization expert. Reply with strict JSON only.",
                 },
                 {"role": "user", "content": prompt},
             ],
-            "max_tokens": 2000,
-            "temperature": 0.3,
-        }
-
-        try:
-            session = requests.Session()
-            session.trust_env = False
-            resp = session.post(self.api_url, headers=headers, json=payload, timeout=60)
-
-            if resp.status_code != 200:
-                self.logger.warning("AI API call failed: %s", resp.status_code)
-                return None
-
-            data = resp.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            return content.strip()
-
-        except Exception as e:
-            self.logger.error("AI API call error: %s", e)
-            return None
+            caller="ai_evolution",
+            max_tokens=2000,
+            temperature=0.3,
+            timeout=60,
+            expect_json=True,
+        )
 
     def _parse_optimization_response(self, response: str) -> Optional[Dict[str, Any]]:
         """解析 AI 优化响应"""
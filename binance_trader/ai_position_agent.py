@@ -5,10 +5,18 @@ AI 仓位管理子代理 - 决定是否加仓、减仓、平仓
 
 import json
 import logging
+import sys
 import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-import requests
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+# 与 signal_monitor 的 AI 模块共用 LLM 调用网关（连接池、并发上限、结果缓存）
+from signal_monitor.llm_gateway import chat_completion
 
 
 class AIPositionAgent:
@@ -224,42 +232,23 @@ class AIPositionAgent:
 
     def _call_ai_api(self, prompt: str) -> Optional[str]:
         """调用 AI API"""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-
-        payload = {
-            "model": self.model,
-            "messages": [
+        return chat_completion(
+            self.api_url,
+            self.api_key,
+            self.model,
+            [
                 {
                     "role": "system",
                     "content": "You are a professional quantitative trading analyst. Reply with strict JSON only.",
                 },
                 {"role": "user", "content": prompt},
             ],
-            "max_tokens": 500,
-            "temperature": 0.3,
-        }
-
-        try:
-            session = requests.Session()
-            session.trust_env = False
-            resp = session.post(self.api_url, headers=headers, json=payload, timeout=30)
-
-            if resp.status_code != 200:
-                self.logger.warning(
-                    "AI API call failed: %s - %s", resp.status_code, resp.text[:200]
-                )
-                return None
-
-            data = resp.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            return content.strip()
-
-        except Exception as e:
-            self.logger.error("AI API call error: %s", e)
-            return None
+            caller="ai_position_agent",
+            max_tokens=500,
+            temperature=0.3,
+            timeout=30,
+            expect_json=True,
+        )
 
     def _parse_ai_response(self, response: str) -> Optional[Dict[str, Any]]:
         """解析 AI 响应"""
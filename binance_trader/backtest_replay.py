@@ -0,0 +1,600 @@
+"""
+历史信号回放回测 - Backtest Replay
+从 valuescan.db 的 processed_messages 按 createTime 顺序回放信号，
+驱动事件时间模式的 SignalAggregator、RiskManager 以及移动止损/金字塔止盈，
+持仓按本地存储的 K 线逐根撮合，无需等待实时行情即可评估参数。
+
+K 线目录中每个标的一个文件：<SYMBOL>USDT_<interval>.json，内容为币安
+/fapi/v1/klines 返回的数组；也可直接指向 signal_monitor 的本地 K 线存储目录
+（<SYMBOL>USDT_<interval>.f64）。使用 --fetch 可从币安下载缺失的 K 线。
+
+用法：
+    python -m binance_trader.backtest_replay --db signal_monitor/valuescan.db \\
+        --klines data/klines --start 2025-01-01 --end 2025-12-31
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import sqlite3
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from binance_trader.signal_aggregator import SignalAggregator
+from binance_trader.risk_manager import RiskManager
+from binance_trader.trailing_stop import TrailingStopManager, PyramidingExitManager
+
+try:
+    from binance_trader import config
+except ImportError:
+    config = None
+
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "1d": 86400,
+}
+
+KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArchivedSignal:
+    """processed_messages 中的一条历史信号"""
+    message_id: str
+    message_type: int
+    symbol: str
+    created_time: datetime
+    data: Dict
+
+
+@dataclass
+class KlineSeries:
+    """单个标的的 K 线（按开盘时间升序的列存储，时间单位：毫秒）"""
+    open_times: List[int] = field(default_factory=list)
+    opens: List[float] = field(default_factory=list)
+    highs: List[float] = field(default_factory=list)
+    lows: List[float] = field(default_factory=list)
+    closes: List[float] = field(default_factory=list)
+
+    @classmethod
+    def from_store_file(cls, path: Path, width: int = 11) -> "KlineSeries":
+        """读取 signal_monitor.kline_store 的定宽 float64 文件（每行 width 列，按开盘时间升序）"""
+        values = array("d")
+        values.frombytes(path.read_bytes())
+        rows = len(values) // width
+        del values[rows * width:]
+        return cls(
+            open_times=[int(v) for v in values[0::width]],
+            opens=values[1::width].tolist(),
+            highs=values[2::width].tolist(),
+            lows=values[3::width].tolist(),
+            closes=values[4::width].tolist(),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence]) -> "KlineSeries":
+        series = cls()
+        last = None
+        for row in sorted(rows, key=lambda r: int(r[0])):
+            open_time = int(row[0])
+            if open_time == last:
+                continue
+            last = open_time
+            series.open_times.append(open_time)
+            series.opens.append(float(row[1]))
+            series.highs.append(float(row[2]))
+            series.lows.append(float(row[3]))
+            series.closes.append(float(row[4]))
+        return series
+
+    def __len__(self) -> int:
+        return len(self.open_times)
+
+    def index_at(self, ts_ms: int) -> int:
+        """第一根开盘时间 >= ts_ms 的 K 线下标"""
+        return bisect.bisect_left(self.open_times, ts_ms)
+
+
+class KlineStore:
+    """从本地目录按需加载 K 线，可选从币安补齐缺失数据"""
+
+    def __init__(self, directory: str, interval: str = "1m",
+                 symbol_suffix: str = "USDT", fetch_missing: bool = False):
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"不支持的 K 线周期: {interval}")
+        self.directory = Path(directory)
+        self.interval = interval
+        self.interval_ms = INTERVAL_SECONDS[interval] * 1000
+        self.symbol_suffix = symbol_suffix
+        self.fetch_missing = fetch_missing
+        self._series: Dict[str, Optional[KlineSeries]] = {}
+
+    def _path(self, symbol: str) -> Path:
+        return self.directory / f"{symbol}{self.symbol_suffix}_{self.interval}.json"
+
+    def get(self, symbol: str, start_ms: Optional[int] = None,
+            end_ms: Optional[int] = None) -> Optional[KlineSeries]:
+        """获取标的 K 线；本地没有且允许下载时按 [start_ms, end_ms] 补齐"""
+        if symbol in self._series:
+            return self._series[symbol]
+        series = None
+        path = self._path(symbol)
+        store_path = path.with_suffix(".f64")
+        try:
+            if path.exists():
+                series = KlineSeries.from_rows(json.loads(path.read_text(encoding="utf-8")))
+            elif store_path.exists():
+                series = KlineSeries.from_store_file(store_path)
+        except (OSError, ValueError, IndexError, TypeError) as exc:
+            logger.warning(f"读取 K 线文件失败 {path}: {exc}")
+        if (series is None or not len(series)) and self.fetch_missing and start_ms is not None:
+            rows = self._download(symbol, start_ms, end_ms or int(time.time() * 1000))
+            if rows:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(rows, separators=(",", ":")), encoding="utf-8")
+                series = KlineSeries.from_rows(rows)
+        self._series[symbol] = series if series is not None and len(series) else None
+        return self._series[symbol]
+
+    def _download(self, symbol: str, start_ms: int, end_ms: int) -> List[list]:
+        import requests
+
+        rows: List[list] = []
+        cursor = start_ms
+        while cursor < end_ms:
+            try:
+                response = requests.get(KLINES_URL, params={
+                    "symbol": f"{symbol}{self.symbol_suffix}",
+                    "interval": self.interval,
+                    "startTime": cursor,
+                    "endTime": end_ms,
+                    "limit": 1500,
+                }, timeout=15)
+                response.raise_for_status()
+                batch = response.json()
+            except Exception as exc:
+                logger.warning(f"下载 {symbol} K 线失败: {exc}")
+                break
+            if not batch:
+                break
+            rows.extend(batch)
+            cursor = int(batch[-1][0]) + self.interval_ms
+            if len(batch) < 1500:
+                break
+        return rows
+
+
+def load_archived_signals(db_path: str, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None,
+                          message_types: Optional[Sequence[int]] = None) -> Iterator[ArchivedSignal]:
+    """按 createTime 升序读取 processed_messages 中的历史信号"""
+    query = ("SELECT message_id, message_type, symbol, created_time, content "
+             "FROM processed_messages WHERE created_time IS NOT NULL")
+    params: List = []
+    if start is not None:
+        query += " AND created_time >= ?"
+        params.append(int(start.timestamp() * 1000))
+    if end is not None:
+        query += " AND created_time < ?"
+        params.append(int(end.timestamp() * 1000))
+    if message_types:
+        query += f" AND message_type IN ({','.join('?' * len(message_types))})"
+        params.extend(int(t) for t in message_types)
+    query += " ORDER BY created_time, rowid"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for message_id, message_type, symbol, created_time, content in conn.execute(query, params):
+            data: Dict = {}
+            if content:
+                try:
+                    parsed = json.loads(content)
+                    if isinstance(parsed, dict):
+                        data = parsed
+                except (TypeError, ValueError):
+                    pass
+            symbol = str(symbol or data.get("symbol") or "").strip().lstrip("$").upper()
+            if not symbol or message_type is None:
+                continue
+            created_ms = int(created_time)
+            data.setdefault("createTime", created_ms)
+            yield ArchivedSignal(
+                message_id=str(message_id),
+                message_type=int(message_type),
+                symbol=symbol,
+                created_time=datetime.fromtimestamp(created_ms / 1000.0),
+                data=data,
+            )
+    finally:
+        conn.close()
+
+
+@dataclass
+class SimPosition:
+    """回测中的模拟持仓"""
+    symbol: str
+    entry_price: float
+    entry_time: datetime
+    quantity: float
+    margin: float
+    stop_loss: float
+    cursor: int  # 下一根待撮合 K 线下标
+    realized_pnl: float = 0.0
+
+
+@dataclass
+class ClosedTrade:
+    symbol: str
+    entry_time: datetime
+    exit_time: datetime
+    entry_price: float
+    exit_price: float
+    pnl: float
+    pnl_percent: float
+    reason: str
+
+
+@dataclass
+class BacktestReport:
+    """回测结果汇总"""
+    signals: int = 0
+    confluences: int = 0
+    skipped: Dict[str, int] = field(default_factory=dict)
+    trades: List[ClosedTrade] = field(default_factory=list)
+    initial_balance: float = 0.0
+    final_balance: float = 0.0
+    max_drawdown_percent: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    def summary(self) -> Dict:
+        wins = [t for t in self.trades if t.pnl > 0]
+        total_pnl = sum(t.pnl for t in self.trades)
+        return {
+            "signals": self.signals,
+            "confluences": self.confluences,
+            "trades": len(self.trades),
+            "win_rate": (len(wins) / len(self.trades) * 100) if self.trades else 0.0,
+            "total_pnl": total_pnl,
+            "return_percent": (total_pnl / self.initial_balance * 100) if self.initial_balance else 0.0,
+            "max_drawdown_percent": self.max_drawdown_percent,
+            "skipped": dict(self.skipped),
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+class BacktestEngine:
+    """
+    历史信号回放引擎
+
+    按信号时间推进回放时钟：每条信号到达前，先用两条信号之间已收盘的 K 线
+    撮合所有持仓的止损、金字塔止盈和移动止损；聚合信号在下一根 K 线开盘价入场。
+    单根 K 线内按 开→低→高→收（阳线）或 开→高→低→收（阴线）的路径撮合。
+    """
+
+    def __init__(self,
+                 klines: KlineStore,
+                 initial_balance: float = 1000.0,
+                 time_window: int = 300,
+                 min_score: float = 0.6,
+                 leverage: int = 10,
+                 fee_percent: float = 0.04,
+                 enable_trailing_stop: bool = True,
+                 trailing_activation: float = 2.0,
+                 trailing_callback: float = 1.5,
+                 pyramiding_levels: Optional[List] = None,
+                 risk_options: Optional[Dict] = None):
+        self.klines = klines
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+        self.leverage = max(int(leverage), 1)
+        self.fee_rate = fee_percent / 100
+
+        self.clock = datetime.fromtimestamp(0)
+        self.aggregator = SignalAggregator(
+            time_window=time_window,
+            min_score=min_score,
+            enable_persistence=False,
+            use_event_time=True,
+        )
+        self.risk_manager = RiskManager(clock=lambda: self.clock, **(risk_options or {}))
+        self.trailing_stop_manager = TrailingStopManager(
+            activation_percent=trailing_activation,
+            callback_percent=trailing_callback,
+        ) if enable_trailing_stop else None
+        self.pyramiding_manager = PyramidingExitManager(
+            exit_levels=pyramiding_levels
+        ) if pyramiding_levels else None
+
+        self.positions: Dict[str, SimPosition] = {}
+        self.report = BacktestReport(initial_balance=initial_balance)
+        self._peak_equity = initial_balance
+
+    @classmethod
+    def from_config(cls, klines: KlineStore, initial_balance: float = 1000.0,
+                    fee_percent: float = 0.04) -> "BacktestEngine":
+        """按 config.py 中的实盘参数构建回测引擎"""
+        pyramiding = getattr(config, "PYRAMIDING_EXIT_LEVELS", None) \
+            if getattr(config, "ENABLE_PYRAMIDING_EXIT", True) else None
+        return cls(
+            klines=klines,
+            initial_balance=initial_balance,
+            time_window=getattr(config, "SIGNAL_TIME_WINDOW", 300),
+            min_score=getattr(config, "MIN_SIGNAL_SCORE", 0.6),
+            leverage=getattr(config, "LEVERAGE", 10),
+            fee_percent=fee_percent,
+            enable_trailing_stop=getattr(config, "ENABLE_TRAILING_STOP", True),
+            trailing_activation=getattr(config, "TRAILING_STOP_ACTIVATION", 2.0),
+            trailing_callback=getattr(config, "TRAILING_STOP_CALLBACK", 1.5),
+            pyramiding_levels=pyramiding,
+            risk_options={
+                "max_position_percent": getattr(config, "MAX_POSITION_PERCENT", 10.0),
+                "max_total_position_percent": getattr(config, "MAX_TOTAL_POSITION_PERCENT", 50.0),
+                "max_daily_trades": getattr(config, "MAX_DAILY_TRADES", 20),
+                "max_daily_loss_percent": getattr(config, "MAX_DAILY_LOSS_PERCENT", 5.0),
+                "stop_loss_percent": getattr(config, "STOP_LOSS_PERCENT", 3.0),
+                "take_profit_1_percent": getattr(config, "TAKE_PROFIT_1_PERCENT", 5.0),
+                "take_profit_2_percent": getattr(config, "TAKE_PROFIT_2_PERCENT", 10.0),
+            },
+        )
+
+    def run(self, signals: Iterator[ArchivedSignal], end: Optional[datetime] = None) -> BacktestReport:
+        """回放信号并返回回测结果；end 为空时撮合至 K 线结束"""
+        started = time.perf_counter()
+        self._sync_balance()
+        for signal in signals:
+            self._advance_to(signal.created_time)
+            self.report.signals += 1
+            self._on_signal(signal)
+
+        # 剩余持仓撮合至结束，未触发退出的按最后价格平仓
+        self._advance_to(end or datetime.max)
+        for symbol in list(self.positions):
+            position = self.positions[symbol]
+            series = self.klines.get(symbol)
+            index = min(position.cursor, len(series)) - 1
+            self._close(symbol, 1.0, series.closes[index], self.clock, "回测结束")
+
+        self.report.final_balance = self.balance
+        self.report.elapsed_seconds = time.perf_counter() - started
+        return self.report
+
+    def _skip(self, reason: str):
+        self.report.skipped[reason] = self.report.skipped.get(reason, 0) + 1
+
+    def _on_signal(self, signal: ArchivedSignal):
+        """对应 FuturesAutoTradingSystem.process_signal 的聚合信号路径"""
+        confluence = self.aggregator.add_signal(
+            message_type=signal.message_type,
+            message_id=signal.message_id,
+            symbol=signal.symbol,
+            data=signal.data,
+            predict_type=signal.data.get("predictType"),
+            event_time=signal.created_time,
+        )
+        self.clock = max(self.clock, signal.created_time)
+
+        if signal.message_type == 112:
+            self._on_risk_signal(signal.symbol)
+            return
+        if not confluence:
+            return
+        self.report.confluences += 1
+
+        symbol = confluence.symbol
+        ts_ms = int(signal.created_time.timestamp() * 1000)
+        series = self.klines.get(symbol, ts_ms - self.klines.interval_ms, None)
+        if series is None:
+            self._skip("无K线数据")
+            return
+        index = series.index_at(ts_ms)
+        if index >= len(series):
+            self._skip("K线不覆盖信号时间")
+            return
+        entry_price = series.opens[index]
+
+        recommendation = self.risk_manager.generate_trade_recommendation(
+            symbol=symbol,
+            current_price=entry_price,
+            signal_score=confluence.score,
+        )
+        if recommendation.action != "BUY" or recommendation.quantity <= 0:
+            self._skip(recommendation.reason or "风控拒绝")
+            return
+
+        entry_time = datetime.fromtimestamp(series.open_times[index] / 1000.0)
+        notional = recommendation.quantity * entry_price
+        self.balance -= notional * self.fee_rate
+        self.positions[symbol] = SimPosition(
+            symbol=symbol,
+            entry_price=entry_price,
+            entry_time=entry_time,
+            quantity=recommendation.quantity,
+            margin=notional / self.leverage,
+            stop_loss=recommendation.stop_loss,
+            cursor=index,
+        )
+        self.risk_manager.add_position(symbol, recommendation.quantity, entry_price, entry_time)
+        self.risk_manager.record_trade(symbol)
+        if self.trailing_stop_manager:
+            self.trailing_stop_manager.add_position(symbol, entry_price, entry_price)
+        if self.pyramiding_manager:
+            self.pyramiding_manager.add_position(symbol, entry_price)
+        self._sync_balance()
+
+    def _on_risk_signal(self, symbol: str):
+        """FOMO 加剧：盈利持仓平掉一半（对应 _handle_risk_signal）"""
+        position = self.positions.get(symbol)
+        if position is None:
+            return
+        series = self.klines.get(symbol)
+        index = position.cursor - 1
+        if index < 0:
+            return
+        price = series.closes[index]
+        if price > position.entry_price:
+            self._close(symbol, 0.5, price, self.clock, "FOMO加剧风险信号")
+
+    def _advance_to(self, until: datetime):
+        """撮合所有持仓在 until 之前已收盘的 K 线"""
+        until_ms = int(until.timestamp() * 1000) if until != datetime.max else None
+        for symbol in list(self.positions):
+            series = self.klines.get(symbol)
+            position = self.positions[symbol]
+            while symbol in self.positions and position.cursor < len(series):
+                index = position.cursor
+                close_ms = series.open_times[index] + self.klines.interval_ms
+                if until_ms is not None and close_ms > until_ms:
+                    break
+                position.cursor += 1
+                self._match_bar(position, series, index)
+            if until_ms is None and symbol in self.positions:
+                last = len(series) - 1
+                self.clock = max(self.clock, datetime.fromtimestamp(
+                    (series.open_times[last] + self.klines.interval_ms) / 1000.0))
+        if until_ms is not None:
+            self.clock = max(self.clock, until)
+
+    def _match_bar(self, position: SimPosition, series: KlineSeries, index: int):
+        symbol = position.symbol
+        bar_time = datetime.fromtimestamp((series.open_times[index] + self.klines.interval_ms) / 1000.0)
+        self.clock = max(self.clock, bar_time)
+        open_, high, low, close = series.opens[index], series.highs[index], series.lows[index], series.closes[index]
+        path = (open_, low, high, close) if close >= open_ else (open_, high, low, close)
+
+        for price in path:
+            if symbol not in self.positions:
+                return
+            if price <= position.stop_loss:
+                # 跳空低开时按开盘价成交
+                fill = min(position.stop_loss, open_) if price == open_ else position.stop_loss
+                self._close(symbol, 1.0, fill, bar_time, "止损")
+                return
+            if self.pyramiding_manager:
+                trigger = self.pyramiding_manager.check_exit_trigger(symbol, price)
+                if trigger:
+                    _, close_ratio, level_idx = trigger
+                    self._close(symbol, close_ratio, price, bar_time, f"金字塔退出 Level {level_idx + 1}")
+                    continue
+            if self.trailing_stop_manager:
+                trigger = self.trailing_stop_manager.update_price(symbol, price)
+                if trigger:
+                    self._close(symbol, 1.0, price, bar_time, "移动止损")
+                    return
+        self.risk_manager.update_position_price(symbol, close)
+        self._update_drawdown()
+
+    def _close(self, symbol: str, ratio: float, price: float, when: datetime, reason: str):
+        position = self.positions[symbol]
+        quantity = position.quantity if ratio >= 1.0 else position.quantity * ratio
+        pnl = (price - position.entry_price) * quantity - quantity * price * self.fee_rate
+        self.balance += pnl
+        position.realized_pnl += pnl
+        position.quantity -= quantity
+        position.margin = position.quantity * position.entry_price / self.leverage
+        self.risk_manager.daily_pnl[when.strftime("%Y-%m-%d")] += pnl
+
+        if ratio < 1.0 and position.quantity > 0:
+            risk_position = self.risk_manager.positions.get(symbol)
+            if risk_position:
+                risk_position.quantity = position.quantity
+            self._sync_balance()
+            return
+
+        self.report.trades.append(ClosedTrade(
+            symbol=symbol,
+            entry_time=position.entry_time,
+            exit_time=when,
+            entry_price=position.entry_price,
+            exit_price=price,
+            pnl=position.realized_pnl,
+            pnl_percent=(price - position.entry_price) / position.entry_price * 100,
+            reason=reason,
+        ))
+        del self.positions[symbol]
+        self.risk_manager.remove_position(symbol)
+        if self.trailing_stop_manager:
+            self.trailing_stop_manager.remove_position(symbol)
+        if self.pyramiding_manager:
+            self.pyramiding_manager.remove_position(symbol)
+        self._sync_balance()
+
+    def _sync_balance(self):
+        margin = sum(p.margin for p in self.positions.values())
+        self.risk_manager.total_balance = self.balance
+        self.risk_manager.available_balance = self.balance - margin
+        self._update_drawdown()
+
+    def _update_drawdown(self):
+        equity = self.balance + sum(
+            (pos.current_price - pos.entry_price) * pos.quantity
+            for pos in self.risk_manager.positions.values()
+        )
+        self._peak_equity = max(self._peak_equity, equity)
+        if self._peak_equity > 0:
+            drawdown = (self._peak_equity - equity) / self._peak_equity * 100
+            self.report.max_drawdown_percent = max(self.report.max_drawdown_percent, drawdown)
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法解析日期: {value}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="ValueScan 历史信号回放回测")
+    parser.add_argument("--db", default=str(Path(__file__).parent.parent / "signal_monitor" / "valuescan.db"),
+                        help="processed_messages 所在的 SQLite 数据库")
+    parser.add_argument("--klines", default="data/klines", help="K 线目录")
+    parser.add_argument("--interval", default="1m", choices=sorted(INTERVAL_SECONDS), help="K 线周期")
+    parser.add_argument("--start", type=_parse_date, help="开始时间 (YYYY-MM-DD[ HH:MM[:SS]])")
+    parser.add_argument("--end", type=_parse_date, help="结束时间")
+    parser.add_argument("--balance", type=float, default=1000.0, help="初始资金 (USDT)")
+    parser.add_argument("--fee", type=float, default=0.04, help="单边手续费百分比")
+    parser.add_argument("--fetch", action="store_true", help="从币安下载缺失的 K 线并保存到 K 线目录")
+    parser.add_argument("--trades", action="store_true", help="输出每笔交易")
+    parser.add_argument("--verbose", action="store_true", help="输出聚合器/止盈止损模块日志")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    store = KlineStore(
+        args.klines,
+        interval=args.interval,
+        symbol_suffix=getattr(config, "SYMBOL_SUFFIX", "USDT"),
+        fetch_missing=args.fetch,
+    )
+    engine = BacktestEngine.from_config(store, initial_balance=args.balance, fee_percent=args.fee)
+    report = engine.run(load_archived_signals(args.db, args.start, args.end), end=args.end)
+
+    if args.trades:
+        for trade in report.trades:
+            print(
+                f"{trade.entry_time:%Y-%m-%d %H:%M} → {trade.exit_time:%Y-%m-%d %H:%M} "
+                f"{trade.symbol:<10} {trade.entry_price:.6g} → {trade.exit_price:.6g} "
+                f"PnL={trade.pnl:+.2f} ({trade.reason})"
+            )
+    print(json.dumps(report.summary(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -155,6 +155,14 @@ SIGNAL_STATE_FILE = "data/signal_state.json"
 # 持久化的已处理信号ID数量上限（用于防重复）
 MAX_PROCESSED_SIGNAL_IDS = 5000
 
+# 信号状态写盘间隔（秒）：新信号先追加到状态日志（SIGNAL_STATE_FILE.journal），按此间隔批量写盘，
+# 日志累计一定条数后合并为完整快照；<=0 表示每条信号立即追加
+SIGNAL_STATE_FLUSH_INTERVAL = 1.0
+
+# 事件时间模式：信号时间取 ValueScan 消息的 createTime，而非收到信号的系统时间
+# 信号转发延迟或重启补发时，聚合时间窗口与评分仍按信号实际发生时间计算（回测回放始终使用此模式）
+SIGNAL_EVENT_TIME = False
+
 # 是否启用 FOMO 加剧信号 (Type 112)
 # True: Type 112 作为风险信号，可用于止盈判断
 # False: 忽略 Type 112 信号
@@ -298,6 +306,29 @@ POSITION_PRECISION = 3
 # 合约需要更频繁监控，特别是启用移动止损时
 POSITION_MONITOR_INTERVAL = 10  # 每10秒检查一次持仓
 
+# 标记价格推送流（WebSocket）
+# 启用后只订阅有持仓的标的，每个推送立即检查移动止损和金字塔退出，
+# 不必等待上面的持仓轮询；推送断开或超时时自动回退到 REST 轮询价格
+ENABLE_MARK_PRICE_STREAM = False
+# 流类型: "markPrice@1s"（标记价格，每秒）或 "aggTrade"（逐笔成交，更快但更频繁）
+MARK_PRICE_STREAM_TYPE = "markPrice@1s"
+# 推送价格超过该秒数未更新视为失效
+MARK_PRICE_STREAM_STALE_SECONDS = 5
+# 自定义推送地址（默认按 USE_TESTNET 自动选择，测试时可指向本地假服务器）
+# MARK_PRICE_STREAM_URL = "ws://127.0.0.1:8765"
+# 推送触发的平仓失败后的重试退避（秒，按连续失败次数翻倍，封顶 MAX）
+EXIT_RETRY_BACKOFF_SECONDS = 2
+EXIT_RETRY_MAX_BACKOFF_SECONDS = 60
+
+# 用户数据流（listenKey）
+# 启用后持仓/挂单由 ACCOUNT_UPDATE / ORDER_TRADE_UPDATE 推送在内存中维护，
+# 开仓后等待成交推送而不是固定 sleep；推送断开时自动回退到 REST 查询
+ENABLE_USER_DATA_STREAM = False
+# 流就绪时仍按该间隔（秒）用 REST 全量对账一次持仓（刷新杠杆、强平价等推送不含的字段）
+USER_DATA_STREAM_RECONCILE_INTERVAL = 60
+# 自定义推送地址（默认按 USE_TESTNET 自动选择，测试时可指向本地假服务器）
+# USER_DATA_STREAM_URL = "ws://127.0.0.1:8766"
+
 # 余额更新间隔（秒）
 BALANCE_UPDATE_INTERVAL = 60  # 每分钟更新一次余额
 
@@ -338,6 +369,12 @@ BINANCE_TIME_SYNC_INTERVAL = 300
 # 安全余量（毫秒）：把签名时间戳保持在服务器时间稍后，避免边界条件“ahead”
 BINANCE_TIME_SYNC_SAFETY_MS = 1500
 
+# 交易规则索引（数量步长/价格精度/最小数量/最小名义价值）
+# 启动时一次性载入并缓存到该文件，下单时不再下载 exchangeInfo；留空则不落盘
+EXCHANGE_RULES_FILE = "data/exchange_rules.json"
+# 规则刷新间隔（秒），过期后在后台刷新；遇到新上架交易对也会触发后台刷新
+EXCHANGE_RULES_REFRESH_INTERVAL = 6 * 3600
+
 # 是否使用对冲模式（Hedge Mode）
 # True: 可以同时持有多空仓位
 # False: 单向持仓模式（推荐）
@@ -0,0 +1,253 @@
+"""
+交易规则索引 - Exchange Rules Index
+启动时一次性载入全部合约交易对的下单规则（LOT_SIZE / PRICE_FILTER / MIN_NOTIONAL），
+持久化到本地 JSON 并按间隔刷新，下单时只做内存查找和整数运算。
+
+- 步长 / 最小变动价位 / 最小数量 / 最小名义价值在载入时换算成整数刻度
+  （值 = units / scale），取整在整数域完成，不再逐次扫描过滤器和经过 Decimal
+- 启动优先读磁盘缓存，未过期直接使用；过期或缺失时下载 exchangeInfo 并原子写回，
+  下载失败时退回使用过期缓存
+- 遇到未知交易对（新上架）时同步刷新一次再查找（按 miss_refresh_interval 限流，并发的未命中只下载一次）；
+  规则过期时只触发后台刷新，下单路径不等待
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+
+def _decimals(text: str) -> int:
+    exponent = Decimal(str(text)).normalize().as_tuple().exponent
+    return max(0, -int(exponent))
+
+
+def _to_units(text: str, scale: int) -> int:
+    return int(Decimal(str(text)) * scale)
+
+
+def _round_units(value: float, step: int, scale: int, rounding: str) -> int:
+    """把 value 取整到 step 的整数倍，返回刻度数（value ≈ units / scale）"""
+    steps = value * scale / step
+    # 吸收浮点乘除的残差（如 0.29 * 100 = 28.999999999999996），约几个 ulp
+    eps = 1e-15 * max(1.0, abs(steps))
+    count = math.floor(steps + eps) if rounding == "down" else math.ceil(steps - eps)
+    return count * step
+
+
+class SymbolRules:
+    """单个交易对的整数化下单规则"""
+
+    __slots__ = ("qty_scale", "step", "min_qty", "price_scale", "tick",
+                 "notional_scale", "min_notional")
+
+    def __init__(self, step_size: str, min_qty: str, tick_size: str, min_notional: str = "0"):
+        self.qty_scale = 10 ** max(_decimals(step_size), _decimals(min_qty))
+        self.step = _to_units(step_size, self.qty_scale)
+        self.min_qty = _to_units(min_qty, self.qty_scale)
+        self.price_scale = 10 ** _decimals(tick_size)
+        self.tick = _to_units(tick_size, self.price_scale)
+        self.notional_scale = 10 ** _decimals(min_notional)
+        self.min_notional = _to_units(min_notional, self.notional_scale)
+        if self.step <= 0 or self.tick <= 0:
+            raise ValueError("stepSize / tickSize must be positive")
+
+    def round_quantity(self, quantity: float, rounding: str = "down") -> float:
+        return _round_units(quantity, self.step, self.qty_scale, rounding) / self.qty_scale
+
+    def round_price(self, price: float, rounding: str = "down") -> float:
+        return _round_units(price, self.tick, self.price_scale, rounding) / self.price_scale
+
+    @property
+    def min_quantity(self) -> float:
+        return self.min_qty / self.qty_scale
+
+    @property
+    def min_notional_value(self) -> float:
+        return self.min_notional / self.notional_scale
+
+    def meets_min_notional(self, quantity: float, price: float) -> bool:
+        """已按规则取整的数量 × 价格是否达到最小名义价值（整数比较）"""
+        if self.min_notional <= 0:
+            return True
+        qty_units = round(quantity * self.qty_scale)
+        price_units = round(price * self.price_scale)
+        return (qty_units * price_units * self.notional_scale
+                >= self.min_notional * self.qty_scale * self.price_scale)
+
+
+def _raw_rules(symbol_info: Dict) -> Optional[Dict[str, str]]:
+    """从 exchangeInfo 的单个交易对中提取需要持久化的原始规则字符串"""
+    filters = {f.get('filterType'): f for f in symbol_info.get('filters', [])}
+    lot = filters.get('LOT_SIZE')
+    price = filters.get('PRICE_FILTER')
+    if not lot or not price:
+        return None
+    notional = filters.get('MIN_NOTIONAL') or {}
+    return {
+        'stepSize': str(lot.get('stepSize', '0')),
+        'minQty': str(lot.get('minQty', '0')),
+        'tickSize': str(price.get('tickSize', '0')),
+        'minNotional': str(notional.get('notional') or notional.get('minNotional') or '0'),
+    }
+
+
+class ExchangeRuleIndex:
+    """
+    全部合约交易对的下单规则索引
+
+    fetch 返回 futures_exchange_info 的完整响应；index 整体替换，读取无需加锁。
+    """
+
+    def __init__(self,
+                 fetch: Callable[[], Dict],
+                 cache_file: Optional[str] = "data/exchange_rules.json",
+                 refresh_interval: float = 6 * 3600,
+                 miss_refresh_interval: float = 60.0):
+        """
+        初始化规则索引
+
+        Args:
+            fetch: 下载 exchangeInfo 的函数
+            cache_file: 磁盘缓存路径（None 表示不持久化）
+            refresh_interval: 规则刷新间隔（秒）
+            miss_refresh_interval: 遇到未知交易对时同步刷新的最小间隔（秒），同时限制刷新失败后的重试
+        """
+        self.fetch = fetch
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.refresh_interval = max(float(refresh_interval), 60.0)
+        self.miss_refresh_interval = max(float(miss_refresh_interval), 1.0)
+        self.logger = logging.getLogger(__name__)
+
+        self._rules: Dict[str, SymbolRules] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._miss_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def load(self) -> int:
+        """启动时载入：磁盘缓存未过期直接使用，否则下载；返回交易对数量"""
+        cached_at = self._load_file()
+        if self._rules and time.time() - cached_at < self.refresh_interval:
+            self.logger.info(f"📐 交易规则从缓存载入: {len(self._rules)} 个交易对")
+            return len(self._rules)
+        try:
+            return self.refresh()
+        except Exception as e:
+            if self._rules:
+                self.logger.warning(f"刷新交易规则失败，使用过期缓存 ({len(self._rules)} 个交易对): {e}")
+            else:
+                self.logger.error(f"载入交易规则失败: {e}")
+            return len(self._rules)
+
+    def refresh(self) -> int:
+        """同步下载 exchangeInfo 并重建索引"""
+        self._last_attempt = time.time()
+        exchange_info = self.fetch()
+        raw: Dict[str, Dict[str, str]] = {}
+        for symbol_info in exchange_info.get('symbols', []):
+            symbol = symbol_info.get('symbol')
+            rules = _raw_rules(symbol_info) if symbol else None
+            if rules:
+                raw[symbol] = rules
+        if not raw:
+            raise RuntimeError("exchangeInfo 未包含任何交易对规则")
+
+        self._install(raw, time.time())
+        self._save_file(raw)
+        self.logger.info(f"📐 交易规则已刷新: {len(self._rules)} 个交易对")
+        return len(self._rules)
+
+    def get(self, symbol: str) -> Optional[SymbolRules]:
+        """查找交易对规则；未知交易对时同步刷新一次后再查找，规则过期时触发后台刷新"""
+        rules = self._rules.get(symbol)
+        if rules is None:
+            return self._refresh_on_miss(symbol)
+        now = time.time()
+        # 刷新失败后同样按 miss_refresh_interval 限流，避免每次下单都重试
+        if now - self._last_attempt >= self.miss_refresh_interval and now - self._fetched_at >= self.refresh_interval:
+            self.refresh_async()
+        return rules
+
+    def _refresh_on_miss(self, symbol: str) -> Optional[SymbolRules]:
+        with self._miss_lock:
+            # 等锁期间其他线程可能已刷新完成
+            rules = self._rules.get(symbol)
+            if rules is not None:
+                return rules
+            if time.time() - self._last_attempt < self.miss_refresh_interval:
+                return None
+            self.logger.warning(f"{symbol} 不在交易规则索引中，同步刷新")
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.warning(f"刷新交易规则失败: {e}")
+                return None
+            return self._rules.get(symbol)
+
+    def refresh_async(self) -> None:
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._last_attempt = time.time()
+        threading.Thread(target=self._refresh_worker, name="ExchangeRulesRefresh", daemon=True).start()
+
+    def _refresh_worker(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.warning(f"后台刷新交易规则失败: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def _install(self, raw: Dict[str, Dict[str, str]], fetched_at: float) -> None:
+        index: Dict[str, SymbolRules] = {}
+        for symbol, item in raw.items():
+            try:
+                index[symbol] = SymbolRules(
+                    item['stepSize'], item['minQty'], item['tickSize'], item.get('minNotional', '0')
+                )
+            except Exception:
+                continue
+        self._rules = index
+        self._fetched_at = fetched_at
+
+    def _load_file(self) -> float:
+        if not self.cache_file or not self.cache_file.exists():
+            return 0.0
+        try:
+            with self.cache_file.open("r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+            fetched_at = float(payload.get('fetched_at', 0))
+            self._install(payload.get('symbols') or {}, fetched_at)
+            return fetched_at
+        except Exception as e:
+            self.logger.warning(f"读取交易规则缓存失败: {e}")
+            return 0.0
+
+    def _save_file(self, raw: Dict[str, Dict[str, str]]) -> None:
+        if not self.cache_file:
+            return
+        tmp_path = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as fh:
+                json.dump({'fetched_at': self._fetched_at, 'symbols': raw}, fh, separators=(',', ':'))
+            tmp_path.replace(self.cache_file)
+        except Exception as e:
+            self.logger.warning(f"写入交易规则缓存失败: {e}")
+            try:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            except Exception:
+                pass
@@ -8,9 +8,10 @@ import os
 import time
 import logging
 import socket
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 from urllib.parse import urlparse
 
 # 添加父目录到路径，以便导入 signal_monitor 模块（如果需要集成）
@@ -20,6 +21,7 @@ from binance_trader.signal_aggregator import SignalAggregator
 from binance_trader.risk_manager import RiskManager
 from binance_trader.futures_trader import BinanceFuturesTrader
 from binance_trader.trailing_stop import TrailingStopManager, PyramidingExitManager
+from binance_trader.market_stream import MarkPriceStream, FUTURES_STREAM_URL, TESTNET_STREAM_URL
 from binance_trader.trading_signal_processor import TradingSignalProcessor, get_trading_signal_processor
 
 # 导入配置
@@ -95,6 +97,8 @@ class FuturesAutoTradingSystem:
         signal_state_file = getattr(config, "SIGNAL_STATE_FILE", "data/signal_state.json")
         enable_signal_cache = getattr(config, "ENABLE_SIGNAL_STATE_CACHE", True)
         max_processed_ids = getattr(config, "MAX_PROCESSED_SIGNAL_IDS", 5000)
+        signal_state_flush_interval = getattr(config, "SIGNAL_STATE_FLUSH_INTERVAL", 1.0)
+        signal_event_time = getattr(config, "SIGNAL_EVENT_TIME", False)
         if not signal_state_file:
             enable_signal_cache = False
 
@@ -103,7 +107,9 @@ class FuturesAutoTradingSystem:
             min_score=config.MIN_SIGNAL_SCORE,
             state_file=signal_state_file if enable_signal_cache else None,
             enable_persistence=enable_signal_cache,
-            max_processed_ids=max_processed_ids
+            max_processed_ids=max_processed_ids,
+            flush_interval=signal_state_flush_interval,
+            use_event_time=signal_event_time
         )
 
         # 2. 初始化风险管理器
@@ -173,6 +179,42 @@ class FuturesAutoTradingSystem:
                 self.pyramiding_manager = None
                 self.logger.info("✅ 金字塔止盈将由交易所挂单执行 (orders)")
 
+        # 5.1 标记价格推送流（可选）：每个推送上检查移动止损/金字塔退出，断流时回退 REST 轮询
+        self._exit_lock = threading.RLock()
+        # 平仓防重入 + 失败退避：symbol -> {in_flight, retry_at, failures}
+        self._exit_attempts: Dict[str, Dict[str, Any]] = {}
+        self._exit_attempts_lock = threading.Lock()
+        self.exit_retry_backoff = float(getattr(config, 'EXIT_RETRY_BACKOFF_SECONDS', 2))
+        self.exit_retry_max_backoff = float(getattr(config, 'EXIT_RETRY_MAX_BACKOFF_SECONDS', 60))
+        self.mark_price_stream = None
+        if getattr(config, 'ENABLE_MARK_PRICE_STREAM', False) and (self.trailing_stop_manager or self.pyramiding_manager):
+            try:
+                self.mark_price_stream = MarkPriceStream(
+                    on_price=self._on_mark_price,
+                    base_url=getattr(
+                        config, 'MARK_PRICE_STREAM_URL',
+                        TESTNET_STREAM_URL if config.USE_TESTNET else FUTURES_STREAM_URL
+                    ),
+                    stream_type=getattr(config, 'MARK_PRICE_STREAM_TYPE', 'markPrice@1s'),
+                    stale_after=getattr(config, 'MARK_PRICE_STREAM_STALE_SECONDS', 5),
+                    proxy=proxy,
+                )
+                self.mark_price_stream.start()
+                self.logger.info("✅ 标记价格推送流已启用")
+            except Exception as e:
+                self.mark_price_stream = None
+                self.logger.warning(f"标记价格推送流启动失败，使用 REST 轮询: {e}")
+        if self.mark_price_stream:
+            self.trader.mark_price_provider = self.mark_price_stream.get_price
+
+        # 5.2 用户数据流（可选）：持仓/挂单由推送维护，开仓等待成交推送而非固定 sleep
+        if getattr(config, 'ENABLE_USER_DATA_STREAM', False):
+            if self.trader.start_user_data_stream(
+                base_url=getattr(config, 'USER_DATA_STREAM_URL', None),
+                reconcile_interval=getattr(config, 'USER_DATA_STREAM_RECONCILE_INTERVAL', 60),
+            ):
+                self.logger.info("✅ 用户数据流已启用")
+
         # 6. 初始化交易信号处理器（新策略）
         long_enabled = getattr(config, 'LONG_TRADING_ENABLED', True)
         short_enabled = getattr(config, 'SHORT_TRADING_ENABLED', False)
@@ -291,6 +333,7 @@ class FuturesAutoTradingSystem:
 
         # 10. 初始化时检查已有持仓，添加到追踪管理器
         self._init_existing_positions()
+        self._sync_mark_price_stream()
 
         self.logger.info("✅ 系统初始化成功")
         self._print_system_status()
@@ -835,6 +878,8 @@ class FuturesAutoTradingSystem:
             current_symbols = set(self.trader.positions.keys())
             closed_symbols = previous_symbols - current_symbols
             for closed_symbol in closed_symbols:
+                with self._exit_attempts_lock:
+                    self._exit_attempts.pop(closed_symbol, None)
                 symbol_base = closed_symbol.replace("USDT", "")
                 self.logger.info(f"🧹 清理 {symbol_base} 的追踪止损和金字塔退出记录")
                 if self.trailing_stop_manager:
@@ -865,8 +910,71 @@ class FuturesAutoTradingSystem:
                         self.pyramiding_manager.add_position(symbol_base, position.entry_price)
                         self.logger.info(f"📊 自动添加 {symbol_base} 到金字塔止盈跟踪")
 
+            self._sync_mark_price_stream()
             self.last_position_monitor = now
 
+    def _sync_mark_price_stream(self):
+        """按当前持仓同步推送流订阅"""
+        if self.mark_price_stream:
+            self.mark_price_stream.sync_symbols(list(self.trader.positions.keys()))
+
+    def _current_price(self, symbol: str, position) -> float:
+        """优先使用推送流的新鲜价格，推送失效时使用 REST 轮询的标记价格"""
+        if self.mark_price_stream:
+            price = self.mark_price_stream.get_price(symbol)
+            if price:
+                return price
+        return position.mark_price
+
+    def _on_mark_price(self, symbol: str, price: float, event_time: int):
+        """推送流回调：更新标记价格并立即检查退出条件"""
+        position = self.trader.positions.get(symbol)
+        if not position:
+            return
+        with self._exit_lock:
+            position.mark_price = price
+            if self.trailing_stop_manager and self._check_trailing_stop_for(symbol, position, price):
+                return
+            if self.pyramiding_manager:
+                self._check_pyramiding_exit_for(symbol, position, price)
+
+    def _exit_blocked(self, symbol: str) -> bool:
+        """该标的平仓请求正在执行，或上次失败后仍在退避期内"""
+        with self._exit_attempts_lock:
+            state = self._exit_attempts.get(symbol)
+            return bool(state) and (state['in_flight'] or time.monotonic() < state['retry_at'])
+
+    def _submit_exit(self, symbol: str, close_fn: Callable[[], bool]) -> bool:
+        """
+        执行一次平仓请求：同一标的同时只有一个在途请求，失败后按指数退避再允许重试
+
+        Returns:
+            平仓是否成功（被在途/退避拦下时返回 False）
+        """
+        with self._exit_attempts_lock:
+            state = self._exit_attempts.setdefault(
+                symbol, {'in_flight': False, 'retry_at': 0.0, 'failures': 0}
+            )
+            if state['in_flight'] or time.monotonic() < state['retry_at']:
+                return False
+            state['in_flight'] = True
+
+        ok = False
+        try:
+            ok = bool(close_fn())
+        finally:
+            with self._exit_attempts_lock:
+                if ok:
+                    self._exit_attempts.pop(symbol, None)
+                else:
+                    state['in_flight'] = False
+                    state['failures'] += 1
+                    delay = min(self.exit_retry_backoff * 2 ** (state['failures'] - 1), self.exit_retry_max_backoff)
+                    state['retry_at'] = time.monotonic() + delay
+            if not ok:
+                self.logger.warning(f"{symbol} 平仓失败，{delay:.0f}s 后允许重试 (连续失败 {state['failures']} 次)")
+        return ok
+
     def check_trailing_stops(self):
         """检查移动止损"""
         if not self.trailing_stop_manager:
@@ -878,85 +986,114 @@ class FuturesAutoTradingSystem:
 
         self.last_trailing_stop_check = now
 
-        # 遍历所有持仓
-        for symbol, position in self.trader.positions.items():
-            symbol_base = symbol.replace("USDT", "")
+        # 遍历所有持仓（推送流回调可能并发平仓，遍历快照）
+        for symbol, position in list(self.trader.positions.items()):
+            with self._exit_lock:
+                if symbol not in self.trader.positions:
+                    continue
+                self._check_trailing_stop_for(symbol, position, self._current_price(symbol, position))
 
-            enabled, activation, callback = self._get_trailing_stop_settings(symbol_base)
-            if not enabled:
-                if symbol_base in self.trailing_stop_manager.tracking_data:
-                    self.trailing_stop_manager.remove_position(symbol_base)
-                continue
-
-            if symbol_base not in self.trailing_stop_manager.tracking_data:
-                self.trailing_stop_manager.add_position(
-                    symbol_base,
-                    position.entry_price,
-                    position.mark_price,
-                    activation_percent=activation,
-                    callback_percent=callback,
-                )
-            else:
-                tracking = self.trailing_stop_manager.tracking_data.get(symbol_base) or {}
-                if activation is not None:
-                    tracking["activation_percent"] = activation
-                if callback is not None:
-                    tracking["callback_percent"] = callback
-
-            # 更新价格并检查触发
-            trigger = self.trailing_stop_manager.update_price(
+    def _check_trailing_stop_for(self, symbol: str, position, price: float) -> bool:
+        """
+        检查单个持仓的移动止损
+
+        Returns:
+            是否触发并平仓
+        """
+        symbol_base = symbol.replace("USDT", "")
+
+        enabled, activation, callback = self._get_trailing_stop_settings(symbol_base)
+        if not enabled:
+            if symbol_base in self.trailing_stop_manager.tracking_data:
+                self.trailing_stop_manager.remove_position(symbol_base)
+            return False
+
+        if symbol_base not in self.trailing_stop_manager.tracking_data:
+            self.trailing_stop_manager.add_position(
                 symbol_base,
-                position.mark_price
+                position.entry_price,
+                price,
+                activation_percent=activation,
+                callback_percent=callback,
             )
+        else:
+            tracking = self.trailing_stop_manager.tracking_data.get(symbol_base) or {}
+            if activation is not None:
+                tracking["activation_percent"] = activation
+            if callback is not None:
+                tracking["callback_percent"] = callback
+
+        # 更新价格并检查触发
+        trigger = self.trailing_stop_manager.update_price(symbol_base, price)
+        if not trigger:
+            return False
+
+        # 触发移动止损，立即平仓（平仓在途或失败退避中时本次跳过）
+        if self._exit_blocked(symbol):
+            return True
+        self.logger.warning(f"🛑 {symbol} 触发追踪止损")
+        if not self._submit_exit(symbol, lambda: self.trader.close_position(symbol, reason="追踪止损")):
+            return True
 
-            if trigger:
-                # 触发移动止损，立即平仓
-                self.logger.warning(f"🛑 {symbol} 触发追踪止损")
-                self.trader.close_position(symbol, reason="追踪止损")
-
-                # 移除分批止盈跟踪
-                if self.pyramiding_manager:
-                    self.pyramiding_manager.remove_position(symbol_base)
+        # 移除分批止盈跟踪
+        if self.pyramiding_manager:
+            self.pyramiding_manager.remove_position(symbol_base)
+        self._sync_mark_price_stream()
+        return True
 
     def check_pyramiding_exits(self):
         """检查分批止盈"""
         if not self.pyramiding_manager:
             return
 
-        # 遍历所有持仓
-        for symbol, position in self.trader.positions.items():
-            symbol_base = symbol.replace("USDT", "")
+        # 遍历所有持仓（推送流回调可能并发平仓，遍历快照）
+        for symbol, position in list(self.trader.positions.items()):
+            with self._exit_lock:
+                if symbol not in self.trader.positions:
+                    continue
+                self._check_pyramiding_exit_for(symbol, position, self._current_price(symbol, position))
+
+    def _check_pyramiding_exit_for(self, symbol: str, position, price: float):
+        """检查单个持仓的分批止盈"""
+        symbol_base = symbol.replace("USDT", "")
+        if self._exit_blocked(symbol):
+            return
 
-            # 检查是否触发分批止盈
-            exit_trigger = self.pyramiding_manager.check_exit_trigger(
-                symbol_base,
-                position.mark_price
-            )
+        # 检查是否触发分批止盈
+        exit_trigger = self.pyramiding_manager.check_exit_trigger(symbol_base, price)
+        if not exit_trigger:
+            return
 
-            if exit_trigger:
-                profit_pct, close_ratio, level_idx = exit_trigger
+        profit_pct, close_ratio, level_idx = exit_trigger
 
-                self.logger.info(
-                    f"🎯 {symbol} 触发金字塔退出 Level {level_idx+1}: "
-                    f"盈利 {profit_pct:.2f}%, 平仓 {close_ratio*100:.0f}%"
-                )
+        self.logger.info(
+            f"🎯 {symbol} 触发金字塔退出 Level {level_idx+1}: "
+            f"盈利 {profit_pct:.2f}%, 平仓 {close_ratio*100:.0f}%"
+        )
 
-                # 部分平仓
-                if close_ratio >= 1.0:
-                    # 全部平仓
-                    self.trader.close_position(symbol, reason=f"金字塔退出 Level {level_idx+1}")
+        # 部分平仓
+        if close_ratio >= 1.0:
+            # 全部平仓
+            if not self._submit_exit(
+                symbol, lambda: self.trader.close_position(symbol, reason=f"金字塔退出 Level {level_idx+1}")
+            ):
+                # 平仓失败：恢复该级别，退避结束后重新触发
+                self.pyramiding_manager.executed_levels.get(symbol_base, set()).discard(level_idx)
+                return
 
-                    # 清理跟踪
-                    if self.trailing_stop_manager:
-                        self.trailing_stop_manager.remove_position(symbol_base)
-                    self.pyramiding_manager.remove_position(symbol_base)
-                else:
-                    # 部分平仓
-                    self.trader.partial_close_position(
-                        symbol,
-                        close_ratio,
-                        reason=f"金字塔退出 Level {level_idx+1}"
-                    )
+            # 清理跟踪
+            if self.trailing_stop_manager:
+                self.trailing_stop_manager.remove_position(symbol_base)
+            self.pyramiding_manager.remove_position(symbol_base)
+            self._sync_mark_price_stream()
+        else:
+            # 部分平仓
+            if not self._submit_exit(symbol, lambda: self.trader.partial_close_position(
+                symbol,
+                close_ratio,
+                reason=f"金字塔退出 Level {level_idx+1}"
+            )):
+                self.pyramiding_manager.executed_levels.get(symbol_base, set()).discard(level_idx)
 
     def update_balance(self):
         """定期更新余额"""
@@ -1049,6 +1186,9 @@ class FuturesAutoTradingSystem:
 
         except KeyboardInterrupt:
             self.logger.info("\n🛑 正在关闭...")
+            if self.mark_price_stream:
+                self.mark_price_stream.stop()
+            self.trader.stop_user_data_stream()
             self._print_system_status()
 
 
@@ -6,14 +6,19 @@
 import time
 import logging
 import threading
-from decimal import Decimal, ROUND_DOWN, ROUND_UP
-from typing import Dict, Optional, List, Tuple
+import uuid
+from decimal import Decimal
+from typing import Callable, Dict, Optional, List, Tuple
 from datetime import datetime
+from pathlib import Path
 import requests
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from .risk_manager import RiskManager, TradeRecommendation
 from .trade_notifier import TradeNotifier
+from .market_stream import FUTURES_STREAM_URL, TESTNET_STREAM_URL
+from .user_data_stream import TERMINAL_ORDER_STATUSES
+from .exchange_rules import ExchangeRuleIndex
 
 
 class PositionInfo:
@@ -90,6 +95,13 @@ class BinanceFuturesTrader:
         self._use_hedge_mode = None
         self.enable_trailing_stop = False
 
+        # 用户数据流（可选）：就绪时持仓/挂单查询走内存簿，并按间隔用 REST 对账
+        self.user_stream = None
+        self.user_stream_reconcile_interval = 60.0
+        self._last_rest_position_sync = 0.0
+        # 标记价格来源（可选）：返回新鲜价格或 None，如 MarkPriceStream.get_price
+        self.mark_price_provider: Optional[Callable[[str], Optional[float]]] = None
+
         self.api_timeout = int(api_timeout) if api_timeout else 30
         self.api_retry_count = max(1, int(api_retry_count) if api_retry_count else 1)
         self.enable_proxy_fallback = bool(enable_proxy_fallback)
@@ -171,8 +183,9 @@ class BinanceFuturesTrader:
         # 已执行的分批止盈级别（避免重复执行）
         self.executed_tp_levels: Dict[str, set] = {}
 
-        # 缓存交易对规则，避免重复请求交易所信息
-        self._symbol_info_cache: Dict[str, Dict] = {}
+        # 各交易对已确认的杠杆/保证金模式，开仓时只在与目标不同时才调用修改接口
+        self._symbol_leverage: Dict[str, int] = {}
+        self._symbol_margin_type: Dict[str, str] = {}
 
         # 初始化 Telegram 通知器
         try:
@@ -284,9 +297,21 @@ class BinanceFuturesTrader:
             self.major_coin_trailing_stop_activation = 1.0
             self.major_coin_trailing_stop_callback = 0.8
 
+        # 交易规则索引：启动时从磁盘缓存/exchangeInfo 一次性载入，下单时只查内存
+        rules_file = getattr(self._config, 'EXCHANGE_RULES_FILE', 'data/exchange_rules.json')
+        if rules_file and testnet:
+            rules_file = str(Path(rules_file).with_name(f"{Path(rules_file).stem}_testnet.json"))
+        self.exchange_rules = ExchangeRuleIndex(
+            fetch=lambda: self._call_read_api('futures_exchange_info'),
+            cache_file=rules_file or None,
+            refresh_interval=float(getattr(self._config, 'EXCHANGE_RULES_REFRESH_INTERVAL', 6 * 3600) or 6 * 3600),
+        )
+
         # 测试连接并同步时间（代理失败时自动切换直连）
         self._init_connectivity()
         self._use_hedge_mode = self._detect_hedge_mode()
+        self.prime_symbol_settings()
+        self.exchange_rules.load()
 
         self._safety_last_action_ts: Dict[str, float] = {}
         
@@ -430,8 +455,13 @@ class BinanceFuturesTrader:
                     except Exception:
                         pass
 
+    # python-binance 会把这些接口的全部参数编码进 batchOrders，附带 recvWindow 会破坏该参数
+    _NO_RECV_WINDOW_METHODS = frozenset({'futures_place_batch_order'})
+
     def _invoke_client_method(self, client: Client, method_name: str, *args, **kwargs):
         recv_window = int(getattr(self, "recv_window_ms", 0) or 0)
+        if method_name in self._NO_RECV_WINDOW_METHODS:
+            recv_window = 0
         if recv_window > 0 and "recvWindow" not in kwargs and "recv_window" not in kwargs:
             with_window = dict(kwargs)
             with_window["recvWindow"] = recv_window
@@ -608,6 +638,74 @@ class BinanceFuturesTrader:
                 'trailing_callback': None,
             }
 
+    def start_user_data_stream(self, base_url: Optional[str] = None,
+                               reconcile_interval: float = 60.0) -> bool:
+        """
+        启动用户数据流，之后持仓/挂单查询和成交等待优先使用推送维护的内存簿
+
+        Args:
+            base_url: WebSocket 地址（默认按 testnet 自动选择）
+            reconcile_interval: 流就绪时 REST 全量对账间隔（秒），用于刷新杠杆/强平价等推送不含的字段
+
+        Returns:
+            是否启动成功
+        """
+        if self.user_stream:
+            return True
+        try:
+            from .user_data_stream import UserDataStream
+
+            self.user_stream = UserDataStream(
+                call_api=self._call_read_api,
+                base_url=base_url or (TESTNET_STREAM_URL if self.testnet else FUTURES_STREAM_URL),
+                proxy=self._proxy,
+                on_leverage_change=self._on_leverage_change,
+            )
+            self.user_stream_reconcile_interval = float(reconcile_interval)
+            self.user_stream.start()
+            return True
+        except Exception as e:
+            self.user_stream = None
+            self.logger.warning(f"用户数据流启动失败，继续使用 REST 轮询: {e}")
+            return False
+
+    def stop_user_data_stream(self):
+        """停止用户数据流"""
+        if self.user_stream:
+            self.user_stream.stop()
+            self.user_stream = None
+
+    def _user_stream_ready(self) -> bool:
+        return bool(self.user_stream and self.user_stream.is_ready())
+
+    def _wait_order_result(self, symbol: str, order_id, fallback_delay: float = 1.0) -> Optional[Dict]:
+        """
+        等待订单终态：用户数据流就绪时等待成交推送，
+        否则立即 REST 查询，未到终态时以递增间隔轮询至 fallback_delay
+        """
+        if self._user_stream_ready():
+            order = self.user_stream.wait_for_order(order_id, timeout=3.0)
+            if order:
+                return order
+            return self.verify_order_status(symbol, order_id)
+
+        deadline = time.monotonic() + fallback_delay
+        delay = 0.05
+        while True:
+            order = self.verify_order_status(symbol, order_id)
+            remaining = deadline - time.monotonic()
+            if order is None or order.get('status') in TERMINAL_ORDER_STATUSES or remaining <= 0:
+                return order
+            time.sleep(min(delay, remaining))
+            delay *= 2
+
+    def _wait_for_new_position(self, symbol: str, fallback_delay: float = 2.0) -> None:
+        """下单超时后等待持仓出现：流就绪时等待推送，否则固定等待"""
+        if self._user_stream_ready():
+            self.user_stream.wait_for_position(symbol, timeout=fallback_delay)
+        else:
+            time.sleep(fallback_delay)
+
     def get_account_balance(self) -> Tuple[float, float]:
         """
         获取合约账户余额
@@ -635,7 +733,14 @@ class BinanceFuturesTrader:
         self.risk_manager.update_balance(total, available)
 
     def get_symbol_price(self, symbol: str) -> Optional[float]:
-        """获取合约当前标记价格"""
+        """获取合约当前标记价格（优先使用 mark_price_provider 的新鲜价格）"""
+        if self.mark_price_provider:
+            try:
+                price = self.mark_price_provider(symbol)
+                if price:
+                    return float(price)
+            except Exception:
+                pass
         try:
             ticker = self._call_read_api('futures_mark_price', symbol=symbol)
             return float(ticker['markPrice'])
@@ -659,10 +764,12 @@ class BinanceFuturesTrader:
                     leverage=leverage
                 )
                 self.logger.info(f"✅ 设置 {symbol} 杠杆: {leverage}x")
+                self._symbol_leverage[symbol] = int(leverage)
                 return True
             except BinanceAPIException as e:
                 if "No need to change leverage" in str(e):
                     self.logger.debug(f"{symbol} 杠杆已设为 {leverage}x")
+                    self._symbol_leverage[symbol] = int(leverage)
                     return True
 
                 # 超时错误，尝试重试
@@ -693,10 +800,12 @@ class BinanceFuturesTrader:
                     marginType=margin_type
                 )
                 self.logger.info(f"✅ 设置 {symbol} 保证金类型: {margin_type}")
+                self._symbol_margin_type[symbol] = self._normalize_margin_type(margin_type)
                 return True
             except BinanceAPIException as e:
                 if "No need to change margin type" in str(e):
                     self.logger.debug(f"{symbol} 保证金类型已设为 {margin_type}")
+                    self._symbol_margin_type[symbol] = self._normalize_margin_type(margin_type)
                     return True
 
                 # 超时错误，尝试重试
@@ -714,10 +823,71 @@ class BinanceFuturesTrader:
 
         return False
 
+    @staticmethod
+    def _normalize_margin_type(margin_type) -> str:
+        # 持仓风险接口返回 isolated/cross，修改接口使用 ISOLATED/CROSSED
+        value = str(margin_type or '').upper()
+        return 'CROSSED' if value == 'CROSS' else value
+
+    def prime_symbol_settings(self) -> int:
+        """
+        从交易对配置接口（GET /fapi/v1/symbolConfig）一次性载入各交易对当前的杠杆与保证金模式（启动时调用）
+
+        持仓风险 v3 接口不再返回 leverage / marginType，不能用来载入。
+
+        Returns:
+            载入的交易对数量
+        """
+        try:
+            configs = self._call_read_api('futures_symbol_config') or []
+        except Exception as e:
+            self.logger.warning(f"载入杠杆/保证金模式失败，开仓时按需设置: {e}")
+            return 0
+
+        loaded = set()
+        for item in configs:
+            symbol = item.get('symbol')
+            if not symbol:
+                continue
+            try:
+                if item.get('leverage') is not None:
+                    self._symbol_leverage[symbol] = int(float(item['leverage']))
+            except (TypeError, ValueError):
+                pass
+            if item.get('marginType'):
+                self._symbol_margin_type[symbol] = self._normalize_margin_type(item['marginType'])
+            loaded.add(symbol)
+        self.logger.info(f"⚙️  已载入 {len(loaded)} 个交易对的杠杆/保证金模式")
+        return len(loaded)
+
+    def _on_leverage_change(self, symbol: str, leverage: int) -> None:
+        """用户数据流 ACCOUNT_CONFIG_UPDATE 回调：杠杆在其它终端被修改时同步缓存"""
+        self._symbol_leverage[symbol] = int(leverage)
+
+    def _forget_symbol_settings(self, symbol: str) -> None:
+        """开仓被拒时丢弃该交易对的缓存，下次开仓重新设置"""
+        self._symbol_leverage.pop(symbol, None)
+        self._symbol_margin_type.pop(symbol, None)
+
+    def ensure_symbol_settings(self, symbol: str, leverage: int, margin_type: str) -> None:
+        """
+        开仓前确保杠杆与保证金模式：缓存与目标一致时不请求币安
+        （尽力而为，设置失败时使用当前设置继续交易）
+        """
+        if self._symbol_leverage.get(symbol) != int(leverage):
+            if not self.set_leverage(symbol, leverage):
+                self.logger.warning(f"⚠️  设置杠杆失败，使用当前杠杆继续交易")
+        if self._symbol_margin_type.get(symbol) != self._normalize_margin_type(margin_type):
+            if not self.set_margin_type(symbol, margin_type):
+                self.logger.warning(f"⚠️  设置保证金模式失败，使用当前模式继续交易")
+
     def get_position_info(self, symbol: str) -> Optional[PositionInfo]:
         """获取指定标的的持仓信息"""
         try:
-            positions = self._call_read_api('futures_position_information', symbol=symbol)
+            if self._user_stream_ready():
+                positions = self._positions_from_user_stream(symbol)
+            else:
+                positions = self._call_read_api('futures_position_information', symbol=symbol)
             for pos in positions:
                 qty = float(pos.get('positionAmt', 0))
                 if qty != 0:  # 有持仓
@@ -737,6 +907,8 @@ class BinanceFuturesTrader:
         注意：此函数用于在开仓前判断是否安全清理旧挂单，避免误删正在保护持仓的止盈/止损。
         """
         try:
+            if self._user_stream_ready():
+                return self.user_stream.get_position_amount(symbol)
             positions = self._call_read_api('futures_position_information', symbol=symbol) or []
             for pos in positions:
                 if pos.get('symbol') == symbol:
@@ -763,8 +935,8 @@ class BinanceFuturesTrader:
             configured_types = order_types or getattr(self, 'exit_order_types_to_cancel', None) or []
             exit_types = {str(t).upper() for t in configured_types if t}
 
-            open_orders = self._call_read_api('futures_get_open_orders', symbol=symbol) or []
-            if not isinstance(open_orders, list):
+            open_orders = self._get_open_orders_safe(symbol)
+            if not open_orders:
                 return 0
 
             attempted = 0
@@ -828,11 +1000,12 @@ class BinanceFuturesTrader:
             normalized.append((profit_pct, close_ratio))
         return sorted(normalized, key=lambda x: x[0])
 
-    def _place_take_profit_orders_from_levels(self, symbol: str, entry_price: float,
-                                              total_qty: float,
-                                              custom_levels: Optional[List[Tuple[float, float]]] = None) -> int:
+    def _take_profit_legs_from_levels(self, symbol: str, entry_price: float,
+                                      total_qty: float,
+                                      custom_levels: Optional[List[Tuple[float, float]]] = None
+                                      ) -> List[Tuple[str, Dict]]:
         """
-        根据止盈级别挂多级止盈单（支持主流币独立策略）。
+        根据止盈级别生成做多多级止盈单（支持主流币独立策略）。
 
         说明：
         - 前端的止盈 1/2/3 百分比会写入 PYRAMIDING_EXIT_LEVELS
@@ -840,7 +1013,7 @@ class BinanceFuturesTrader:
         - 最后一个 close_ratio>=1 的级别使用 closePosition=True，避免舍入导致的残留
 
         Returns:
-            成功提交的止盈单数量（不含止损单）。
+            [(名称, 下单参数)]，由 _submit_exit_orders 提交
         """
         # 优先使用自定义级别（主流币策略），否则使用默认配置
         if custom_levels:
@@ -848,7 +1021,7 @@ class BinanceFuturesTrader:
         else:
             levels = self._normalize_exit_levels(getattr(self, 'pyramiding_exit_levels', []) or [])
         if not levels:
-            return 0
+            return []
         # 兼容旧配置：平仓比例固定为 50% / 50% / 全平（按"剩余仓位"逐级计算）。
         # 仅对默认配置应用此兼容逻辑，自定义级别直接使用
         if len(levels) >= 3 and not custom_levels:
@@ -857,60 +1030,12 @@ class BinanceFuturesTrader:
                 (levels[1][0], 0.5),
                 (levels[2][0], 1.0),
             ]
+        return self._build_take_profit_legs(symbol, entry_price, total_qty, levels, close_side='SELL')
 
-        submitted = 0
-        remaining = float(total_qty or 0)
-        if remaining <= 0:
-            return 0
-
-        for idx, (profit_pct, close_ratio) in enumerate(levels):
-            if remaining <= 0:
-                break
-
-            is_final_close = close_ratio >= 1.0
-            tp_target = entry_price * (1 + profit_pct / 100)
-            tp_price = self.format_price(symbol, tp_target, rounding="up")
-
-            order_kwargs = {
-                'symbol': symbol,
-                'side': 'SELL',
-                'type': 'TAKE_PROFIT_MARKET',
-                'stopPrice': tp_price,
-            }
-
-            if is_final_close:
-                order_kwargs['closePosition'] = True
-                self.logger.info(f"🎯 设置止盈{idx+1} 于 {tp_price} (全平, {profit_pct}%)")
-            else:
-                raw_qty = remaining * min(max(close_ratio, 0.0), 1.0)
-                tp_qty = self.format_quantity(symbol, raw_qty)
-                if tp_qty <= 0:
-                    self.logger.warning(f"止盈{idx+1} 下单量过小，跳过: {symbol} qty={raw_qty}")
-                    continue
-                if tp_qty > remaining:
-                    tp_qty = remaining
-                order_kwargs['quantity'] = tp_qty
-                self.logger.info(
-                    f"🎯 设置止盈{idx+1} 于 {tp_price} (平{tp_qty}张, {profit_pct}%, ratio={close_ratio})"
-                )
-
-            try:
-                self._submit_order_with_mode(order_kwargs, position_side='LONG')
-                submitted += 1
-            except BinanceAPIException as e:
-                self.logger.error(f"设置止盈{idx+1}失败: {e}")
-            except Exception as e:
-                self.logger.error(f"设置止盈{idx+1}异常: {e}")
-
-            if not is_final_close and 'quantity' in order_kwargs:
-                remaining -= float(order_kwargs['quantity'])
-
-        return submitted
-
-    def _place_short_pyramiding_exit_orders(self, symbol: str, entry_price: float,
-                                            total_qty: float) -> int:
+    def _short_pyramiding_exit_legs(self, symbol: str, entry_price: float,
+                                    total_qty: float) -> List[Tuple[str, Dict]]:
         """
-        根据 SHORT_PYRAMIDING_EXIT_LEVELS 挂做空多级止盈单。
+        根据 SHORT_PYRAMIDING_EXIT_LEVELS 生成做空多级止盈单。
 
         说明：
         - 做空止盈在价格下跌时触发（价格低于入场价）
@@ -918,11 +1043,11 @@ class BinanceFuturesTrader:
         - 最后一个 close_ratio>=1 的级别使用 closePosition=True
 
         Returns:
-            成功提交的止盈单数量。
+            [(名称, 下单参数)]，由 _submit_exit_orders 提交
         """
         levels = self._normalize_exit_levels(getattr(self, 'short_pyramiding_exit_levels', []) or [])
         if not levels:
-            return 0
+            return []
 
         # 兼容配置：平仓比例固定为 50% / 50% / 全平
         if len(levels) >= 3:
@@ -931,56 +1056,185 @@ class BinanceFuturesTrader:
                 (levels[1][0], 0.5),
                 (levels[2][0], 1.0),
             ]
+        return self._build_take_profit_legs(symbol, entry_price, total_qty, levels, close_side='BUY')
 
-        submitted = 0
+    def _build_take_profit_legs(self, symbol: str, entry_price: float, total_qty: float,
+                                levels: List[Tuple[float, float]],
+                                close_side: str) -> List[Tuple[str, Dict]]:
+        """按级别逐级计算止盈价与平仓数量；close_side 为 SELL（做多）或 BUY（做空）"""
+        is_long = close_side == 'SELL'
+        label = "止盈" if is_long else "做空止盈"
+        sign = "" if is_long else "-"
+
+        legs: List[Tuple[str, Dict]] = []
         remaining = float(total_qty or 0)
         if remaining <= 0:
-            return 0
+            return legs
 
         for idx, (profit_pct, close_ratio) in enumerate(levels):
             if remaining <= 0:
                 break
 
             is_final_close = close_ratio >= 1.0
-            # 做空止盈：价格下跌 profit_pct% 时触发
-            tp_target = entry_price * (1 - profit_pct / 100)
-            tp_price = self.format_price(symbol, tp_target, rounding="down")
+            if is_long:
+                tp_price = self.format_price(symbol, entry_price * (1 + profit_pct / 100), rounding="up")
+            else:
+                # 做空止盈：价格下跌 profit_pct% 时触发
+                tp_price = self.format_price(symbol, entry_price * (1 - profit_pct / 100), rounding="down")
 
             order_kwargs = {
                 'symbol': symbol,
-                'side': 'BUY',  # 做空平仓用 BUY
+                'side': close_side,
                 'type': 'TAKE_PROFIT_MARKET',
                 'stopPrice': tp_price,
             }
 
             if is_final_close:
                 order_kwargs['closePosition'] = True
-                self.logger.info(f"🎯 做空止盈{idx+1} 于 {tp_price} (全平, -{profit_pct}%)")
+                self.logger.info(f"🎯 设置{label}{idx+1} 于 {tp_price} (全平, {sign}{profit_pct}%)")
             else:
                 raw_qty = remaining * min(max(close_ratio, 0.0), 1.0)
                 tp_qty = self.format_quantity(symbol, raw_qty)
                 if tp_qty <= 0:
-                    self.logger.warning(f"做空止盈{idx+1} 下单量过小，跳过: {symbol} qty={raw_qty}")
+                    self.logger.warning(f"{label}{idx+1} 下单量过小，跳过: {symbol} qty={raw_qty}")
                     continue
                 if tp_qty > remaining:
                     tp_qty = remaining
                 order_kwargs['quantity'] = tp_qty
+                remaining -= float(tp_qty)
                 self.logger.info(
-                    f"🎯 做空止盈{idx+1} 于 {tp_price} (平{tp_qty}张, -{profit_pct}%, ratio={close_ratio})"
+                    f"🎯 设置{label}{idx+1} 于 {tp_price} (平{tp_qty}张, {sign}{profit_pct}%, ratio={close_ratio})"
                 )
 
+            legs.append((f"{label}{idx+1}", order_kwargs))
+
+        return legs
+
+    def _legacy_take_profit_legs(self, symbol: str, recommendation: TradeRecommendation,
+                                 total_qty: float) -> List[Tuple[str, Dict]]:
+        """兼容旧配置：固定 2 个止盈点 (50% + 50%)，价格取交易建议的 TP1/TP2"""
+        legs: List[Tuple[str, Dict]] = []
+        for label, target in (("第一止盈", recommendation.take_profit_1),
+                              ("第二止盈", recommendation.take_profit_2)):
+            tp_price = self.format_price(symbol, target, rounding="up")
+            tp_quantity = self.format_quantity(symbol, total_qty * 0.5)
+            self.logger.info(f"🎯 设置{label}于 {tp_price} (平{tp_quantity}张合约, 50%)")
+            legs.append((label, {
+                'symbol': symbol,
+                'side': 'SELL',
+                'type': 'TAKE_PROFIT_MARKET',
+                'stopPrice': tp_price,
+                'quantity': tp_quantity,
+                'reduceOnly': True,
+            }))
+        return legs
+
+    # 币安 batchOrders 单次最多 5 个订单
+    _BATCH_ORDER_LIMIT = 5
+    # 同一 newClientOrderId 已有挂单
+    _DUPLICATE_CLIENT_ORDER_ID = -4116
+
+    @staticmethod
+    def _batch_order_value(value) -> str:
+        # batchOrders 内的参数必须是字符串；浮点数不能用科学计数法
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            return format(Decimal(str(value)), 'f')
+        return str(value)
+
+    def _place_batch_orders(self, orders: List[Dict]) -> List[Dict]:
+        """
+        POST /fapi/v1/batchOrders 一次提交最多 5 个订单（futures_place_batch_order，经 _call_api）。
+
+        batchOrders 内的参数必须是字符串；该接口不附带 recvWindow（见 _NO_RECV_WINDOW_METHODS）。
+
+        Returns:
+            与 orders 逐一对应的结果：成功为订单信息，被拒为 {'code': ..., 'msg': ...}
+        """
+        batch = [{k: self._batch_order_value(v) for k, v in order.items()} for order in orders]
+        return self._call_api('futures_place_batch_order', batchOrders=batch)
+
+    def _open_client_order_ids(self, symbol: str) -> Optional[set]:
+        """直接向币安查询交易对当前挂单的 clientOrderId；查询失败返回 None"""
+        try:
+            orders = self._call_read_api('futures_get_open_orders', symbol=symbol) or []
+        except Exception as e:
+            self.logger.error(f"核对 {symbol} 挂单失败: {e}")
+            return None
+        return {order.get('clientOrderId') for order in orders if order.get('clientOrderId')}
+
+    def _submit_single_exit_order(self, label: str, order_kwargs: Dict, position_side: str) -> bool:
+        try:
+            self._submit_order_with_mode(order_kwargs, position_side=position_side)
+            self.logger.info(f"✅ {label}已设于 {order_kwargs.get('stopPrice')}")
+            return True
+        except BinanceAPIException as e:
+            if getattr(e, "code", None) == self._DUPLICATE_CLIENT_ORDER_ID:
+                # 同一 clientOrderId 的订单此前已挂上（批量请求实际已成交）
+                self.logger.info(f"✅ {label}已存在于 {order_kwargs.get('stopPrice')}")
+                return True
+            self.logger.error(f"设置{label}失败: {e}")
+        except Exception as e:
+            self.logger.error(f"设置{label}异常: {e}")
+        return False
+
+    def _submit_exit_orders(self, legs: List[Tuple[str, Dict]], position_side: str) -> List[bool]:
+        """
+        用 batchOrders 一次提交止损/止盈单（超过 5 个时分批）。
+
+        - 每个订单预先分配 newClientOrderId，双向持仓模式下附带 positionSide 并去掉 reduceOnly
+        - 被单独拒绝的订单改走单笔下单路径重试（兼容 -4061/-1106 等模式问题）
+        - 整批被拒（API 错误）时全部改走单笔路径
+        - 网络错误时无法确定批量请求是否已到达：查询挂单，按 clientOrderId 补挂缺失的订单
+          （止损必在其中）；查询也失败时全部补挂，已存在的订单因 clientOrderId 重复被拒，不会重复挂单
+
+        Returns:
+            与 legs 逐一对应的是否提交成功
+        """
+        results = [False] * len(legs)
+        use_hedge = self._ensure_hedge_mode()
+        legs = [(label, dict(order_kwargs, newClientOrderId=order_kwargs.get('newClientOrderId')
+                             or f"vs_exit_{uuid.uuid4().hex[:24]}"))
+                for label, order_kwargs in legs]
+
+        for start in range(0, len(legs), self._BATCH_ORDER_LIMIT):
+            chunk = list(enumerate(legs))[start:start + self._BATCH_ORDER_LIMIT]
+            orders = []
+            for _, (_, order_kwargs) in chunk:
+                order = dict(order_kwargs)
+                if use_hedge:
+                    order['positionSide'] = position_side
+                    order.pop('reduceOnly', None)
+                orders.append(order)
+
             try:
-                self._submit_order_with_mode(order_kwargs, position_side='SHORT')
-                submitted += 1
+                responses = self._place_batch_orders(orders)
             except BinanceAPIException as e:
-                self.logger.error(f"设置做空止盈{idx+1}失败: {e}")
+                self.logger.warning(f"批量挂止盈/止损被拒，改为逐笔提交: {e}")
+                for idx, (label, order_kwargs) in chunk:
+                    results[idx] = self._submit_single_exit_order(label, order_kwargs, position_side)
+                continue
             except Exception as e:
-                self.logger.error(f"设置做空止盈{idx+1}异常: {e}")
+                self.logger.error(f"批量挂止盈/止损异常，核对挂单后补挂: {e}")
+                placed = self._open_client_order_ids(chunk[0][1][1]['symbol'])
+                for idx, (label, order_kwargs) in chunk:
+                    if placed is not None and order_kwargs['newClientOrderId'] in placed:
+                        results[idx] = True
+                        self.logger.info(f"✅ {label}已设于 {order_kwargs.get('stopPrice')}")
+                    else:
+                        results[idx] = self._submit_single_exit_order(label, order_kwargs, position_side)
+                continue
 
-            if not is_final_close and 'quantity' in order_kwargs:
-                remaining -= float(order_kwargs['quantity'])
+            for (idx, (label, order_kwargs)), response in zip(chunk, responses or []):
+                if isinstance(response, dict) and response.get('orderId'):
+                    results[idx] = True
+                    self.logger.info(f"✅ {label}已设于 {order_kwargs.get('stopPrice')}")
+                    continue
+                self.logger.warning(f"{label}批量提交被拒，逐笔重试: {response}")
+                results[idx] = self._submit_single_exit_order(label, order_kwargs, position_side)
 
-        return submitted
+        return results
 
     def verify_order_status(self, symbol: str, order_id: int) -> Optional[Dict]:
         """
@@ -1028,23 +1282,16 @@ class BinanceFuturesTrader:
     def format_quantity(self, symbol: str, quantity: float) -> float:
         """根据交易对规则格式化数量"""
         try:
-            symbol_info = self._get_symbol_info(symbol)
-            if symbol_info:
-                lot_filter = next(
-                    (f for f in symbol_info.get('filters', []) if f.get('filterType') == 'LOT_SIZE'),
-                    None
-                )
-                if lot_filter:
-                    step_size = float(lot_filter.get('stepSize', 0)) or 0.0
-                    min_qty = float(lot_filter.get('minQty', 0)) or 0.0
-                    if step_size > 0:
-                        rounded_qty = self._round_to_step(quantity, step_size, rounding="down")
-                        if rounded_qty < min_qty and quantity >= min_qty:
-                            self.logger.warning(
-                                f"{symbol} 下单量 {quantity} 低于最小数量 {min_qty}，已上调至最小值"
-                            )
-                            rounded_qty = self._round_to_step(min_qty, step_size, rounding="up")
-                        return rounded_qty
+            rules = self.exchange_rules.get(symbol)
+            if rules:
+                rounded_qty = rules.round_quantity(quantity, rounding="down")
+                min_qty = rules.min_quantity
+                if rounded_qty < min_qty and quantity >= min_qty:
+                    self.logger.warning(
+                        f"{symbol} 下单量 {quantity} 低于最小数量 {min_qty}，已上调至最小值"
+                    )
+                    rounded_qty = rules.round_quantity(min_qty, rounding="up")
+                return rounded_qty
             return round(quantity, 3)  # 默认3位小数
         except Exception as e:
             self.logger.error(f"格式化数量失败: {e}")
@@ -1053,52 +1300,23 @@ class BinanceFuturesTrader:
     def format_price(self, symbol: str, price: float, rounding: str = "down") -> float:
         """根据交易对规则格式化价格"""
         try:
-            symbol_info = self._get_symbol_info(symbol)
-            if symbol_info:
-                price_filter = next(
-                    (f for f in symbol_info.get('filters', []) if f.get('filterType') == 'PRICE_FILTER'),
-                    None
-                )
-                if price_filter:
-                    tick_size = float(price_filter.get('tickSize', 0)) or 0.0
-                    if tick_size > 0:
-                        rounded_price = self._round_to_step(price, tick_size, rounding=rounding)
-                        return rounded_price
+            rules = self.exchange_rules.get(symbol)
+            if rules:
+                return rules.round_price(price, rounding=rounding)
             return round(price, 4)
         except Exception as e:
             self.logger.error(f"格式化价格失败: {e}")
             return round(price, 4)
 
-    def _get_symbol_info(self, symbol: str) -> Optional[Dict]:
-        """获取并缓存交易对规则"""
-        if symbol in self._symbol_info_cache:
-            return self._symbol_info_cache[symbol]
-
-        try:
-            exchange_info = self._call_read_api('futures_exchange_info')
-            symbol_info = next((s for s in exchange_info['symbols'] if s['symbol'] == symbol), None)
-            if symbol_info:
-                self._symbol_info_cache[symbol] = symbol_info
-                return symbol_info
-        except Exception as e:
-            self.logger.error(f"获取 {symbol} 交易规则失败: {e}")
-        return None
-
-    @staticmethod
-    def _round_to_step(value: float, step: float, rounding: str = "down") -> float:
-        """按照交易对步长对数值取整"""
-        if step <= 0:
-            return value
-
-        decimal_value = Decimal(str(value))
-        decimal_step = Decimal(str(step))
-
-        rounding_mode = ROUND_DOWN if rounding == "down" else ROUND_UP
-        floored = (decimal_value / decimal_step).to_integral_value(rounding=rounding_mode) * decimal_step
-
-        # 使用 tickSize 的精度格式化结果，避免浮点数残留
-        quantized = floored.quantize(decimal_step)
-        return float(quantized)
+    def meets_min_notional(self, symbol: str, quantity: float, price: float) -> bool:
+        """下单名义价值是否达到交易对最小值（规则未知时视为满足，由交易所判定）"""
+        rules = self.exchange_rules.get(symbol)
+        if not rules or rules.meets_min_notional(quantity, price):
+            return True
+        self.logger.error(
+            f"❌ {symbol} 名义价值 {quantity * price:.4f} 低于最小值 {rules.min_notional_value}，跳过下单"
+        )
+        return False
 
     def open_long_position(self, recommendation: TradeRecommendation,
                           symbol_suffix: str = "USDT",
@@ -1128,17 +1346,10 @@ class BinanceFuturesTrader:
         binance_symbol = f"{recommendation.symbol}{symbol_suffix}"
 
         try:
-            # 1. 设置杠杆（尽力而为，即使失败也继续）
-            leverage_set = self.set_leverage(binance_symbol, leverage)
-            if not leverage_set:
-                self.logger.warning(f"⚠️  设置杠杆失败，使用当前杠杆继续交易")
-
-            # 2. 设置保证金模式（尽力而为，即使失败也继续）
-            margin_set = self.set_margin_type(binance_symbol, margin_type)
-            if not margin_set:
-                self.logger.warning(f"⚠️  设置保证金模式失败，使用当前模式继续交易")
+            # 1-2. 设置杠杆与保证金模式（已缓存且一致时跳过；尽力而为，即使失败也继续）
+            self.ensure_symbol_settings(binance_symbol, leverage, margin_type)
 
-            # 3. 获取当前价格
+            # 3. 获取当前价格（标记价格流就绪时直接取内存）
             current_price = self.get_symbol_price(binance_symbol)
             if not current_price:
                 self.logger.error(f"获取 {binance_symbol} 价格失败")
@@ -1174,11 +1385,13 @@ class BinanceFuturesTrader:
             quantity = self.format_quantity(binance_symbol, quantity)
 
             self.logger.info(f"📊 计算数量: {quantity} 张合约 @ {current_price}")
+            if not self.meets_min_notional(binance_symbol, quantity, current_price):
+                return False
 
             # 4.5 开仓前取消旧的止盈/止损挂单（避免旧单残留）
             self.cancel_stale_exit_orders_before_entry(binance_symbol)
 
-            # 5. 开仓（市价做多）- 带重试和状态验证
+            # 5. 开仓（市价做多）- 带重试和状态验证；RESULT 响应直接带回成交结果
             max_order_retries = 2
             order_retry_delay = 3  # 秒
             order = None
@@ -1199,7 +1412,8 @@ class BinanceFuturesTrader:
                             symbol=binance_symbol,
                             side='BUY',
                             type='MARKET',
-                            quantity=quantity
+                            quantity=quantity,
+                            newOrderRespType='RESULT'
                         )
                     except BinanceAPIException as e:
                         # 如果是 positionSide 相关错误，尝试双向模式
@@ -1210,7 +1424,8 @@ class BinanceFuturesTrader:
                                 side='BUY',
                                 positionSide='LONG',
                                 type='MARKET',
-                                quantity=quantity
+                                quantity=quantity,
+                                newOrderRespType='RESULT'
                             )
                         else:
                             raise
@@ -1235,7 +1450,7 @@ class BinanceFuturesTrader:
                         # 超时情况下尝试检查是否有新持仓
                         if e.code == -1007 or "Timeout" in str(e):
                             self.logger.warning("⚠️  超时错误，检查是否有新持仓...")
-                            time.sleep(2)  # 等待2秒让订单可能完成
+                            self._wait_for_new_position(binance_symbol)  # 等待订单可能完成
                             position = self.get_position_info(binance_symbol)
                             if position and position.quantity > 0:
                                 self.logger.warning(
@@ -1258,10 +1473,10 @@ class BinanceFuturesTrader:
                 self.logger.error("❌ 下单失败，未获取到订单信息")
                 return False
 
-            # 6. 验证订单状态（如果有订单ID）
-            if order_id and order_id != 'UNKNOWN_TIMEOUT':
-                time.sleep(1)  # 等待1秒确保订单处理完成
-                verified_order = self.verify_order_status(binance_symbol, order_id)
+            # 6. 验证订单状态（响应已是终态时无需等待；否则等待成交推送）
+            if (order_id and order_id != 'UNKNOWN_TIMEOUT'
+                    and order.get('status') not in TERMINAL_ORDER_STATUSES):
+                verified_order = self._wait_order_result(binance_symbol, order_id)
                 if verified_order:
                     order = verified_order  # 使用验证后的订单信息
                     self.logger.info(f"✅ 订单状态已验证: {verified_order.get('status')}")
@@ -1297,93 +1512,42 @@ class BinanceFuturesTrader:
             stop_loss_price = self.format_price(binance_symbol, actual_stop_loss, rounding="down")
             self.logger.info(f"🛡️  设置止损于 {stop_loss_price} ({'主流币' if is_major else '山寨币'}策略)")
 
-            try:
-                # 先尝试单向模式（不带 positionSide）
-                try:
-                    stop_order = self._call_api('futures_create_order',
-                        symbol=binance_symbol,
-                        side='SELL',
-                        type='STOP_MARKET',
-                        stopPrice=stop_loss_price,
-                        closePosition=True
-                    )
-                except BinanceAPIException as e:
-                    # 如果失败，尝试双向模式
-                    if e.code == -4061 or "position side" in str(e).lower():
-                        self.logger.warning("单向模式止损失败，尝试双向模式...")
-                        stop_order = self._call_api('futures_create_order',
-                            symbol=binance_symbol,
-                            side='SELL',
-                            positionSide='LONG',
-                            type='STOP_MARKET',
-                            stopPrice=stop_loss_price,
-                            closePosition=True
-                        )
-                    else:
-                        raise
-                self.logger.info(f"✅ 止损已设于 {stop_loss_price}")
-            except BinanceAPIException as e:
-                self.logger.error(f"设置止损失败: {e}")
-
-            # 9. 设置止盈单（根据主流币/山寨币策略选择不同的止盈级别）
-            tp_count = 0
+            stop_leg = ('止损', {
+                'symbol': binance_symbol,
+                'side': 'SELL',
+                'type': 'STOP_MARKET',
+                'stopPrice': stop_loss_price,
+                'closePosition': True,
+            })
+
+            # 9. 止盈单（根据主流币/山寨币策略选择不同的止盈级别）
+            total_qty = executed_quantity or quantity
+            tp_legs: List[Tuple[str, Dict]] = []
             if getattr(self, 'enable_pyramiding_exit', False) and getattr(
                     self, 'pyramiding_exit_execution', 'orders') == 'orders':
                 # 根据币种类型选择止盈级别
                 if is_major and coin_strategy['pyramiding_levels']:
                     self.logger.info(f"🏆 使用主流币金字塔止盈策略: {coin_strategy['pyramiding_levels']}")
-                    tp_count = self._place_take_profit_orders_from_levels(
-                        binance_symbol, current_price, executed_quantity or quantity,
+                    tp_legs = self._take_profit_legs_from_levels(
+                        binance_symbol, current_price, total_qty,
                         custom_levels=coin_strategy['pyramiding_levels']
                     )
                 else:
-                    tp_count = self._place_take_profit_orders_from_levels(
-                        binance_symbol, current_price, executed_quantity or quantity
+                    tp_legs = self._take_profit_legs_from_levels(
+                        binance_symbol, current_price, total_qty
                     )
-            if tp_count == 0:
-                # 兼容旧配置：固定 2 个止盈点 (50% + 50%)
-                # 自动适应单向/双向持仓模式
-                tp1_price = self.format_price(binance_symbol, recommendation.take_profit_1, rounding="up")
-                tp1_quantity = self.format_quantity(binance_symbol, (executed_quantity or quantity) * 0.5)
-                self.logger.info(f"🎯 设置第一止盈于 {tp1_price} (平{tp1_quantity}张合约, 50%)")
-
-                try:
-                    # 先尝试单向模式
-                    self._submit_order_with_mode(
-                        {
-                            'symbol': binance_symbol,
-                            'side': 'SELL',
-                            'type': 'TAKE_PROFIT_MARKET',
-                            'stopPrice': tp1_price,
-                            'quantity': tp1_quantity,
-                            'reduceOnly': True,
-                        },
-                        position_side='LONG'
-                    )
-                    self.logger.info(f"✅ 第一止盈已设于 {tp1_price}")
-                except BinanceAPIException as e:
-                    self.logger.error(f"设置第一止盈失败: {e}")
-
-                tp2_price = self.format_price(binance_symbol, recommendation.take_profit_2, rounding="up")
-                tp2_quantity = self.format_quantity(binance_symbol, (executed_quantity or quantity) * 0.5)
-                self.logger.info(f"🎯 设置第二止盈于 {tp2_price} (平{tp2_quantity}张合约, 50%)")
-
-                try:
-                    # 先尝试单向模式
-                    self._submit_order_with_mode(
-                        {
-                            'symbol': binance_symbol,
-                            'side': 'SELL',
-                            'type': 'TAKE_PROFIT_MARKET',
-                            'stopPrice': tp2_price,
-                            'quantity': tp2_quantity,
-                            'reduceOnly': True,
-                        },
-                        position_side='LONG'
-                    )
-                    self.logger.info(f"✅ 第二止盈已设于 {tp2_price}")
-                except BinanceAPIException as e:
-                    self.logger.error(f"设置第二止盈失败: {e}")
+            legacy_tp = not tp_legs
+            if legacy_tp:
+                tp_legs = self._legacy_take_profit_legs(binance_symbol, recommendation, total_qty)
+
+            # 10. 止损与止盈一次 batchOrders 提交
+            results = self._submit_exit_orders([stop_leg] + tp_legs, position_side='LONG')
+            if not legacy_tp and not any(results[1:]):
+                # 金字塔止盈全部失败时回退到固定 2 个止盈点
+                self._submit_exit_orders(
+                    self._legacy_take_profit_legs(binance_symbol, recommendation, total_qty),
+                    position_side='LONG'
+                )
 
             # 11. 记录交易
             self.risk_manager.record_trade(recommendation.symbol)
@@ -1425,6 +1589,7 @@ class BinanceFuturesTrader:
             return False
         except BinanceAPIException as e:
             self.logger.error(f"❌ API 错误: {e}")
+            self._forget_symbol_settings(binance_symbol)
             return False
         except Exception as e:
             self.logger.error(f"❌ 未预期的错误: {e}")
@@ -1458,15 +1623,8 @@ class BinanceFuturesTrader:
         binance_symbol = f"{recommendation.symbol}{symbol_suffix}"
 
         try:
-            # 1. 设置杠杆
-            leverage_set = self.set_leverage(binance_symbol, leverage)
-            if not leverage_set:
-                self.logger.warning(f"⚠️  设置杠杆失败，使用当前杠杆继续交易")
-
-            # 2. 设置保证金模式
-            margin_set = self.set_margin_type(binance_symbol, margin_type)
-            if not margin_set:
-                self.logger.warning(f"⚠️  设置保证金模式失败，使用当前模式继续交易")
+            # 1-2. 设置杠杆与保证金模式（已缓存且一致时跳过）
+            self.ensure_symbol_settings(binance_symbol, leverage, margin_type)
 
             # 3. 获取当前价格
             current_price = self.get_symbol_price(binance_symbol)
@@ -1501,6 +1659,8 @@ class BinanceFuturesTrader:
             quantity = self.format_quantity(binance_symbol, quantity)
 
             self.logger.info(f"📊 计算数量: {quantity} 张合约 @ {current_price}")
+            if not self.meets_min_notional(binance_symbol, quantity, current_price):
+                return False
 
             # 4.5 开仓前取消旧的止盈/止损挂单
             self.cancel_stale_exit_orders_before_entry(binance_symbol)
@@ -1520,6 +1680,7 @@ class BinanceFuturesTrader:
                             'side': 'SELL',
                             'type': 'MARKET',
                             'quantity': quantity,
+                            'newOrderRespType': 'RESULT',
                         },
                         position_side='SHORT'
                     )
@@ -1539,7 +1700,7 @@ class BinanceFuturesTrader:
                         self.logger.error(f"❌ 下单失败: {e}")
                         if e.code == -1007 or "Timeout" in str(e):
                             self.logger.warning("⚠️  超时错误，检查是否有新持仓...")
-                            time.sleep(2)
+                            self._wait_for_new_position(binance_symbol)
                             position = self.get_position_info(binance_symbol)
                             if position and position.quantity < 0:
                                 self.logger.warning(
@@ -1558,10 +1719,10 @@ class BinanceFuturesTrader:
                 self.logger.error("❌ 下单失败，未获取到订单信息")
                 return False
 
-            # 6. 验证订单状态
-            if order_id and order_id != 'UNKNOWN_TIMEOUT':
-                time.sleep(1)
-                verified_order = self.verify_order_status(binance_symbol, order_id)
+            # 6. 验证订单状态（响应已是终态时无需等待）
+            if (order_id and order_id != 'UNKNOWN_TIMEOUT'
+                    and order.get('status') not in TERMINAL_ORDER_STATUSES):
+                verified_order = self._wait_order_result(binance_symbol, order_id)
                 if verified_order:
                     order = verified_order
                     self.logger.info(f"✅ 订单状态已验证: {verified_order.get('status')}")
@@ -1586,49 +1747,38 @@ class BinanceFuturesTrader:
             stop_loss_price = self.format_price(binance_symbol, stop_loss_price, rounding="up")
             self.logger.info(f"🛡️  设置止损于 {stop_loss_price} (+{stop_loss_percent}%)")
 
-            try:
-                self._submit_order_with_mode(
-                    {
-                        'symbol': binance_symbol,
-                        'side': 'BUY',
-                        'type': 'STOP_MARKET',
-                        'stopPrice': stop_loss_price,
-                        'closePosition': True,
-                    },
-                    position_side='SHORT'
-                )
-                self.logger.info(f"✅ 止损已设于 {stop_loss_price}")
-            except BinanceAPIException as e:
-                self.logger.error(f"设置止损失败: {e}")
+            stop_leg = ('止损', {
+                'symbol': binance_symbol,
+                'side': 'BUY',
+                'type': 'STOP_MARKET',
+                'stopPrice': stop_loss_price,
+                'closePosition': True,
+            })
 
-            # 9. 设置止盈单（空仓止盈在下方）
-            # 检查是否启用做空金字塔退出
+            # 9. 设置止盈单（空仓止盈在下方），与止损一次 batchOrders 提交
+            tp_legs: List[Tuple[str, Dict]] = []
             if self.short_enable_pyramiding_exit and self.short_pyramiding_exit_levels:
                 # 使用金字塔退出策略
-                tp_count = self._place_short_pyramiding_exit_orders(
+                tp_legs = self._short_pyramiding_exit_legs(
                     binance_symbol, current_price, executed_quantity or float(quantity)
                 )
-                self.logger.info(f"✅ 已设置 {tp_count} 个做空金字塔止盈单")
+            if tp_legs:
+                take_profit_price = tp_legs[0][1]['stopPrice']
             else:
                 # 使用简单止盈
                 take_profit_price = current_price * (1 - take_profit_percent / 100)
                 take_profit_price = self.format_price(binance_symbol, take_profit_price, rounding="down")
                 self.logger.info(f"🎯 设置止盈于 {take_profit_price} (-{take_profit_percent}%)")
+                tp_legs = [('止盈', {
+                    'symbol': binance_symbol,
+                    'side': 'BUY',
+                    'type': 'TAKE_PROFIT_MARKET',
+                    'stopPrice': take_profit_price,
+                    'closePosition': True,
+                })]
 
-                try:
-                    self._submit_order_with_mode(
-                        {
-                            'symbol': binance_symbol,
-                            'side': 'BUY',
-                            'type': 'TAKE_PROFIT_MARKET',
-                            'stopPrice': take_profit_price,
-                            'closePosition': True,
-                        },
-                        position_side='SHORT'
-                    )
-                    self.logger.info(f"✅ 止盈已设于 {take_profit_price}")
-                except BinanceAPIException as e:
-                    self.logger.error(f"设置止盈失败: {e}")
+            results = self._submit_exit_orders([stop_leg] + tp_legs, position_side='SHORT')
+            self.logger.info(f"✅ 已设置 {sum(results[1:])} 个做空止盈单")
 
             # 10. 记录交易
             self.risk_manager.record_trade(recommendation.symbol)
@@ -1668,6 +1818,7 @@ class BinanceFuturesTrader:
             return False
         except BinanceAPIException as e:
             self.logger.error(f"❌ API 错误: {e}")
+            self._forget_symbol_settings(binance_symbol)
             return False
         except Exception as e:
             self.logger.error(f"❌ 未预期的错误: {e}")
@@ -1851,6 +2002,8 @@ class BinanceFuturesTrader:
 
     def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict]:
         """获取未成交订单"""
+        if self._user_stream_ready():
+            return self.user_stream.get_open_orders(symbol)
         try:
             if symbol:
                 return self._call_read_api('futures_get_open_orders', symbol=symbol)
@@ -1862,7 +2015,15 @@ class BinanceFuturesTrader:
     def update_positions(self):
         """更新所有持仓信息"""
         try:
-            positions = self._call_read_api('futures_position_information')
+            now = time.time()
+            if (
+                self._user_stream_ready()
+                and now - self._last_rest_position_sync < self.user_stream_reconcile_interval
+            ):
+                positions = self._positions_from_user_stream()
+            else:
+                positions = self._call_read_api('futures_position_information')
+                self._last_rest_position_sync = now
             previous_positions = self.positions
             updated_positions: Dict[str, PositionInfo] = {}
             risk_positions: Dict[str, Dict[str, float]] = {}
@@ -1924,6 +2085,45 @@ class BinanceFuturesTrader:
             self.logger.warning(f"更新持仓失败 (网络错误): {e}")
             # 保留之前的持仓数据，不做更新
 
+    def _positions_from_user_stream(self, symbol: Optional[str] = None) -> List[Dict]:
+        """
+        由用户数据流内存簿构造 futures_position_information 格式的持仓列表
+
+        推送不含标记价格/杠杆/强平价：标记价格依次取 mark_price_provider（行情推送）、
+        上次的持仓缓存（REST 对账或推送更新）、快照中的 markPrice，不逐个标的请求 REST；
+        杠杆和强平价沿用上次 REST 对账的持仓缓存。
+        """
+        result = []
+        for pos in self.user_stream.get_positions():
+            pos_symbol = pos.get('symbol')
+            if symbol and pos_symbol != symbol:
+                continue
+            previous = self.positions.get(pos_symbol)
+
+            mark_price = None
+            if self.mark_price_provider:
+                try:
+                    mark_price = self.mark_price_provider(pos_symbol)
+                except Exception:
+                    mark_price = None
+            if not mark_price and previous:
+                mark_price = previous.mark_price
+            mark_price = float(mark_price or pos.get('markPrice') or pos.get('entryPrice') or 0)
+
+            amount = float(pos.get('positionAmt') or 0)
+            entry_price = float(pos.get('entryPrice') or 0)
+            data = dict(pos)
+            data['markPrice'] = mark_price
+            data['unRealizedProfit'] = (mark_price - entry_price) * amount
+            if previous:
+                data['leverage'] = previous.leverage
+                data['liquidationPrice'] = previous.liquidation_price
+                data.setdefault('marginType', previous.margin_type)
+            else:
+                data.setdefault('leverage', self.leverage)
+            result.append(data)
+        return result
+
     def monitor_positions(self):
         """监控持仓状态并更新价格"""
         self.update_positions()
@@ -1955,6 +2155,8 @@ class BinanceFuturesTrader:
         return ((entry_price - mark_price) / entry_price) * 100
 
     def _get_open_orders_safe(self, symbol: str) -> List[Dict]:
+        if self._user_stream_ready():
+            return self.user_stream.get_open_orders(symbol)
         try:
             orders = self._call_read_api('futures_get_open_orders', symbol=symbol) or []
             return orders if isinstance(orders, list) else []
@@ -0,0 +1,304 @@
+"""
+行情推送流 - Market Stream
+通过币安合约 WebSocket 订阅持仓标的的标记价格（markPrice@1s 或 aggTrade），
+让移动止损 / 金字塔止盈在每个推送上检查，而不是等待 REST 持仓轮询。
+
+- 只订阅当前有持仓的标的，持仓变化时自动 SUBSCRIBE / UNSUBSCRIBE
+- 断线自动重连（指数退避），重连后重新订阅
+- 推送在独立分发线程中回调，同一标的只保留最新价格，回调阻塞不会影响收包
+- 价格超过 stale_after 秒未更新视为失效，调用方应回退到 REST 轮询价格
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - websockets 随 python-binance 安装
+    websockets = None
+
+
+FUTURES_STREAM_URL = "wss://fstream.binance.com"
+TESTNET_STREAM_URL = "wss://stream.binancefuture.com"
+
+
+class MarkPriceStream:
+    """
+    标记价格推送流
+
+    回调签名: on_price(symbol: str, price: float, event_time_ms: int)
+    """
+
+    def __init__(self,
+                 on_price: Callable[[str, float, int], None],
+                 base_url: str = FUTURES_STREAM_URL,
+                 stream_type: str = "markPrice@1s",
+                 stale_after: float = 5.0,
+                 proxy: Optional[str] = None,
+                 reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0):
+        """
+        初始化推送流
+
+        Args:
+            on_price: 价格回调
+            base_url: WebSocket 地址（测试时可指向本地假服务器）
+            stream_type: 订阅的流类型，markPrice@1s / markPrice / aggTrade
+            stale_after: 价格超过该秒数未更新视为失效
+            proxy: 代理地址（需要 websockets 版本支持 proxy 参数）
+            reconnect_delay: 初始重连间隔（秒）
+            max_reconnect_delay: 最大重连间隔（秒）
+        """
+        if websockets is None:
+            raise RuntimeError("websockets 未安装，无法启用行情推送流")
+
+        self.on_price = on_price
+        self.base_url = base_url.rstrip("/")
+        self.stream_type = stream_type
+        self.stale_after = float(stale_after)
+        self.proxy = proxy
+        self.reconnect_delay = float(reconnect_delay)
+        self.max_reconnect_delay = float(max_reconnect_delay)
+
+        self.logger = logging.getLogger(__name__)
+
+        self._symbols: Set[str] = set()  # 期望订阅
+        self._subscribed: Set[str] = set()  # 当前连接上已订阅
+        self._prices: Dict[str, Tuple[float, float, int]] = {}  # symbol -> (price, 本地时间, 事件时间)
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws = None
+        self._connected = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._request_id = 0
+
+        # 分发：每个标的只保留最新一笔
+        self._pending: Dict[str, Tuple[float, int]] = {}
+        self._pending_cond = threading.Condition()
+        self._dispatch_thread: Optional[threading.Thread] = None
+
+        self.stats = {"messages": 0, "reconnects": 0, "callback_errors": 0}
+
+    # ------------------------------------------------------------------ 生命周期
+
+    def start(self):
+        """启动推送流（后台线程）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._thread_main, name="mark-price-stream", daemon=True)
+        self._thread.start()
+        self._dispatch_thread = threading.Thread(target=self._dispatch_loop, name="mark-price-dispatch", daemon=True)
+        self._dispatch_thread.start()
+        self.logger.info(f"📡 行情推送流已启动: {self.base_url} ({self.stream_type})")
+
+    def stop(self, timeout: float = 5.0):
+        """停止推送流"""
+        self._stopped.set()
+        loop, ws = self._loop, self._ws
+        if loop and ws is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+            except Exception:
+                pass
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+        for thread in (self._thread, self._dispatch_thread):
+            if thread:
+                thread.join(timeout)
+        self.logger.info("行情推送流已停止")
+
+    # ------------------------------------------------------------------ 订阅管理
+
+    def sync_symbols(self, symbols: Iterable[str]):
+        """
+        按当前持仓同步订阅列表
+
+        Args:
+            symbols: 交易对列表（如 BTCUSDT）
+        """
+        desired = {str(s).upper() for s in symbols if s}
+        with self._lock:
+            if desired == self._symbols:
+                return
+            self._symbols = desired
+            for symbol in list(self._prices):
+                if symbol not in desired:
+                    del self._prices[symbol]
+        loop = self._loop
+        if loop and self._connected:
+            asyncio.run_coroutine_threadsafe(self._apply_subscriptions(), loop)
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}@{self.stream_type}"
+
+    async def _apply_subscriptions(self):
+        ws = self._ws
+        if ws is None:
+            return
+        with self._lock:
+            to_add = self._symbols - self._subscribed
+            to_remove = self._subscribed - self._symbols
+        if to_add:
+            await self._send_method(ws, "SUBSCRIBE", to_add)
+            self._subscribed |= to_add
+            self.logger.info(f"📡 订阅行情: {sorted(to_add)}")
+        if to_remove:
+            await self._send_method(ws, "UNSUBSCRIBE", to_remove)
+            self._subscribed -= to_remove
+            self.logger.info(f"📡 取消订阅行情: {sorted(to_remove)}")
+
+    async def _send_method(self, ws, method: str, symbols: Set[str]):
+        self._request_id += 1
+        await ws.send(json.dumps({
+            "method": method,
+            "params": [self._stream_name(s) for s in sorted(symbols)],
+            "id": self._request_id,
+        }))
+
+    # ------------------------------------------------------------------ 查询
+
+    def get_price(self, symbol: str) -> Optional[float]:
+        """获取标的最新推送价格，失效（超过 stale_after）返回 None"""
+        with self._lock:
+            entry = self._prices.get(str(symbol).upper())
+        if not entry:
+            return None
+        price, received_at, _ = entry
+        if time.monotonic() - received_at > self.stale_after:
+            return None
+        return price
+
+    def is_healthy(self) -> bool:
+        """连接正常且所有订阅标的在 stale_after 内都有推送"""
+        if not self._connected:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            symbols = set(self._symbols)
+            prices = dict(self._prices)
+        for symbol in symbols:
+            entry = prices.get(symbol)
+            if not entry or now - entry[1] > self.stale_after:
+                return False
+        return True
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            subscribed = sorted(self._symbols)
+        return {**self.stats, "connected": self._connected, "symbols": subscribed}
+
+    # ------------------------------------------------------------------ 连接与收包
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _connect(self):
+        url = f"{self.base_url}/stream"
+        if self.proxy:
+            try:
+                return await websockets.connect(url, proxy=self.proxy, open_timeout=10)
+            except TypeError:
+                self.logger.warning("当前 websockets 版本不支持代理参数，行情推送流改为直连")
+        return await websockets.connect(url, open_timeout=10)
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                ws = await self._connect()
+            except Exception as e:
+                self.logger.warning(f"行情推送流连接失败: {e}，{delay:.0f}s 后重试")
+                await self._sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            self._ws = ws
+            self._connected = True
+            self._subscribed = set()
+            delay = self.reconnect_delay
+            try:
+                await self._apply_subscriptions()
+                async for raw in ws:
+                    self._handle_message(raw)
+            except Exception as e:
+                if not self._stopped.is_set():
+                    self.logger.warning(f"行情推送流断开: {e}")
+            finally:
+                self._connected = False
+                self._ws = None
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+
+            if not self._stopped.is_set():
+                self.stats["reconnects"] += 1
+                self.logger.info(f"行情推送流将在 {delay:.0f}s 后重连（期间使用 REST 价格）")
+                await self._sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _sleep(self, seconds: float):
+        end = time.monotonic() + seconds
+        while not self._stopped.is_set() and time.monotonic() < end:
+            await asyncio.sleep(min(0.2, end - time.monotonic()))
+
+    def _handle_message(self, raw):
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(msg, dict) or "result" in msg:
+            return  # 订阅应答
+        data = msg.get("data", msg)
+        if not isinstance(data, dict):
+            return
+        symbol = data.get("s")
+        price = data.get("p")
+        if not symbol or price is None:
+            return
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return
+        if price <= 0:
+            return
+
+        symbol = str(symbol).upper()
+        event_time = int(data.get("E") or 0)
+        with self._lock:
+            if symbol not in self._symbols:
+                return
+            self._prices[symbol] = (price, time.monotonic(), event_time)
+        self.stats["messages"] += 1
+
+        with self._pending_cond:
+            self._pending[symbol] = (price, event_time)
+            self._pending_cond.notify()
+
+    # ------------------------------------------------------------------ 回调分发
+
+    def _dispatch_loop(self):
+        while not self._stopped.is_set():
+            with self._pending_cond:
+                while not self._pending and not self._stopped.is_set():
+                    self._pending_cond.wait(1.0)
+                batch, self._pending = self._pending, {}
+            for symbol, (price, event_time) in batch.items():
+                try:
+                    self.on_price(symbol, price, event_time)
+                except Exception as e:
+                    self.stats["callback_errors"] += 1
+                    self.logger.error(f"行情推送回调失败 {symbol}: {e}")
@@ -4,7 +4,7 @@
 """
 
 import logging
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -63,7 +63,8 @@ class RiskManager:
                  major_coins: list = None,
                  major_coin_max_position_percent: float = None,
                  major_total_position_percent: Optional[float] = None,
-                 alt_total_position_percent: Optional[float] = None):
+                 alt_total_position_percent: Optional[float] = None,
+                 clock: Optional[Callable[[], datetime]] = None):
         """
         初始化风险管理器
 
@@ -77,6 +78,7 @@ class RiskManager:
             take_profit_2_percent: 第二目标价盈利百分比（清仓）
             major_coins: 主流币列表
             major_coin_max_position_percent: 主流币最大仓位比例
+            clock: 当前时间函数，默认 datetime.now；回测时传入回放时钟，按历史日期统计每日交易
         """
         self.max_position_percent = max_position_percent
         self.max_total_position_percent = max_total_position_percent
@@ -90,6 +92,7 @@ class RiskManager:
         self.major_coin_max_position_percent = major_coin_max_position_percent
         self.major_total_position_percent = major_total_position_percent
         self.alt_total_position_percent = alt_total_position_percent
+        self._clock = clock or datetime.now
 
         # 当前持仓
         self.positions: Dict[str, PositionInfo] = {}
@@ -143,7 +146,7 @@ class RiskManager:
         """更新账户余额"""
         self.total_balance = total_balance
         self.available_balance = available_balance
-        now = datetime.now()
+        now = self._clock()
         should_log = False
 
         if self._last_balance_log_time is None:
@@ -169,7 +172,7 @@ class RiskManager:
                      entry_price: float, entry_time: datetime = None):
         """添加新持仓"""
         if entry_time is None:
-            entry_time = datetime.now()
+            entry_time = self._clock()
 
         position = PositionInfo(
             symbol=symbol,
@@ -212,7 +215,7 @@ class RiskManager:
 
             entry_price = float(data.get("entry_price", 0) or 0)
             current_price = float(data.get("current_price", entry_price or 0) or 0)
-            entry_time = data.get("entry_time") or datetime.now()
+            entry_time = data.get("entry_time") or self._clock()
 
             if symbol in self.positions:
                 position = self.positions[symbol]
@@ -283,7 +286,7 @@ class RiskManager:
             return False, f"已持有 {symbol} 仓位"
 
         # 3. 检查每日交易次数限制
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = self._clock().strftime("%Y-%m-%d")
         if self.daily_trades[today] >= self.max_daily_trades:
             return False, f"达到每日交易次数限制 ({self.max_daily_trades})"
 
@@ -409,7 +412,7 @@ class RiskManager:
 
     def record_trade(self, symbol: str, pnl: float = 0.0):
         """记录交易"""
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = self._clock().strftime("%Y-%m-%d")
         self.daily_trades[today] += 1
         if pnl != 0:
             self.daily_pnl[today] += pnl
@@ -430,7 +433,7 @@ class RiskManager:
 
     def get_status(self) -> Dict:
         """Get risk manager status."""
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = self._clock().strftime("%Y-%m-%d")
 
         total_position_value = sum(
             pos.quantity * pos.current_price
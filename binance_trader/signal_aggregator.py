@@ -5,12 +5,15 @@
 2. 做空策略：检测看跌信号（FOMO加剧、资金出逃、风险增加、价格高点）
 """
 
+import atexit
+import bisect
 import json
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
 import logging
 
 
@@ -95,13 +98,26 @@ class SignalAggregator:
     PREDICT_RISK_INCREASE = 7  # 风险增加
     PREDICT_PRICE_TOP = 24  # 疑似价格高点
 
+    # 信号缓存名称 -> 属性名
+    _BUCKET_ATTRS = {
+        "fomo": "fomo_signals",
+        "alpha": "alpha_signals",
+        "risk": "risk_signals",
+        "bearish": "bearish_signals",
+    }
+    # 需要持久化的信号缓存
+    _PERSISTED_BUCKETS = ("fomo", "alpha", "risk")
+
     def __init__(self,
                  time_window: int = 300,  # 时间窗口（秒），默认5分钟
                  min_score: float = 0.6,  # 最低信号评分
                  state_file: Optional[str] = None,
                  enable_persistence: bool = True,  # 是否开启持久化
                  max_processed_ids: int = 5000,
-                 movement_list_checker=None):  # 异动榜单检查器
+                 movement_list_checker=None,  # 异动榜单检查器
+                 flush_interval: float = 1.0,
+                 compact_every: int = 2000,
+                 use_event_time: bool = False):
         """
         初始化信号聚合器
 
@@ -109,20 +125,33 @@ class SignalAggregator:
             time_window: 信号匹配时间窗口（秒）
             min_score: 最低信号评分阈值（0-1）
             movement_list_checker: 异动榜单检查函数，用于做空策略
+            flush_interval: 状态日志的批量写盘间隔（秒），<=0 表示每条信号立即写盘
+            compact_every: 状态日志累计多少条记录后合并为完整快照
+            use_event_time: 事件时间模式，信号时间取消息的 createTime，过期与评分以
+                已收到信号的最新时间为"当前时间"（用于历史回放；实时运行可抵御转发延迟）
         """
         self.time_window = time_window
         self.min_score = min_score
         self.movement_list_checker = movement_list_checker
 
-        # 活跃信号缓存 - 按标的分组
-        self.fomo_signals: Dict[str, List[Signal]] = defaultdict(list)  # Type 113
-        self.alpha_signals: Dict[str, List[Signal]] = defaultdict(list)  # Type 110
-        self.risk_signals: Dict[str, List[Signal]] = defaultdict(list)  # Type 112 风险信号
-        self.bearish_signals: Dict[str, List[Signal]] = defaultdict(list)  # 看跌信号
+        # 事件时间模式：时钟只随信号时间前进，不读取系统时间
+        self.use_event_time = use_event_time
+        self._event_clock: Optional[datetime] = None
+
+        # 活跃信号缓存 - 按标的分组，每个标的内按时间先后排列
+        self.fomo_signals: Dict[str, Deque[Signal]] = defaultdict(deque)  # Type 113
+        self.alpha_signals: Dict[str, Deque[Signal]] = defaultdict(deque)  # Type 110
+        self.risk_signals: Dict[str, Deque[Signal]] = defaultdict(deque)  # Type 112 风险信号
+        self.bearish_signals: Dict[str, Deque[Signal]] = defaultdict(deque)  # 看跌信号
+
+        # 过期索引：每类信号一个按时间排列的 (时间, 标的) 队列，清理时只从队首弹出
+        self._expiry_index: Dict[str, Deque[Tuple[datetime, str]]] = {
+            bucket: deque() for bucket in self._BUCKET_ATTRS
+        }
 
         # 已匹配的聚合信号
         self.confluence_signals: List[ConfluenceSignal] = []
-        self.bearish_trade_signals: List[BearishSignal] = []  # 做空信号
+        self.bearish_trade_signals: Deque[BearishSignal] = deque()  # 做空信号
 
         # 已处理的信号ID（防重复）
         self.processed_signal_ids: Set[str] = set()
@@ -131,19 +160,27 @@ class SignalAggregator:
         except (TypeError, ValueError):
             max_ids_value = 5000
         self.max_processed_ids = max(1000, max_ids_value)
-        self.processed_signal_order: List[str] = []
+        self.processed_signal_order: Deque[str] = deque()
 
         self.logger = logging.getLogger(__name__)
 
-        # 状态持久化
+        # 状态持久化：完整快照（state_file）+ 追加写的状态日志（state_file.journal）
         self.state_file: Optional[Path] = None
+        self.journal_file: Optional[Path] = None
         self.persistence_enabled = False
+        self.flush_interval = flush_interval
+        self.compact_every = max(int(compact_every), 1)
+        self._state_lock = threading.RLock()
+        self._pending_records: List[Dict[str, Any]] = []
+        self._journal_records = 0
+        self._flush_timer: Optional[threading.Timer] = None
 
         if state_file and enable_persistence:
             try:
                 state_path = Path(state_file).expanduser()
                 state_path.parent.mkdir(parents=True, exist_ok=True)
                 self.state_file = state_path
+                self.journal_file = state_path.with_name(state_path.name + ".journal")
                 self.persistence_enabled = True
             except Exception as exc:
                 self.logger.warning(f"无法创建信号状态目录，已禁用持久化: {exc}")
@@ -152,6 +189,7 @@ class SignalAggregator:
 
         if self.persistence_enabled:
             self._load_state()
+            atexit.register(self.flush)
 
         self.logger.info(
             f"信号聚合器已初始化: "
@@ -167,7 +205,8 @@ class SignalAggregator:
 
     def add_signal(self, message_type: int, message_id: str,
                    symbol: str, data: Dict, 
-                   predict_type: Optional[int] = None) -> Optional[ConfluenceSignal]:
+                   predict_type: Optional[int] = None,
+                   event_time: Optional[datetime] = None) -> Optional[ConfluenceSignal]:
         """
         添加新信号并尝试匹配
 
@@ -177,11 +216,18 @@ class SignalAggregator:
             symbol: 交易标的（如 "BTC", "ETH"）
             data: 原始消息数据
             predict_type: AI预测类型（仅 type=100 时使用）
+            event_time: 信号发生时间（仅事件时间模式使用，缺省时从 data 的 createTime 解析）
 
         Returns:
             如果匹配成功，返回 ConfluenceSignal；否则返回 None
             注意：做空信号通过 get_latest_bearish_signal() 获取
         """
+        with self._state_lock:
+            return self._add_signal(message_type, message_id, symbol, data, predict_type, event_time)
+
+    def _add_signal(self, message_type: int, message_id: str, symbol: str, data: Dict,
+                    predict_type: Optional[int],
+                    event_time: Optional[datetime] = None) -> Optional[ConfluenceSignal]:
         # 防重复
         if message_id in self.processed_signal_ids:
             self.logger.debug(f"信号 {message_id} 已处理过，跳过")
@@ -198,25 +244,29 @@ class SignalAggregator:
             signal_id=message_id,
             symbol=symbol.upper(),
             signal_type=signal_type,
-            timestamp=datetime.now(),
+            timestamp=self._signal_time(data, event_time),
             message_type=message_type,
             predict_type=predict_type,
             data=data
         )
 
         # 添加到对应缓存
+        bucket: Optional[str] = None
         if signal_type == "FOMO":
-            self.fomo_signals[signal.symbol].append(signal)
+            bucket = "fomo"
+            self._append_signal(bucket, signal)
             self.logger.info(f"📢 新 FOMO 信号: {signal.symbol} (Type 113)")
         elif signal_type == "ALPHA":
-            self.alpha_signals[signal.symbol].append(signal)
+            bucket = "alpha"
+            self._append_signal(bucket, signal)
             self.logger.info(f"🎯 新 Alpha 信号: {signal.symbol} (Type 110)")
         elif signal_type == "RISK":
-            self.risk_signals[signal.symbol].append(signal)
+            bucket = "risk"
+            self._append_signal(bucket, signal)
             self.logger.warning(f"⚠️  风险信号检测到: {signal.symbol} (Type 112 - FOMO加剧，建议止盈)")
         elif signal_type in ["BEARISH_FOMO_ESCALATION", "BEARISH_CAPITAL_FLIGHT", 
                             "BEARISH_RISK_INCREASE", "BEARISH_PRICE_TOP"]:
-            self.bearish_signals[signal.symbol].append(signal)
+            self._append_signal("bearish", signal)
             bearish_name = {
                 "BEARISH_FOMO_ESCALATION": "FOMO加剧",
                 "BEARISH_CAPITAL_FLIGHT": "资金出逃",
@@ -248,10 +298,82 @@ class SignalAggregator:
             self.confluence_signals.append(confluence)
 
         if self.persistence_enabled:
-            self._persist_state()
+            record: Dict[str, Any] = {"op": "add", "id": message_id}
+            if bucket in self._PERSISTED_BUCKETS:
+                record["bucket"] = bucket
+                record["signal"] = self._serialize_signal(signal)
+            self._journal_append(record)
+            if confluence:
+                self._journal_append({
+                    "op": "match",
+                    "symbol": confluence.symbol,
+                    "ids": [confluence.fomo_signal.signal_id, confluence.alpha_signal.signal_id],
+                })
 
         return confluence
 
+    def _append_signal(self, bucket: str, signal: Signal):
+        """追加信号到缓存，并登记到过期索引"""
+        signals = getattr(self, self._BUCKET_ATTRS[bucket])[signal.symbol]
+        index = self._expiry_index[bucket]
+        if (signals and signals[-1].timestamp > signal.timestamp) or \
+                (index and index[-1][0] > signal.timestamp):
+            # 事件时间模式下消息可能乱序到达，按时间插入以保持队列有序
+            pos = bisect.bisect_right([s.timestamp for s in signals], signal.timestamp)
+            signals.insert(pos, signal)
+            pos = bisect.bisect_right([entry[0] for entry in index], signal.timestamp)
+            index.insert(pos, (signal.timestamp, signal.symbol))
+            return
+        signals.append(signal)
+        index.append((signal.timestamp, signal.symbol))
+
+    def _now(self) -> datetime:
+        """聚合器的当前时间：事件时间模式下为已收到信号的最新时间"""
+        if self.use_event_time and self._event_clock is not None:
+            return self._event_clock
+        return datetime.now()
+
+    def _signal_time(self, data: Dict, event_time: Optional[datetime]) -> datetime:
+        """确定信号时间，事件时间模式下同时推进事件时钟"""
+        if not self.use_event_time:
+            return datetime.now()
+        if event_time is None:
+            event_time = self._extract_create_time(data)
+        if event_time is None:
+            # 缺少 createTime 时沿用事件时钟（回放中不能跳到系统时间）
+            if self._event_clock is not None:
+                self.logger.debug("信号缺少 createTime，使用当前事件时间")
+                return self._event_clock
+            self.logger.debug("信号缺少 createTime，使用系统时间")
+            event_time = datetime.now()
+        if self._event_clock is None or event_time > self._event_clock:
+            self._event_clock = event_time
+        return event_time
+
+    @staticmethod
+    def _extract_create_time(data: Optional[Dict]) -> Optional[datetime]:
+        """从消息数据中解析 createTime（兼容 IPC 转发的 raw_message 包装，毫秒/秒均可）"""
+        if not isinstance(data, dict):
+            return None
+        candidates = [data]
+        raw_message = data.get("raw_message")
+        if isinstance(raw_message, dict):
+            candidates.append(raw_message)
+        for item in candidates:
+            value = item.get("createTime")
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if value <= 0:
+                continue
+            if value > 1e11:
+                value /= 1000.0
+            return datetime.fromtimestamp(value)
+        return None
+
     def _get_signal_type(self, message_type: int, 
                          predict_type: Optional[int] = None) -> Optional[str]:
         """
@@ -382,7 +504,7 @@ class SignalAggregator:
         type_score = type_weights.get(signal.signal_type, 0.5)
         
         # 信号新鲜度（越新越好）
-        age = (datetime.now() - signal.timestamp).total_seconds()
+        age = (self._now() - signal.timestamp).total_seconds()
         freshness_score = 1.0 - min(age / 1800, 1.0)  # 30分钟后为0
         
         # 加权计算
@@ -486,14 +608,18 @@ class SignalAggregator:
             symbol=symbol,
             fomo_signal=fomo_signal,
             alpha_signal=alpha_signal,
-            confluence_time=datetime.now(),
+            confluence_time=self._now(),
             time_gap=time_gap,
             score=score
         )
 
         # 从缓存中移除已匹配的信号（避免重复匹配）
-        self.fomo_signals[symbol].remove(fomo_signal)
-        self.alpha_signals[symbol].remove(alpha_signal)
+        fomo_list.remove(fomo_signal)
+        alpha_list.remove(alpha_signal)
+        if not fomo_list:
+            del self.fomo_signals[symbol]
+        if not alpha_list:
+            del self.alpha_signals[symbol]
 
         return confluence
 
@@ -514,7 +640,7 @@ class SignalAggregator:
         fomo_strength = 1.0 if fomo.message_type == self.FOMO_INTENSIFY_TYPE else 0.8
 
         # 3. 信号新鲜度评分 (距离现在越近越好，最多考虑1小时)
-        now = datetime.now()
+        now = self._now()
         avg_age = (
             (now - fomo.timestamp).total_seconds() +
             (now - alpha.timestamp).total_seconds()
@@ -540,7 +666,7 @@ class SignalAggregator:
         """限制已处理信号历史长度，避免状态文件过大"""
         overflow = len(self.processed_signal_order) - self.max_processed_ids
         while overflow > 0 and self.processed_signal_order:
-            oldest_id = self.processed_signal_order.pop(0)
+            oldest_id = self.processed_signal_order.popleft()
             self.processed_signal_ids.discard(oldest_id)
             overflow -= 1
 
@@ -586,62 +712,103 @@ class SignalAggregator:
             return value
         return str(value)
 
-    def _persist_state(self):
-        """将当前信号状态保存到磁盘"""
-        if not self.persistence_enabled or not self.state_file:
-            return
-
-        state = {
+    def _build_snapshot(self) -> Dict[str, Any]:
+        """当前信号状态的完整快照"""
+        state: Dict[str, Any] = {
             "version": 1,
             "saved_at": datetime.now().isoformat(),
             "time_window": self.time_window,
             "min_score": self.min_score,
-            "fomo_signals": {
-                symbol: [self._serialize_signal(s) for s in signals]
-                for symbol, signals in self.fomo_signals.items()
-            },
-            "alpha_signals": {
-                symbol: [self._serialize_signal(s) for s in signals]
-                for symbol, signals in self.alpha_signals.items()
-            },
-            "risk_signals": {
-                symbol: [self._serialize_signal(s) for s in signals]
-                for symbol, signals in self.risk_signals.items()
-            },
-            "processed_signal_order": self.processed_signal_order[-self.max_processed_ids:]
         }
+        for bucket in self._PERSISTED_BUCKETS:
+            state[self._BUCKET_ATTRS[bucket]] = {
+                symbol: [self._serialize_signal(s) for s in signals]
+                for symbol, signals in getattr(self, self._BUCKET_ATTRS[bucket]).items()
+            }
+        state["processed_signal_order"] = list(self.processed_signal_order)
+        return state
+
+    def _journal_append(self, record: Dict[str, Any]):
+        """记录一条状态变更，按 flush_interval 批量追加到状态日志"""
+        self._pending_records.append(record)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """将待写入的状态变更追加到状态日志；日志过长时合并为完整快照"""
+        if not self.persistence_enabled or not self.journal_file:
+            return
+        with self._state_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            records, self._pending_records = self._pending_records, []
+            if not records:
+                return
+            if self._journal_records + len(records) >= self.compact_every:
+                # 快照已包含这些变更，无需再写入日志
+                self._persist_state()
+                return
+            try:
+                with self.journal_file.open("a", encoding="utf-8") as fh:
+                    for record in records:
+                        fh.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                        fh.write("\n")
+                self._journal_records += len(records)
+            except Exception as exc:
+                self.logger.warning(f"写入信号状态日志失败: {exc}")
 
-        tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+    def _persist_state(self):
+        """将当前信号状态保存为完整快照，并清空状态日志"""
+        if not self.persistence_enabled or not self.state_file:
+            return
 
-        try:
-            with tmp_path.open("w", encoding="utf-8") as fh:
-                json.dump(state, fh, ensure_ascii=False, indent=2)
-            tmp_path.replace(self.state_file)
-        except Exception as exc:
-            self.logger.warning(f"保存信号状态失败: {exc}")
-            if tmp_path.exists():
-                try:
-                    tmp_path.unlink()
-                except Exception:
+        with self._state_lock:
+            state = self._build_snapshot()
+            tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+
+            try:
+                with tmp_path.open("w", encoding="utf-8") as fh:
+                    json.dump(state, fh, ensure_ascii=False, separators=(",", ":"))
+                tmp_path.replace(self.state_file)
+            except Exception as exc:
+                self.logger.warning(f"保存信号状态失败: {exc}")
+                if tmp_path.exists():
+                    try:
+                        tmp_path.unlink()
+                    except Exception:
+                        pass
+                return
+
+            # 快照写入成功后再清空日志；两步之间中断时重放日志会被已处理ID去重
+            try:
+                with self.journal_file.open("w", encoding="utf-8"):
                     pass
+                self._journal_records = 0
+            except Exception as exc:
+                self.logger.warning(f"清空信号状态日志失败: {exc}")
 
     def _load_state(self):
-        """从磁盘恢复信号状态"""
-        if not self.state_file or not self.state_file.exists():
-            return
-
-        try:
-            with self.state_file.open("r", encoding="utf-8") as fh:
-                state = json.load(fh)
-        except Exception as exc:
-            self.logger.warning(f"加载信号状态失败，忽略持久化: {exc}")
-            return
+        """从磁盘恢复信号状态（快照 + 状态日志重放）"""
+        state: Dict[str, Any] = {}
+        if self.state_file and self.state_file.exists():
+            try:
+                with self.state_file.open("r", encoding="utf-8") as fh:
+                    state = json.load(fh)
+            except Exception as exc:
+                self.logger.warning(f"加载信号状态失败，忽略持久化: {exc}")
+                state = {}
 
-        def load_bucket(bucket: str, target: Dict[str, List[Signal]]):
+        def load_bucket(bucket: str, target: Dict[str, Deque[Signal]]):
             raw = state.get(bucket, {})
             target.clear()
             for symbol, items in raw.items():
-                restored = []
+                restored = deque()
                 for item in items:
                     signal = self._deserialize_signal(item)
                     if signal:
@@ -649,76 +816,127 @@ class SignalAggregator:
                 if restored:
                     target[symbol] = restored
 
-        load_bucket("fomo_signals", self.fomo_signals)
-        load_bucket("alpha_signals", self.alpha_signals)
-        load_bucket("risk_signals", self.risk_signals)
+        for bucket in self._PERSISTED_BUCKETS:
+            load_bucket(self._BUCKET_ATTRS[bucket], getattr(self, self._BUCKET_ATTRS[bucket]))
 
         order = state.get("processed_signal_order")
         if order:
-            self.processed_signal_order = [str(item) for item in order if item]
+            self.processed_signal_order = deque(str(item) for item in order if item)
             self.processed_signal_ids = set(self.processed_signal_order)
         else:
             ids = state.get("processed_signal_ids", [])
             # 使用 dict fromkeys 保持顺序并去重
-            self.processed_signal_order = list(dict.fromkeys(str(item) for item in ids if item))
+            self.processed_signal_order = deque(dict.fromkeys(str(item) for item in ids if item))
             self.processed_signal_ids = set(self.processed_signal_order)
 
+        replayed = self._replay_journal()
+
         self._trim_processed_history()
+        self._rebuild_expiry_index()
 
         # 清理超出时间窗口的历史数据
         self._cleanup_expired_signals()
 
+        # 启动时合并一次，后续日志从空文件开始追加
+        if replayed or state:
+            self._persist_state()
+
         self.logger.info(
             f"已从状态文件加载 {sum(len(v) for v in self.fomo_signals.values())} 条FOMO信号、"
             f"{sum(len(v) for v in self.alpha_signals.values())} 条Alpha信号、"
             f"{sum(len(v) for v in self.risk_signals.values())} 条风险信号"
         )
 
+    def _replay_journal(self) -> int:
+        """按顺序重放状态日志，返回重放的记录数"""
+        if not self.journal_file or not self.journal_file.exists():
+            return 0
+        count = 0
+        try:
+            with self.journal_file.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 写入中断留下的残缺行
+                        continue
+                    self._apply_journal_record(record)
+                    count += 1
+        except Exception as exc:
+            self.logger.warning(f"读取信号状态日志失败: {exc}")
+        return count
+
+    def _apply_journal_record(self, record: Dict[str, Any]):
+        op = record.get("op")
+        if op == "add":
+            signal_id = str(record.get("id") or "")
+            if not signal_id or signal_id in self.processed_signal_ids:
+                return
+            self.processed_signal_ids.add(signal_id)
+            self.processed_signal_order.append(signal_id)
+            bucket = record.get("bucket")
+            if bucket in self._PERSISTED_BUCKETS and record.get("signal"):
+                signal = self._deserialize_signal(record["signal"])
+                if signal:
+                    getattr(self, self._BUCKET_ATTRS[bucket])[signal.symbol].append(signal)
+        elif op == "match":
+            symbol = str(record.get("symbol") or "").upper()
+            ids = set(record.get("ids") or [])
+            for bucket in ("fomo", "alpha"):
+                signals = getattr(self, self._BUCKET_ATTRS[bucket])
+                if symbol not in signals:
+                    continue
+                remaining = deque(s for s in signals[symbol] if s.signal_id not in ids)
+                if remaining:
+                    signals[symbol] = remaining
+                else:
+                    del signals[symbol]
+
+    def _rebuild_expiry_index(self):
+        """按信号时间重建过期索引（加载状态后调用）"""
+        for bucket, attr in self._BUCKET_ATTRS.items():
+            entries = []
+            for symbol, signals in getattr(self, attr).items():
+                ordered = sorted(signals, key=lambda s: s.timestamp)
+                signals.clear()
+                signals.extend(ordered)
+                entries.extend((s.timestamp, symbol) for s in ordered)
+            entries.sort(key=lambda entry: entry[0])
+            self._expiry_index[bucket] = deque(entries)
+
+    def _expire_bucket(self, bucket: str, cutoff: datetime):
+        """弹出过期索引队首早于 cutoff 的条目，并从对应标的队首移除过期信号"""
+        index = self._expiry_index[bucket]
+        signals = getattr(self, self._BUCKET_ATTRS[bucket])
+        while index and index[0][0] <= cutoff:
+            _, symbol = index.popleft()
+            pending = signals.get(symbol)
+            if pending is None:
+                continue
+            while pending and pending[0].timestamp <= cutoff:
+                pending.popleft()
+            if not pending:
+                del signals[symbol]
+
     def _cleanup_expired_signals(self):
         """清理过期信号（超过时间窗口的信号）"""
-        cutoff = datetime.now() - timedelta(seconds=self.time_window * 2)
-
-        for symbol in list(self.fomo_signals.keys()):
-            self.fomo_signals[symbol] = [
-                s for s in self.fomo_signals[symbol]
-                if s.timestamp > cutoff
-            ]
-            if not self.fomo_signals[symbol]:
-                del self.fomo_signals[symbol]
-
-        for symbol in list(self.alpha_signals.keys()):
-            self.alpha_signals[symbol] = [
-                s for s in self.alpha_signals[symbol]
-                if s.timestamp > cutoff
-            ]
-            if not self.alpha_signals[symbol]:
-                del self.alpha_signals[symbol]
-
-        # 清理风险信号（保留更短时间，30分钟）
-        risk_cutoff = datetime.now() - timedelta(seconds=1800)
-        for symbol in list(self.risk_signals.keys()):
-            self.risk_signals[symbol] = [
-                s for s in self.risk_signals[symbol]
-                if s.timestamp > risk_cutoff
-            ]
-            if not self.risk_signals[symbol]:
-                del self.risk_signals[symbol]
-
-        # 清理看跌信号（保留30分钟）
-        for symbol in list(self.bearish_signals.keys()):
-            self.bearish_signals[symbol] = [
-                s for s in self.bearish_signals[symbol]
-                if s.timestamp > risk_cutoff
-            ]
-            if not self.bearish_signals[symbol]:
-                del self.bearish_signals[symbol]
+        now = self._now()
+        cutoff = now - timedelta(seconds=self.time_window * 2)
+        self._expire_bucket("fomo", cutoff)
+        self._expire_bucket("alpha", cutoff)
+
+        # 清理风险信号、看跌信号（保留更短时间，30分钟）
+        risk_cutoff = now - timedelta(seconds=1800)
+        self._expire_bucket("risk", risk_cutoff)
+        self._expire_bucket("bearish", risk_cutoff)
 
         # 清理做空交易信号（保留1小时）
-        trade_cutoff = datetime.now() - timedelta(seconds=3600)
-        self.bearish_trade_signals = [
-            s for s in self.bearish_trade_signals
-            if s.signal_time > trade_cutoff
-        ]
+        trade_cutoff = now - timedelta(seconds=3600)
+        while self.bearish_trade_signals and self.bearish_trade_signals[0].signal_time <= trade_cutoff:
+            self.bearish_trade_signals.popleft()
 
     def get_pending_signals_count(self) -> Dict[str, int]:
         """获取待匹配信号数量统计"""
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+历史信号回放回测测试
+
+用一小段合成的信号流与 K 线驱动 BacktestEngine，核对入场/出场成交；
+事件时间模式下缺少 createTime 的信号沿用事件时钟，不跳到系统时间。
+"""
+
+import json
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from binance_trader.backtest_replay import ArchivedSignal, BacktestEngine, KlineStore
+from binance_trader.signal_aggregator import SignalAggregator
+
+T0_MS = 1_700_000_040_000  # 整分钟
+MINUTE_MS = 60_000
+
+
+def _bar(index, open_, high, low, close):
+    return [T0_MS + index * MINUTE_MS, str(open_), str(high), str(low), str(close), "0"]
+
+
+def _signal(message_id, message_type, symbol, offset_seconds):
+    created = datetime.fromtimestamp(T0_MS / 1000.0) + timedelta(seconds=offset_seconds)
+    return ArchivedSignal(
+        message_id=message_id,
+        message_type=message_type,
+        symbol=symbol,
+        created_time=created,
+        data={"createTime": int(created.timestamp() * 1000)},
+    )
+
+
+def _engine(directory):
+    return BacktestEngine(
+        klines=KlineStore(directory),
+        initial_balance=1000.0,
+        time_window=300,
+        min_score=0.6,
+        fee_percent=0.0,
+        enable_trailing_stop=False,
+        risk_options={"stop_loss_percent": 3.0},
+    )
+
+
+def test_replay_fills_stop_loss_and_end_of_run():
+    """FOMO + Alpha 聚合后在下一根 K 线开盘入场；跌破止损按止损价成交，其余持仓在结束时平仓"""
+    with tempfile.TemporaryDirectory() as tmp:
+        klines = {
+            "ABC": [
+                _bar(0, 100, 100, 100, 100),
+                _bar(1, 100, 100, 100, 100),
+                _bar(2, 100, 101, 99.5, 100.5),
+                _bar(3, 100.5, 100.8, 96, 96.5),  # 阴线：开→高→低，低点触发止损 97
+                _bar(4, 96.5, 97, 96, 96.8),
+            ],
+            "XYZ": [
+                _bar(0, 10, 10, 10, 10),
+                _bar(1, 10, 10, 10, 10),
+                _bar(2, 10, 10.1, 9.9, 10),
+                _bar(3, 10, 10.4, 10, 10.3),
+                _bar(4, 10.3, 10.6, 10.2, 10.5),
+            ],
+        }
+        for symbol, rows in klines.items():
+            Path(tmp, f"{symbol}USDT_1m.json").write_text(json.dumps(rows), encoding="utf-8")
+
+        engine = _engine(tmp)
+        report = engine.run(iter([
+            _signal("f-abc", 113, "ABC", 10),
+            _signal("f-xyz", 113, "XYZ", 20),
+            _signal("a-abc", 110, "ABC", 70),
+            _signal("a-xyz", 110, "XYZ", 80),
+            _signal("f-nok", 113, "NOK", 90),
+            _signal("a-nok", 110, "NOK", 100),
+        ]))
+
+    assert report.signals == 6
+    assert report.confluences == 3
+    assert report.skipped == {"无K线数据": 1}
+
+    fills = {
+        trade.symbol: (trade.entry_time, trade.entry_price, trade.exit_time, trade.exit_price, trade.reason)
+        for trade in report.trades
+    }
+    bar_time = lambda index: datetime.fromtimestamp((T0_MS + index * MINUTE_MS) / 1000.0)
+    assert fills == {
+        "ABC": (bar_time(2), 100.0, bar_time(4), 97.0, "止损"),
+        "XYZ": (bar_time(2), 10.0, bar_time(5), 10.5, "回测结束"),
+    }
+    pnl = sum(trade.pnl for trade in report.trades)
+    assert abs(report.final_balance - (1000.0 + pnl)) < 1e-9
+
+
+def test_missing_create_time_uses_event_clock():
+    """事件时间模式下缺少 createTime 的信号取当前事件时间，仍能与回放中的信号聚合"""
+    aggregator = SignalAggregator(time_window=300, min_score=0.6, enable_persistence=False, use_event_time=True)
+    fomo_time = datetime(2023, 11, 14, 22, 14, 0)
+
+    assert aggregator.add_signal(113, "f-1", "ABC", data={}, event_time=fomo_time) is None
+    confluence = aggregator.add_signal(110, "a-1", "ABC", data={})
+
+    assert confluence is not None
+    assert confluence.alpha_signal.timestamp == fomo_time
+    assert confluence.time_gap == 0.0
+    assert aggregator._now() == fomo_time
+
+
+if __name__ == '__main__':
+    test_replay_fills_stop_loss_and_end_of_run()
+    test_missing_create_time_uses_event_clock()
+    print("[OK] 全部通过")
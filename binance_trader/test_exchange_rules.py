@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+交易规则索引测试
+
+- 整数刻度取整：数量/价格按步长向下/向上取整，最小名义价值整数比较
+- 未知交易对（新上架）同步刷新一次后返回规则，刷新按间隔限流
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from binance_trader.exchange_rules import ExchangeRuleIndex, SymbolRules
+
+
+def _symbol(symbol, step, min_qty, tick, notional):
+    return {
+        'symbol': symbol,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'tickSize': tick},
+            {'filterType': 'LOT_SIZE', 'stepSize': step, 'minQty': min_qty},
+            {'filterType': 'MIN_NOTIONAL', 'notional': notional},
+        ],
+    }
+
+
+class FakeExchangeInfo:
+    """按调用次数返回不同的 exchangeInfo；第二次起包含新上架的交易对"""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("exchangeInfo unavailable")
+        symbols = [_symbol('BTCUSDT', '0.001', '0.001', '0.10', '100')]
+        if self.calls > 1:
+            symbols.append(_symbol('NEWUSDT', '1', '1', '0.0001', '5'))
+        return {'symbols': symbols}
+
+
+def test_rounding_in_integer_units():
+    """数量/价格取整不受浮点残差影响"""
+    rules = SymbolRules('0.001', '0.001', '0.10', '100')
+    assert rules.round_quantity(0.29) == 0.29
+    assert rules.round_quantity(1.23456) == 1.234
+    assert rules.round_quantity(1.23456, rounding="up") == 1.235
+    assert rules.round_quantity(0.0009) == 0.0
+    assert rules.round_price(64123.456) == 64123.4
+    assert rules.round_price(64123.41, rounding="up") == 64123.5
+    assert rules.round_price(0.3) == 0.3
+    assert rules.min_quantity == 0.001
+    assert rules.min_notional_value == 100.0
+    assert rules.meets_min_notional(0.002, 50000.0)
+    assert not rules.meets_min_notional(0.001, 99999.9)
+
+    coarse = SymbolRules('1', '1', '0.0001', '5')
+    assert coarse.round_quantity(12.9) == 12.0
+    assert coarse.round_quantity(12.1, rounding="up") == 13.0
+    assert coarse.round_price(0.123456) == 0.1234
+
+
+def test_unknown_symbol_refreshes_once_synchronously():
+    """未知交易对同步刷新一次后返回规则；限流期内不再重复下载"""
+    fetch = FakeExchangeInfo()
+    index = ExchangeRuleIndex(fetch, cache_file=None, miss_refresh_interval=60)
+    assert index.load() == 1
+    assert fetch.calls == 1
+
+    # 启动载入后不足 miss_refresh_interval：不下载
+    assert index.get('NEWUSDT') is None
+    assert fetch.calls == 1
+
+    index._last_attempt -= 60
+    rules = index.get('NEWUSDT')
+    assert rules is not None and rules.round_quantity(3.7) == 3.0
+    assert fetch.calls == 2
+
+    assert index.get('NOPEUSDT') is None
+    assert fetch.calls == 2  # 距上次刷新不足 miss_refresh_interval
+    assert index.get('BTCUSDT').round_price(1.26) == 1.2
+
+
+def test_concurrent_misses_download_once():
+    """并发的未命中只下载一次 exchangeInfo"""
+    fetch = FakeExchangeInfo()
+    index = ExchangeRuleIndex(fetch, cache_file=None, miss_refresh_interval=1)
+    index._install({}, 0.0)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.get('NEWUSDT'))) for _ in range(8)]
+    fetch.calls = 1  # 下一次下载即包含 NEWUSDT
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert fetch.calls == 2
+    assert len(results) == 8 and all(r is not None for r in results)
+
+
+def test_failed_miss_refresh_returns_none():
+    """刷新失败时返回 None，由调用方回退"""
+    index = ExchangeRuleIndex(FakeExchangeInfo(fail=True), cache_file=None, miss_refresh_interval=60)
+    assert index.get('BTCUSDT') is None
+    assert index.get('BTCUSDT') is None
+    assert index.fetch.calls == 1
+
+
+if __name__ == '__main__':
+    test_rounding_in_integer_units()
+    test_unknown_symbol_refreshes_once_synchronously()
+    test_concurrent_misses_download_once()
+    test_failed_miss_refresh_returns_none()
+    print("[OK] 全部通过")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+交易器杠杆/保证金模式缓存与止盈止损批量提交测试
+
+启动时从 GET /fapi/v1/symbolConfig 载入各交易对的杠杆与保证金模式，
+开仓前缓存与目标一致时不再请求币安。
+止盈/止损经 batchOrders 提交，网络错误后按 clientOrderId 核对挂单并补挂缺失的订单。
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from binance.exceptions import BinanceAPIException
+from binance_trader.futures_trader import BinanceFuturesTrader
+
+
+class FakeClient:
+    """只实现 symbolConfig 的假客户端；持仓风险 v3 不含 leverage / marginType"""
+
+    def __init__(self):
+        self.calls = []
+
+    def futures_symbol_config(self, **kwargs):
+        self.calls.append('futures_symbol_config')
+        return [
+            {'symbol': 'BTCUSDT', 'marginType': 'CROSSED', 'isAutoAddMargin': 'false',
+             'leverage': 20, 'maxNotionalValue': '1000000'},
+            {'symbol': 'ETHUSDT', 'marginType': 'ISOLATED', 'isAutoAddMargin': 'false',
+             'leverage': '10', 'maxNotionalValue': '500000'},
+            {'symbol': 'SOLUSDT', 'marginType': 'CROSSED', 'leverage': 'bad'},
+        ]
+
+    def futures_position_information(self, **kwargs):
+        self.calls.append('futures_position_information')
+        return [{'symbol': 'BTCUSDT', 'positionSide': 'BOTH', 'positionAmt': '0'}]
+
+
+def _trader(client):
+    trader = BinanceFuturesTrader.__new__(BinanceFuturesTrader)
+    trader.logger = logging.getLogger("test")
+    trader.client = client
+    trader.api_retry_count = 1
+    trader.recv_window_ms = 0
+    trader._symbol_leverage = {}
+    trader._symbol_margin_type = {}
+    trader._sync_time_if_needed = lambda *args, **kwargs: None
+    trader._get_alternate_client = lambda: None
+    return trader
+
+
+def test_prime_symbol_settings_reads_symbol_config():
+    """杠杆与保证金模式取自 symbolConfig，不读持仓风险接口"""
+    client = FakeClient()
+    trader = _trader(client)
+
+    assert trader.prime_symbol_settings() == 3
+    assert client.calls == ['futures_symbol_config']
+    assert trader._symbol_leverage == {'BTCUSDT': 20, 'ETHUSDT': 10}
+    assert trader._symbol_margin_type == {'BTCUSDT': 'CROSSED', 'ETHUSDT': 'ISOLATED', 'SOLUSDT': 'CROSSED'}
+
+
+def test_primed_settings_skip_set_calls():
+    """缓存与目标一致时开仓前不再设置杠杆/保证金模式"""
+    trader = _trader(FakeClient())
+    trader.prime_symbol_settings()
+
+    requested = []
+    trader.set_leverage = lambda symbol, leverage: requested.append(('leverage', symbol, leverage)) or True
+    trader.set_margin_type = lambda symbol, margin: requested.append(('margin', symbol, margin)) or True
+
+    trader.ensure_symbol_settings('BTCUSDT', 20, 'CROSSED')
+    trader.ensure_symbol_settings('ETHUSDT', 10, 'ISOLATED')
+    assert requested == []
+
+    trader.ensure_symbol_settings('ETHUSDT', 5, 'CROSSED')
+    assert requested == [('leverage', 'ETHUSDT', 5), ('margin', 'ETHUSDT', 'CROSSED')]
+
+
+class FakeResponse:
+    status_code = 400
+    text = '{"code": -4116, "msg": "ClientOrderId is duplicated."}'
+
+
+class BatchClient:
+    """batchOrders 请求到达交易所后连接断开：订单已挂上但调用方收到网络错误"""
+
+    def __init__(self, land=2, open_orders_error=False):
+        self.land = land
+        self.open_orders_error = open_orders_error
+        self.open_orders = []
+        self.batch_calls = []
+        self.single_orders = []
+
+    def futures_place_batch_order(self, **params):
+        self.batch_calls.append(params)
+        self.open_orders.extend(
+            {'clientOrderId': order['newClientOrderId']} for order in params['batchOrders'][:self.land]
+        )
+        raise ConnectionError("Connection aborted")
+
+    def futures_get_open_orders(self, **kwargs):
+        if self.open_orders_error:
+            raise ConnectionError("Connection aborted")
+        return list(self.open_orders)
+
+    def futures_create_order(self, **params):
+        if any(o['clientOrderId'] == params['newClientOrderId'] for o in self.open_orders):
+            raise BinanceAPIException(FakeResponse(), 400, FakeResponse.text)
+        self.single_orders.append(params)
+        self.open_orders.append({'clientOrderId': params['newClientOrderId']})
+        return {'orderId': len(self.open_orders)}
+
+
+def _exit_legs():
+    return [
+        ("止损", {'symbol': 'BTCUSDT', 'side': 'SELL', 'type': 'STOP_MARKET',
+                 'stopPrice': 60000.0, 'closePosition': True}),
+        ("止盈1", {'symbol': 'BTCUSDT', 'side': 'SELL', 'type': 'TAKE_PROFIT_MARKET',
+                  'stopPrice': 66000.0, 'quantity': 0.002, 'reduceOnly': True}),
+        ("止盈2", {'symbol': 'BTCUSDT', 'side': 'SELL', 'type': 'TAKE_PROFIT_MARKET',
+                  'stopPrice': 70000.0, 'closePosition': True}),
+    ]
+
+
+def _batch_trader(client):
+    trader = _trader(client)
+    trader.recv_window_ms = 5000
+    trader._use_hedge_mode = False
+    return trader
+
+
+def test_network_error_resubmits_missing_exit_legs():
+    """网络错误后核对挂单：已挂上的不重复提交，缺失的（含止损）逐笔补挂"""
+    client = BatchClient(land=1)
+    trader = _batch_trader(client)
+
+    assert trader._submit_exit_orders(_exit_legs(), position_side='LONG') == [True, True, True]
+    batch = client.batch_calls[0]
+    assert set(batch) == {'batchOrders'}  # 不附带 recvWindow
+    assert batch['batchOrders'][1]['reduceOnly'] == 'true'
+    assert batch['batchOrders'][1]['quantity'] == '0.002'
+    # 止损已经挂上，只补挂两个止盈，clientOrderId 与批量请求一致
+    sent_ids = [order['newClientOrderId'] for order in batch['batchOrders']]
+    assert [order['newClientOrderId'] for order in client.single_orders] == sent_ids[1:]
+    assert len(client.open_orders) == 3
+
+
+def test_unknown_batch_outcome_resubmits_with_same_client_ids():
+    """挂单查询也失败时全部补挂；已存在的订单因 clientOrderId 重复被拒，视为已挂上"""
+    client = BatchClient(land=3, open_orders_error=True)
+    trader = _batch_trader(client)
+
+    assert trader._submit_exit_orders(_exit_legs(), position_side='LONG') == [True, True, True]
+    assert client.single_orders == []
+    assert len(client.open_orders) == 3
+
+    client = BatchClient(land=0, open_orders_error=True)
+    trader = _batch_trader(client)
+    assert trader._submit_exit_orders(_exit_legs(), position_side='LONG') == [True, True, True]
+    assert [order['type'] for order in client.single_orders][0] == 'STOP_MARKET'
+    assert len(client.open_orders) == 3
+
+
+if __name__ == '__main__':
+    test_prime_symbol_settings_reads_symbol_config()
+    test_primed_settings_skip_set_calls()
+    test_network_error_resubmits_missing_exit_legs()
+    test_unknown_batch_outcome_resubmits_with_same_client_ids()
+    print("[OK] 全部通过")
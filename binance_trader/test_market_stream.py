@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+行情推送流与推送触发平仓的测试
+
+- 本地假 WebSocket 服务器：断线后自动重连并重新订阅，价格继续回调
+- 平仓防重入 / 失败退避
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets
+
+from binance_trader.market_stream import MarkPriceStream
+
+
+class FakeMarkPriceServer:
+    """记录每个连接收到的订阅请求；每个连接推送一笔价格后由服务端断开"""
+
+    def __init__(self):
+        self.subscriptions = []  # 每个连接收到的 SUBSCRIBE 参数
+        self.connections = 0
+        self.port = None
+        self._ready = threading.Event()
+        self._stop = None
+        self._loop = None
+        self._thread = threading.Thread(target=self._main, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        assert self._ready.wait(5), "fake server did not start"
+
+    def stop(self):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join(5)
+
+    def _main(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        self._stop = self._loop.create_future()
+        async with websockets.serve(self._handler, "127.0.0.1", 0) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self._ready.set()
+            await self._stop
+
+    async def _handler(self, ws, *args):
+        self.connections += 1
+        connection = self.connections
+        request = json.loads(await ws.recv())
+        self.subscriptions.append((request["method"], request["params"]))
+        await ws.send(json.dumps({"result": None, "id": request["id"]}))
+        await ws.send(json.dumps({
+            "stream": "btcusdt@markPrice@1s",
+            "data": {"e": "markPriceUpdate", "E": 1000 * connection, "s": "BTCUSDT", "p": str(100 + connection)},
+        }))
+        if connection == 1:
+            await ws.close()
+            return
+        await ws.wait_closed()
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_reconnect_resubscribes():
+    """服务端断开后重连，新连接上重新订阅持仓标的并继续推送"""
+    server = FakeMarkPriceServer()
+    server.start()
+    ticks = []
+    stream = MarkPriceStream(
+        on_price=lambda symbol, price, event_time: ticks.append((symbol, price, event_time)),
+        base_url=f"ws://127.0.0.1:{server.port}",
+        reconnect_delay=0.1,
+        max_reconnect_delay=0.2,
+    )
+    try:
+        stream.sync_symbols(["BTCUSDT"])
+        stream.start()
+
+        assert _wait_for(lambda: len(ticks) >= 2), f"ticks={ticks}"
+        assert server.connections >= 2
+        assert server.subscriptions[:2] == [
+            ("SUBSCRIBE", ["btcusdt@markPrice@1s"]),
+            ("SUBSCRIBE", ["btcusdt@markPrice@1s"]),
+        ]
+        assert ticks[:2] == [("BTCUSDT", 101.0, 1000), ("BTCUSDT", 102.0, 2000)]
+        assert stream.stats["reconnects"] >= 1
+        assert _wait_for(stream.is_healthy)
+        assert stream.get_price("BTCUSDT") == 102.0
+    finally:
+        stream.stop()
+        server.stop()
+
+
+def test_exit_in_flight_and_backoff():
+    """同一标的平仓在途时不重复提交；失败后在退避期内不重试"""
+    from binance_trader.futures_main import FuturesAutoTradingSystem
+    import logging
+
+    system = FuturesAutoTradingSystem.__new__(FuturesAutoTradingSystem)
+    system.logger = logging.getLogger("test")
+    system._exit_attempts = {}
+    system._exit_attempts_lock = threading.Lock()
+    system.exit_retry_backoff = 0.2
+    system.exit_retry_max_backoff = 1.0
+
+    calls = []
+    release = threading.Event()
+
+    def slow_close():
+        calls.append("slow")
+        release.wait(5)
+        return True
+
+    worker = threading.Thread(target=system._submit_exit, args=("BTCUSDT", slow_close))
+    worker.start()
+    assert _wait_for(lambda: calls == ["slow"])
+    assert system._exit_blocked("BTCUSDT")
+    assert not system._submit_exit("BTCUSDT", lambda: calls.append("dup") or True)
+    release.set()
+    worker.join(5)
+    assert calls == ["slow"]
+    assert not system._exit_blocked("BTCUSDT")
+
+    assert not system._submit_exit("ETHUSDT", lambda: calls.append("fail") and False)
+    assert system._exit_blocked("ETHUSDT")
+    assert not system._submit_exit("ETHUSDT", lambda: calls.append("retry-too-early") or True)
+    assert _wait_for(lambda: not system._exit_blocked("ETHUSDT"), timeout=2)
+    assert system._submit_exit("ETHUSDT", lambda: calls.append("retry") or True)
+    assert calls == ["slow", "fail", "retry"]
+    assert "ETHUSDT" not in system._exit_attempts
+
+
+if __name__ == "__main__":
+    test_reconnect_resubscribes()
+    test_exit_in_flight_and_backoff()
+    print("[OK] 全部通过")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+信号聚合器持久化测试
+
+- 只写状态日志（未合并快照）时，重启后按日志重放恢复出与运行中一致的状态
+- 日志累计到 compact_every 后合并为快照并清空日志，重启后状态一致
+- 写入中断留下的残缺行被忽略，重放后的已处理 ID 仍能去重
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from binance_trader.signal_aggregator import SignalAggregator
+
+
+def _aggregator(state_file, compact_every=1000):
+    return SignalAggregator(state_file=str(state_file), flush_interval=0, compact_every=compact_every)
+
+
+def _feed(aggregator):
+    """FOMO/Alpha 待匹配、一对成功匹配、看跌信号（只记 ID）和不追踪的类型各若干"""
+    aggregator.add_signal(113, "fomo-btc", "BTC", {})
+    aggregator.add_signal(110, "alpha-eth", "ETH", {})
+    aggregator.add_signal(113, "fomo-xrp", "XRP", {"price": 1.5, "nested": {"k": [1, 2]}})
+    aggregator.add_signal(112, "bearish-sol", "SOL", {})
+    aggregator.add_signal(999, "ignored", "BTC", {})
+    return aggregator.add_signal(110, "alpha-btc", "BTC", {})
+
+
+def _state(aggregator):
+    buckets = {
+        bucket: {
+            symbol: [(s.signal_id, s.signal_type, s.timestamp, s.message_type, s.data) for s in signals]
+            for symbol, signals in getattr(aggregator, attr).items()
+        }
+        for bucket, attr in (("fomo", "fomo_signals"), ("alpha", "alpha_signals"), ("risk", "risk_signals"))
+    }
+    return buckets, list(aggregator.processed_signal_order)
+
+
+def test_journal_replay_restores_state():
+    """未合并快照时，重启按状态日志重放得到相同的待匹配信号和已处理 ID"""
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = Path(tmp) / "signals.json"
+        live = _aggregator(state_file)
+        confluence = _feed(live)
+        assert confluence is not None and confluence.symbol == "BTC"
+        assert not state_file.exists()
+        journal = state_file.with_name(state_file.name + ".journal")
+        assert len(journal.read_text(encoding="utf-8").splitlines()) == 6  # 5 条 add + 1 条 match
+
+        restored = _aggregator(state_file)
+        assert _state(restored) == _state(live)
+        assert "BTC" not in restored.fomo_signals and "BTC" not in restored.alpha_signals
+        # 启动时已合并为快照，日志从空文件开始
+        assert state_file.exists() and journal.read_text(encoding="utf-8") == ""
+
+        # 已处理 ID 随状态恢复，重复消息不再入队
+        assert restored.add_signal(113, "fomo-xrp", "XRP", {}) is None
+        assert len(restored.fomo_signals["XRP"]) == 1
+        assert restored.add_signal(112, "bearish-sol", "SOL", {}) is None
+        assert "SOL" not in restored.bearish_signals
+
+
+def test_compaction_round_trip():
+    """日志达到 compact_every 后合并为快照；快照 + 后续日志重放与运行中状态一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = Path(tmp) / "signals.json"
+        journal = state_file.with_name(state_file.name + ".journal")
+        live = _aggregator(state_file, compact_every=4)
+        _feed(live)
+        # 第 4 条记录触发合并：快照写入、日志清空后继续追加
+        assert state_file.exists()
+        assert len(journal.read_text(encoding="utf-8").splitlines()) == 2
+
+        live.add_signal(110, "alpha-sol", "SOL", {})
+        with journal.open("a", encoding="utf-8") as fh:
+            fh.write('{"op":"add","id":"torn')  # 写入中断留下的残缺行
+
+        restored = _aggregator(state_file, compact_every=4)
+        assert _state(restored) == _state(live)
+        assert restored.add_signal(110, "alpha-sol", "SOL", {}) is None
+
+        # 再重启一次：只剩快照也得到同样的状态
+        again = _aggregator(state_file, compact_every=4)
+        assert _state(again) == _state(live)
+
+
+if __name__ == '__main__':
+    test_journal_replay_restores_state()
+    test_compaction_round_trip()
+    print("[OK] 全部通过")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+用户数据流快照与缓冲事件对账测试
+
+连接建立后推送先在 websocket 中缓冲，再取 REST 快照；
+事件时间不晚于快照时间的推送必须丢弃，之后的推送正常增量更新。
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from binance_trader.futures_trader import BinanceFuturesTrader
+from binance_trader.user_data_stream import UserDataStream
+
+SNAPSHOT_TIME = 1_700_000_010_000
+
+
+def _fake_api(calls):
+    responses = {
+        'futures_time': {'serverTime': SNAPSHOT_TIME},
+        'futures_position_information': [
+            {'symbol': 'BTCUSDT', 'positionSide': 'BOTH', 'positionAmt': '0.010',
+             'entryPrice': '60000', 'markPrice': '61000', 'updateTime': SNAPSHOT_TIME - 500},
+        ],
+        'futures_get_open_orders': [
+            {'symbol': 'BTCUSDT', 'orderId': 11, 'status': 'NEW', 'type': 'STOP_MARKET'},
+        ],
+        'futures_account': {'assets': [{'asset': 'USDT', 'walletBalance': '1000', 'crossWalletBalance': '900'}]},
+    }
+
+    def call_api(method, *args, **kwargs):
+        calls.append(method)
+        return responses[method]
+    return call_api
+
+
+def _account_update(event_time, amount, entry='60000', wallet='1000'):
+    return json.dumps({
+        'e': 'ACCOUNT_UPDATE', 'E': event_time,
+        'a': {
+            'B': [{'a': 'USDT', 'wb': wallet, 'cw': wallet}],
+            'P': [{'s': 'BTCUSDT', 'ps': 'BOTH', 'pa': amount, 'ep': entry, 'up': '0', 'mt': 'cross'}],
+        },
+    })
+
+
+def _order_update(event_time, order_id, status):
+    return json.dumps({
+        'e': 'ORDER_TRADE_UPDATE', 'E': event_time,
+        'o': {'s': 'BTCUSDT', 'i': order_id, 'X': status, 'o': 'MARKET', 'T': event_time},
+    })
+
+
+def _stream_with_snapshot():
+    calls = []
+    stream = UserDataStream(call_api=_fake_api(calls))
+    stream._load_snapshot()
+    stream._ready = True
+    return stream, calls
+
+
+def test_buffered_events_before_snapshot_are_dropped():
+    """快照之前缓冲的推送不能覆盖较新的快照"""
+    stream, _ = _stream_with_snapshot()
+
+    # 快照前：仓位曾是 0.005、挂单 22 还未成交 —— 都已被快照覆盖
+    stream._handle_message(_account_update(SNAPSHOT_TIME - 2000, '0.005', wallet='800'))
+    stream._handle_message(_account_update(SNAPSHOT_TIME, '0', wallet='700'))
+    stream._handle_message(_order_update(SNAPSHOT_TIME - 1000, 22, 'NEW'))
+    # 快照前成交的订单仍记录，等待成交的调用方可以拿到终态
+    stream._handle_message(_order_update(SNAPSHOT_TIME - 1000, 33, 'FILLED'))
+
+    assert stream.get_position_amount('BTCUSDT') == 0.010
+    assert stream.get_balance('USDT') == {'wallet': 1000.0, 'cross_wallet': 900.0}
+    assert [o['orderId'] for o in stream.get_open_orders()] == [11]
+    assert stream.wait_for_order(33, timeout=0)['status'] == 'FILLED'
+
+
+def test_events_after_snapshot_apply_in_order():
+    """快照之后的推送增量更新，乱序到达的旧事件不回退状态"""
+    stream, _ = _stream_with_snapshot()
+
+    stream._handle_message(_account_update(SNAPSHOT_TIME + 2000, '0.020', entry='60500', wallet='990'))
+    stream._handle_message(_account_update(SNAPSHOT_TIME + 1000, '0.015'))
+    assert stream.get_position_amount('BTCUSDT') == 0.020
+    assert stream.get_balance('USDT')['wallet'] == 990.0
+
+    stream._handle_message(_order_update(SNAPSHOT_TIME + 3000, 11, 'CANCELED'))
+    stream._handle_message(_order_update(SNAPSHOT_TIME + 3000, 44, 'NEW'))
+    assert [o['orderId'] for o in stream.get_open_orders()] == [44]
+
+    stream._handle_message(_account_update(SNAPSHOT_TIME + 4000, '0'))
+    assert stream.get_positions() == []
+
+
+def test_positions_use_stream_or_snapshot_mark_price():
+    """由推送簿构造持仓时不逐个标的请求 REST 标记价格"""
+    stream, calls = _stream_with_snapshot()
+    stream._handle_message(_account_update(SNAPSHOT_TIME + 1000, '0.020', entry='60500'))
+
+    trader = BinanceFuturesTrader.__new__(BinanceFuturesTrader)
+    trader.user_stream = stream
+    trader.positions = {}
+    trader.leverage = 10
+    trader.mark_price_provider = None
+
+    def no_rest(symbol):
+        raise AssertionError("REST price lookup")
+    trader.get_symbol_price = no_rest
+
+    calls.clear()
+    (position,) = trader._positions_from_user_stream()
+    assert position['markPrice'] == 61000.0  # 快照中的 markPrice
+    assert abs(position['unRealizedProfit'] - (61000.0 - 60500.0) * 0.020) < 1e-9
+
+    trader.mark_price_provider = lambda symbol: 62000.0
+    (position,) = trader._positions_from_user_stream('BTCUSDT')
+    assert position['markPrice'] == 62000.0
+    assert calls == []
+
+
+if __name__ == '__main__':
+    test_buffered_events_before_snapshot_are_dropped()
+    test_events_after_snapshot_apply_in_order()
+    test_positions_use_stream_or_snapshot_mark_price()
+    print("[OK] 全部通过")
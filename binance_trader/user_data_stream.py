@@ -0,0 +1,471 @@
+"""
+用户数据流 - User Data Stream
+通过 listenKey 订阅币安合约账户推送（ACCOUNT_UPDATE / ORDER_TRADE_UPDATE / ACCOUNT_CONFIG_UPDATE），
+在内存中维护持仓 / 挂单 / 余额簿，交易器据此回答查询并等待成交事件，
+减少 REST 轮询与固定 sleep。
+
+- 连接后先用 REST 快照初始化内存簿，之后只靠推送增量更新；
+  连接期间缓冲的、事件时间不晚于快照时间的推送已反映在快照中，直接丢弃
+- listenKey 每 30 分钟续期，过期（listenKeyExpired）或断线时重新获取并重连
+- 未就绪（未连接 / 快照失败）时 is_ready() 为 False，调用方应回退到 REST
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - websockets 随 python-binance 安装
+    websockets = None
+
+from .market_stream import FUTURES_STREAM_URL
+
+# 终态订单状态
+TERMINAL_ORDER_STATUSES = {'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH'}
+
+
+def _order_from_event(o: Dict) -> Dict:
+    """把 ORDER_TRADE_UPDATE 的订单字段转换为与 REST 查询一致的格式"""
+    return {
+        'symbol': o.get('s'),
+        'orderId': o.get('i'),
+        'clientOrderId': o.get('c'),
+        'side': o.get('S'),
+        'type': o.get('o'),
+        'origType': o.get('ot') or o.get('o'),
+        'status': o.get('X'),
+        'origQty': o.get('q'),
+        'executedQty': o.get('z'),
+        'avgPrice': o.get('ap'),
+        'price': o.get('p'),
+        'stopPrice': o.get('sp'),
+        'positionSide': o.get('ps'),
+        'reduceOnly': bool(o.get('R')),
+        'closePosition': bool(o.get('cp')),
+        'updateTime': o.get('T'),
+    }
+
+
+class UserDataStream:
+    """
+    合约用户数据流与内存账户簿
+
+    call_api: 交易器的 REST 调用函数，签名 call_api(method_name, *args, **kwargs)
+    """
+
+    def __init__(self,
+                 call_api: Callable,
+                 base_url: str = FUTURES_STREAM_URL,
+                 proxy: Optional[str] = None,
+                 keepalive_interval: float = 30 * 60,
+                 reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0,
+                 max_closed_orders: int = 500,
+                 on_leverage_change: Optional[Callable[[str, int], None]] = None):
+        """
+        初始化用户数据流
+
+        Args:
+            call_api: REST 调用函数（用于 listenKey 管理和快照）
+            base_url: WebSocket 地址（测试时可指向本地假服务器）
+            proxy: 代理地址（需要 websockets 版本支持 proxy 参数）
+            keepalive_interval: listenKey 续期间隔（秒）
+            reconnect_delay: 初始重连间隔（秒）
+            max_reconnect_delay: 最大重连间隔（秒）
+            max_closed_orders: 保留的终态订单数量（供 wait_for_order 查询）
+            on_leverage_change: 收到 ACCOUNT_CONFIG_UPDATE 杠杆变更时回调 (symbol, leverage)
+        """
+        if websockets is None:
+            raise RuntimeError("websockets 未安装，无法启用用户数据流")
+
+        self.call_api = call_api
+        self.base_url = base_url.rstrip("/")
+        self.proxy = proxy
+        self.keepalive_interval = float(keepalive_interval)
+        self.reconnect_delay = float(reconnect_delay)
+        self.max_reconnect_delay = float(max_reconnect_delay)
+        self.max_closed_orders = int(max_closed_orders)
+        self.on_leverage_change = on_leverage_change
+
+        self.logger = logging.getLogger(__name__)
+
+        # 内存账户簿（_cond 保护）
+        self._cond = threading.Condition()
+        self._positions: Dict[tuple, Dict] = {}  # (symbol, positionSide) -> REST 格式持仓
+        self._open_orders: Dict[int, Dict] = {}  # orderId -> 订单
+        self._closed_orders: "OrderedDict[int, Dict]" = OrderedDict()
+        self._balances: Dict[str, Dict[str, float]] = {}  # asset -> {'wallet', 'cross_wallet'}
+        self._balance_times: Dict[str, int] = {}  # asset -> 最近一次余额推送的事件时间
+        self._ready = False
+        self._last_event_time = 0
+        self._snapshot_time = 0  # 快照取数时的服务器时间（毫秒）
+
+        self._listen_key: Optional[str] = None
+        self._ws = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {"events": 0, "reconnects": 0, "snapshots": 0}
+
+    # ------------------------------------------------------------------ 生命周期
+
+    def start(self):
+        """启动用户数据流（后台线程）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._thread_main, name="user-data-stream", daemon=True)
+        self._thread.start()
+        self.logger.info(f"📡 用户数据流已启动: {self.base_url}")
+
+    def stop(self, timeout: float = 5.0):
+        """停止用户数据流并关闭 listenKey"""
+        self._stopped.set()
+        loop, ws = self._loop, self._ws
+        if loop and ws is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout)
+        if self._listen_key:
+            try:
+                self.call_api('futures_stream_close', listenKey=self._listen_key)
+            except Exception:
+                pass
+            self._listen_key = None
+        with self._cond:
+            self._ready = False
+            self._cond.notify_all()
+        self.logger.info("用户数据流已停止")
+
+    def is_ready(self) -> bool:
+        """已连接且内存簿已由快照初始化"""
+        return self._ready
+
+    # ------------------------------------------------------------------ 查询
+
+    def get_positions(self) -> List[Dict]:
+        """获取所有非零持仓（REST futures_position_information 格式）"""
+        with self._cond:
+            return [dict(p) for p in self._positions.values() if float(p.get('positionAmt') or 0) != 0]
+
+    def get_position_amount(self, symbol: str) -> float:
+        """获取标的净持仓数量（无持仓返回 0）"""
+        with self._cond:
+            return sum(
+                float(p.get('positionAmt') or 0)
+                for (s, _), p in self._positions.items()
+                if s == symbol
+            )
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict]:
+        """获取未成交挂单"""
+        with self._cond:
+            return [
+                dict(o) for o in self._open_orders.values()
+                if symbol is None or o.get('symbol') == symbol
+            ]
+
+    def get_balance(self, asset: str = 'USDT') -> Optional[Dict[str, float]]:
+        """获取资产余额 {'wallet', 'cross_wallet'}，未知返回 None"""
+        with self._cond:
+            balance = self._balances.get(asset)
+            return dict(balance) if balance else None
+
+    def get_order(self, order_id) -> Optional[Dict]:
+        with self._cond:
+            order = self._open_orders.get(order_id) or self._closed_orders.get(order_id)
+            return dict(order) if order else None
+
+    def wait_for_order(self, order_id, timeout: float = 3.0) -> Optional[Dict]:
+        """
+        等待订单进入终态（成交 / 取消 / 过期 / 拒绝）
+
+        Args:
+            order_id: 订单ID
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            终态订单信息；超时或流不可用返回 None
+        """
+        try:
+            order_id = int(order_id)
+        except (TypeError, ValueError):
+            return None
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                order = self._closed_orders.get(order_id)
+                if order:
+                    return dict(order)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._ready:
+                    return None
+                self._cond.wait(remaining)
+
+    def wait_for_position(self, symbol: str, timeout: float = 2.0) -> float:
+        """
+        等待标的出现非零持仓
+
+        Returns:
+            超时前观察到的净持仓数量
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                amount = sum(
+                    float(p.get('positionAmt') or 0)
+                    for (s, _), p in self._positions.items()
+                    if s == symbol
+                )
+                remaining = deadline - time.monotonic()
+                if amount != 0 or remaining <= 0 or not self._ready:
+                    return amount
+                self._cond.wait(remaining)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {
+                **self.stats,
+                "ready": self._ready,
+                "positions": len([p for p in self._positions.values() if float(p.get('positionAmt') or 0) != 0]),
+                "open_orders": len(self._open_orders),
+            }
+
+    # ------------------------------------------------------------------ 快照
+
+    def _server_time_ms(self) -> int:
+        try:
+            result = self.call_api('futures_time') or {}
+            server_time = int(result.get('serverTime') or 0)
+            if server_time > 0:
+                return server_time
+        except Exception as e:
+            self.logger.debug(f"获取服务器时间失败，使用本地时间: {e}")
+        return int(time.time() * 1000)
+
+    def _load_snapshot(self):
+        """用 REST 快照初始化内存簿（在推送已开始缓冲后调用）"""
+        # 取数前的服务器时间：事件时间不晚于它的推送已包含在快照里
+        snapshot_time = self._server_time_ms()
+        positions = self.call_api('futures_position_information') or []
+        open_orders = self.call_api('futures_get_open_orders') or []
+        account = self.call_api('futures_account') or {}
+
+        with self._cond:
+            self._positions = {
+                (p.get('symbol'), p.get('positionSide', 'BOTH')): dict(p)
+                for p in positions
+                if float(p.get('positionAmt') or 0) != 0
+            }
+            self._open_orders = {o.get('orderId'): dict(o) for o in open_orders if o.get('orderId')}
+            self._balances = {
+                a.get('asset'): {
+                    'wallet': float(a.get('walletBalance') or 0),
+                    'cross_wallet': float(a.get('crossWalletBalance') or 0),
+                }
+                for a in account.get('assets', []) or []
+                if a.get('asset')
+            }
+            self._balance_times = {}
+            self._snapshot_time = snapshot_time
+            self.stats["snapshots"] += 1
+
+    # ------------------------------------------------------------------ 连接与收包
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _connect(self, listen_key: str):
+        url = f"{self.base_url}/ws/{listen_key}"
+        if self.proxy:
+            try:
+                return await websockets.connect(url, proxy=self.proxy, open_timeout=10)
+            except TypeError:
+                self.logger.warning("当前 websockets 版本不支持代理参数，用户数据流改为直连")
+        return await websockets.connect(url, open_timeout=10)
+
+    def _new_listen_key(self) -> str:
+        result = self.call_api('futures_stream_get_listen_key')
+        if isinstance(result, dict):
+            result = result.get('listenKey')
+        if not result:
+            raise RuntimeError("获取 listenKey 失败")
+        return result
+
+    async def _keepalive(self):
+        while not self._stopped.is_set():
+            await self._sleep(self.keepalive_interval)
+            if self._stopped.is_set() or not self._listen_key:
+                return
+            try:
+                await self._loop.run_in_executor(
+                    None, lambda: self.call_api('futures_stream_keepalive', listenKey=self._listen_key)
+                )
+                self.logger.debug("listenKey 已续期")
+            except Exception as e:
+                self.logger.warning(f"listenKey 续期失败: {e}")
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            keepalive_task = None
+            try:
+                self._listen_key = await self._loop.run_in_executor(None, self._new_listen_key)
+                ws = await self._connect(self._listen_key)
+            except Exception as e:
+                self.logger.warning(f"用户数据流连接失败: {e}，{delay:.0f}s 后重试")
+                await self._sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            self._ws = ws
+            try:
+                # 连接建立后推送已在 websocket 中缓冲，再取快照，避免丢失中间事件
+                await self._loop.run_in_executor(None, self._load_snapshot)
+                with self._cond:
+                    self._ready = True
+                    self._cond.notify_all()
+                self.logger.info("✅ 用户数据流已就绪，持仓/挂单改由推送维护")
+                delay = self.reconnect_delay
+                keepalive_task = asyncio.ensure_future(self._keepalive())
+                async for raw in ws:
+                    if self._handle_message(raw) == 'expired':
+                        self.logger.warning("listenKey 已过期，重新连接用户数据流")
+                        break
+            except Exception as e:
+                if not self._stopped.is_set():
+                    self.logger.warning(f"用户数据流断开: {e}")
+            finally:
+                with self._cond:
+                    self._ready = False
+                    self._cond.notify_all()
+                if keepalive_task:
+                    keepalive_task.cancel()
+                self._ws = None
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+
+            if not self._stopped.is_set():
+                self.stats["reconnects"] += 1
+                self.logger.info(f"用户数据流将在 {delay:.0f}s 后重连（期间使用 REST 查询）")
+                await self._sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _sleep(self, seconds: float):
+        end = time.monotonic() + seconds
+        while not self._stopped.is_set() and time.monotonic() < end:
+            await asyncio.sleep(min(0.2, end - time.monotonic()))
+
+    # ------------------------------------------------------------------ 事件处理
+
+    def _handle_message(self, raw) -> Optional[str]:
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(msg, dict):
+            return None
+        event = msg.get('e')
+        if event == 'listenKeyExpired':
+            return 'expired'
+        if event == 'ACCOUNT_UPDATE':
+            self._apply_account_update(msg)
+        elif event == 'ORDER_TRADE_UPDATE':
+            self._apply_order_update(msg)
+        elif event == 'ACCOUNT_CONFIG_UPDATE':
+            self._apply_account_config(msg)
+        else:
+            return None
+        self.stats["events"] += 1
+        return event
+
+    def _is_stale_event(self, event_time) -> bool:
+        """快照之前产生的推送（连接后、快照前缓冲的事件）"""
+        return bool(event_time) and int(event_time) <= self._snapshot_time
+
+    def _apply_account_update(self, msg: Dict):
+        account = msg.get('a') or {}
+        event_time = msg.get('E')
+        with self._cond:
+            if self._is_stale_event(event_time):
+                return
+            for b in account.get('B', []) or []:
+                asset = b.get('a')
+                if not asset:
+                    continue
+                if event_time and int(event_time) < self._balance_times.get(asset, 0):
+                    continue  # 乱序的旧事件
+                self._balances[asset] = {
+                    'wallet': float(b.get('wb') or 0),
+                    'cross_wallet': float(b.get('cw') or 0),
+                }
+                if event_time:
+                    self._balance_times[asset] = int(event_time)
+            for p in account.get('P', []) or []:
+                symbol = p.get('s')
+                if not symbol:
+                    continue
+                key = (symbol, p.get('ps', 'BOTH'))
+                current = self._positions.get(key)
+                if current and event_time and int(event_time) < int(current.get('updateTime') or 0):
+                    continue  # 乱序的旧事件
+                if float(p.get('pa') or 0) == 0:
+                    self._positions.pop(key, None)
+                    continue
+                position = self._positions.get(key, {'symbol': symbol, 'positionSide': key[1]})
+                position.update({
+                    'positionAmt': p.get('pa'),
+                    'entryPrice': p.get('ep'),
+                    'unRealizedProfit': p.get('up'),
+                    'marginType': p.get('mt', position.get('marginType')),
+                    'updateTime': msg.get('E'),
+                })
+                self._positions[key] = position
+            self._last_event_time = msg.get('E') or self._last_event_time
+            self._cond.notify_all()
+
+    def _apply_account_config(self, msg: Dict):
+        config = msg.get('ac') or {}
+        symbol = config.get('s')
+        if not symbol or config.get('l') is None or not self.on_leverage_change:
+            return
+        try:
+            self.on_leverage_change(symbol, int(config['l']))
+        except Exception as e:
+            self.logger.debug(f"杠杆变更回调失败 {symbol}: {e}")
+
+    def _apply_order_update(self, msg: Dict):
+        order = _order_from_event(msg.get('o') or {})
+        order_id = order.get('orderId')
+        if order_id is None:
+            return
+        with self._cond:
+            if self._is_stale_event(msg.get('E')) and order.get('status') not in TERMINAL_ORDER_STATUSES:
+                return  # 快照前的挂单状态已由快照覆盖；终态事件仍记录供 wait_for_order 使用
+            if order.get('status') in TERMINAL_ORDER_STATUSES:
+                self._open_orders.pop(order_id, None)
+                self._closed_orders[order_id] = order
+                self._closed_orders.move_to_end(order_id)
+                while len(self._closed_orders) > self.max_closed_orders:
+                    self._closed_orders.popitem(last=False)
+            else:
+                self._open_orders[order_id] = order
+            self._last_event_time = msg.get('E') or self._last_event_time
+            self._cond.notify_all()
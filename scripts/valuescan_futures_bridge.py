@@ -2,8 +2,13 @@
 """
 ValueScan → Binance Futures IPC Bridge
 
-开启本地 TCP 服务，接收 ValueScan 信号（JSON 按行发送），并交由
-FuturesAutoTradingSystem 处理，实现 signal_monitor 与交易模块的进程解耦。
+开启本地 TCP 服务，接收 ValueScan 信号，并交由 FuturesAutoTradingSystem 处理，
+实现 signal_monitor 与交易模块的进程解耦。
+
+支持两种客户端：
+- 长连接（先发送握手行）：长度前缀帧按批发送，收到整批后先回复 ack 再执行，
+  重发的信号按 message_id / ipc_id 去重，去重表持久化，重启后仍有效
+- 旧版短连接：JSON 按行发送，无 ack
 """
 
 import argparse
@@ -22,6 +27,22 @@ if ROOT_DIR not in sys.path:
 
 from binance_trader.futures_main import FuturesAutoTradingSystem
 from ipc_config import IPC_HOST, IPC_PORT
+from signal_monitor.ipc_protocol import (
+    HANDSHAKE,
+    SeenMessageStore,
+    dedupe_key,
+    encode_frame,
+    read_frame_from_file,
+)
+
+try:
+    from ipc_config import IPC_UNIX_SOCKET
+except ImportError:
+    IPC_UNIX_SOCKET = None
+
+# 去重窗口：长连接断线重发时同一信号可能到达两次
+SEEN_MESSAGE_LIMIT = 5000
+DEFAULT_SEEN_DB_PATH = os.getenv("VALUESCAN_IPC_SEEN_DB_PATH") or os.path.join(ROOT_DIR, "data", "ipc_seen.db")
 
 LOGGER = logging.getLogger("valuescan.ipc_bridge")
 
@@ -72,27 +93,86 @@ def _extract_symbol(payload: Dict[str, Any]) -> Optional[str]:
 
 class SignalRequestHandler(socketserver.StreamRequestHandler):
     """
-    逐行读取客户端发送的 JSON，解析后调用交易系统处理信号
+    读取客户端发送的信号（长连接帧或旧版 JSON 行），解析后调用交易系统处理信号
     """
 
     def handle(self):
-        client = f"{self.client_address[0]}:{self.client_address[1]}"
+        if isinstance(self.client_address, tuple) and len(self.client_address) >= 2:
+            client = f"{self.client_address[0]}:{self.client_address[1]}"
+        else:
+            client = "unix"
         LOGGER.debug("📥 IPC 客户端已连接: %s", client)  # 改为 DEBUG 级别
 
+        first_line = self.rfile.readline()
+        if first_line == HANDSHAKE:
+            LOGGER.info("🔌 IPC 长连接客户端已连接: %s", client)
+            self._handle_framed()
+            LOGGER.info("IPC 长连接客户端断开: %s", client)
+            return
+
+        if first_line:
+            self._handle_line(first_line)
         for raw_line in self.rfile:
-            line = raw_line.decode("utf-8", errors="ignore").strip()
-            if not line:
-                continue
+            self._handle_line(raw_line)
+
+        LOGGER.debug("📤 IPC 客户端断开: %s", client)  # 改为 DEBUG 级别
+
+    def _handle_line(self, raw_line: bytes):
+        line = raw_line.decode("utf-8", errors="ignore").strip()
+        if not line:
+            return
+
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as exc:
+            LOGGER.warning("无法解析客户端消息（JSON 错误）: %s | 错误: %s", line[:200], exc)
+            return
+
+        self._process_payload(payload)
 
+    def _handle_framed(self):
+        """长连接：收到整批并记入去重表后立即 ack，再逐条执行（执行耗时不触发客户端重发）"""
+        while True:
             try:
-                payload = json.loads(line)
-            except json.JSONDecodeError as exc:
-                LOGGER.warning("无法解析客户端消息（JSON 错误）: %s | 错误: %s", line[:200], exc)
+                frame = read_frame_from_file(self.rfile)
+            except (OSError, ValueError) as exc:
+                LOGGER.warning("IPC 帧读取失败，断开连接: %s", exc)
+                return
+            if frame is None:
+                return
+            if frame.get("op") != "batch":
                 continue
 
-            self._process_payload(payload)
-
-        LOGGER.debug("📤 IPC 客户端断开: %s", client)  # 改为 DEBUG 级别
+            items = frame.get("items") or []
+            fresh = []
+            for payload in items:
+                if not isinstance(payload, dict):
+                    continue
+                if not self.server.mark_seen(payload):  # type: ignore[attr-defined]
+                    LOGGER.debug(
+                        "跳过重复信号: id=%s ipc_id=%s", payload.get("message_id"), payload.get("ipc_id")
+                    )
+                    continue
+                fresh.append(payload)
+
+            acked = True
+            try:
+                self.wfile.write(encode_frame({"op": "ack", "seq": frame.get("seq")}))
+                self.wfile.flush()
+            except OSError as exc:
+                # 已记入去重表，客户端重发时会被跳过，本批仍需执行
+                LOGGER.warning("IPC ack 发送失败: %s", exc)
+                acked = False
+
+            for payload in fresh:
+                try:
+                    self._process_payload(payload)
+                except Exception as exc:
+                    LOGGER.error("处理信号失败: id=%s 错误: %s", payload.get("message_id"), exc)
+            if len(items) > 1:
+                LOGGER.debug("IPC 批次处理完成: seq=%s 数量=%s", frame.get("seq"), len(items))
+            if not acked:
+                return
 
     def _process_payload(self, payload: Dict[str, Any]):
         message_type = payload.get("message_type")
@@ -144,13 +224,44 @@ class SignalRequestHandler(socketserver.StreamRequestHandler):
         )
 
 
-class SignalTCPServer(socketserver.ThreadingTCPServer):
+class _SeenMessagesMixin:
+    """按 message_id / ipc_id 记录已接收的信号（持久化），供多个连接和 TCP/Unix 服务共享"""
+
+    seen_store: SeenMessageStore
+
+    def mark_seen(self, payload: Dict[str, Any]) -> bool:
+        """返回 True 表示首次出现"""
+        key = dedupe_key(payload)
+        if key is None:
+            return True
+        return self.seen_store.add(key)
+
+
+class SignalTCPServer(_SeenMessagesMixin, socketserver.ThreadingTCPServer):
     allow_reuse_address = True
+    daemon_threads = True
 
-    def __init__(self, server_address, handler_class, system):
+    def __init__(self, server_address, handler_class, system, seen_store):
         super().__init__(server_address, handler_class)
         self.system = system
         self.logger = LOGGER
+        self.seen_store = seen_store
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class SignalUnixServer(_SeenMessagesMixin, socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, socket_path, handler_class, system, seen_store):
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            super().__init__(socket_path, handler_class)
+            self.system = system
+            self.logger = LOGGER
+            self.seen_store = seen_store
+else:
+    SignalUnixServer = None
 
 
 def start_maintenance_loop(system: FuturesAutoTradingSystem, stop_event: threading.Event):
@@ -198,6 +309,8 @@ def main():
     parser = argparse.ArgumentParser(description="启动 ValueScan → Binance Futures IPC 桥接服务")
     parser.add_argument("--host", default=IPC_HOST, help="监听地址 (默认: %(default)s)")
     parser.add_argument("--port", type=int, default=IPC_PORT, help="监听端口 (默认: %(default)s)")
+    parser.add_argument("--unix-socket", default=IPC_UNIX_SOCKET, help="额外监听的 Unix 域套接字路径 (可选)")
+    parser.add_argument("--seen-db", default=DEFAULT_SEEN_DB_PATH, help="信号去重表路径 (默认: %(default)s)")
     args = parser.parse_args()
 
     system = FuturesAutoTradingSystem()
@@ -210,10 +323,17 @@ def main():
     )
     maintenance_thread.start()
 
-    server = SignalTCPServer((args.host, args.port), SignalRequestHandler, system)
+    seen_store = SeenMessageStore(args.seen_db, limit=SEEN_MESSAGE_LIMIT)
+    server = SignalTCPServer((args.host, args.port), SignalRequestHandler, system, seen_store)
+
+    unix_server = None
+    if args.unix_socket and SignalUnixServer is not None:
+        unix_server = SignalUnixServer(args.unix_socket, SignalRequestHandler, system, seen_store)
+        threading.Thread(target=unix_server.serve_forever, name="ipc-unix", daemon=True).start()
+        LOGGER.info("IPC Unix 套接字已监听: %s", args.unix_socket)
 
     LOGGER.info("IPC 服务启动: %s:%s", args.host, args.port)
-    LOGGER.info("等待 ValueScan 信号 (TCP JSON Lines)... 按 Ctrl+C 退出")
+    LOGGER.info("等待 ValueScan 信号 (长连接帧 / TCP JSON Lines)... 按 Ctrl+C 退出")
 
     try:
         server.serve_forever()
@@ -223,7 +343,11 @@ def main():
         stop_event.set()
         server.shutdown()
         server.server_close()
+        if unix_server is not None:
+            unix_server.shutdown()
+            unix_server.server_close()
         maintenance_thread.join(timeout=5)
+        seen_store.close()
         LOGGER.info("IPC 桥接服务已退出")
 
 
@@ -6,11 +6,12 @@ AI只负责分析，不负责绘制
 
 import json
 import os
-import requests
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Optional, Any
 import numpy as np
 import pandas as pd
 from logger import logger
+from valuescan_snapshot import get_valuescan_snapshot
+from llm_gateway import chat_completion
 
 # ValuScan 数据有效期配置
 def _read_int_env_or_config(env_key: str, config_key: str, default: int) -> int:
@@ -30,143 +31,6 @@ def _read_int_env_or_config(env_key: str, config_key: str, default: int) -> int:
         return default
 
 
-def _extract_valuescan_list(payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    if not isinstance(payload, dict):
-        return []
-    data = payload.get("data")
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items", "data"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-    return []
-
-
-def _normalize_flow_period(value: Any) -> str:
-    if value is None:
-        return ""
-    key = str(value).strip().lower().replace(" ", "")
-    aliases = {
-        "h1": "1h",
-        "h4": "4h",
-        "h12": "12h",
-        "h24": "24h",
-        "1d": "24h",
-        "d1": "24h",
-        "d": "24h",
-        "m15": "15m",
-    }
-    return aliases.get(key, key)
-
-
-def _first_float(item: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[float]:
-    for key in keys:
-        value = item.get(key)
-        if value is None:
-            continue
-        try:
-            return float(value)
-        except Exception:
-            continue
-    return None
-
-
-def _extract_flow_items(data: Any) -> List[Dict[str, Any]]:
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-        items: List[Dict[str, Any]] = []
-        for key, value in data.items():
-            if isinstance(value, dict):
-                item = dict(value)
-                item.setdefault("timeType", key)
-                items.append(item)
-        return items
-    return []
-
-
-def _normalize_exchange_flow_detail(resp: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
-    if not isinstance(resp, dict) or resp.get("code") != 200:
-        return {}
-    items = _extract_flow_items(resp.get("data"))
-    result: Dict[str, Dict[str, float]] = {}
-    for item in items:
-        period = _normalize_flow_period(
-            item.get("timeType")
-            or item.get("period")
-            or item.get("time")
-            or item.get("timeParticle")
-        )
-        if not period:
-            continue
-        in_val = _first_float(item, ("inFlowValue", "inFlow", "tradeIn", "stopTradeIn", "contractTradeIn"))
-        out_val = _first_float(item, ("outFlowValue", "outFlow", "tradeOut", "stopTradeOut", "contractTradeOut"))
-        net_val = _first_float(
-            item,
-            ("netFlowValue", "netFlow", "tradeInflow", "stopTradeInflow", "contractTradeInflow"),
-        )
-        if net_val is None and in_val is not None and out_val is not None:
-            net_val = in_val - out_val
-        if in_val is None and out_val is None and net_val is None:
-            continue
-        total = (in_val or 0.0) + (out_val or 0.0)
-        ratio = (in_val or 0.0) / total if total > 0 else 0.5
-        result[period] = {
-            "in": float(in_val or 0.0),
-            "out": float(out_val or 0.0),
-            "net": float(net_val or 0.0),
-            "ratio": float(ratio),
-        }
-    return result
-
-
-def _compact_valuescan_history(resp: Optional[Dict[str, Any]], limit: int = 60) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    return items[:limit]
-
-
-def _compact_holder_items(resp: Optional[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "address": item.get("address"),
-            "balance": item.get("balance"),
-            "balancePercent": item.get("balancePercent"),
-            "price": item.get("price"),
-            "profit": item.get("profit"),
-            "cost": item.get("cost"),
-            "chainName": item.get("chainName"),
-            "labelName": item.get("labelName") or item.get("label"),
-        })
-    return trimmed
-
-
-def _compact_chain_items(resp: Optional[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "chainName": item.get("chainName"),
-            "contractAddress": item.get("contractAddress"),
-            "coinKey": item.get("coinKey"),
-            "holderCount": item.get("holderCount"),
-        })
-    return trimmed
-
-
 VALUESCAN_KEY_LEVELS_DAYS = _read_int_env_or_config(
     "VALUESCAN_KEY_LEVELS_CHART_DAYS",
     "VALUESCAN_KEY_LEVELS_DAYS",
@@ -201,166 +65,17 @@ def get_valuescan_data(symbol: str, days: int = None) -> Optional[Dict[str, Any]
     - whale_flow: 巨鲸资金流向
     - opportunity_signals: 机会信号
     - risk_signals: 风险信号
+    
+    与 ai_signal_analysis 共用 valuescan_snapshot 的并发采集和短时缓存
     """
     if days is None:
         days = VALUESCAN_AI_ANALYSIS_DAYS
     
     try:
-        import sys
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        if base_dir not in sys.path:
-            sys.path.insert(0, base_dir)
-        
-        from valuescan_api import (
-            get_main_force, get_hold_cost, get_keyword,
-            get_token_flow, get_whale_flow,
-            get_inflow, get_detailed_inflow,
-            get_opportunity_signals, get_risk_signals,
-            get_exchange_flow_detail, get_fund_trade_history_total,
-            get_holder_page, get_chain_page,
-        )
-        
-        clean_symbol = symbol.upper().replace("USDT", "").replace("$", "").strip()
-        keyword = get_keyword(clean_symbol)
-        if not keyword:
-            logger.warning(f"ValuScan: No keyword found for {symbol}")
-            return None
-        
-        result = {"symbol": clean_symbol, "days": days, "keyword": keyword}
-        
-        # 1. 主力位（阻力位）- 最重要
-        mf = get_main_force(clean_symbol, days)
-        if mf.get("code") == 200:
-            mf_data = mf.get("data", [])
-            if mf_data:
-                levels = []
-                for item in mf_data:
-                    price = item.get("price")
-                    if price is None:
-                        continue
-                    try:
-                        levels.append(float(price))
-                    except Exception:
-                        continue
-                if levels:
-                    result["main_force_levels"] = levels
-                    result["current_main_force"] = levels[-1]
-                    logger.info(f"ValuScan: {clean_symbol} 主力位 ${result['current_main_force']:,.2f}")
-        
-        # 2. 主力成本（支撑位）- 最重要
-        hc = get_hold_cost(clean_symbol, days)
-        if hc.get("code") == 200:
-            hc_data = hc.get("data", {}).get("holdingPrice", [])
-            if hc_data:
-                result["main_cost"] = float(hc_data[-1]["val"])
-                logger.info(f"ValuScan: {clean_symbol} 主力成本 ${result['main_cost']:,.2f}")
-        
-        # 3. 代币资金流向
-        try:
-            tf = get_token_flow("H12", 1, 20)
-            if tf.get("code") == 200:
-                result["token_flow"] = tf.get("data", {})
-        except Exception:
-            pass
-
-        # 3.1 交易资金流向（币种级）
-        try:
-            inflow = get_inflow(clean_symbol)
-            if inflow.get("code") == 200:
-                result["trade_inflow"] = inflow.get("data", {})
-        except Exception:
-            pass
-
-        # 3.2 详细资金流向（多周期）
-        try:
-            detailed = get_detailed_inflow(clean_symbol)
-            if detailed.get("code") == 200:
-                result["detailed_inflow"] = detailed.get("data", {})
-        except Exception:
-            pass
-        
-        # 4. 巨鲸资金流向
-        try:
-            wf = get_whale_flow(1, "m5", 1, 20)
-            if wf.get("code") == 200:
-                result["whale_flow"] = wf.get("data", {})
-        except Exception:
-            pass
-        
-        # 5. 机会信号
-        try:
-            os_data = get_opportunity_signals(1, 10)
-            if os_data.get("code") == 200:
-                result["opportunity_signals"] = os_data.get("data", {})
-        except Exception:
-            pass
-        
-        # 6. 风险信号
-        try:
-            rs_data = get_risk_signals(1, 10)
-            if rs_data.get("code") == 200:
-                result["risk_signals"] = rs_data.get("data", {})
-        except Exception:
-            pass
-
-        # 6. Exchange flow detail (multi-period)
-        try:
-            flow_detail = _normalize_exchange_flow_detail(get_exchange_flow_detail(clean_symbol))
-            if flow_detail:
-                result["exchange_flow_detail"] = flow_detail
-        except Exception:
-            pass
-
-        # 7. Fund flow/volume history
-        try:
-            flow_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=60,
-                    flow=True,
-                    trade_type=2,
-                ),
-                limit=60,
-            )
-            if flow_history:
-                result["fund_flow_history"] = flow_history
-        except Exception:
-            pass
-
-        try:
-            volume_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=60,
-                    flow=False,
-                    trade_type=2,
-                ),
-                limit=60,
-            )
-            if volume_history:
-                result["fund_volume_history"] = volume_history
-        except Exception:
-            pass
-
-        # 8. Holder and chain data
-        try:
-            holders = _compact_holder_items(get_holder_page(clean_symbol, page=1, page_size=10), limit=5)
-            if holders:
-                result["holders_top"] = holders
-        except Exception:
-            pass
-
-        try:
-            chains = _compact_chain_items(get_chain_page(clean_symbol, page=1, page_size=10), limit=10)
-            if chains:
-                result["chains"] = chains
-        except Exception:
-            pass
-
-        return result if len(result) > 3 else None
-        
+        snapshot = get_valuescan_snapshot(symbol, days)
+        if snapshot is None:
+            logger.warning(f"ValuScan: No data for {symbol}")
+        return snapshot
     except Exception as e:
         logger.warning(f"ValuScan data fetch failed for {symbol}: {e}")
         return None
@@ -690,38 +405,20 @@ def call_ai_analysis_api(prompt: str, config: Dict[str, Any]) -> Optional[str]:
     if not api_key or not api_url or not model:
         return None
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {api_key}'
-    }
-
-    payload = {
-        'model': model,
-        'messages': [
+    return chat_completion(
+        api_url,
+        api_key,
+        model,
+        [
             {'role': 'system', 'content': 'You are a professional quantitative analyst. Reply with strict JSON only.'},
             {'role': 'user', 'content': prompt}
         ],
-        'max_tokens': 8000,
-        'temperature': 0.3,
-    }
-
-    try:
-        session = requests.Session()
-        session.trust_env = False
-        resp = session.post(api_url, headers=headers, json=payload, timeout=120)
-        if resp.status_code != 200:
-            logger.warning(f"AI analysis API call failed: {resp.status_code} - {resp.text[:200]}")
-            return None
-
-        data = resp.json()
-        content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-        if not content:
-            return None
-
-        return content.strip()
-    except Exception as exc:
-        logger.warning(f"AI analysis API call error: {exc}")
-        return None
+        caller='ai_market_analysis',
+        max_tokens=8000,
+        temperature=0.3,
+        timeout=120,
+        expect_json=True,
+    )
 
 
 def parse_ai_analysis(raw: str) -> Optional[Dict[str, Any]]:
@@ -792,8 +489,9 @@ def get_ai_market_analysis(
     if supplementary_data:
         logger.info(f"[Priority 2] Supplementary data loaded for {symbol}")
     
-    # 3. 合并补充数据到 valuescan_data
+    # 3. 合并补充数据到 valuescan_data（快照是共享缓存，复制后再合并）
     if valuescan_data and supplementary_data:
+        valuescan_data = dict(valuescan_data)
         valuescan_data["supplementary"] = supplementary_data
     elif supplementary_data:
         valuescan_data = {"supplementary": supplementary_data}
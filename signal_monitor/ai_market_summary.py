@@ -16,7 +16,9 @@ AI 市场宏观分析模块
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -24,6 +26,10 @@ from typing import Any, Dict, List, Optional, Tuple
 import requests
 
 from market_data_sources import fetch_market_snapshot, fetch_news, fetch_trending
+from market_data_cache import cached_json
+from kline_store import load_klines, to_dicts as kline_dicts
+from llm_gateway import chat_completion
+from valuescan_snapshot import get_valuescan_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -59,137 +65,17 @@ def _read_int_env_or_config(env_key: str, config_key: str, default: int) -> int:
         return default
 
 
-def _extract_valuescan_list(payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    if not isinstance(payload, dict):
-        return []
-    data = payload.get("data")
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items", "data"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-    return []
-
-
-def _normalize_flow_period(value: Any) -> str:
-    if value is None:
-        return ""
-    key = str(value).strip().lower().replace(" ", "")
-    aliases = {
-        "h1": "1h",
-        "h4": "4h",
-        "h12": "12h",
-        "h24": "24h",
-        "1d": "24h",
-        "d1": "24h",
-        "d": "24h",
-        "m15": "15m",
-    }
-    return aliases.get(key, key)
-
-
-def _first_float(item: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[float]:
-    for key in keys:
-        value = item.get(key)
-        if value is None:
-            continue
-        try:
-            return float(value)
-        except Exception:
-            continue
-    return None
-
-
-def _extract_flow_items(data: Any) -> List[Dict[str, Any]]:
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-        items: List[Dict[str, Any]] = []
-        for key, value in data.items():
-            if isinstance(value, dict):
-                item = dict(value)
-                item.setdefault("timeType", key)
-                items.append(item)
-        return items
-    return []
-
-
-def _normalize_exchange_flow_detail(resp: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
-    if not isinstance(resp, dict) or resp.get("code") != 200:
-        return {}
-    items = _extract_flow_items(resp.get("data"))
-    result: Dict[str, Dict[str, float]] = {}
-    for item in items:
-        period = _normalize_flow_period(
-            item.get("timeType")
-            or item.get("period")
-            or item.get("time")
-            or item.get("timeParticle")
-        )
-        if not period:
-            continue
-        in_val = _first_float(item, ("inFlowValue", "inFlow", "tradeIn", "stopTradeIn", "contractTradeIn"))
-        out_val = _first_float(item, ("outFlowValue", "outFlow", "tradeOut", "stopTradeOut", "contractTradeOut"))
-        net_val = _first_float(
-            item,
-            ("netFlowValue", "netFlow", "tradeInflow", "stopTradeInflow", "contractTradeInflow"),
-        )
-        if net_val is None and in_val is not None and out_val is not None:
-            net_val = in_val - out_val
-        if in_val is None and out_val is None and net_val is None:
-            continue
-        total = (in_val or 0.0) + (out_val or 0.0)
-        ratio = (in_val or 0.0) / total if total > 0 else 0.5
-        result[period] = {
-            "in": float(in_val or 0.0),
-            "out": float(out_val or 0.0),
-            "net": float(net_val or 0.0),
-            "ratio": float(ratio),
-        }
-    return result
-
-
-def _compact_valuescan_history(resp: Optional[Dict[str, Any]], limit: int = 30) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    return items[:limit]
-
-
-def _compact_holder_items(resp: Optional[Dict[str, Any]], limit: int = 3) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "address": item.get("address"),
-            "balance": item.get("balance"),
-            "balancePercent": item.get("balancePercent"),
-            "chainName": item.get("chainName"),
-        })
-    return trimmed
-
-
-def _compact_chain_items(resp: Optional[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "chainName": item.get("chainName"),
-            "contractAddress": item.get("contractAddress"),
-            "coinKey": item.get("coinKey"),
-        })
-    return trimmed
-
+# 数据收集：所有数据源并发请求，整体截止时间（秒）内未返回的数据源按缺失处理
+COLLECT_DEADLINE_SECONDS = _read_int_env_or_config(
+    "VALUESCAN_AI_SUMMARY_COLLECT_TIMEOUT",
+    "AI_SUMMARY_COLLECT_TIMEOUT",
+    30,
+)
+COLLECT_WORKERS = _read_int_env_or_config(
+    "VALUESCAN_AI_SUMMARY_COLLECT_WORKERS",
+    "AI_SUMMARY_COLLECT_WORKERS",
+    16,
+)
 
 BULL_BEAR_SIGNAL_TTL_SECONDS = _read_int_env_or_config(
     "VALUESCAN_BULL_BEAR_SIGNAL_TTL_SECONDS",
@@ -233,6 +119,62 @@ MAJOR_COINS = ["BTC", "ETH"]
 # 上次总结时间
 _last_summary_time: float = 0.0
 
+# 后台生成总结的线程（同一时间只运行一个）
+_summary_thread: Optional[threading.Thread] = None
+_summary_thread_lock = threading.Lock()
+
+_collect_executor: Optional[ThreadPoolExecutor] = None
+_collect_executor_lock = threading.Lock()
+
+# 数据源任务: name -> (函数, 参数)
+CollectTasks = Dict[str, Tuple[Any, tuple]]
+
+
+def _get_collect_executor() -> ThreadPoolExecutor:
+    global _collect_executor
+    with _collect_executor_lock:
+        if _collect_executor is None:
+            _collect_executor = ThreadPoolExecutor(
+                max_workers=max(COLLECT_WORKERS, 1), thread_name_prefix="ai-summary-collect"
+            )
+        return _collect_executor
+
+
+def _gather(tasks: CollectTasks, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    并发执行 {name: (fn, args)}，在整体截止时间内等待结果
+
+    超时或异常的数据源结果为 None，不影响其他数据源。
+    """
+    if not tasks:
+        return {}
+    timeout = COLLECT_DEADLINE_SECONDS if deadline is None else deadline
+    started = time.monotonic()
+    executor = _get_collect_executor()
+    futures = {name: executor.submit(fn, *args) for name, (fn, args) in tasks.items()}
+    results: Dict[str, Any] = {}
+    timed_out = []
+    for name, future in futures.items():
+        remaining = max(started + timeout - time.monotonic(), 0.0)
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            future.cancel()
+            timed_out.append(name)
+            results[name] = None
+        except Exception as exc:
+            logger.debug("数据源 %s 失败: %s", name, exc)
+            results[name] = None
+    if timed_out:
+        logger.warning("数据收集超时 (%ss)，按缺失处理: %s", timeout, ", ".join(timed_out))
+    logger.debug("数据收集完成: %d 个数据源, 耗时 %.2fs", len(tasks), time.monotonic() - started)
+    return results
+
+
+def _subset(results: Dict[str, Any], prefix: str) -> Dict[str, Any]:
+    """取出 _gather 结果中以 prefix 开头的条目（去掉前缀）"""
+    return {name[len(prefix):]: value for name, value in results.items() if name.startswith(prefix)}
+
 
 def _load_config() -> Dict[str, Any]:
     """从配置文件加载 AI 总结配置（AI简评专用）"""
@@ -533,11 +475,19 @@ def _fetch_binance_klines(symbol: str, interval: str = "1h", limit: int = 24) ->
         "limit": limit,
     }
     
+    def _fetch(request_params=params):
+        resp = requests.get(url, params=request_params, timeout=15, proxies=_get_proxies())
+        if resp.status_code != 200:
+            logger.debug("Binance API 返回 %d: %s", resp.status_code, symbol)
+            return None
+        return resp.json()
+
     try:
-        proxies = _get_proxies()
-        resp = requests.get(url, params=params, timeout=15, proxies=proxies)
-        if resp.status_code == 200:
-            data = resp.json()
+        rows = load_klines(symbol.upper(), interval, limit, _fetch)
+        if rows is not None:
+            return kline_dicts(rows)
+        data = cached_json(url, params, _fetch)
+        if data is not None:
             klines = []
             for k in data:
                 klines.append({
@@ -552,9 +502,7 @@ def _fetch_binance_klines(symbol: str, interval: str = "1h", limit: int = 24) ->
                     "trades": int(k[8]),
                 })
             return klines
-        else:
-            logger.debug("Binance API 返回 %d: %s", resp.status_code, symbol)
-            return []
+        return []
     except Exception as e:
         logger.debug("Binance API 请求失败 (%s): %s", symbol, e)
         return []
@@ -621,27 +569,36 @@ def _fetch_binance_open_interest(symbol: str) -> Optional[float]:
     if not base.endswith("USDT"):
         base = f"{base}USDT"
     url = f"{BINANCE_FUTURES_BASE}/fapi/v1/openInterest"
-    try:
+    def _fetch():
         resp = requests.get(url, params={"symbol": base}, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
+        return resp.json() if resp.status_code == 200 else None
+
+    try:
+        data = cached_json(url, {"symbol": base}, _fetch)
+        if data is not None:
             return float(data.get("openInterest", 0) or 0)
     except Exception as e:
         logger.debug("获取 OI 失败: %s", e)
     return None
 
 
-def _collect_major_coin_data() -> Dict[str, Dict[str, Any]]:
-    """
-    收集 BTC 和 ETH 的综合数据
-    
-    Returns:
-        包含 K线分析、量化数据的字典
-    """
+_KLINE_KEYS = (("1h", "klines_1h"), ("4h", "klines_4h"), ("1d", "klines_1d"))
+
+
+def _major_coin_tasks() -> CollectTasks:
+    """BTC/ETH 各周期 K 线、市场快照、OI 的请求任务"""
+    tasks: CollectTasks = {}
+    for symbol in MAJOR_COINS:
+        for interval, key in _KLINE_KEYS:
+            tasks[f"{symbol}|{key}"] = (_fetch_binance_klines, (symbol, interval, 24))
+        tasks[f"{symbol}|market"] = (fetch_market_snapshot, (symbol,))
+        tasks[f"{symbol}|open_interest"] = (_fetch_binance_open_interest, (symbol,))
+    return tasks
+
+
+def _assemble_major_coin_data(results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     result = {}
-    
     for symbol in MAJOR_COINS:
-        logger.info(f"收集 {symbol} 数据...")
         coin_data = {
             "symbol": symbol,
             "klines_1h": {},
@@ -650,174 +607,79 @@ def _collect_major_coin_data() -> Dict[str, Dict[str, Any]]:
             "market": {},
             "open_interest": None,
         }
-
-        # 收集不同周期K线数据
-        for interval, key in [("1h", "klines_1h"), ("4h", "klines_4h"), ("1d", "klines_1d")]:
-            klines = _fetch_binance_klines(symbol, interval, limit=24)
+        for _, key in _KLINE_KEYS:
+            klines = results.get(f"{symbol}|{key}")
             if klines:
                 coin_data[key] = _analyze_klines(klines)
-
-        # 市场数据（CMC/CG/CC 数据源）
-        market = fetch_market_snapshot(symbol)
+        market = results.get(f"{symbol}|market")
         if market:
             coin_data["market"] = market
-
-        # Binance OI
-        coin_data["open_interest"] = _fetch_binance_open_interest(symbol)
-
+        coin_data["open_interest"] = results.get(f"{symbol}|open_interest")
         result[symbol] = coin_data
-    
     return result
 
 
-def _collect_valuescan_macro_data(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
-    result: Dict[str, Dict[str, Any]] = {}
-    try:
-        import sys
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        if base_dir not in sys.path:
-            sys.path.insert(0, base_dir)
-        from valuescan_api import (
-            get_main_force,
-            get_hold_cost,
-            get_inflow,
-            get_detailed_inflow,
-            get_token_flow,
-            get_whale_flow,
-            get_opportunity_signals,
-            get_risk_signals,
-            get_exchange_flow_detail,
-            get_fund_trade_history_total,
-            get_holder_page,
-            get_chain_page,
-        )
-    except Exception as exc:
-        logger.debug("ValuScan macro data import failed: %s", exc)
-        return result
-
-    for symbol in symbols:
-        clean_symbol = symbol.upper().replace("USDT", "").replace("$", "").strip()
-        item: Dict[str, Any] = {"symbol": clean_symbol}
-
-        try:
-            mf = get_main_force(clean_symbol, 15)
-            if mf.get("code") == 200:
-                mf_data = mf.get("data", [])
-                if mf_data:
-                    item["main_force"] = float(mf_data[-1]["price"])
-        except Exception:
-            pass
-
-        try:
-            hc = get_hold_cost(clean_symbol, 14)
-            if hc.get("code") == 200:
-                hc_data = hc.get("data", {}).get("holdingPrice", [])
-                if hc_data:
-                    item["main_cost"] = float(hc_data[-1]["val"])
-        except Exception:
-            pass
-
-        try:
-            inflow = get_inflow(clean_symbol)
-            if inflow.get("code") == 200:
-                item["trade_inflow"] = inflow.get("data", {})
-        except Exception:
-            pass
-
-        try:
-            detailed = get_detailed_inflow(clean_symbol)
-            if detailed.get("code") == 200:
-                item["detailed_inflow"] = detailed.get("data", {})
-        except Exception:
-            pass
-
-        try:
-            tf = get_token_flow("H12", 1, 20)
-            if tf.get("code") == 200:
-                item["token_flow"] = tf.get("data", {})
-        except Exception:
-            pass
-
-        try:
-            wf = get_whale_flow(1, "m5", 1, 20)
-            if wf.get("code") == 200:
-                item["whale_flow"] = wf.get("data", {})
-        except Exception:
-            pass
-
-        try:
-            os_data = get_opportunity_signals(1, 10)
-            if os_data.get("code") == 200:
-                item["opportunity_signals"] = os_data.get("data", {})
-        except Exception:
-            pass
+def _collect_major_coin_data() -> Dict[str, Dict[str, Any]]:
+    """
+    收集 BTC 和 ETH 的综合数据（各数据源并发请求）
+    
+    Returns:
+        包含 K线分析、量化数据的字典
+    """
+    return _assemble_major_coin_data(_gather(_major_coin_tasks()))
+
+
+# 宏观数据复用 valuescan_snapshot 的采集与缓存（与 AI 单币简评/市场分析共用），
+# Prompt 中的列表字段按以下长度截取
+MACRO_SNAPSHOT_DAYS = 14
+_MACRO_LIST_LIMITS = {"fund_flow_history": 30, "fund_volume_history": 30, "holders_top": 3, "chains": 5}
+# 结果字段顺序（Prompt 中按此顺序输出）
+_MACRO_FIELDS = (
+    "main_cost", "trade_inflow", "detailed_inflow", "token_flow", "whale_flow",
+    "opportunity_signals", "risk_signals", "exchange_flow_detail", "fund_flow_history",
+    "fund_volume_history", "holders_top", "chains",
+)
 
-        try:
-            rs_data = get_risk_signals(1, 10)
-            if rs_data.get("code") == 200:
-                item["risk_signals"] = rs_data.get("data", {})
-        except Exception:
-            pass
 
-        try:
-            flow_detail = _normalize_exchange_flow_detail(get_exchange_flow_detail(clean_symbol))
-            if flow_detail:
-                item["exchange_flow_detail"] = flow_detail
-        except Exception:
-            pass
+def _clean_macro_symbols(symbols: List[str]) -> List[str]:
+    return [symbol.upper().replace("USDT", "").replace("$", "").strip() for symbol in symbols]
 
-        try:
-            flow_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=30,
-                    flow=True,
-                    trade_type=2,
-                ),
-                limit=30,
-            )
-            if flow_history:
-                item["fund_flow_history"] = flow_history
-        except Exception:
-            pass
 
-        try:
-            volume_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=30,
-                    flow=False,
-                    trade_type=2,
-                ),
-                limit=30,
-            )
-            if volume_history:
-                item["fund_volume_history"] = volume_history
-        except Exception:
-            pass
+def _valuescan_macro_tasks(symbols: List[str]) -> CollectTasks:
+    """ValuScan 宏观数据的请求任务：每个币种一份快照"""
+    return {
+        symbol: (get_valuescan_snapshot, (symbol, MACRO_SNAPSHOT_DAYS))
+        for symbol in _clean_macro_symbols(symbols)
+    }
 
-        try:
-            holders = _compact_holder_items(get_holder_page(clean_symbol, page=1, page_size=5), limit=3)
-            if holders:
-                item["holders_top"] = holders
-        except Exception:
-            pass
-
-        try:
-            chains = _compact_chain_items(get_chain_page(clean_symbol, page=1, page_size=5), limit=5)
-            if chains:
-                item["chains"] = chains
-        except Exception:
-            pass
 
+def _assemble_valuescan_macro_data(symbols: List[str], results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    result: Dict[str, Dict[str, Any]] = {}
+    for clean_symbol in _clean_macro_symbols(symbols):
+        snapshot = results.get(clean_symbol)
+        if not snapshot:
+            continue
+        # 快照为缓存共享对象，只读取不修改
+        item: Dict[str, Any] = {"symbol": clean_symbol}
+        if snapshot.get("current_main_force") is not None:
+            item["main_force"] = snapshot["current_main_force"]
+        for field in _MACRO_FIELDS:
+            value = snapshot.get(field)
+            if value is None:
+                continue
+            limit = _MACRO_LIST_LIMITS.get(field)
+            item[field] = value[:limit] if limit and isinstance(value, list) else value
         if len(item) > 1:
             result[clean_symbol] = item
 
     return result
 
 
+def _collect_valuescan_macro_data(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """收集 ValuScan 宏观数据（各币种快照并发获取）"""
+    return _assemble_valuescan_macro_data(symbols, _gather(_valuescan_macro_tasks(symbols)))
+
+
 def _collect_quantitative_data(symbols: List[str]) -> Dict[str, Any]:
     """
     Collect quantitative snapshot data for a set of symbols.
@@ -832,6 +694,7 @@ def _collect_quantitative_data(symbols: List[str]) -> Dict[str, Any]:
         return {"coins": [], "summary": {}}
 
     symbols_to_fetch = list(set(symbols))[:10]
+    snapshots = _gather({sym: (fetch_market_snapshot, (sym,)) for sym in symbols_to_fetch})
 
     coin_data = []
     bullish_coins = []
@@ -839,7 +702,7 @@ def _collect_quantitative_data(symbols: List[str]) -> Dict[str, Any]:
     high_volume_coins = []
 
     for sym in symbols_to_fetch:
-        data = fetch_market_snapshot(sym)
+        data = snapshots.get(sym)
         if not data:
             continue
 
@@ -873,20 +736,13 @@ def _collect_quantitative_data(symbols: List[str]) -> Dict[str, Any]:
     }
 
 
-def _fetch_crypto_news() -> List[Dict[str, Any]]:
-    """Fetch market news and trending coins."""
-    news = []
-    try:
-        news = fetch_news(limit=5)
-    except Exception as e:
-        logger.debug("fetch_news failed: %s", e)
+def _news_tasks() -> CollectTasks:
+    return {"news": (fetch_news, (5,)), "trending": (fetch_trending, (5,))}
 
-    trending = []
-    try:
-        trending = fetch_trending(limit=5)
-    except Exception as e:
-        logger.debug("fetch_trending failed: %s", e)
 
+def _assemble_news(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    news = list(results.get("news") or [])
+    trending = results.get("trending") or []
     if trending:
         news.append({
             "title": "Trending Coins",
@@ -896,6 +752,11 @@ def _fetch_crypto_news() -> List[Dict[str, Any]]:
     return news
 
 
+def _fetch_crypto_news() -> List[Dict[str, Any]]:
+    """Fetch market news and trending coins (concurrently)."""
+    return _assemble_news(_gather(_news_tasks()))
+
+
 def _build_macro_analysis_prompt(
     major_coin_data: Dict[str, Dict[str, Any]],
     oi_ranking: List[Dict[str, Any]],
@@ -1153,43 +1014,31 @@ def _call_ai_api(prompt: str, config: Dict[str, Any], language: str = "zh") -> O
         logger.error("AI API Key 未配置")
         return None
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-
     system_prompt = (
         "You are a professional crypto market analyst. Output plain text only, no markdown symbols."
         if language == "en"
         else "你是专业的加密货币市场分析师。只输出纯文本，不要使用任何markdown符号（不要用*、#、-、>等）。"
     )
 
-    payload = {
-        "model": model,
-        "messages": [
+    logger.info(f"[AI Market] 调用 AI API: {api_url} (无代理)")
+    content = chat_completion(
+        api_url,
+        api_key,
+        model,
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt},
         ],
-        "max_tokens": 4000,  # 增加到4000以确保完整输出
-        "temperature": 0.7,
-    }
-
-    try:
-        # 显式禁用代理直接连接 AI API
-        logger.info(f"[AI Market] 调用 AI API: {api_url} (无代理)")
-        session = requests.Session()
-        session.trust_env = False
-        resp = session.post(api_url, headers=headers, json=payload, timeout=120)
-        if resp.status_code != 200:
-            logger.error("AI API 返回错误: %s - %s", resp.status_code, resp.text[:200])
-            return None
-        data = resp.json()
-        content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        logger.info(f"[AI Market] AI API 返回成功，内容长度: {len(content) if content else 0}")
-        return content.strip() if content else None
-    except Exception as e:
-        logger.error("AI API 调用失败: %s", e)
+        caller="ai_market_summary",
+        max_tokens=4000,  # 增加到4000以确保完整输出
+        temperature=0.7,
+        timeout=120,
+    )
+    if not content:
+        logger.error("AI API 调用失败或返回为空")
         return None
+    logger.info(f"[AI Market] AI API 返回成功，内容长度: {len(content)}")
+    return content
 
 
 def _send_summary_to_telegram(summary: str, language: str = "zh") -> bool:
@@ -1249,31 +1098,32 @@ def generate_market_summary(force: bool = False) -> Optional[str]:
     logger.info("=" * 60)
 
     try:
-        # 1. 收集 BTC/ETH 核心数据（K线 + 量化数据）
-        logger.info("📊 [1/6] 收集 BTC/ETH 核心数据...")
-        major_coin_data = _collect_major_coin_data()
+        # 1-4. 所有数据源一次并发收集：BTC/ETH 核心数据、信号、ValuScan 宏观数据、新闻
+        lookback = config.get("lookback_hours", 1)
+        logger.info(f"📊 [1-4/6] 并发收集 BTC/ETH 核心数据、最近 {lookback} 小时信号、ValuScan 数据、市场新闻...")
+        tasks: CollectTasks = {"signals": (_collect_recent_signals, (lookback,))}
+        tasks.update({f"major|{k}": v for k, v in _major_coin_tasks().items()})
+        tasks.update({f"macro|{k}": v for k, v in _valuescan_macro_tasks(MAJOR_COINS).items()})
+        tasks.update({f"news|{k}": v for k, v in _news_tasks().items()})
+        results = _gather(tasks)
+
+        major_coin_data = _assemble_major_coin_data(_subset(results, "major|"))
         logger.info(f"   ✅ 收集到 {len(major_coin_data)} 个主流币数据")
 
-        # 2. 获取 OI 排行数据
-        logger.info("📈 [2/6] 获取 OI 排行数据...")
+        # OI 排行数据
         oi_ranking = []
         logger.info(f"   ✅ OI 排行数据: {len(oi_ranking)} 条")
 
-        # 3. 收集 ValueScan 信号数据
-        lookback = config.get("lookback_hours", 1)
-        logger.info(f"🔍 [3/6] 收集最近 {lookback} 小时信号数据...")
-        signals = _collect_recent_signals(lookback)
+        signals = results.get("signals") or {}
         total_signals = signals.get("total_count", 0)
-        valuescan_macro = _collect_valuescan_macro_data(MAJOR_COINS)
+        valuescan_macro = _assemble_valuescan_macro_data(MAJOR_COINS, _subset(results, "macro|"))
         if valuescan_macro:
             logger.info("   ValuScan macro data: %s symbols", len(valuescan_macro))
         else:
             logger.info("   ValuScan macro data not available")
         logger.info(f"   ✅ 收集到 {total_signals} 个信号")
 
-        # 4. 获取新闻数据
-        logger.info("📰 [4/6] 获取市场新闻...")
-        news = _fetch_crypto_news()
+        news = _assemble_news(_subset(results, "news|"))
         logger.info(f"   ✅ 收集到 {len(news) if news else 0} 条新闻")
 
         # 检查是否有足够数据
@@ -1317,7 +1167,11 @@ def generate_market_summary(force: bool = False) -> Optional[str]:
 def check_and_generate_summary() -> None:
     """
     检查是否需要生成总结（由 polling_monitor 定期调用）
+
+    总结在后台线程中生成，立即返回，不阻塞信号轮询；上一次生成未结束时跳过。
     """
+    global _summary_thread
+
     # 使用AI市场分析的独立配置
     config = get_ai_market_config()
     if not config.get("enabled"):
@@ -1326,8 +1180,17 @@ def check_and_generate_summary() -> None:
     interval_seconds = config.get("interval_hours", 1) * 3600
     now = time.time()
 
-    if (now - _last_summary_time) >= interval_seconds:
-        generate_market_summary()
+    if (now - _last_summary_time) < interval_seconds:
+        return
+
+    with _summary_thread_lock:
+        if _summary_thread is not None and _summary_thread.is_alive():
+            logger.debug("AI 市场总结仍在生成中，跳过本次检查")
+            return
+        _summary_thread = threading.Thread(
+            target=generate_market_summary, name="ai-market-summary", daemon=True
+        )
+        _summary_thread.start()
 
 
 def main():
@@ -8,7 +8,6 @@ configured AI endpoint to produce a short professional read.
 
 import json
 import os
-import sys
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -95,142 +94,6 @@ def _is_bull_bear_signal_expired(signal_payload: Optional[Dict[str, Any]]) -> bo
     return age_seconds > _BULL_BEAR_SIGNAL_TTL_SECONDS
 
 
-def _extract_valuescan_list(payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    if not isinstance(payload, dict):
-        return []
-    data = payload.get("data")
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items", "data"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-    return []
-
-
-def _normalize_flow_period(value: Any) -> str:
-    if value is None:
-        return ""
-    key = str(value).strip().lower().replace(" ", "")
-    aliases = {
-        "h1": "1h",
-        "h4": "4h",
-        "h12": "12h",
-        "h24": "24h",
-        "1d": "24h",
-        "d1": "24h",
-        "d": "24h",
-        "m15": "15m",
-    }
-    return aliases.get(key, key)
-
-
-def _first_float(item: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[float]:
-    for key in keys:
-        value = item.get(key)
-        if value is None:
-            continue
-        try:
-            return float(value)
-        except Exception:
-            continue
-    return None
-
-
-def _extract_flow_items(data: Any) -> List[Dict[str, Any]]:
-    if isinstance(data, list):
-        return [item for item in data if isinstance(item, dict)]
-    if isinstance(data, dict):
-        for key in ("list", "records", "items"):
-            items = data.get(key)
-            if isinstance(items, list):
-                return [item for item in items if isinstance(item, dict)]
-        items: List[Dict[str, Any]] = []
-        for key, value in data.items():
-            if isinstance(value, dict):
-                item = dict(value)
-                item.setdefault("timeType", key)
-                items.append(item)
-        return items
-    return []
-
-
-def _normalize_exchange_flow_detail(resp: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
-    if not isinstance(resp, dict) or resp.get("code") != 200:
-        return {}
-    items = _extract_flow_items(resp.get("data"))
-    result: Dict[str, Dict[str, float]] = {}
-    for item in items:
-        period = _normalize_flow_period(
-            item.get("timeType")
-            or item.get("period")
-            or item.get("time")
-            or item.get("timeParticle")
-        )
-        if not period:
-            continue
-        in_val = _first_float(item, ("inFlowValue", "inFlow", "tradeIn", "stopTradeIn", "contractTradeIn"))
-        out_val = _first_float(item, ("outFlowValue", "outFlow", "tradeOut", "stopTradeOut", "contractTradeOut"))
-        net_val = _first_float(
-            item,
-            ("netFlowValue", "netFlow", "tradeInflow", "stopTradeInflow", "contractTradeInflow"),
-        )
-        if net_val is None and in_val is not None and out_val is not None:
-            net_val = in_val - out_val
-        if in_val is None and out_val is None and net_val is None:
-            continue
-        total = (in_val or 0.0) + (out_val or 0.0)
-        ratio = (in_val or 0.0) / total if total > 0 else 0.5
-        result[period] = {
-            "in": float(in_val or 0.0),
-            "out": float(out_val or 0.0),
-            "net": float(net_val or 0.0),
-            "ratio": float(ratio),
-        }
-    return result
-
-
-def _compact_valuescan_history(resp: Optional[Dict[str, Any]], limit: int = 60) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    return items[:limit]
-
-
-def _compact_holder_items(resp: Optional[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "address": item.get("address"),
-            "balance": item.get("balance"),
-            "balancePercent": item.get("balancePercent"),
-            "price": item.get("price"),
-            "profit": item.get("profit"),
-            "cost": item.get("cost"),
-            "chainName": item.get("chainName"),
-            "labelName": item.get("labelName") or item.get("label"),
-        })
-    return trimmed
-
-
-def _compact_chain_items(resp: Optional[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
-    items = _extract_valuescan_list(resp)
-    if not items:
-        return []
-    trimmed: List[Dict[str, Any]] = []
-    for item in items[:limit]:
-        trimmed.append({
-            "chainName": item.get("chainName"),
-            "contractAddress": item.get("contractAddress"),
-            "coinKey": item.get("coinKey"),
-            "holderCount": item.get("holderCount"),
-        })
-    return trimmed
-
 try:
     from .logger import logger
 except Exception:
@@ -266,6 +129,7 @@ from chart_pro_v10 import (
     get_klines,
     get_orderbook,
     calculate_atr,
+    build_pattern_fits,
     detect_channel,
     detect_best_flag,
     detect_best_wedge,
@@ -275,6 +139,9 @@ from chart_pro_v10 import (
 from ai_key_levels_cache import set_levels
 from ai_overlays_cache import set_overlays
 from market_data_sources import fetch_market_snapshot
+from market_data_cache import cached_json
+from valuescan_snapshot import get_valuescan_snapshot
+from llm_gateway import chat_completion
 
 
 def get_supplementary_data(symbol: str) -> Optional[Dict[str, Any]]:
@@ -291,160 +158,13 @@ def get_valuescan_data(symbol: str, days: int = None) -> Optional[Dict[str, Any]
     """
     获取 ValuScan 所有数据（主力位、主力成本、资金流、信号等）
     这是 AI 分析系统的主要数据源，具有最高优先级
+    （并发采集并短时缓存，见 valuescan_snapshot）
     """
     if days is None:
         days = VALUESCAN_AI_ANALYSIS_DAYS
     
     try:
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        if base_dir not in sys.path:
-            sys.path.insert(0, base_dir)
-        
-        from valuescan_api import (
-            get_main_force, get_hold_cost, get_keyword,
-            get_token_flow, get_whale_flow,
-            get_inflow, get_detailed_inflow,
-            get_opportunity_signals, get_risk_signals,
-            get_exchange_flow_detail, get_fund_trade_history_total,
-            get_holder_page, get_chain_page,
-        )
-        
-        clean_symbol = symbol.upper().replace("USDT", "").replace("$", "").strip()
-        keyword = get_keyword(clean_symbol)
-        if not keyword:
-            logger.debug(f"ValuScan: No keyword found for {symbol}")
-            return None
-        
-        result = {"symbol": clean_symbol, "days": days, "keyword": keyword}
-        
-        # 1. 主力位（阻力位）
-        mf = get_main_force(clean_symbol, days)
-        if mf.get("code") == 200:
-            mf_data = mf.get("data", [])
-            if mf_data:
-                levels = []
-                for item in mf_data:
-                    price = item.get("price")
-                    if price is None:
-                        continue
-                    try:
-                        levels.append(float(price))
-                    except Exception:
-                        continue
-                if levels:
-                    result["main_force_levels"] = levels
-                    result["current_main_force"] = levels[-1]
-                    logger.info(f"ValuScan: {clean_symbol} 主力位 ${result['current_main_force']:,.2f}")
-        
-        # 2. 主力成本（支撑位）
-        hc = get_hold_cost(clean_symbol, days)
-        if hc.get("code") == 200:
-            hc_data = hc.get("data", {}).get("holdingPrice", [])
-            if hc_data:
-                result["main_cost"] = float(hc_data[-1]["val"])
-                logger.info(f"ValuScan: {clean_symbol} 主力成本 ${result['main_cost']:,.2f}")
-        
-        # 3. 代币资金流向
-        try:
-            tf = get_token_flow("H12", 1, 20)
-            if tf.get("code") == 200:
-                result["token_flow"] = tf.get("data", {})
-        except Exception:
-            pass
-
-        # 3.1 交易资金流向（币种级）
-        try:
-            inflow = get_inflow(clean_symbol)
-            if inflow.get("code") == 200:
-                result["trade_inflow"] = inflow.get("data", {})
-        except Exception:
-            pass
-
-        # 3.2 详细资金流向（多周期）
-        try:
-            detailed = get_detailed_inflow(clean_symbol)
-            if detailed.get("code") == 200:
-                result["detailed_inflow"] = detailed.get("data", {})
-        except Exception:
-            pass
-        
-        # 4. 巨鲸资金流向
-        try:
-            wf = get_whale_flow(1, "m5", 1, 20)
-            if wf.get("code") == 200:
-                result["whale_flow"] = wf.get("data", {})
-        except Exception:
-            pass
-        
-        # 5. 机会/风险信号
-        try:
-            os_data = get_opportunity_signals(1, 10)
-            if os_data.get("code") == 200:
-                result["opportunity_signals"] = os_data.get("data", {})
-            rs_data = get_risk_signals(1, 10)
-            if rs_data.get("code") == 200:
-                result["risk_signals"] = rs_data.get("data", {})
-        except Exception:
-            pass
-
-        # 6. Exchange flow detail (multi-period)
-        try:
-            flow_detail = _normalize_exchange_flow_detail(get_exchange_flow_detail(clean_symbol))
-            if flow_detail:
-                result["exchange_flow_detail"] = flow_detail
-        except Exception:
-            pass
-
-        # 7. Fund flow/volume history
-        try:
-            flow_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=60,
-                    flow=True,
-                    trade_type=2,
-                ),
-                limit=60,
-            )
-            if flow_history:
-                result["fund_flow_history"] = flow_history
-        except Exception:
-            pass
-
-        try:
-            volume_history = _compact_valuescan_history(
-                get_fund_trade_history_total(
-                    clean_symbol,
-                    time_particle="12h",
-                    limit_size=60,
-                    flow=False,
-                    trade_type=2,
-                ),
-                limit=60,
-            )
-            if volume_history:
-                result["fund_volume_history"] = volume_history
-        except Exception:
-            pass
-
-        # 8. Holder and chain data
-        try:
-            holders = _compact_holder_items(get_holder_page(clean_symbol, page=1, page_size=10), limit=5)
-            if holders:
-                result["holders_top"] = holders
-        except Exception:
-            pass
-
-        try:
-            chains = _compact_chain_items(get_chain_page(clean_symbol, page=1, page_size=10), limit=10)
-            if chains:
-                result["chains"] = chains
-        except Exception:
-            pass
-
-        return result if len(result) > 3 else None
-        
+        return get_valuescan_snapshot(symbol, days)
     except Exception as e:
         logger.debug(f"ValuScan data fetch failed for {symbol}: {e}")
         return None
@@ -552,31 +272,26 @@ def _fetch_taker_flow(symbol: str) -> Dict[str, Dict[str, float]]:
     result: Dict[str, Dict[str, float]] = {}
     proxies = _get_binance_proxies()
     
+    url = "https://fapi.binance.com/futures/data/takerlongshortRatio"
+
+    def _fetch(params):
+        resp = requests.get(url, params=params, timeout=15, proxies=proxies)
+        if resp.status_code != 200:
+            # 代理失败时尝试直连
+            if not proxies:
+                return None
+            try:
+                resp = requests.get(url, params=params, timeout=15)
+            except Exception:
+                return None
+            if resp.status_code != 200:
+                return None
+        return resp.json()
+
     for period in periods:
         try:
-            url = "https://fapi.binance.com/futures/data/takerlongshortRatio"
-            resp = requests.get(
-                url, 
-                params={"symbol": sym, "period": period, "limit": 1}, 
-                timeout=15,
-                proxies=proxies
-            )
-            if resp.status_code != 200:
-                # 代理失败时尝试直连
-                if proxies:
-                    try:
-                        resp = requests.get(
-                            url,
-                            params={"symbol": sym, "period": period, "limit": 1},
-                            timeout=15
-                        )
-                        if resp.status_code != 200:
-                            continue
-                    except:
-                        continue
-                else:
-                    continue
-            data = resp.json()
+            params = {"symbol": sym, "period": period, "limit": 1}
+            data = cached_json(url, params, lambda: _fetch(params))
             if not isinstance(data, list) or not data:
                 continue
             row = data[-1]
@@ -645,10 +360,11 @@ def _build_snapshot(
         }
 
     atr = calculate_atr(df)
-    channel = detect_channel(df, atr=atr, windows=(60, 80, 120), r2_min=0.55)
+    fits = build_pattern_fits(df, (60, 80, 120))
+    channel = detect_channel(df, atr=atr, windows=(60, 80, 120), r2_min=0.55, fits=fits)
     flag = detect_best_flag(df, atr, impulse_lookback=20, windows=(12, 18, 24))
-    wedge = detect_best_wedge(df, atr=atr, windows=(60, 80, 120), r2_min=0.5)
-    triangle = detect_best_triangle(df, atr=atr, windows=(60, 80, 120), r2_min=0.5)
+    wedge = detect_best_wedge(df, atr=atr, windows=(60, 80, 120), r2_min=0.5, fits=fits)
+    triangle = detect_best_triangle(df, atr=atr, windows=(60, 80, 120), r2_min=0.5, fits=fits)
 
     market_snapshot = fetch_market_snapshot(symbol) or {}
     valuescan_data = get_valuescan_data(symbol)
@@ -1405,39 +1121,29 @@ def _call_ai_api(prompt: str, config: Dict[str, Any], language: str = "zh") -> O
     if not api_key or not api_url or not model:
         return None
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
     system_prompt = (
         "You are a professional quantitative analyst. Reply with strict JSON only."
         if language == "en"
         else "你是专业的量化分析师，只能输出严格 JSON。"
     )
 
-    payload = {
-        "model": model,
-        "messages": [
+    content = chat_completion(
+        api_url,
+        api_key,
+        model,
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt},
         ],
-        "max_tokens": 8000,
-        "temperature": 0.4,
-    }
-
-    try:
-        # 显式禁用代理直接连接 AI API
-        session = requests.Session()
-        session.trust_env = False
-        resp = session.post(api_url, headers=headers, json=payload, timeout=120)
-        if resp.status_code != 200:
-            logger.warning("AI API call failed: %s - %s", resp.status_code, resp.text[:200])
-            return None
-        data = resp.json()
-        content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        if not content:
-            return None
-        return _strip_thoughts(content)
-    except Exception as exc:
-        logger.warning("AI API call error: %s", exc)
+        caller="ai_signal",
+        max_tokens=8000,
+        temperature=0.4,
+        timeout=120,
+        expect_json=True,
+    )
+    if not content:
         return None
+    return _strip_thoughts(content)
 
 
 def generate_ai_key_levels(symbol: str) -> Optional[Dict[str, Any]]:
@@ -83,6 +83,29 @@ def forward_ai_signal(
         },
     }
 
+    # 优先走共享 IPC 通道（长连接 + 发件箱），不可用时退回短连接
+    send_payload = None
+    try:
+        from .ipc_client import send_payload
+    except ImportError:
+        try:
+            from ipc_client import send_payload
+        except ImportError:
+            send_payload = None
+    if send_payload is not None:
+        if send_payload(payload):
+            logger.info(
+                "📡 AI 信号已加入转发: symbol=%s direction=%s entry=%.4f SL=%.4f confidence=%.2f",
+                symbol,
+                direction,
+                entry_price or 0,
+                stop_loss or 0,
+                confidence or 0,
+            )
+            return True
+        logger.error("❌ AI 信号转发失败: symbol=%s direction=%s", symbol, direction)
+        return False
+
     data = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
 
     # 尝试发送
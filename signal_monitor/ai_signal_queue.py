@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 """
 AI 信号简评队列管理器
-确保每条信号都被简评，一个个顺序处理，不会跳过任何信号
+确保每条信号都被简评，不会跳过任何仍然有效的信号：
+
+- 多个工作线程并发处理（AI_SIGNAL_QUEUE_WORKERS）
+- 按优先级出队：新鲜的 FOMO / Alpha 信号优先，资金异动（108）最后；同一优先级内较新的信号优先
+- 队列中同一币种的多条信号合并为一个任务，分析结果回调给每条信号
+- 开始处理前检查截止时间与看涨/看跌信号有效期，已过期的任务不再调用 AI
 """
 
+import heapq
+import itertools
 import os
-import queue
 import threading
 import time
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable
 from dataclasses import dataclass, field
 
 try:
@@ -42,6 +48,30 @@ _BULL_BEAR_SIGNAL_TTL_SECONDS = _read_int_env_or_config(
     "BULL_BEAR_SIGNAL_TTL_SECONDS",
     86400,
 )
+
+# 工作线程数
+_QUEUE_WORKERS = max(_read_int_env_or_config("AI_SIGNAL_QUEUE_WORKERS", "AI_SIGNAL_QUEUE_WORKERS", 3), 1)
+# 任务入队后超过该时间（秒）仍未开始处理则丢弃，<=0 不限制
+_TASK_DEADLINE_SECONDS = _read_int_env_or_config(
+    "AI_SIGNAL_QUEUE_DEADLINE_SECONDS",
+    "AI_SIGNAL_QUEUE_DEADLINE_SECONDS",
+    600,
+)
+# 信号产生后该时间（秒）内视为新鲜，FOMO / Alpha 信号仅在新鲜时享有最高优先级
+_FRESH_SIGNAL_SECONDS = _read_int_env_or_config(
+    "AI_SIGNAL_QUEUE_FRESH_SECONDS",
+    "AI_SIGNAL_QUEUE_FRESH_SECONDS",
+    300,
+)
+
+# 优先级（数值越小越先处理）
+_PRIORITY_HIGH = 0
+_PRIORITY_NORMAL = 1
+_PRIORITY_LOW = 2
+# FOMO: 113, FOMO加剧: 112, Alpha: 110
+_HIGH_PRIORITY_SIGNAL_TYPES = {110, 112, 113}
+# 资金异动: 108
+_LOW_PRIORITY_SIGNAL_TYPES = {108}
 
 
 def _extract_signal_timestamp_ms(signal_payload: Optional[Dict[str, Any]]) -> int:
@@ -88,6 +118,16 @@ def _is_bull_bear_signal_expired(signal_payload: Optional[Dict[str, Any]]) -> bo
     return age_seconds > _BULL_BEAR_SIGNAL_TTL_SECONDS
 
 
+def _signal_priority(signal_payload: Optional[Dict[str, Any]], signal_time: float) -> int:
+    msg_type = _extract_signal_type(signal_payload)
+    if msg_type in _LOW_PRIORITY_SIGNAL_TYPES:
+        return _PRIORITY_LOW
+    if msg_type in _HIGH_PRIORITY_SIGNAL_TYPES:
+        if _FRESH_SIGNAL_SECONDS <= 0 or time.time() - signal_time <= _FRESH_SIGNAL_SECONDS:
+            return _PRIORITY_HIGH
+    return _PRIORITY_NORMAL
+
+
 @dataclass
 class AISignalTask:
     """AI简评任务"""
@@ -96,13 +136,24 @@ class AISignalTask:
     callback: Optional[Callable[[Dict[str, Any]], None]] = None
     created_at: float = field(default_factory=time.time)
     task_id: str = field(default_factory=lambda: f"{time.time():.6f}")
+    # 信号产生时间（秒）；payload 中没有时间戳时使用入队时间
+    signal_time: float = 0.0
+    priority: int = _PRIORITY_NORMAL
+    # 开始处理的截止时间（time.time()），0 表示不限制
+    deadline: float = 0.0
+    # 合并进来的其他信号的回调
+    extra_callbacks: List[Callable[[Dict[str, Any]], None]] = field(default_factory=list)
+    merged: bool = False
+
+    def callbacks(self) -> List[Callable[[Dict[str, Any]], None]]:
+        return ([self.callback] if self.callback else []) + self.extra_callbacks
 
 
 class AISignalQueue:
     """
     AI信号简评队列管理器
-    - 所有信号进入队列排队
-    - 单线程顺序处理，确保不跳过任何信号
+    - 所有信号进入优先级队列排队，多个工作线程并发处理
+    - 同一币种排队中的信号合并，过期信号开始前丢弃
     - 支持回调通知处理结果
     """
     
@@ -121,58 +172,104 @@ class AISignalQueue:
         if self._initialized:
             return
         
-        self._queue: queue.Queue[AISignalTask] = queue.Queue()
-        self._worker_thread: Optional[threading.Thread] = None
+        self._heap: List[Any] = []
+        self._pending: Dict[str, AISignalTask] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._unfinished = 0
+        self._workers: List[threading.Thread] = []
+        self._num_workers = _QUEUE_WORKERS
         self._stop_event = threading.Event()
         self._processing_lock = threading.Lock()
-        self._current_task: Optional[AISignalTask] = None
+        self._current_tasks: Dict[str, AISignalTask] = {}
         self._stats = {
             "total_queued": 0,
             "total_processed": 0,
             "total_success": 0,
             "total_failed": 0,
             "total_skipped": 0,
+            "total_coalesced": 0,
+            "total_expired": 0,
         }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._age_total = 0.0
+        self._age_max = 0.0
         self._initialized = True
         self._start_worker()
-        logger.info("[AI队列] 信号队列管理器已初始化")
+        logger.info(f"[AI队列] 信号队列管理器已初始化 (工作线程: {self._num_workers})")
     
     def _start_worker(self):
-        """启动工作线程"""
-        if self._worker_thread is None or not self._worker_thread.is_alive():
+        """启动工作线程（补齐已退出的线程）"""
+        with self._processing_lock:
+            alive = [t for t in self._workers if t.is_alive()]
+            if len(alive) >= self._num_workers:
+                return
             self._stop_event.clear()
-            self._worker_thread = threading.Thread(
-                target=self._worker_loop,
-                name="AISignalQueueWorker",
-                daemon=True
-            )
-            self._worker_thread.start()
-            logger.info("[AI队列] 工作线程已启动")
+            for index in range(len(alive), self._num_workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"AISignalQueueWorker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                alive.append(thread)
+            self._workers = alive
+        logger.info(f"[AI队列] 工作线程已启动 ({self._num_workers})")
+
+    def _next_task(self) -> Optional[AISignalTask]:
+        """取出优先级最高的任务，超时1秒返回 None 以检查停止信号"""
+        with self._cond:
+            deadline = time.monotonic() + 1.0
+            while True:
+                while self._heap:
+                    _, _, _, task = heapq.heappop(self._heap)
+                    if task.merged:
+                        continue
+                    if self._pending.get(task.symbol) is task:
+                        del self._pending[task.symbol]
+                    return task
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                self._cond.wait(remaining)
+
+    def _task_done(self):
+        with self._cond:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._cond.notify_all()
     
     def _worker_loop(self):
         """工作线程主循环"""
         while not self._stop_event.is_set():
             try:
-                # 等待任务，超时1秒检查停止信号
-                try:
-                    task = self._queue.get(timeout=1.0)
-                except queue.Empty:
+                task = self._next_task()
+                if task is None:
                     continue
                 
-                with self._processing_lock:
-                    self._current_task = task
-                
                 try:
-                    self._process_task(task)
-                    self._stats["total_success"] += 1
-                except Exception as e:
-                    logger.error(f"[AI队列] 处理任务失败: {task.symbol} - {e}")
-                    self._stats["total_failed"] += 1
-                finally:
-                    self._stats["total_processed"] += 1
+                    if self._is_expired(task):
+                        continue
+                
+                    thread_name = threading.current_thread().name
                     with self._processing_lock:
-                        self._current_task = None
-                    self._queue.task_done()
+                        self._current_tasks[thread_name] = task
+
+                    outcome = "total_failed"
+                    try:
+                        self._process_task(task)
+                        outcome = "total_success"
+                    except Exception as e:
+                        logger.error(f"[AI队列] 处理任务失败: {task.symbol} - {e}")
+                    finally:
+                        # 计数器由多个工作线程更新，统一在锁内累加
+                        with self._processing_lock:
+                            self._stats[outcome] += 1
+                            self._stats["total_processed"] += 1
+                            self._current_tasks.pop(thread_name, None)
+                finally:
+                    self._task_done()
                     
             except Exception as e:
                 logger.error(f"[AI队列] 工作线程异常: {e}")
@@ -180,11 +277,44 @@ class AISignalQueue:
         
         logger.info("[AI队列] 工作线程已停止")
     
+    def _is_expired(self, task: AISignalTask) -> bool:
+        """开始处理前检查截止时间，过期任务回调空结果并丢弃"""
+        now = time.time()
+        reason = None
+        if task.deadline and now > task.deadline:
+            reason = f"超过截止时间 {now - task.created_at:.0f}s"
+        elif _is_bull_bear_signal_expired(task.signal_payload):
+            reason = "看涨/看跌信号已过期"
+        if reason is None:
+            return False
+        with self._processing_lock:
+            self._stats["total_expired"] += 1
+        logger.info(f"[AI队列] 丢弃过期任务: {task.symbol} ({reason})")
+        self._notify(task, {})
+        return True
+
+    def _notify(self, task: AISignalTask, result: Dict[str, Any]):
+        for callback in task.callbacks():
+            try:
+                callback(result)
+            except Exception as e:
+                logger.warning(f"[AI队列] 回调执行失败: {task.symbol} - {e}")
+
     def _process_task(self, task: AISignalTask):
         """处理单个AI简评任务"""
         symbol = task.symbol
-        wait_time = time.time() - task.created_at
-        logger.info(f"[AI队列] 开始处理: {symbol} (等待 {wait_time:.1f}s, 队列剩余 {self._queue.qsize()})")
+        now = time.time()
+        wait_time = now - task.created_at
+        signal_age = now - task.signal_time
+        with self._processing_lock:
+            self._wait_total += wait_time
+            self._wait_max = max(self._wait_max, wait_time)
+            self._age_total += signal_age
+            self._age_max = max(self._age_max, signal_age)
+        logger.info(
+            f"[AI队列] 开始处理: {symbol} (等待 {wait_time:.1f}s, 信号年龄 {signal_age:.1f}s, "
+            f"优先级 {task.priority}, 队列剩余 {self.get_queue_size()})"
+        )
         
         try:
             from ai_signal_analysis import analyze_signal
@@ -201,19 +331,11 @@ class AISignalQueue:
                 result = {}
             
             # 执行回调
-            if task.callback:
-                try:
-                    task.callback(result or {})
-                except Exception as e:
-                    logger.warning(f"[AI队列] 回调执行失败: {symbol} - {e}")
+            self._notify(task, result or {})
                     
         except Exception as e:
             logger.error(f"[AI队列] ❌ 分析失败: {symbol} - {e}")
-            if task.callback:
-                try:
-                    task.callback({})
-                except:
-                    pass
+            self._notify(task, {})
             raise
     
     def enqueue(
@@ -221,6 +343,7 @@ class AISignalQueue:
         symbol: str,
         signal_payload: Optional[Dict[str, Any]] = None,
         callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        deadline: Optional[float] = None,
     ) -> str:
         """
         将信号加入队列
@@ -229,12 +352,14 @@ class AISignalQueue:
             symbol: 币种符号
             signal_payload: 信号数据
             callback: 处理完成后的回调函数，接收分析结果
+            deadline: 开始处理的截止时间（time.time()），None 使用 AI_SIGNAL_QUEUE_DEADLINE_SECONDS
             
         Returns:
-            任务ID
+            任务ID（与排队中的同币种任务合并时返回该任务的ID）
         """
         if _is_bull_bear_signal_expired(signal_payload):
-            self._stats["total_skipped"] += 1
+            with self._processing_lock:
+                self._stats["total_skipped"] += 1
             logger.info("[AIQueue] Skip expired bull/bear signal: %s", symbol)
             if callback:
                 try:
@@ -248,12 +373,40 @@ class AISignalQueue:
             signal_payload=signal_payload,
             callback=callback,
         )
+        signal_ts_ms = _extract_signal_timestamp_ms(signal_payload)
+        task.signal_time = min(signal_ts_ms / 1000.0, task.created_at) if signal_ts_ms else task.created_at
+        task.priority = _signal_priority(signal_payload, task.signal_time)
+        if deadline is not None:
+            task.deadline = deadline
+        elif _TASK_DEADLINE_SECONDS > 0:
+            task.deadline = task.created_at + _TASK_DEADLINE_SECONDS
         
-        self._queue.put(task)
-        self._stats["total_queued"] += 1
+        with self._cond:
+            existing = self._pending.get(symbol)
+            if existing is not None:
+                # 同一币种已在排队：用较新的信号数据分析一次，结果回调给所有信号
+                existing.merged = True
+                task.extra_callbacks = existing.callbacks()
+                task.created_at = existing.created_at
+                task.task_id = existing.task_id
+                task.priority = min(task.priority, existing.priority)
+                task.deadline = max(task.deadline, existing.deadline) if task.deadline and existing.deadline else 0.0
+            else:
+                self._unfinished += 1
+            self._pending[symbol] = task
+            # 同一优先级内较新的信号优先
+            heapq.heappush(self._heap, (task.priority, -task.signal_time, next(self._seq), task))
+            with self._processing_lock:
+                self._stats["total_queued"] += 1
+                if existing is not None:
+                    self._stats["total_coalesced"] += 1
+            queue_size = len(self._pending)
+            self._cond.notify()
         
-        queue_size = self._queue.qsize()
-        logger.info(f"[AI队列] 入队: {symbol} (队列长度: {queue_size}, 任务ID: {task.task_id})")
+        if existing is not None:
+            logger.info(f"[AI队列] 合并: {symbol} (队列长度: {queue_size}, 任务ID: {task.task_id})")
+        else:
+            logger.info(f"[AI队列] 入队: {symbol} (队列长度: {queue_size}, 任务ID: {task.task_id})")
         
         # 确保工作线程在运行
         self._start_worker()
@@ -262,23 +415,34 @@ class AISignalQueue:
     
     def get_queue_size(self) -> int:
         """获取当前队列长度"""
-        return self._queue.qsize()
+        with self._cond:
+            return len(self._pending)
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         with self._processing_lock:
-            current = self._current_task.symbol if self._current_task else None
+            stats = dict(self._stats)
+            processing = [task.symbol for task in self._current_tasks.values()]
+            started = stats["total_processed"] + len(processing)
+            wait_total, wait_max = self._wait_total, self._wait_max
+            age_total, age_max = self._age_total, self._age_max
         
         return {
-            **self._stats,
-            "queue_size": self._queue.qsize(),
-            "current_processing": current,
+            **stats,
+            "workers": self._num_workers,
+            "queue_size": self.get_queue_size(),
+            "current_processing": processing[0] if processing else None,
+            "processing": processing,
+            "avg_queue_wait": round(wait_total / started, 2) if started else None,
+            "max_queue_wait": round(wait_max, 2),
+            "avg_age_at_start": round(age_total / started, 2) if started else None,
+            "max_age_at_start": round(age_max, 2),
         }
     
     def is_processing(self) -> bool:
         """是否正在处理任务"""
         with self._processing_lock:
-            return self._current_task is not None
+            return bool(self._current_tasks)
     
     def wait_for_completion(self, timeout: Optional[float] = None) -> bool:
         """
@@ -290,17 +454,23 @@ class AISignalQueue:
         Returns:
             是否在超时前完成
         """
-        try:
-            self._queue.join()
-            return True
-        except:
-            return False
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._unfinished > 0:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
     
     def stop(self):
         """停止队列处理"""
         self._stop_event.set()
-        if self._worker_thread and self._worker_thread.is_alive():
-            self._worker_thread.join(timeout=5)
+        with self._cond:
+            self._cond.notify_all()
+        for thread in list(self._workers):
+            if thread.is_alive():
+                thread.join(timeout=5)
         logger.info("[AI队列] 队列管理器已停止")
 
 
@@ -219,15 +219,16 @@ class AuxiliaryLineDrawer:
         bins = np.linspace(price_min, price_max, num_bins)
         volume_profile = np.zeros(num_bins - 1)
 
-        for i in range(len(self.df)):
-            low_idx = np.searchsorted(bins, self.df['low'].iloc[i]) - 1
-            high_idx = np.searchsorted(bins, self.df['high'].iloc[i]) - 1
+        low_idxs = np.searchsorted(bins, self.df['low'].to_numpy(dtype=float)) - 1
+        high_idxs = np.searchsorted(bins, self.df['high'].to_numpy(dtype=float)) - 1
+        volumes = self.df['volume'].to_numpy(dtype=float)
 
-            low_idx = max(0, min(low_idx, num_bins - 2))
-            high_idx = max(0, min(high_idx, num_bins - 2))
+        for i in range(len(self.df)):
+            low_idx = max(0, min(int(low_idxs[i]), num_bins - 2))
+            high_idx = max(0, min(int(high_idxs[i]), num_bins - 2))
 
             if low_idx <= high_idx:
-                volume_profile[low_idx:high_idx + 1] += self.df['volume'].iloc[i] / (high_idx - low_idx + 1)
+                volume_profile[low_idx:high_idx + 1] += volumes[i] / (high_idx - low_idx + 1)
 
         # 找到高成交量区域
         threshold = np.percentile(volume_profile, 80)  # 前20%
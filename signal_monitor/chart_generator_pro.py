@@ -16,6 +16,7 @@ from matplotlib.collections import PolyCollection
 from datetime import datetime, timedelta
 from logger import logger
 from chart_fonts import configure_matplotlib_fonts
+from pattern_kernels import swing_indices
 
 # ==================== 配置 ====================
 BINANCE_FUTURES_KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
@@ -184,15 +185,15 @@ def find_support_resistance(df, num_levels=3):
     key_prices = []
     
     # 1. 近期高低点
-    for i in range(2, len(df) - 2):
-        # 局部高点
-        if df['high'].iloc[i] >= df['high'].iloc[i-1] and df['high'].iloc[i] >= df['high'].iloc[i-2] and \
-           df['high'].iloc[i] >= df['high'].iloc[i+1] and df['high'].iloc[i] >= df['high'].iloc[i+2]:
-            key_prices.append(('R', df['high'].iloc[i], df['volume'].iloc[i]))
-        # 局部低点
-        if df['low'].iloc[i] <= df['low'].iloc[i-1] and df['low'].iloc[i] <= df['low'].iloc[i-2] and \
-           df['low'].iloc[i] <= df['low'].iloc[i+1] and df['low'].iloc[i] <= df['low'].iloc[i+2]:
-            key_prices.append(('S', df['low'].iloc[i], df['volume'].iloc[i]))
+    high_values = df['high'].values
+    low_values = df['low'].values
+    volumes = df['volume'].values
+    # 局部高点
+    for i in swing_indices(high_values, 2, "high"):
+        key_prices.append(('R', high_values[i], volumes[i]))
+    # 局部低点
+    for i in swing_indices(low_values, 2, "low"):
+        key_prices.append(('S', low_values[i], volumes[i]))
     
     # 2. 成交量加权的价格区间
     price_range = df['high'].max() - df['low'].min()
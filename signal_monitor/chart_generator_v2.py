@@ -16,6 +16,7 @@ from matplotlib.colors import LinearSegmentedColormap
 from datetime import datetime
 from logger import logger
 from chart_fonts import configure_matplotlib_fonts
+from pattern_kernels import swing_indices
 
 # ==================== 配置 ====================
 BINANCE_FUTURES_KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
@@ -118,13 +119,13 @@ def find_support_resistance(df, num_levels=3):
     lows = []
     window = 5
     
-    for i in range(window, len(df) - window):
-        # 局部高点
-        if df['high'].iloc[i] == df['high'].iloc[i-window:i+window+1].max():
-            highs.append((df['high'].iloc[i], df['volume'].iloc[i], i))
-        # 局部低点
-        if df['low'].iloc[i] == df['low'].iloc[i-window:i+window+1].min():
-            lows.append((df['low'].iloc[i], df['volume'].iloc[i], i))
+    high_values = df['high'].values
+    low_values = df['low'].values
+    volumes = df['volume'].values
+    for i in swing_indices(high_values, window, "high"):
+        highs.append((high_values[i], volumes[i], int(i)))
+    for i in swing_indices(low_values, window, "low"):
+        lows.append((low_values[i], volumes[i], int(i)))
     
     # 2. 合并相近的价格水平（±0.5%）
     def merge_levels(levels, threshold=0.005):
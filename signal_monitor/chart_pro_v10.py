@@ -8,15 +8,20 @@
 import io
 import os
 import math
+import threading
 import time
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.colors import LinearSegmentedColormap
 from scipy.ndimage import gaussian_filter1d
+from PIL import Image
 from chart_logger import ChartGenerationLogger
 from logger import logger
 from key_levels_enhanced import find_key_levels_enhanced, check_confluence
@@ -26,6 +31,9 @@ from ai_key_levels_cache import get_levels as get_ai_levels
 from ai_market_summary import get_ai_summary_config, get_ai_overlays_config
 from chart_fonts import configure_matplotlib_fonts
 from market_data_sources import fetch_market_snapshot
+from market_data_cache import cached_json
+from kline_store import load_klines, to_frame
+from pattern_kernels import TailWindowFits, count_line_touches, find_swings, tail_regressions
 
 # ==================== 代理配置 ====================
 try:
@@ -113,17 +121,44 @@ COLORS = {
 
 # ==================== Professional Data Matrix ====================
 
-def _req(url, params=None, headers=None):
-    """发送 HTTP GET 请求，支持代理"""
+# 共享连接池：同一张图的十几个 Binance 请求复用 keep-alive 连接
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# get_integrated_data 的并发拉取线程池
+_DATA_EXECUTOR = ThreadPoolExecutor(max_workers=12, thread_name_prefix="chart-data")
+
+# 各数据源的等待上限（秒），超时的数据源按缺失处理，图表照常渲染
+SOURCE_TIMEOUTS = {
+    'klines': 15,
+    'tick': 10,
+    'fund': 8,
+    'ls': 8,
+    'flow': 12,
+    'oi': 8,
+    'oi_hist': 8,
+    'ob': 8,
+    'ai_lvls': 5,
+    'liq': 10,
+}
+
+
+def _req(url, params=None, headers=None, timeout=15):
+    """发送 HTTP GET 请求，支持代理；行情类接口走进程内共享缓存"""
+    return cached_json(url, params, lambda: _fetch_json(url, params, headers, timeout))
+
+
+def _fetch_json(url, params=None, headers=None, timeout=15):
     proxies = _get_proxies()
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=15, proxies=proxies)
+        r = _SESSION.get(url, params=params, headers=headers, timeout=timeout, proxies=proxies)
         return r.json() if r.status_code == 200 else None
     except Exception as e:
         # 如果代理失败，尝试直连
         if proxies:
             try:
-                r = requests.get(url, params=params, headers=headers, timeout=15)
+                r = _SESSION.get(url, params=params, headers=headers, timeout=timeout)
                 return r.json() if r.status_code == 200 else None
             except:
                 pass
@@ -228,19 +263,8 @@ def _calc_liq_from_binance(payload):
         return None
     return {"longs": longs, "shorts": shorts}
 
-def get_integrated_data(symbol, interval):
-    base = symbol.upper().replace('$', '').replace('USDT', '').strip()
-    fs = f"{base}USDT"
-    
-    # 1. Primary Market
-    k_raw = _req(f"{BINANCE_FUT_BASE}/fapi/v1/klines", {'symbol': fs, 'interval': interval, 'limit': 200})
-    if not k_raw: return None
-    df = pd.DataFrame(k_raw, columns=['timestamp','open','high','low','close','volume','ct','qv','t','tbb','tbq','i']).iloc[:,:6]
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    for c in df.columns[1:]: df[c] = df[c].astype(float)
-    
-    # 2. Intelligence Sources
-    tick = _req(f"{BINANCE_FUT_BASE}/fapi/v1/ticker/24hr", {'symbol': fs})
+def _fetch_ticker(fs, base, timeout):
+    tick = _req(f"{BINANCE_FUT_BASE}/fapi/v1/ticker/24hr", {'symbol': fs}, timeout=timeout)
     if not isinstance(tick, dict):
         market = fetch_market_snapshot(base)
         if market:
@@ -251,26 +275,111 @@ def get_integrated_data(symbol, interval):
                 "quoteVolume": market.get("volume_24h", 0),
                 "openPrice": market.get("open_24h", market.get("price", 0)),
             }
-    fund = _req(f"{BINANCE_FUT_BASE}/fapi/v1/fundingRate", {'symbol': fs, 'limit': 1})
-    ls_hist = _req(f"{BINANCE_FUT_BASE}/futures/data/globalLongShortAccountRatio", {'symbol': fs, 'period': '5m', 'limit': 1})
-    
+    return tick
+
+
+def _fetch_flows(fs, base, timeout):
+    """ValueScan 资金流优先，拿不到时才请求 Binance 主动买卖比"""
     vs_flow = _get_valuescan_exchange_flow(base)
-    taker_flow = _req(f"{BINANCE_FUT_BASE}/futures/data/takerlongshortRatio", {'symbol': fs, 'period': '15m', 'limit': 24}) if not vs_flow else None
-    oi_raw = _req(f"{BINANCE_FUT_BASE}/fapi/v1/openInterest", {'symbol': fs})
-    oi_hist = _req(f"{BINANCE_FUT_BASE}/futures/data/openInterestHist", {'symbol': fs, 'period': '1h', 'limit': 2})
-    liq = None
-    ob_raw = _req(f"{BINANCE_FUT_BASE}/fapi/v1/depth", {'symbol': fs, 'limit': 50})
-    
-    # AI System Docking
-    ai_lvls = get_ai_levels(base)
+    taker_flow = None
+    if not vs_flow:
+        taker_flow = _req(
+            f"{BINANCE_FUT_BASE}/futures/data/takerlongshortRatio",
+            {'symbol': fs, 'period': '15m', 'limit': 24},
+            timeout=timeout,
+        )
+    return vs_flow, taker_flow
+
+
+def _timed_call(starts, name, fn, args):
+    starts[name] = time.monotonic()
+    return fn(*args)
+
+
+def _collect_sources(tasks):
+    """
+    并发执行 {name: (fn, args)}，按 SOURCE_TIMEOUTS 等待各数据源。
+    超时从任务真正开始执行时计时（共享线程池排队不计入）；排队超过同样时长仍未开始的任务取消。
+    超时或异常的数据源返回 None，不影响其他数据源。
+    """
+    started = time.monotonic()
+    starts = {}
+    pending = {
+        name: _DATA_EXECUTOR.submit(_timed_call, starts, name, fn, args)
+        for name, (fn, args) in tasks.items()
+    }
+    results = {}
+    while pending:
+        now = time.monotonic()
+        next_check = now + 0.5
+        for name, future in list(pending.items()):
+            limit = SOURCE_TIMEOUTS.get(name, 10)
+            if future.done():
+                pending.pop(name)
+                try:
+                    results[name] = future.result()
+                except Exception as exc:
+                    logger.debug(f"[chart_pro_v10] {name} failed: {exc}")
+                    results[name] = None
+                continue
+            begin = starts.get(name)
+            deadline = (begin if begin is not None else started) + limit
+            if now >= deadline:
+                pending.pop(name)
+                future.cancel()
+                state = "超时" if begin is not None else "排队超时"
+                logger.warning(f"[chart_pro_v10] {name} {state} ({limit}s)，按缺失处理")
+                results[name] = None
+            elif begin is not None:
+                next_check = min(next_check, deadline)
+        if pending:
+            wait(list(pending.values()), timeout=max(0.0, next_check - time.monotonic()),
+                 return_when=FIRST_COMPLETED)
+    logger.debug(f"[chart_pro_v10] 数据拉取耗时 {time.monotonic() - started:.2f}s")
+    return results
+
+
+def get_integrated_data(symbol, interval, ai_levels=None):
+    """ai_levels: 调用方预先取好的 AI 主力位（渲染子进程看不到主进程的内存缓存）"""
+    base = symbol.upper().replace('$', '').replace('USDT', '').strip()
+    fs = f"{base}USDT"
+    t = SOURCE_TIMEOUTS
 
     end_ms = int(time.time() * 1000)
     start_ms = end_ms - 24 * 60 * 60 * 1000
-    liq_raw = _req(
-        f"{BINANCE_FUT_BASE}/fapi/v1/forceOrders",
-        {'symbol': fs, 'startTime': start_ms, 'endTime': end_ms, 'limit': 1000},
-    )
-    liq_stats = _calc_liq_from_binance(liq_raw)
+    tasks = {
+        # 1. Primary Market
+        'klines': (_load_klines_df, (fs, interval, 200, t['klines'])),
+        # 2. Intelligence Sources
+        'tick': (_fetch_ticker, (fs, base, t['tick'])),
+        'fund': (_req, (f"{BINANCE_FUT_BASE}/fapi/v1/fundingRate", {'symbol': fs, 'limit': 1}, None, t['fund'])),
+        'ls': (_req, (f"{BINANCE_FUT_BASE}/futures/data/globalLongShortAccountRatio", {'symbol': fs, 'period': '5m', 'limit': 1}, None, t['ls'])),
+        'flow': (_fetch_flows, (fs, base, t['flow'])),
+        'oi': (_req, (f"{BINANCE_FUT_BASE}/fapi/v1/openInterest", {'symbol': fs}, None, t['oi'])),
+        'oi_hist': (_req, (f"{BINANCE_FUT_BASE}/futures/data/openInterestHist", {'symbol': fs, 'period': '1h', 'limit': 2}, None, t['oi_hist'])),
+        'ob': (_req, (f"{BINANCE_FUT_BASE}/fapi/v1/depth", {'symbol': fs, 'limit': 50}, None, t['ob'])),
+        # AI System Docking
+        'ai_lvls': (get_ai_levels, (base,)),
+        'liq': (_req, (f"{BINANCE_FUT_BASE}/fapi/v1/forceOrders", {'symbol': fs, 'startTime': start_ms, 'endTime': end_ms, 'limit': 1000}, None, t['liq'])),
+    }
+    if ai_levels is not None:
+        tasks.pop('ai_lvls')
+    results = _collect_sources(tasks)
+    if ai_levels is not None:
+        results['ai_lvls'] = ai_levels
+
+    df = results['klines']
+    if df is None: return None
+
+    tick = results['tick']
+    fund = results['fund']
+    ls_hist = results['ls']
+    vs_flow, taker_flow = results['flow'] or ({}, None)
+    oi_raw = results['oi']
+    oi_hist = results['oi_hist']
+    ob_raw = results['ob']
+    ai_lvls = results['ai_lvls']
+    liq_stats = _calc_liq_from_binance(results['liq'])
 
     oi_stats = {}
     if isinstance(oi_raw, dict):
@@ -298,14 +407,13 @@ def get_integrated_data(symbol, interval):
     }
 
 
-def get_klines(symbol, timeframe='1h', limit=200):
-    base = symbol.upper().replace('$', '').strip()
-    if not base.endswith('USDT'):
-        base = f"{base}USDT"
-    k_raw = _req(
-        f"{BINANCE_FUT_BASE}/fapi/v1/klines",
-        {'symbol': base, 'interval': timeframe, 'limit': limit},
-    )
+def _load_klines_df(symbol, interval, limit, timeout=15):
+    """K 线优先读本地存储（只增量拉取新 K 线），存储不可用时回退 REST"""
+    url = f"{BINANCE_FUT_BASE}/fapi/v1/klines"
+    rows = load_klines(symbol, interval, limit, lambda params: _fetch_json(url, params, None, timeout))
+    if rows is not None:
+        return to_frame(rows)
+    k_raw = _req(url, {'symbol': symbol, 'interval': interval, 'limit': limit}, None, timeout)
     if not k_raw:
         return None
     df = pd.DataFrame(
@@ -318,6 +426,13 @@ def get_klines(symbol, timeframe='1h', limit=200):
     return df
 
 
+def get_klines(symbol, timeframe='1h', limit=200):
+    base = symbol.upper().replace('$', '').strip()
+    if not base.endswith('USDT'):
+        base = f"{base}USDT"
+    return _load_klines_df(base, timeframe, limit)
+
+
 def get_orderbook(symbol, limit=100):
     base = symbol.upper().replace('$', '').strip()
     if not base.endswith('USDT'):
@@ -352,53 +467,48 @@ PATTERN_SCORE_THRESHOLDS = {
 }
 
 def _linear_regression(series):
-    x = np.arange(len(series), dtype=float)
     y = np.asarray(series, dtype=float)
     if len(y) < 2:
         return 0.0, y[-1] if len(y) else 0.0, 0.0
-    slope, intercept = np.polyfit(x, y, 1)
-    y_pred = slope * x + intercept
-    ss_res = np.sum((y - y_pred) ** 2)
-    ss_tot = np.sum((y - y.mean()) ** 2)
-    r2 = 1.0 - (ss_res / ss_tot) if ss_tot > 0 else 0.0
-    return float(slope), float(intercept), float(r2)
+    return tail_regressions(y, (len(y),))[len(y)]
 
 
 def _find_swings(series, window=4, mode="high"):
-    points = []
-    if len(series) < window * 2 + 1:
-        return points
-    for i in range(window, len(series) - window):
-        seg = series[i - window : i + window + 1]
-        if mode == "high" and series[i] >= max(seg):
-            points.append((i, series[i]))
-        elif mode == "low" and series[i] <= min(seg):
-            points.append((i, series[i]))
-    return points
+    return find_swings(series, window=window, mode=mode)
 
 
 def _count_line_touches(points, slope, intercept, tol):
-    touches = 0
-    for idx, price in points:
-        if abs((slope * idx + intercept) - price) <= tol:
-            touches += 1
-    return touches
+    if not points:
+        return 0
+    idx, prices = zip(*points)
+    return count_line_touches(idx, prices, slope, intercept, tol)
+
+
+def build_pattern_fits(df, windows=(60, 80, 120)):
+    """构建多窗口共用的回归/摆动点缓存，供 detect_channel / wedge / triangle 共享"""
+    return TailWindowFits(df["high"].values, df["low"].values, df["volume"].values, windows)
+
+
+def _fits_for(df, windows, fits):
+    """复用调用方传入的 fits（窗口不同会按需补算），K 线数量不一致时报错"""
+    if fits is None:
+        return build_pattern_fits(df, windows)
+    if fits.n != len(df):
+        raise ValueError(f"pattern fits 基于 {fits.n} 根 K 线构建，与当前 {len(df)} 根不一致")
+    return fits
 
 
-def detect_channel(df, atr=None, windows=(60, 80, 120), r2_min=0.55):
+def detect_channel(df, atr=None, windows=(60, 80, 120), r2_min=0.55, fits=None):
     best = None
-    highs = df["high"].values
-    lows = df["low"].values
     curr = float(df["close"].iloc[-1])
     tol = max((atr or 0) * 0.5, curr * 0.003)
+    fits = _fits_for(df, windows, fits)
 
     for w in windows:
         if len(df) < w + 5:
             continue
-        h = highs[-w:]
-        l = lows[-w:]
-        slope_h, intercept_h, r2_h = _linear_regression(h)
-        slope_l, intercept_l, r2_l = _linear_regression(l)
+        slope_h, intercept_h, r2_h = fits.high_fit(w)
+        slope_l, intercept_l, r2_l = fits.low_fit(w)
         if min(r2_h, r2_l) < r2_min:
             continue
         slope_diff = abs(slope_h - slope_l)
@@ -410,10 +520,7 @@ def detect_channel(df, atr=None, windows=(60, 80, 120), r2_min=0.55):
         if width_avg < max((atr or 0) * 1.2, curr * 0.004):
             continue
 
-        high_swings = _find_swings(h, window=3, mode="high")
-        low_swings = _find_swings(l, window=3, mode="low")
-        hi_hits = _count_line_touches(high_swings, slope_h, intercept_h, tol)
-        lo_hits = _count_line_touches(low_swings, slope_l, intercept_l, tol)
+        hi_hits, lo_hits = fits.touches(w, slope_h, intercept_h, slope_l, intercept_l, tol)
         if hi_hits < 2 or lo_hits < 2:
             continue
 
@@ -428,21 +535,17 @@ def detect_channel(df, atr=None, windows=(60, 80, 120), r2_min=0.55):
     return best
 
 
-def detect_best_wedge(df, atr=None, windows=(60, 80, 120), r2_min=0.5):
+def detect_best_wedge(df, atr=None, windows=(60, 80, 120), r2_min=0.5, fits=None):
     best = None
-    highs = df["high"].values
-    lows = df["low"].values
     curr = float(df["close"].iloc[-1])
     tol = max((atr or 0) * 0.6, curr * 0.0035)
-    vols = df["volume"].values
+    fits = _fits_for(df, windows, fits)
 
     for w in windows:
         if len(df) < w + 5:
             continue
-        h = highs[-w:]
-        l = lows[-w:]
-        slope_h, intercept_h, r2_h = _linear_regression(h)
-        slope_l, intercept_l, r2_l = _linear_regression(l)
+        slope_h, intercept_h, r2_h = fits.high_fit(w)
+        slope_l, intercept_l, r2_l = fits.low_fit(w)
         if min(r2_h, r2_l) < r2_min:
             continue
         if slope_h == 0 or slope_l == 0:
@@ -456,12 +559,8 @@ def detect_best_wedge(df, atr=None, windows=(60, 80, 120), r2_min=0.5):
         if abs(slope_h - slope_l) < abs(slope_h) * 0.15:
             continue
 
-        vol_slope, _, _ = _linear_regression(vols[-w:])
-        vol_score = 1.0 if vol_slope < 0 else 0.4
-        high_swings = _find_swings(h, window=3, mode="high")
-        low_swings = _find_swings(l, window=3, mode="low")
-        hi_hits = _count_line_touches(high_swings, slope_h, intercept_h, tol)
-        lo_hits = _count_line_touches(low_swings, slope_l, intercept_l, tol)
+        vol_score = 1.0 if fits.vol_slope(w) < 0 else 0.4
+        hi_hits, lo_hits = fits.touches(w, slope_h, intercept_h, slope_l, intercept_l, tol)
         if hi_hits < 2 or lo_hits < 2:
             continue
 
@@ -476,21 +575,17 @@ def detect_best_wedge(df, atr=None, windows=(60, 80, 120), r2_min=0.5):
     return best
 
 
-def detect_best_triangle(df, atr=None, windows=(60, 80, 120), r2_min=0.5):
+def detect_best_triangle(df, atr=None, windows=(60, 80, 120), r2_min=0.5, fits=None):
     best = None
-    highs = df["high"].values
-    lows = df["low"].values
     curr = float(df["close"].iloc[-1])
     flat_thresh = max((atr or 0) * 0.15, curr * 0.0008)
-    vols = df["volume"].values
+    fits = _fits_for(df, windows, fits)
 
     for w in windows:
         if len(df) < w + 5:
             continue
-        h = highs[-w:]
-        l = lows[-w:]
-        slope_h, intercept_h, r2_h = _linear_regression(h)
-        slope_l, intercept_l, r2_l = _linear_regression(l)
+        slope_h, intercept_h, r2_h = fits.high_fit(w)
+        slope_l, intercept_l, r2_l = fits.low_fit(w)
         if min(r2_h, r2_l) < r2_min:
             continue
         width_start = intercept_h - intercept_l
@@ -509,8 +604,7 @@ def detect_best_triangle(df, atr=None, windows=(60, 80, 120), r2_min=0.5):
         else:
             continue
 
-        vol_slope, _, _ = _linear_regression(vols[-w:])
-        vol_score = 1.0 if vol_slope < 0 else 0.5
+        vol_score = 1.0 if fits.vol_slope(w) < 0 else 0.5
         score = min(r2_h, r2_l) * 0.6 + vol_score * 0.4
         best = {
             "type": t_type,
@@ -679,6 +773,139 @@ def _compress_levels(levels, min_gap, max_levels):
 
 # ==================== Core UI Components ====================
 
+_FONTS_CONFIGURED = False
+
+
+def ensure_chart_fonts():
+    """每个进程只扫描一次字体列表（渲染子进程在初始化时调用）"""
+    global _FONTS_CONFIGURED
+    if _FONTS_CONFIGURED:
+        return
+    configure_matplotlib_fonts([
+        'Microsoft YaHei',
+        'SimHei',
+        'WenQuanYi Micro Hei',
+        'Noto Sans CJK SC',
+        'Noto Sans CJK',
+        'Noto Sans',
+        'DejaVu Sans',
+        'Arial',
+    ])
+    _FONTS_CONFIGURED = True
+
+
+# 色图只构建一次
+_CMAP_BG = LinearSegmentedColormap.from_list('b', [COLORS['bg_top'], COLORS['bg_bot']])
+_CMAP_HEAT = LinearSegmentedColormap.from_list('h', [COLORS['bg_top'], COLORS['ai_accent'], COLORS['vwap']])
+_CHART_DPI = 120
+_FLOW_COLS = [0.05, 0.22, 0.40, 0.58, 0.76]
+
+
+def _rect_verts(x0, x1, y0, y1):
+    """批量矩形顶点 (n, 4, 2)，交给 PolyCollection 一次绘制"""
+    x0, x1, y0, y1 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (x0, x1, y0, y1)))
+    verts = np.empty(x0.shape + (4, 2))
+    verts[:, 0, 0] = x0; verts[:, 0, 1] = y0
+    verts[:, 1, 0] = x0; verts[:, 1, 1] = y1
+    verts[:, 2, 0] = x1; verts[:, 2, 1] = y1
+    verts[:, 3, 0] = x1; verts[:, 3, 1] = y0
+    return verts
+
+
+class _ChartTemplate:
+    """
+    可复用的图表模板（每个进程一份）
+    渐变背景、面板布局、信息/资金流面板底板和资金流表头只绘制一次并缓存像素；
+    每次出图先恢复缓存像素，再只绘制数据相关的 artist，最后直接编码画布像素
+    """
+
+    def __init__(self):
+        ensure_chart_fonts()
+        fig = Figure(figsize=(16, 10), dpi=_CHART_DPI)
+        FigureCanvasAgg(fig)
+
+        # Background Gradient
+        ax_bg = fig.add_axes([0,0,1,1], zorder=-10); ax_bg.axis('off')
+        ax_bg.imshow(np.linspace(0, 1, 256).reshape(-1, 1), cmap=_CMAP_BG, aspect='auto', extent=[0,1,0,1])
+
+        # Grid Layout (调整布局：减少右侧面板宽度，增加图表空间)
+        gs = fig.add_gridspec(2, 3, width_ratios=[0.02, 0.80, 0.18], height_ratios=[0.8, 0.2],
+                              wspace=0.04, hspace=0.05, left=0.02, right=0.98, top=0.95, bottom=0.04)
+        ax_heat, ax_main, ax_info, ax_flow = fig.add_subplot(gs[0,0]), fig.add_subplot(gs[0,1]), fig.add_subplot(gs[0,2]), fig.add_subplot(gs[1,:])
+        for a in [ax_heat, ax_main, ax_info, ax_flow]: a.axis('off')
+
+        static = [
+            ax_info.add_patch(mpatches.FancyBboxPatch((0,0), 1, 1, boxstyle="round,pad=0,rounding_size=0.04", fc=COLORS['panel'], alpha=0.7, transform=ax_info.transAxes)),
+            ax_flow.add_patch(mpatches.FancyBboxPatch((0,0), 1, 1, boxstyle="round,pad=0,rounding_size=0.04", fc=COLORS['panel'], alpha=0.7, transform=ax_flow.transAxes)),
+            ax_flow.text(0.02, 0.85, "资金流入/流出", color=COLORS['ai_accent'], fontsize=10, fontweight='bold', transform=ax_flow.transAxes),
+        ]
+        for i, h in enumerate(["周期", "流入", "流出", "净流", "强度"]):
+            static.append(ax_flow.text(_FLOW_COLS[i], 0.68, h, color=COLORS['text_dim'], fontsize=8, fontweight='bold', transform=ax_flow.transAxes))
+
+        fig.canvas.draw()
+        self.background = fig.canvas.copy_from_bbox(fig.bbox)
+        # 静态 artist 已在缓存像素里，之后不再重复绘制
+        for artist in static:
+            artist.set_visible(False)
+
+        self.fig = fig
+        self.axes = (ax_heat, ax_main, ax_info, ax_flow)
+        self._static_children = {a: set(a.get_children()) for a in self.axes}
+
+    def reset(self):
+        """移除上一次出图留下的数据 artist"""
+        for a in self.axes:
+            keep = self._static_children[a]
+            for artist in a.get_children():
+                if artist not in keep:
+                    artist.remove()
+            a.ignore_existing_data_limits = True
+
+    def render_png(self):
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        renderer = canvas.get_renderer()
+        for a in self.axes:
+            a.draw(renderer)
+        # 画面不透明，去掉 alpha 通道无损；压缩级别 3 比默认 6 编码快约四分之一，体积略大
+        width, height = canvas.get_width_height()
+        image = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+        buf = io.BytesIO()
+        image.save(buf, format='PNG', compress_level=3, dpi=(_CHART_DPI, _CHART_DPI))
+        return buf.getvalue()
+
+
+_TEMPLATE = None
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def _acquire_template():
+    """返回 (模板, 是否为共享模板)；共享模板正被其他线程占用时临时新建一份"""
+    global _TEMPLATE
+    if not _TEMPLATE_LOCK.acquire(blocking=False):
+        return _ChartTemplate(), False
+    try:
+        if _TEMPLATE is None:
+            _TEMPLATE = _ChartTemplate()
+        _TEMPLATE.reset()
+    except Exception:
+        _TEMPLATE = None
+        _TEMPLATE_LOCK.release()
+        raise
+    return _TEMPLATE, True
+
+
+def _release_template(shared):
+    if shared:
+        _TEMPLATE_LOCK.release()
+
+
+def warm_chart_template():
+    """提前构建本进程的图表模板（渲染子进程初始化时调用）"""
+    _, shared = _acquire_template()
+    _release_template(shared)
+
+
 def draw_glow_line(ax, x, y, color, lw=1.2, ls='-', label=None):
     """高级发光线条渲染"""
     ax.plot(x, y, color=color, lw=lw, ls=ls, alpha=0.9, zorder=5)
@@ -686,11 +913,59 @@ def draw_glow_line(ax, x, y, color, lw=1.2, ls='-', label=None):
     if label:
         ax.text(x[-1], y[-1], f" {label}", color=color, fontsize=8, fontweight='bold', va='center')
 
-def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool = True):
+def prepare_ai_overlay_analysis(symbol, interval='1h', limit=200, allow_ai_overlays: bool = True):
+    """
+    在调用方进程中获取 AI 画线分析，结果经 ai_analysis 参数传给 generate_chart_v10
+
+    LLM 调用可达 120s，不能放进受渲染截止时间限制的子进程。只在 AI 画线启用、
+    且未设置优先本地或本地算法画不出线时才调用；返回 None 表示只画本地辅助线。
+    """
+    if not allow_ai_overlays:
+        return None
+    try:
+        ai_config = get_ai_overlays_config()
+    except Exception:
+        return None
+    if not ai_config or not ai_config.get("enabled", False) or not ai_config.get("api_key"):
+        return None
+
+    base = symbol.upper().replace('$', '').replace('USDT', '').strip()
+    fs = f"{base}USDT"
+    df = _load_klines_df(fs, interval, limit, SOURCE_TIMEOUTS['klines'])
+    if df is None or df.empty:
+        return None
+    curr_p = df['close'].iloc[-1]
+    atr = (df['high'] - df['low']).rolling(14).mean().iloc[-1]
+    if ai_config.get("prefer_local", True):
+        local_lines = draw_auxiliary_lines_optimized(df, curr_p, atr, None)
+        if any(local_lines.get(key) for key in ("trendlines", "channels", "zones")):
+            return None
+
+    ob_raw = _req(f"{BINANCE_FUT_BASE}/fapi/v1/depth", {'symbol': fs, 'limit': 50}, None, SOURCE_TIMEOUTS['ob'])
+    ob = {
+        'bids': [[float(p), float(a)] for p, a in ob_raw['bids']],
+        'asks': [[float(p), float(a)] for p, a in ob_raw['asks']],
+    } if ob_raw else None
+    try:
+        language = os.getenv('VALUESCAN_LANGUAGE', 'zh').lower()
+        logger.info(f"Calling AI for market analysis of {symbol}...")
+        ai_analysis = get_ai_market_analysis(symbol, df, curr_p, ob, None, ai_config, language)
+        if ai_analysis:
+            logger.info(f"AI analysis completed for {symbol}")
+        return ai_analysis
+    except Exception as e:
+        logger.warning(f"AI market analysis failed: {e}")
+        return None
+
+
+def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool = True, ai_levels=None,
+                       ai_analysis=None):
+    """ai_analysis: 调用方用 prepare_ai_overlay_analysis 预先取好的 AI 画线分析（None 时只画本地辅助线）"""
     cl = ChartGenerationLogger(symbol); cl.log_start()
+    template = None
     try:
         # Step 1: Accurate Docking
-        data = get_integrated_data(symbol, interval)
+        data = get_integrated_data(symbol, interval, ai_levels=ai_levels)
         if not data: return None
         df = data.get('df')
         tick = data.get('tick')
@@ -708,28 +983,9 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
         df['ema50'] = df['close'].ewm(span=50).mean()
         df['vwap'] = ((df['high']+df['low']+df['close'])/3 * df['volume']).cumsum() / df['volume'].cumsum()
         
-        # Step 2: Workspace Setup
-        configure_matplotlib_fonts([
-            'Microsoft YaHei',
-            'SimHei',
-            'WenQuanYi Micro Hei',
-            'Noto Sans CJK SC',
-            'Noto Sans CJK',
-            'Noto Sans',
-            'DejaVu Sans',
-            'Arial',
-        ])
-        dpi = 120; fig = plt.figure(figsize=(16, 10), dpi=dpi)
-        
-        # Background Gradient
-        ax_bg = fig.add_axes([0,0,1,1], zorder=-10); ax_bg.axis('off')
-        ax_bg.imshow(np.linspace(0, 1, 256).reshape(-1, 1), cmap=LinearSegmentedColormap.from_list('b', [COLORS['bg_top'], COLORS['bg_bot']]), aspect='auto', extent=[0,1,0,1])
-
-        # Grid Layout (调整布局：减少右侧面板宽度，增加图表空间)
-        gs = fig.add_gridspec(2, 3, width_ratios=[0.02, 0.80, 0.18], height_ratios=[0.8, 0.2],
-                              wspace=0.04, hspace=0.05, left=0.02, right=0.98, top=0.95, bottom=0.04)
-        ax_heat, ax_main, ax_info, ax_flow = fig.add_subplot(gs[0,0]), fig.add_subplot(gs[0,1]), fig.add_subplot(gs[0,2]), fig.add_subplot(gs[1,:])
-        for a in [ax_heat, ax_main, ax_info, ax_flow]: a.axis('off')
+        # Step 2: Workspace Setup (复用模板：背景、布局和面板底板不再重建)
+        template, template_shared = _acquire_template()
+        ax_heat, ax_main, ax_info, ax_flow = template.axes
 
         p_min, p_max = df['low'].min() - atr, df['high'].max() + atr
         ax_main.set_ylim(p_min, p_max); ax_main.set_xlim(-5, len(df)+22)
@@ -738,9 +994,12 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
         # --- A. HEATMAP Strip (Price Density) ---
         bins = np.linspace(p_min, p_max, 100); h_v, _ = np.histogram(df['close'], bins=bins, weights=df['volume'])
         h_n = gaussian_filter1d(h_v/h_v.max(), 1.5)
-        cmap_h = LinearSegmentedColormap.from_list('h', [COLORS['bg_top'], COLORS['ai_accent'], COLORS['vwap']])
-        ax_heat.barh(bins[:-1], h_n, height=(bins[1]-bins[0]), color=[cmap_h(v) for v in h_n], edgecolor='none', alpha=0.8)
-        ax_heat.set_ylim(ax_main.get_ylim()); ax_heat.invert_xaxis()
+        bin_h = bins[1] - bins[0]
+        ax_heat.add_collection(PolyCollection(
+            _rect_verts(0.0, h_n, bins[:-1] - bin_h / 2, bins[:-1] + bin_h / 2),
+            facecolors=_CMAP_HEAT(h_n), edgecolors='none', alpha=0.8,
+        ))
+        ax_heat.set_ylim(ax_main.get_ylim()); ax_heat.set_xlim(h_n.max() * 1.05, 0)
 
         # --- B. AUXILIARY LINE SYSTEM (ValuScan + AI + LOCAL) ---
         # 优先级: ValuScan > AI > Local
@@ -768,7 +1027,7 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
                     sys.path.insert(0, base_dir)
                 from valuescan_api import get_main_force, get_hold_cost, get_keyword
 
-                keyword = get_keyword(clean_symbol)
+                keyword = get_keyword(clean_symbol, blocking=False)
                 if keyword:
                     mf = get_main_force(clean_symbol, VALUESCAN_KEY_LEVELS_DAYS)
                     hc = get_hold_cost(clean_symbol, VALUESCAN_KEY_LEVELS_DAYS)
@@ -995,7 +1254,6 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
             draw_key_line(r, COLORS['down'], "RES", source_display, strength)
 
         # 2. AI Market Analysis & Auxiliary Lines (New System)
-        ai_analysis = None
         try:
             # Always run local algorithm first for speed.
             auxiliary_lines = draw_auxiliary_lines_optimized(df, curr_p, atr, None)
@@ -1003,20 +1261,8 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
                 auxiliary_lines.get(key) for key in ("trendlines", "channels", "zones")
             )
 
-            if enable_ai_overlays and (not prefer_local_overlays or not has_local_lines):
-                try:
-                    ai_config = get_ai_overlays_config()
-                    if ai_config and ai_config.get('api_key'):
-                        language = os.getenv('VALUESCAN_LANGUAGE', 'zh').lower()
-                        logger.info(f"Calling AI for market analysis of {symbol}...")
-                        ai_analysis = get_ai_market_analysis(
-                            symbol, df, curr_p, ob, None, ai_config, language
-                        )
-                        if ai_analysis:
-                            logger.info(f"AI analysis completed for {symbol}")
-                            auxiliary_lines = draw_auxiliary_lines_optimized(df, curr_p, atr, ai_analysis)
-                except Exception as e:
-                    logger.warning(f"AI market analysis failed: {e}")
+            if enable_ai_overlays and ai_analysis and (not prefer_local_overlays or not has_local_lines):
+                auxiliary_lines = draw_auxiliary_lines_optimized(df, curr_p, atr, ai_analysis)
 
             # 绘制趋势线
             for trendline in auxiliary_lines.get('trendlines', []):
@@ -1180,7 +1426,7 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
         x = np.arange(len(df)); o, c, h, l = df['open'], df['close'], df['high'], df['low']
         col_c = np.where(c>=o, COLORS['up'], COLORS['down'])
         ax_main.add_collection(LineCollection(np.stack([np.column_stack([x,l]), np.column_stack([x,h])], axis=1), colors=col_c, lw=0.8))
-        verts = [[(i-0.35, min(o[i],c[i])), (i-0.35, max(o[i],c[i])), (i+0.35, max(o[i],c[i])), (i+0.35, min(o[i],c[i]))] for i in x]
+        verts = _rect_verts(x - 0.35, x + 0.35, np.minimum(o, c), np.maximum(o, c))
         ax_main.add_collection(PolyCollection(verts, facecolors=col_c, edgecolors=None, alpha=0.9))
         
         ax_main.plot(x, df['ema20'], color=COLORS['ema20'], lw=0.9, alpha=0.55)  # 降低
@@ -1199,7 +1445,6 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
         ax_main.text(len(df)+1, curr_p, f" {curr_p:.2f} ", color='white', fontsize=9, fontweight='bold', bbox=dict(fc=COLORS['ai_accent'], ec='none', pad=3))
 
         # --- D. METRIC DASHBOARD ---
-        ax_info.add_patch(mpatches.FancyBboxPatch((0,0), 1, 1, boxstyle="round,pad=0,rounding_size=0.04", fc=COLORS['panel'], alpha=0.7, transform=ax_info.transAxes))
         yp = 0.94
         def row(lbl, val, clr='white', mono=True):
             nonlocal yp
@@ -1244,11 +1489,8 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
         # 清算分析部分已删除，为图表腾出更多空间
 
         # --- E. CAPITAL FLOW ---
-        ax_flow.add_patch(mpatches.FancyBboxPatch((0,0), 1, 1, boxstyle="round,pad=0,rounding_size=0.04", fc=COLORS['panel'], alpha=0.7, transform=ax_flow.transAxes))
-        ax_flow.text(0.02, 0.85, "资金流入/流出", color=COLORS['ai_accent'], fontsize=10, fontweight='bold', transform=ax_flow.transAxes)
-        cols = [0.05, 0.22, 0.40, 0.58, 0.76]; hdrs = ["周期", "流入", "流出", "净流", "强度"]
-        for i, h in enumerate(hdrs): ax_flow.text(cols[i], 0.68, h, color=COLORS['text_dim'], fontsize=8, fontweight='bold', transform=ax_flow.transAxes)
-            
+        cols = _FLOW_COLS
+
         flow_periods = ['15m', '1h', '4h', '24h']
         f_data = {}
         flow_source = "Binance"
@@ -1297,13 +1539,14 @@ def generate_chart_v10(symbol, interval='1h', limit=200, allow_ai_overlays: bool
             ax_flow.add_patch(mpatches.Rectangle((bx+bw*r, ry), bw*(1-r), 0.03, fc=COLORS['down'], transform=ax_flow.transAxes, alpha=0.3))
             ry -= 0.14
 
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=dpi, facecolor=COLORS['bg_bot'], bbox_inches=None, pad_inches=0)
-        buf.seek(0); img_d = buf.read(); buf.close(); plt.close(fig)
+        img_d = template.render_png()
         cl.log_complete(len(img_d)); return img_d
 
     except Exception as e:
         cl.log_error(str(e), e); return None
+    finally:
+        if template is not None:
+            _release_template(template_shared)
 
 if __name__ == '__main__':
     test_symbol = 'BTC'
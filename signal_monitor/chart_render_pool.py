@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Pro 图表渲染进程池
+matplotlib 绘图和 PNG 编码都持有 GIL，线程并发等于串行：信号密集时第十张图要排队数分钟。
+
+- 预先启动 CHART_RENDER_WORKERS 个渲染子进程（spawn，不继承主进程的线程/锁），
+  每个子进程启动时只导入一次图表模块、配置一次字体并预建图表模板
+- 有界队列：正在渲染 + 排队的任务数超过 workers + CHART_RENDER_QUEUE_SIZE 时直接放弃该图表
+- 每个任务带截止时间（提交时刻 + CHART_RENDER_TIMEOUT_SECONDS），排队等待也计入；
+  截止时间由主进程执行：超时的渲染子进程直接终止并换一个新进程，卡死的任务不会长期占用工作进程
+- PNG 字节经子进程的管道返回
+- AI 主力位与 AI 画线分析（LLM 调用）在主进程取好后随任务传入，不占用子进程的渲染时限
+- 服务启动时调用 start_chart_render_pool() 预先拉起子进程
+- CHART_RENDER_WORKERS=0 时退回进程内串行渲染
+"""
+
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+try:
+    from logger import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+def _read_int_env_or_config(env_key: str, config_key: str, default: int) -> int:
+    raw = os.getenv(env_key)
+    if raw is not None and str(raw).strip() != "":
+        try:
+            return int(float(raw))
+        except Exception:
+            return default
+    try:
+        import config as signal_config
+        value = getattr(signal_config, config_key, None)
+        if value is None:
+            return default
+        return int(float(value))
+    except Exception:
+        return default
+
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 渲染子进程数，0 表示不使用进程池
+_RENDER_WORKERS = max(
+    _read_int_env_or_config(
+        "VALUESCAN_CHART_RENDER_WORKERS",
+        "CHART_RENDER_WORKERS",
+        min(4, os.cpu_count() or 1),
+    ),
+    0,
+)
+# 除正在渲染的任务外最多排队的任务数
+_RENDER_QUEUE_SIZE = max(
+    _read_int_env_or_config("VALUESCAN_CHART_RENDER_QUEUE_SIZE", "CHART_RENDER_QUEUE_SIZE", 16),
+    0,
+)
+# 单个任务从提交到完成的截止时间（秒）
+_RENDER_TIMEOUT_SECONDS = max(
+    _read_int_env_or_config("VALUESCAN_CHART_RENDER_TIMEOUT_SECONDS", "CHART_RENDER_TIMEOUT_SECONDS", 30),
+    1,
+)
+
+
+def _init_worker(base_dir: str) -> None:
+    """子进程初始化：无界面后端、导入图表模块、预建图表模板（每个进程只做一次）"""
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    os.environ["MPLBACKEND"] = "Agg"
+    # 主进程退出时 Ctrl+C 由主进程处理
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    except Exception:
+        pass
+    import matplotlib
+    matplotlib.use("Agg")
+    import chart_pro_v10
+    # 构建本进程的图表模板（配置字体并完整绘制一次静态层），避免第一条信号承担这部分耗时
+    chart_pro_v10.warm_chart_template()
+
+
+def _render_job(
+    symbol: str,
+    interval: str,
+    limit: int,
+    allow_ai_overlays: bool,
+    ai_levels: Optional[Dict[str, Any]],
+    ai_analysis: Optional[Dict[str, Any]] = None,
+) -> Optional[bytes]:
+    """在渲染子进程中执行"""
+    from chart_pro_v10 import generate_chart_v10
+
+    return generate_chart_v10(
+        symbol,
+        interval,
+        limit,
+        allow_ai_overlays=allow_ai_overlays,
+        ai_levels=ai_levels,
+        ai_analysis=ai_analysis,
+    )
+
+
+def _worker_main(conn, base_dir: str) -> None:
+    """渲染子进程主循环：逐个接收任务参数，回传 PNG 字节（失败为 None）；收到 None 时退出"""
+    _init_worker(base_dir)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        try:
+            result = _render_job(*job)
+        except Exception as exc:
+            logger.error(f"[ChartPool] 渲染任务异常: {exc}")
+            result = None
+        try:
+            conn.send(result)
+        except (EOFError, OSError):
+            return
+
+
+class _RenderWorker:
+    """一个渲染子进程及其管道（同一时刻只被一个调用线程使用）"""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, _BASE_DIR),
+            name="ChartRenderWorker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(1.0)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class ChartRenderPool:
+    """渲染进程池；render() 在调用线程中阻塞直到拿到 PNG 或超过截止时间"""
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = max(1, int(workers))
+        self.timeout = float(timeout)
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, int(queue_size)))
+        self._lock = threading.Lock()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_RenderWorker]" = queue.Queue()
+        self._all: List[_RenderWorker] = []
+        self._started = False
+        self.replaced = 0
+
+    def _spawn(self) -> _RenderWorker:
+        worker = _RenderWorker(self._ctx)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _replace(self, worker: _RenderWorker) -> None:
+        """终止出问题的子进程并补一个新进程（新进程在后台完成导入，首个任务在管道中等待）"""
+        worker.kill()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+            started = self._started
+            self.replaced += 1
+        if started:
+            self._idle.put(self._spawn())
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        # spawn 模式下子进程启动时完成导入和模板预建
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+        logger.info(f"[ChartPool] 启动 {self.workers} 个渲染进程")
+
+    def render(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        limit: int = 200,
+        allow_ai_overlays: bool = True,
+        ai_levels: Optional[Dict[str, Any]] = None,
+        ai_analysis: Optional[Dict[str, Any]] = None,
+    ) -> Optional[bytes]:
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"[ChartPool] 渲染队列已满，跳过图表: ${symbol}")
+            return None
+        try:
+            deadline = time.monotonic() + self.timeout
+            self.start()
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                logger.warning(f"[ChartPool] ${symbol} 排队超过截止时间，跳过渲染")
+                return None
+            return self._run(worker, deadline, symbol,
+                             (symbol, interval, limit, allow_ai_overlays, ai_levels, ai_analysis))
+        finally:
+            self._slots.release()
+
+    def _run(self, worker: _RenderWorker, deadline: float, symbol: str, job: tuple) -> Optional[bytes]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._idle.put(worker)
+            logger.warning(f"[ChartPool] ${symbol} 排队超过截止时间，跳过渲染")
+            return None
+        try:
+            worker.conn.send(job)
+            if not worker.conn.poll(remaining):
+                logger.error(f"[ChartPool] ${symbol} 渲染超时 ({self.timeout:.0f}s)，终止渲染进程")
+                self._replace(worker)
+                return None
+            result = worker.conn.recv()
+        except (EOFError, OSError) as exc:
+            logger.error(f"[ChartPool] 渲染进程异常退出，重启: {exc}")
+            self._replace(worker)
+            return None
+        self._idle.put(worker)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._started = False
+            workers, self._all = self._all, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.stop()
+
+
+_POOL: Optional[ChartRenderPool] = None
+_POOL_LOCK = threading.Lock()
+_INPROCESS_LOCK = threading.Lock()
+
+
+def get_chart_render_pool() -> Optional[ChartRenderPool]:
+    """CHART_RENDER_WORKERS=0 时返回 None"""
+    global _POOL
+    if _RENDER_WORKERS <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ChartRenderPool(_RENDER_WORKERS, _RENDER_QUEUE_SIZE, _RENDER_TIMEOUT_SECONDS)
+        return _POOL
+
+
+def start_chart_render_pool() -> None:
+    """服务启动时预先拉起渲染子进程（Pro 图表关闭或 CHART_RENDER_WORKERS=0 时不启动）"""
+    try:
+        import config as signal_config
+        if not getattr(signal_config, "ENABLE_PRO_CHART", True):
+            return
+    except Exception:
+        pass
+    pool = get_chart_render_pool()
+    if pool is not None:
+        pool.start()
+
+
+def render_chart(
+    symbol: str,
+    interval: str = "1h",
+    limit: int = 200,
+    allow_ai_overlays: bool = True,
+) -> Optional[bytes]:
+    """渲染 Pro 图表，返回 PNG 字节；失败/超时/队列已满返回 None"""
+    base = symbol.upper().replace("$", "").replace("USDT", "").strip()
+    try:
+        from ai_key_levels_cache import get_levels
+        ai_levels = get_levels(base)
+    except Exception:
+        ai_levels = None
+
+    from chart_pro_v10 import generate_chart_v10, prepare_ai_overlay_analysis
+    # LLM 调用耗时可能超过渲染时限，在主进程完成后再提交渲染
+    ai_analysis = prepare_ai_overlay_analysis(symbol, interval, limit, allow_ai_overlays=allow_ai_overlays)
+
+    pool = get_chart_render_pool()
+    if pool is not None:
+        return pool.render(
+            symbol, interval, limit,
+            allow_ai_overlays=allow_ai_overlays, ai_levels=ai_levels, ai_analysis=ai_analysis,
+        )
+
+    with _INPROCESS_LOCK:
+        return generate_chart_v10(
+            symbol, interval, limit,
+            allow_ai_overlays=allow_ai_overlays, ai_levels=ai_levels, ai_analysis=ai_analysis,
+        )
@@ -7,6 +7,7 @@ import time
 import requests
 from functools import wraps
 from logger import logger
+from market_data_cache import cached_json
 
 # ==================== API配置 ====================
 ETHERSCAN_API_KEY = "HDEJ9NFX5BN63E9CPAZ16QJJJDE5X91W75"
@@ -80,15 +81,19 @@ class BinanceProvider:
         self.session = get_session_with_retry()
         self.proxies = get_proxies()
 
+    def _get_json(self, url, params):
+        """GET 请求，非 200 返回 None；行情数据走进程内共享缓存"""
+        def _fetch():
+            response = self.session.get(url, params=params, proxies=self.proxies, timeout=10)
+            return response.json() if response.status_code == 200 else None
+        return cached_json(url, params, _fetch)
+
     @rate_limit(calls_per_minute=1000)  # 保守限制
     def get_ticker(self, symbol):
         """获取24h行情"""
         try:
             url = f"{self.BASE_URL}/api/v3/ticker/24hr"
-            response = self.session.get(url, params={'symbol': symbol},
-                                       proxies=self.proxies, timeout=10)
-            if response.status_code == 200:
-                return response.json()
+            return self._get_json(url, {'symbol': symbol})
         except Exception as e:
             logger.warning(f"Binance ticker获取失败: {e}")
         return None
@@ -98,11 +103,7 @@ class BinanceProvider:
         """获取K线数据"""
         try:
             url = f"{self.BASE_URL}/api/v3/klines"
-            response = self.session.get(url, params={
-                'symbol': symbol, 'interval': interval, 'limit': limit
-            }, proxies=self.proxies, timeout=10)
-            if response.status_code == 200:
-                return response.json()
+            return self._get_json(url, {'symbol': symbol, 'interval': interval, 'limit': limit})
         except Exception as e:
             logger.warning(f"Binance K线获取失败: {e}")
         return None
@@ -112,11 +113,7 @@ class BinanceProvider:
         """获取订单簿深度"""
         try:
             url = f"{self.BASE_URL}/api/v3/depth"
-            response = self.session.get(url, params={
-                'symbol': symbol, 'limit': limit
-            }, proxies=self.proxies, timeout=10)
-            if response.status_code == 200:
-                return response.json()
+            return self._get_json(url, {'symbol': symbol, 'limit': limit})
         except Exception as e:
             logger.warning(f"Binance 订单簿获取失败: {e}")
         return None
@@ -126,11 +123,8 @@ class BinanceProvider:
         """获取资金费率（合约）"""
         try:
             url = f"{self.FUTURES_URL}/fapi/v1/fundingRate"
-            response = self.session.get(url, params={'symbol': symbol, 'limit': 1},
-                                       proxies=self.proxies, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return data[0] if data else None
+            data = self._get_json(url, {'symbol': symbol, 'limit': 1})
+            return data[0] if data else None
         except Exception as e:
             logger.warning(f"Binance 资金费率获取失败: {e}")
         return None
@@ -140,10 +134,7 @@ class BinanceProvider:
         """获取持仓量（合约）"""
         try:
             url = f"{self.FUTURES_URL}/fapi/v1/openInterest"
-            response = self.session.get(url, params={'symbol': symbol},
-                                       proxies=self.proxies, timeout=10)
-            if response.status_code == 200:
-                return response.json()
+            return self._get_json(url, {'symbol': symbol})
         except Exception as e:
             logger.warning(f"Binance 持仓量获取失败: {e}")
         return None
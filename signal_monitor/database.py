@@ -1,25 +1,46 @@
 """
 数据库模块
 使用 SQLite 存储已处理的消息 ID，防止重复发送
+
+- WAL 模式 + 内存 LRU 缓存最近已处理的 ID，常见的重复检查不访问磁盘
+- get_processed_ids() 一次查询整批 ID
+- add_message() 默认立即提交；defer=True（或 write_behind=True）时写入待写队列，
+  flush() 时在一个事务中批量落盘，仅用于丢失后无副作用的记录
+- ID 缓存在第一次查询时才预热，只做统计/读取的实例不加载
 """
 
+import atexit
 import sqlite3
 import os
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional, Set
 from logger import logger
 
+# SQLite 单条语句的参数上限（旧版本为 999）
+_SQLITE_MAX_VARS = 900
+
 
 class MessageDatabase:
     """消息数据库管理类"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        write_behind: bool = False,
+        cache_size: int = 50000,
+        flush_batch_size: int = 200,
+    ):
         """
         初始化数据库连接
         
         Args:
             db_path: 数据库文件路径
+            write_behind: 是否对所有 add_message() 启用批量延迟写入（需调用 flush() 落盘）
+            cache_size: 内存中缓存的最近已处理消息 ID 数量
+            flush_batch_size: 待写队列达到该数量时自动落盘
         """
         self.db_path = db_path or self._get_default_db_path()
         try:
@@ -28,6 +49,13 @@ class MessageDatabase:
             pass
         self.conn = None
         self.cursor = None
+        self.write_behind = write_behind
+        self.cache_size = max(0, int(cache_size))
+        self.flush_batch_size = max(1, int(flush_batch_size))
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._pending = OrderedDict()
+        self._cache_warmed = False
+        self._lock = threading.RLock()
         self._init_database()
 
     @staticmethod
@@ -46,6 +74,13 @@ class MessageDatabase:
             self.conn = sqlite3.connect(self.db_path)
             self.cursor = self.conn.cursor()
             
+            # WAL: 读写互不阻塞，批量提交时 fsync 次数更少
+            try:
+                self.cursor.execute('PRAGMA journal_mode=WAL')
+                self.cursor.execute('PRAGMA synchronous=NORMAL')
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ 启用 WAL 模式失败: {e}")
+            
             # 创建消息记录表
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS processed_messages (
@@ -77,6 +112,16 @@ class MessageDatabase:
                 ON processed_messages(processed_time)
             ''')
             
+            # 轮询水位表：记录每个信号源已处理到的最新 createTime
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS poll_watermarks (
+                    source TEXT PRIMARY KEY,
+                    created_time INTEGER,
+                    message_id TEXT,
+                    updated_time INTEGER
+                )
+            ''')
+            
             self.conn.commit()
             
             # 获取数据库中已有的记录数
@@ -88,6 +133,45 @@ class MessageDatabase:
             logger.error(f"❌ 数据库初始化失败: {e}")
             raise
     
+    def _warm_cache(self):
+        """第一次查询时把最近处理过的消息 ID 载入内存缓存"""
+        if self._cache_warmed:
+            return
+        self._cache_warmed = True
+        if not self.cache_size:
+            return
+        try:
+            self.cursor.execute(
+                'SELECT message_id FROM processed_messages ORDER BY processed_time DESC LIMIT ?',
+                (self.cache_size,)
+            )
+            for (message_id,) in reversed(self.cursor.fetchall()):
+                self._remember(message_id)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 预热消息 ID 缓存失败: {e}")
+    
+    def _reset_cache(self):
+        """删除记录后清空 ID 缓存，下次查询时重新预热"""
+        with self._lock:
+            self._recent_ids.clear()
+            self._cache_warmed = False
+    
+    def _remember(self, message_id):
+        if not self.cache_size:
+            return
+        self._recent_ids[message_id] = None
+        self._recent_ids.move_to_end(message_id)
+        while len(self._recent_ids) > self.cache_size:
+            self._recent_ids.popitem(last=False)
+    
+    def _is_known(self, message_id):
+        if message_id in self._pending:
+            return True
+        if message_id in self._recent_ids:
+            self._recent_ids.move_to_end(message_id)
+            return True
+        return False
+    
     def is_processed(self, message_id):
         """
         检查消息 ID 是否已处理过
@@ -98,21 +182,55 @@ class MessageDatabase:
         Returns:
             bool: True 表示已处理过，False 表示未处理
         """
-        try:
-            self.cursor.execute(
-                'SELECT message_id FROM processed_messages WHERE message_id = ?',
-                (str(message_id),)
-            )
-            result = self.cursor.fetchone()
-            return result is not None
-        except sqlite3.Error as e:
-            logger.error(f"❌ 查询消息 ID 失败: {e}")
-            return False
+        return str(message_id) in self.get_processed_ids([message_id])
     
-    def add_message(self, message_id, message_type=None, symbol=None, title=None, created_time=None, content=None):
+    def get_processed_ids(self, message_ids: Iterable) -> Set[str]:
+        """
+        批量检查消息 ID，缓存未命中的部分合并为一次查询
+        
+        Args:
+            message_ids: 消息 ID 列表
+        
+        Returns:
+            set: 其中已处理过的消息 ID（字符串）
+        """
+        with self._lock:
+            self._warm_cache()
+            found = set()
+            missing = []
+            for message_id in message_ids:
+                message_id = str(message_id)
+                if self._is_known(message_id):
+                    found.add(message_id)
+                else:
+                    missing.append(message_id)
+            if not missing:
+                return found
+            
+            missing = list(dict.fromkeys(missing))
+            try:
+                for start in range(0, len(missing), _SQLITE_MAX_VARS):
+                    chunk = missing[start:start + _SQLITE_MAX_VARS]
+                    placeholders = ','.join('?' * len(chunk))
+                    self.cursor.execute(
+                        f'SELECT message_id FROM processed_messages WHERE message_id IN ({placeholders})',
+                        chunk
+                    )
+                    for (message_id,) in self.cursor.fetchall():
+                        found.add(message_id)
+                        self._remember(message_id)
+            except sqlite3.Error as e:
+                logger.error(f"❌ 查询消息 ID 失败: {e}")
+            return found
+    
+    def add_message(self, message_id, message_type=None, symbol=None, title=None, created_time=None, content=None,
+                    defer=False):
         """
         添加消息到数据库
         
+        默认提交后才返回；defer=True 或启用 write_behind 时只写入待写队列，由 flush() 批量提交，
+        进程在 flush() 前退出会丢失这些记录，已发送消息的去重记录不要使用。
+        
         Args:
             message_id: 消息 ID
             message_type: 消息类型代码
@@ -120,39 +238,122 @@ class MessageDatabase:
             title: 消息标题
             created_time: 消息创建时间（毫秒时间戳）
             content: 消息内容
+            defer: 是否写入待写队列延迟落盘
         
         Returns:
             bool: 添加成功返回 True，失败或已存在返回 False
         """
-        # 先检查是否已存在
-        if self.is_processed(message_id):
-            return False
-        
-        try:
-            current_time = int(time.time())
+        message_id = str(message_id)
+        with self._lock:
+            # 先检查是否已存在
+            if self.is_processed(message_id):
+                return False
             
-            self.cursor.execute('''
-                INSERT INTO processed_messages 
-                (message_id, message_type, symbol, title, processed_time, created_time, content)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                str(message_id),
+            row = (
+                message_id,
                 message_type,
                 symbol,
                 title,
-                current_time,
+                int(time.time()),
                 created_time,
                 content
-            ))
+            )
             
-            self.conn.commit()
-            return True
+            if defer or self.write_behind:
+                self._pending[message_id] = row
+                self._remember(message_id)
+                if len(self._pending) >= self.flush_batch_size:
+                    self.flush()
+                return True
             
-        except sqlite3.IntegrityError:
-            # 主键冲突，消息已存在
+            try:
+                self.cursor.execute('''
+                    INSERT INTO processed_messages 
+                    (message_id, message_type, symbol, title, processed_time, created_time, content)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', row)
+                
+                self.conn.commit()
+                self._remember(message_id)
+                return True
+                
+            except sqlite3.IntegrityError:
+                # 主键冲突，消息已存在
+                return False
+            except sqlite3.Error as e:
+                logger.error(f"❌ 添加消息到数据库失败: {e}")
+                return False
+    
+    def flush(self):
+        """
+        将待写队列在一个事务中写入数据库
+        
+        Returns:
+            int: 写入的消息数量
+        """
+        with self._lock:
+            if not self._pending or self.conn is None:
+                return 0
+            rows = list(self._pending.values())
+            try:
+                with self.conn:
+                    self.conn.executemany('''
+                        INSERT OR IGNORE INTO processed_messages 
+                        (message_id, message_type, symbol, title, processed_time, created_time, content)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                self._pending.clear()
+                return len(rows)
+            except sqlite3.Error as e:
+                # 保留待写队列，下次 flush 重试
+                logger.error(f"❌ 批量写入消息失败 ({len(rows)} 条): {e}")
+                return 0
+    
+    def get_watermarks(self):
+        """
+        获取所有信号源的轮询水位
+        
+        Returns:
+            dict: {source: created_time}
+        """
+        try:
+            self.cursor.execute('SELECT source, created_time FROM poll_watermarks')
+            return {row[0]: int(row[1] or 0) for row in self.cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"❌ 获取轮询水位失败: {e}")
+            return {}
+    
+    def set_watermark(self, source, created_time, message_id=None):
+        """
+        更新信号源的轮询水位
+        
+        Args:
+            source: 信号源名称
+            created_time: 已处理到的最新消息创建时间
+            message_id: 该消息 ID（仅用于排查）
+        
+        Returns:
+            bool: 更新成功返回 True
+        """
+        # 水位不能领先于尚未落盘的消息记录
+        self.flush()
+        if self._pending:
             return False
+        try:
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO poll_watermarks
+                (source, created_time, message_id, updated_time)
+                VALUES (?, ?, ?, ?)
+            ''', (
+                str(source),
+                int(created_time),
+                str(message_id) if message_id is not None else None,
+                int(time.time())
+            ))
+            self.conn.commit()
+            return True
         except sqlite3.Error as e:
-            logger.error(f"❌ 添加消息到数据库失败: {e}")
+            logger.error(f"❌ 更新轮询水位失败: {e}")
             return False
     
     def get_total_count(self):
@@ -162,6 +363,7 @@ class MessageDatabase:
         Returns:
             int: 消息总数
         """
+        self.flush()
         try:
             self.cursor.execute('SELECT COUNT(*) FROM processed_messages')
             result = self.cursor.fetchone()
@@ -180,6 +382,7 @@ class MessageDatabase:
         Returns:
             list: 消息列表
         """
+        self.flush()
         try:
             self.cursor.execute('''
                 SELECT message_id, message_type, symbol, title, 
@@ -205,6 +408,7 @@ class MessageDatabase:
         Returns:
             list: 消息字典列表
         """
+        self.flush()
         try:
             if since_timestamp_ms:
                 self.cursor.execute('''
@@ -251,6 +455,7 @@ class MessageDatabase:
         Returns:
             int: 删除的消息数量
         """
+        self.flush()
         try:
             cutoff_time = int(time.time()) - (days * 24 * 3600)
             
@@ -263,6 +468,7 @@ class MessageDatabase:
             self.conn.commit()
             
             if deleted_count > 0:
+                self._reset_cache()
                 logger.info(f"🗑️ 已清理 {deleted_count} 条超过 {days} 天的旧消息")
             
             return deleted_count
@@ -271,6 +477,25 @@ class MessageDatabase:
             logger.error(f"❌ 清理旧消息失败: {e}")
             return 0
     
+    def clear_all(self):
+        """
+        删除所有消息记录（包括待写队列和 ID 缓存）
+        
+        Returns:
+            int: 删除的消息数量
+        """
+        with self._lock:
+            self._pending.clear()
+            try:
+                self.cursor.execute('DELETE FROM processed_messages')
+                deleted_count = self.cursor.rowcount
+                self.conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"❌ 清空消息记录失败: {e}")
+                return 0
+            self._reset_cache()
+            return deleted_count
+    
     def get_statistics(self):
         """
         获取数据库统计信息
@@ -311,7 +536,9 @@ class MessageDatabase:
     def close(self):
         """关闭数据库连接"""
         if self.conn:
+            self.flush()
             self.conn.close()
+            self.conn = None
             logger.info("数据库连接已关闭")
     
     def __enter__(self):
@@ -337,6 +564,7 @@ def get_database():
     global _db_instance
     if _db_instance is None:
         _db_instance = MessageDatabase()
+        atexit.register(_db_instance.flush)
     return _db_instance
 
 
@@ -354,7 +582,8 @@ def is_message_processed(message_id):
     return db.is_processed(message_id)
 
 
-def mark_message_processed(message_id, message_type=None, symbol=None, title=None, created_time=None, content=None):
+def mark_message_processed(message_id, message_type=None, symbol=None, title=None, created_time=None, content=None,
+                           defer=False):
     """
     快捷函数：标记消息为已处理
     
@@ -365,12 +594,38 @@ def mark_message_processed(message_id, message_type=None, symbol=None, title=Non
         title: 消息标题
         created_time: 创建时间
         content: 消息内容
+        defer: 是否延迟到 flush_processed_messages() 时落盘
     
     Returns:
         bool: 成功返回 True
     """
     db = get_database()
-    return db.add_message(message_id, message_type, symbol, title, created_time, content)
+    return db.add_message(message_id, message_type, symbol, title, created_time, content, defer=defer)
+
+
+def get_processed_message_ids(message_ids):
+    """
+    快捷函数：批量检查消息是否已处理
+    
+    Args:
+        message_ids: 消息 ID 列表
+    
+    Returns:
+        set: 已处理的消息 ID
+    """
+    db = get_database()
+    return db.get_processed_ids(message_ids)
+
+
+def flush_processed_messages():
+    """
+    快捷函数：将待写入的已处理消息批量落盘
+    
+    Returns:
+        int: 写入的消息数量
+    """
+    db = get_database()
+    return db.flush()
 
 
 # Legacy alias for older imports.
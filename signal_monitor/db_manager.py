@@ -106,9 +106,8 @@ def clear_all_data():
     
     db = MessageDatabase()
     try:
-        db.cursor.execute('DELETE FROM processed_messages')
-        db.conn.commit()
-        logger.info("✅ 数据库已清空")
+        deleted = db.clear_all()
+        logger.info(f"✅ 数据库已清空 ({deleted} 条)")
     except Exception as e:
         logger.error(f"❌ 清空数据库失败: {e}")
     finally:
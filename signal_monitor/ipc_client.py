@@ -1,12 +1,23 @@
 """
 本地 IPC 客户端
 负责将 ValueScan 捕获的信号转发到交易模块
+
+默认通过一条长连接（TCP 或 Unix 域套接字）按批发送，桥接端收到整批后回复 ack；
+待发送信号先写入磁盘发件箱（SQLite），桥接/交易进程重启期间的信号在重连后补发。
+每条载荷写入发件箱时分配持久的 ipc_id，重发时不变，桥接端据此去重；
+超过 IPC_OUTBOX_MAX_AGE 仍未送达的信号直接丢弃，不在交易进程恢复后补发过期信号。
 """
 
+import atexit
 import json
+import os
 import socket
+import sqlite3
+import threading
 import time
-from typing import Any, Dict, Optional
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from .logger import logger
@@ -18,6 +29,8 @@ try:
         IPC_RETRY_DELAY,
         IPC_MAX_RETRIES,
     )
+    from . import config as _ipc_config
+    from .ipc_protocol import HANDSHAKE, encode_frame, read_frame
 except ImportError:  # 兼容脚本执行
     from logger import logger
     from config import (
@@ -28,6 +41,20 @@ except ImportError:  # 兼容脚本执行
         IPC_RETRY_DELAY,
         IPC_MAX_RETRIES,
     )
+    import config as _ipc_config
+    from ipc_protocol import HANDSHAKE, encode_frame, read_frame
+
+# 长连接 + 发件箱（VALUESCAN_IPC_PERSISTENT=0 可回退为每条信号一次短连接）
+IPC_PERSISTENT_CHANNEL = bool(getattr(_ipc_config, "IPC_PERSISTENT_CHANNEL", True))
+_env_persistent = os.getenv("VALUESCAN_IPC_PERSISTENT")
+if _env_persistent is not None:
+    IPC_PERSISTENT_CHANNEL = _env_persistent != "0"
+IPC_UNIX_SOCKET = os.getenv("VALUESCAN_IPC_UNIX_SOCKET") or getattr(_ipc_config, "IPC_UNIX_SOCKET", None)
+IPC_BATCH_SIZE = int(getattr(_ipc_config, "IPC_BATCH_SIZE", 50))
+IPC_BATCH_LINGER_MS = int(getattr(_ipc_config, "IPC_BATCH_LINGER_MS", 20))
+IPC_ACK_TIMEOUT = float(getattr(_ipc_config, "IPC_ACK_TIMEOUT", 30))
+IPC_OUTBOX_PATH = os.getenv("VALUESCAN_IPC_OUTBOX_PATH") or getattr(_ipc_config, "IPC_OUTBOX_PATH", None)
+IPC_OUTBOX_MAX_AGE = float(getattr(_ipc_config, "IPC_OUTBOX_MAX_AGE", 120))
 
 # 支持的交易信号类型
 FORWARD_TYPES = {110, 112, 113}
@@ -90,6 +117,261 @@ def _send_payload(payload: Dict[str, Any]) -> bool:
     return False
 
 
+class IPCChannel:
+    """
+    持久化 IPC 通道
+
+    enqueue() 只写发件箱并唤醒发送线程；发送线程维持一条长连接，
+    把发件箱中的信号按批发送，收到 ack 后才从发件箱删除；
+    写入超过 max_age 秒仍未送达的信号在发送前丢弃（0 表示不过期）。
+    """
+
+    def __init__(
+        self,
+        host: str = IPC_HOST,
+        port: int = IPC_PORT,
+        unix_socket: Optional[str] = None,
+        outbox_path: Optional[str] = None,
+        batch_size: int = 50,
+        linger: float = 0.02,
+        ack_timeout: float = 30.0,
+        connect_timeout: float = IPC_CONNECT_TIMEOUT,
+        retry_delay: float = IPC_RETRY_DELAY,
+        max_age: float = 120.0,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.outbox_path = outbox_path or self._get_default_outbox_path()
+        self.batch_size = max(1, int(batch_size))
+        self.linger = max(0.0, float(linger))
+        self.ack_timeout = float(ack_timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.retry_delay = max(0.1, float(retry_delay))
+        self.max_age = max(0.0, float(max_age or 0))
+
+        Path(self.outbox_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.outbox_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+        self._sock: Optional[socket.socket] = None
+        self._seq = 0
+        self._wakeup = threading.Event()
+        self._drained = threading.Condition()
+        self._stopped = threading.Event()
+        self._last_error_log = 0.0
+
+        pending = self.pending_count()
+        if pending:
+            logger.info("📮 IPC 发件箱中有 %s 条待补发信号", pending)
+
+        self._thread = threading.Thread(target=self._run, name="ipc-sender", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _get_default_outbox_path() -> str:
+        repo_root = Path(__file__).resolve().parent.parent
+        return str(repo_root / "data" / "ipc_outbox.db")
+
+    # ------------------------------------------------------------------ 发件箱
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        """写入发件箱并唤醒发送线程，返回是否已持久化"""
+        if not payload.get("ipc_id"):
+            payload = dict(payload, ipc_id=uuid.uuid4().hex)
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT INTO outbox (payload, created_at) VALUES (?, ?)",
+                    (json.dumps(payload, ensure_ascii=False), time.time()),
+                )
+                self._db.commit()
+        except sqlite3.Error as exc:
+            logger.error("IPC 发件箱写入失败: %s", exc)
+            return False
+        self._wakeup.set()
+        return True
+
+    def pending_count(self) -> int:
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _expire(self):
+        """删除超过 max_age 的信号（交易进程长时间不可用时不补发过期信号）"""
+        if not self.max_age:
+            return
+        with self._db_lock:
+            cursor = self._db.execute(
+                "DELETE FROM outbox WHERE created_at < ?", (time.time() - self.max_age,)
+            )
+            self._db.commit()
+        if cursor.rowcount:
+            logger.warning("⌛ IPC 发件箱丢弃 %s 条超过 %.0fs 未送达的过期信号", cursor.rowcount, self.max_age)
+
+    def _next_batch(self) -> List[Tuple[int, Dict[str, Any]]]:
+        self._expire()
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (self.batch_size,)
+            ).fetchall()
+        batch = []
+        for row_id, raw in rows:
+            try:
+                batch.append((row_id, json.loads(raw)))
+            except ValueError:
+                self._delete([row_id])
+        return batch
+
+    def _delete(self, ids: List[int]):
+        with self._db_lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待发件箱清空（用于退出前），返回是否已全部送达"""
+        deadline = time.monotonic() + timeout
+        self._wakeup.set()
+        with self._drained:
+            while self.pending_count():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._drained.wait(min(remaining, 0.5))
+        return True
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=2)
+        self._disconnect()
+        with self._db_lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------ 连接
+
+    def _connect(self) -> socket.socket:
+        if self.unix_socket and hasattr(socket, "AF_UNIX"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.unix_socket)
+        else:
+            sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(HANDSHAKE)
+        return sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _send_batch(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        if self._sock is None:
+            self._sock = self._connect()
+            logger.info("🔌 IPC 长连接已建立: %s", self.unix_socket or f"{self.host}:{self.port}")
+        self._seq += 1
+        seq = self._seq
+        self._sock.settimeout(self.ack_timeout)
+        self._sock.sendall(encode_frame({"op": "batch", "seq": seq, "items": [p for _, p in batch]}))
+        reply = read_frame(self._sock)
+        if not reply or reply.get("op") != "ack" or reply.get("seq") != seq:
+            raise ConnectionError(f"IPC ack 异常: {reply}")
+
+    # ------------------------------------------------------------------ 发送线程
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if not batch:
+                with self._drained:
+                    self._drained.notify_all()
+                self._wakeup.wait(1.0)
+                if self._wakeup.is_set() and self.linger:
+                    time.sleep(self.linger)  # 等同一轮轮询的其它信号一起成批
+                self._wakeup.clear()
+                continue
+
+            try:
+                self._send_batch(batch)
+            except (OSError, ValueError, ConnectionError) as exc:
+                self._disconnect()
+                now = time.monotonic()
+                if now - self._last_error_log >= 30:
+                    logger.warning(
+                        "IPC 发送失败，%s 条信号保留在发件箱等待重试: %s", self.pending_count(), exc
+                    )
+                    self._last_error_log = now
+                self._stopped.wait(self.retry_delay)
+                continue
+
+            self._delete([row_id for row_id, _ in batch])
+            for _, payload in batch:
+                logger.info(
+                    "📡 IPC 已转发信号: type=%s id=%s symbol_hint=%s",
+                    payload.get("message_type"),
+                    payload.get("message_id"),
+                    payload.get("symbol_hint") or payload.get("symbol"),
+                )
+
+
+_channel: Optional[IPCChannel] = None
+_channel_lock = threading.Lock()
+
+
+def get_ipc_channel() -> IPCChannel:
+    """获取全局 IPC 通道实例（单例模式）"""
+    global _channel
+    if _channel is None:
+        with _channel_lock:
+            if _channel is None:
+                _channel = IPCChannel(
+                    unix_socket=IPC_UNIX_SOCKET,
+                    outbox_path=IPC_OUTBOX_PATH,
+                    batch_size=IPC_BATCH_SIZE,
+                    linger=IPC_BATCH_LINGER_MS / 1000.0,
+                    ack_timeout=IPC_ACK_TIMEOUT,
+                    max_age=IPC_OUTBOX_MAX_AGE,
+                )
+                atexit.register(_close_channel)
+    return _channel
+
+
+def _close_channel():
+    if _channel is not None:
+        _channel.flush(timeout=2.0)
+        _channel.close()
+
+
+def send_payload(payload: Dict[str, Any]) -> bool:
+    """
+    发送一条 IPC 载荷：启用长连接时写入发件箱异步送达，否则短连接同步发送
+
+    Returns:
+        bool: 是否已送达（长连接模式下为是否已写入发件箱）
+    """
+    if IPC_PERSISTENT_CHANNEL:
+        try:
+            if get_ipc_channel().enqueue(payload):
+                return True
+        except Exception as exc:
+            logger.error("IPC 通道不可用，改用短连接发送: %s", exc)
+    return _send_payload(payload)
+
+
 def forward_signal(item: Dict[str, Any], parsed_content: Optional[Dict[str, Any]]):
     """
     将捕获到的 ValueScan 信号通过本地 IPC 发送给交易模块
@@ -101,14 +383,15 @@ def forward_signal(item: Dict[str, Any], parsed_content: Optional[Dict[str, Any]
     if not payload:
         return
 
-    success = _send_payload(payload)
+    success = send_payload(payload)
     if success:
-        logger.info(
-            "📡 IPC 已转发信号: type=%s id=%s symbol_hint=%s",
-            payload["message_type"],
-            payload["message_id"],
-            payload["symbol_hint"],
-        )
+        if not IPC_PERSISTENT_CHANNEL:
+            logger.info(
+                "📡 IPC 已转发信号: type=%s id=%s symbol_hint=%s",
+                payload["message_type"],
+                payload["message_id"],
+                payload["symbol_hint"],
+            )
     else:
         logger.error(
             "❌ IPC 信号转发失败: id=%s type=%s",
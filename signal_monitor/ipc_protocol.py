@@ -0,0 +1,121 @@
+"""
+本地 IPC 帧协议
+signal_monitor 与交易桥接进程之间的长连接协议（仅依赖标准库，两端共用）：
+
+- 客户端连接后先发送握手行 HANDSHAKE；未发送握手的连接按旧版 JSON Lines 处理
+- 之后每帧为 4 字节大端长度 + UTF-8 JSON
+- 客户端发送 {"op": "batch", "seq": N, "items": [payload, ...]}
+- 服务端收到整批并记入去重表后立即回复 {"op": "ack", "seq": N}，再执行信号，
+  交易执行耗时不会让客户端 ack 超时重发
+- 每条载荷带客户端分配的 ipc_id（重发不变），服务端按 message_id / ipc_id 去重，
+  去重表持久化在 SQLite 中，桥接进程重启后仍然有效
+"""
+
+import json
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+HANDSHAKE = b"VSIPC1\n"
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """读取一帧，连接关闭返回 None"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"IPC 帧过大: {length}")
+    body = _recv_exact(sock, length)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def read_frame_from_file(rfile) -> Optional[Dict[str, Any]]:
+    """从文件对象（如 StreamRequestHandler.rfile）读取一帧"""
+    header = rfile.read(_HEADER.size)
+    if not header or len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"IPC 帧过大: {length}")
+    body = rfile.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def dedupe_key(payload: Dict[str, Any]) -> Optional[str]:
+    """载荷的去重键：优先 (message_type, message_id)，其次客户端分配的 ipc_id"""
+    message_id = payload.get("message_id")
+    if message_id:
+        return f"{payload.get('message_type')}:{message_id}"
+    ipc_id = payload.get("ipc_id")
+    if ipc_id:
+        return f"ipc:{ipc_id}"
+    return None
+
+
+class SeenMessageStore:
+    """已接收信号的去重表（SQLite），只保留最近 limit 条"""
+
+    def __init__(self, path: str, limit: int = 5000, prune_every: int = 500):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.limit = max(1, int(limit))
+        self.prune_every = max(1, int(prune_every))
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen_messages (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    def add(self, key: str) -> bool:
+        """记录去重键，返回 True 表示首次出现"""
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO seen_messages (key, seen_at) VALUES (?, ?)", (key, time.time())
+                )
+            except sqlite3.IntegrityError:
+                return False
+            self._inserts += 1
+            if self._inserts % self.prune_every == 0:
+                self._db.execute(
+                    "DELETE FROM seen_messages WHERE key NOT IN "
+                    "(SELECT key FROM seen_messages ORDER BY seen_at DESC LIMIT ?)",
+                    (self.limit,),
+                )
+            self._db.commit()
+            return True
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -72,24 +72,20 @@ def calculate_level_strength(
     strength = 0.0
 
     # 1. 触碰分析 (权重40%)
-    touches = 0
-    touch_quality = []
-    for i in range(len(df)):
-        high = df['high'].iloc[i]
-        low = df['low'].iloc[i]
-        close = df['close'].iloc[i]
-
-        # 检查是否触碰
-        if abs(high - level) / level <= tolerance or abs(low - level) / level <= tolerance:
-            touches += 1
-            # 计算触碰质量：收盘价离关键位越近，质量越高
-            quality = 1.0 - min(abs(close - level) / level / tolerance, 1.0)
-            # 时间衰减：越近的触碰权重越高
-            time_weight = (i + 1) / len(df)
-            touch_quality.append(quality * time_weight)
-
+    highs = df['high'].to_numpy(dtype=float)
+    lows = df['low'].to_numpy(dtype=float)
+    closes = df['close'].to_numpy(dtype=float)
+    n = len(closes)
+
+    # 检查是否触碰
+    touched = (np.abs(highs - level) / level <= tolerance) | (np.abs(lows - level) / level <= tolerance)
+    touches = int(touched.sum())
     if touches > 0:
-        avg_quality = sum(touch_quality) / len(touch_quality)
+        # 计算触碰质量：收盘价离关键位越近，质量越高
+        quality = 1.0 - np.minimum(np.abs(closes[touched] - level) / level / tolerance, 1.0)
+        # 时间衰减：越近的触碰权重越高
+        time_weight = (np.flatnonzero(touched) + 1) / n
+        avg_quality = float(np.mean(quality * time_weight))
         # 触碰次数归一化 (2-10次为最佳)
         touch_score = min(touches / 5.0, 1.0) * avg_quality
         strength += touch_score * 0.4
@@ -116,23 +112,15 @@ def calculate_level_strength(
 
     # 4. 反弹/突破历史 (权重10%)
     # 检查历史上是否有效反弹或突破
-    bounces = 0
-    for i in range(1, len(df)):
-        prev_close = df['close'].iloc[i-1]
-        curr_close = df['close'].iloc[i]
-        curr_low = df['low'].iloc[i]
-        curr_high = df['high'].iloc[i]
-
+    prev_close = closes[:-1]
+    curr_close = closes[1:]
+    if level < current_price:
         # 支撑反弹
-        if level < current_price:
-            if curr_low <= level * (1 + tolerance) and curr_close > level * (1 + tolerance):
-                if prev_close > level:
-                    bounces += 1
+        bounced = (lows[1:] <= level * (1 + tolerance)) & (curr_close > level * (1 + tolerance)) & (prev_close > level)
+    else:
         # 阻力反弹
-        else:
-            if curr_high >= level * (1 - tolerance) and curr_close < level * (1 - tolerance):
-                if prev_close < level:
-                    bounces += 1
+        bounced = (highs[1:] >= level * (1 - tolerance)) & (curr_close < level * (1 - tolerance)) & (prev_close < level)
+    bounces = int(bounced.sum())
 
     bounce_score = min(bounces / 3.0, 1.0)
     strength += bounce_score * 0.1
@@ -13,6 +13,11 @@ import pandas as pd
 from scipy.ndimage import gaussian_filter1d
 from scipy.signal import find_peaks, argrelextrema
 
+try:
+    from .pattern_kernels import find_swings
+except ImportError:
+    from pattern_kernels import find_swings
+
 
 def calculate_vwap(df):
     """计算成交量加权平均价 (VWAP)"""
@@ -73,12 +78,15 @@ def find_poc_and_value_area(df, num_levels=100):
     volume_profile = np.zeros(num_levels)
     price_levels = np.linspace(price_min, price_max, num_levels)
 
+    lows = df['low'].to_numpy(dtype=float)
+    highs = df['high'].to_numpy(dtype=float)
+    volumes = df['volume'].to_numpy(dtype=float)
     for i in range(len(df)):
-        low_idx = max(0, int((df['low'].iloc[i] - price_min) / level_width))
-        high_idx = min(num_levels - 1, int((df['high'].iloc[i] - price_min) / level_width))
+        low_idx = max(0, int((lows[i] - price_min) / level_width))
+        high_idx = min(num_levels - 1, int((highs[i] - price_min) / level_width))
         if low_idx <= high_idx:
             # 使用TPO方法：每个K线在价格区间内的时间权重
-            volume_profile[low_idx:high_idx+1] += df['volume'].iloc[i] / max(1, high_idx - low_idx + 1)
+            volume_profile[low_idx:high_idx+1] += volumes[i] / max(1, high_idx - low_idx + 1)
 
     # POC: 成交量最大的价格
     poc_idx = np.argmax(volume_profile)
@@ -113,22 +121,8 @@ def find_fractal_levels(df, order=5):
     highs = df['high'].values
     lows = df['low'].values
 
-    fractal_highs = []
-    fractal_lows = []
-
-    for i in range(order, len(df) - order):
-        # 分形高点：中间K线的高点是左右各order根K线中最高的
-        is_fractal_high = all(highs[i] >= highs[i-j] for j in range(1, order+1)) and \
-                          all(highs[i] >= highs[i+j] for j in range(1, order+1))
-
-        # 分形低点：中间K线的低点是左右各order根K线中最低的
-        is_fractal_low = all(lows[i] <= lows[i-j] for j in range(1, order+1)) and \
-                         all(lows[i] <= lows[i+j] for j in range(1, order+1))
-
-        if is_fractal_high:
-            fractal_highs.append((i, highs[i]))
-        if is_fractal_low:
-            fractal_lows.append((i, lows[i]))
+    fractal_highs = find_swings(highs, window=order, mode="high")
+    fractal_lows = find_swings(lows, window=order, mode="low")
 
     return fractal_highs, fractal_lows
 
@@ -0,0 +1,441 @@
+"""
+本地 K 线列存储
+图表、AI 市场总结、AI 信号分析都要最近 200 根 K 线，每次从 Binance REST 重新下载。
+本模块把 K 线按 (交易对, 周期) 存为定宽 float64 二进制文件，以 NumPy memmap 读取：
+
+- 每行 11 列（开盘时间、OHLCV、收盘时间、成交额、笔数、主动买入量/额），按开盘时间升序
+- 增量同步：只从最后一根已存 K 线开始拉取，未收盘的最后一根原地覆盖
+- 断档超过补齐上限时只拉最新一段追加在旧数据之后（中间留空），已存/已补齐的历史不丢弃；
+  之后请求的最近 limit 根跨越断档时向前补齐断档的后半段，补不齐则只返回断档之后的连续部分
+- 读取返回 memmap 切片，DataFrame 的价格/成交量列直接引用映射内存，不复制
+- 同一 (交易对, 周期) 在 K 线缓存 TTL 内重复读取不发请求
+- backfill() 向前补齐深度历史，供回测与形态检测使用
+
+文件只会原地覆盖或追加，不会截短；需要重写（首次写入/向前补历史）时写临时文件后替换，
+已持有旧映射的读取方不受影响。
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from .logger import logger
+    from .market_data_cache import ttl_for
+except ImportError:
+    from logger import logger
+    from market_data_cache import ttl_for
+
+
+COLUMNS = (
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote",
+)
+ROW_WIDTH = len(COLUMNS)
+ROW_BYTES = ROW_WIDTH * 8
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+# Binance /fapi/v1/klines 单次最多返回条数
+PAGE_LIMIT = 1500
+
+DEFAULT_DIR = Path(__file__).parent / "data" / "klines"
+
+# fetcher(params) -> Binance K 线数组，失败返回 None
+KlineFetcher = Callable[[Dict[str, Any]], Optional[List[list]]]
+StoreKey = Tuple[str, str]
+
+
+def _normalize_symbol(symbol: str) -> str:
+    base = str(symbol or "").upper().replace("$", "").strip()
+    return base if base.endswith("USDT") else f"{base}USDT"
+
+
+def _to_rows(raw: Optional[List[list]]) -> np.ndarray:
+    """Binance K 线数组 → (n, ROW_WIDTH) float64，按开盘时间去重升序"""
+    if not raw:
+        return np.empty((0, ROW_WIDTH), dtype=np.float64)
+    rows = np.array([[float(v) for v in k[:ROW_WIDTH]] for k in raw], dtype=np.float64)
+    _, index = np.unique(rows[:, 0], return_index=True)
+    return rows[index]
+
+
+class _FileLock:
+    """跨进程文件锁（fcntl 不可用时仅依赖进程内锁）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fh = open(self.path, "a+b")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+class KlineStore:
+    """
+    按 (交易对, 周期) 持久化的 K 线存储
+
+    fetcher 由调用方提供（各模块有自己的代理/会话配置），接收 Binance klines 请求参数。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_catchup_pages: int = 5):
+        self.directory = Path(directory) if directory else DEFAULT_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_catchup_pages = max(1, int(max_catchup_pages))
+        self._maps: Dict[StoreKey, Tuple[Tuple[int, int], np.memmap]] = {}
+        self._synced_at: Dict[StoreKey, float] = {}
+        self._locks: Dict[StoreKey, threading.Lock] = {}
+        self._holes: Dict[StoreKey, int] = {}  # 交易所本身缺失、无法补齐的断档（断档前最后一根的开盘时间）
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "syncs": 0, "rows_fetched": 0, "requests": 0, "gaps": 0, "holes_filled": 0}
+
+    def _path(self, key: StoreKey) -> Path:
+        return self.directory / f"{key[0]}_{key[1]}.f64"
+
+    def _key_lock(self, key: StoreKey) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def read(self, symbol: str, interval: str, limit: Optional[int] = None) -> Optional[np.ndarray]:
+        """读取已存储的 K 线（只读 memmap 切片，不发请求）"""
+        key = (_normalize_symbol(symbol), interval)
+        data = self._map(key)
+        if data is None:
+            return None
+        return data[-limit:] if limit else data
+
+    def _map(self, key: StoreKey) -> Optional[np.memmap]:
+        """打开（或复用）文件映射；文件大小或 inode 变化时重新映射"""
+        path = self._path(key)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        rows = st.st_size // ROW_BYTES
+        if rows <= 0:
+            return None
+        ident = (st.st_ino, rows)
+        cached = self._maps.get(key)
+        if cached and cached[0] == ident:
+            return cached[1]
+        data = np.memmap(path, dtype=np.float64, mode="r", shape=(rows, ROW_WIDTH))
+        self._maps[key] = (ident, data)
+        return data
+
+    def get(self, symbol: str, interval: str, limit: int, fetcher: KlineFetcher,
+            max_age: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        获取最近 limit 根 K 线，必要时增量同步
+
+        Args:
+            symbol: 交易对（BTC / BTCUSDT 均可）
+            interval: K 线周期
+            limit: 数量
+            fetcher: 请求函数
+            max_age: 距上次同步多久内不再请求（秒），默认按行情缓存的 K 线 TTL
+
+        Returns:
+            (n, ROW_WIDTH) 只读数组，列顺序见 COLUMNS；同步失败且无本地数据时返回 None。
+            开盘时间保证连续：跨越无法补齐的断档时只返回断档之后的部分（可能少于 limit 根）
+        """
+        if interval not in INTERVAL_MS:
+            return None
+        key = (_normalize_symbol(symbol), interval)
+        step = INTERVAL_MS[interval]
+        if max_age is None:
+            max_age = ttl_for("/fapi/v1/klines", interval)
+        with self._key_lock(key):
+            data = self._map(key)
+            fresh = time.monotonic() - self._synced_at.get(key, float("-inf")) < max_age
+            if data is not None and fresh and len(data) >= limit:
+                window = data[-limit:]
+                start = _tail_start(window, step)
+                if start == 0 or self._holes.get(key) == int(window[start - 1, 0]):
+                    self._stats["hits"] += 1
+                    return window[start:]
+            try:
+                with _FileLock(self._path(key).with_suffix(".lock")):
+                    if data is None or not fresh or len(data) < limit:
+                        self._sync(key, limit, fetcher)
+                    self._fill_hole(key, limit, fetcher)
+            except Exception as exc:
+                logger.warning(f"[KlineStore] 同步 {key[0]} {interval} 失败: {exc}")
+            data = self._map(key)
+        if data is None:
+            return None
+        window = data[-limit:]
+        return window[_tail_start(window, step):]
+
+    def _fetch(self, fetcher: KlineFetcher, params: Dict[str, Any]) -> np.ndarray:
+        self._stats["requests"] += 1
+        rows = _to_rows(fetcher(params))
+        self._stats["rows_fetched"] += len(rows)
+        return rows
+
+    def _sync(self, key: StoreKey, limit: int, fetcher: KlineFetcher):
+        symbol, interval = key
+        step = INTERVAL_MS[interval]
+        data = self._map(key)
+        self._stats["syncs"] += 1
+
+        gap = False
+        if data is not None:
+            last_open = int(data[-1, 0])
+            missing = (int(time.time() * 1000) - last_open) // step + 1
+            # 断档太久，补齐代价过高：只拉最新一段，追加在旧数据之后
+            gap = missing > self.max_catchup_pages * PAGE_LIMIT
+
+        if data is None or gap:
+            rows = self._fetch(fetcher, {"symbol": symbol, "interval": interval,
+                                         "limit": min(max(limit, 1), PAGE_LIMIT)})
+            if gap:
+                rows = rows[rows[:, 0] > last_open] if len(rows) else rows
+            if not len(rows):
+                return
+            if gap:
+                self._stats["gaps"] += 1
+                self._write_tail(key, len(data), rows)
+            else:
+                self._rewrite(key, rows)
+        else:
+            # 从最后一根（可能未收盘）开始拉取，覆盖它并追加新 K 线
+            cursor = last_open
+            pages: List[np.ndarray] = []
+            for _ in range(self.max_catchup_pages):
+                rows = self._fetch(fetcher, {"symbol": symbol, "interval": interval,
+                                             "startTime": cursor, "limit": PAGE_LIMIT})
+                if not len(rows):
+                    break
+                pages.append(rows)
+                if len(rows) < PAGE_LIMIT:
+                    break
+                cursor = int(rows[-1, 0]) + step
+            if not pages:
+                return
+            rows = _to_rows_concat(pages)
+            rows = rows[rows[:, 0] >= last_open]
+            if len(rows):
+                self._write_tail(key, len(data) - 1, rows)
+        self._synced_at[key] = time.monotonic()
+
+        data = self._map(key)
+        if data is not None and len(data) < limit:
+            self._backfill_to(key, limit, fetcher)
+
+    def _fill_hole(self, key: StoreKey, limit: int, fetcher: KlineFetcher):
+        """最近 limit 根跨越断档时，从断档之后的第一根向前补齐，直到最近 limit 根连续"""
+        symbol, interval = key
+        step = INTERVAL_MS[interval]
+        data = self._map(key)
+        if data is None:
+            return
+        window = data[-limit:]
+        start = _tail_start(window, step)
+        if start == 0:
+            return
+        hole_open = int(window[start - 1, 0])
+        if self._holes.get(key) == hole_open:
+            return
+        cursor = int(window[start, 0])
+        need = limit - (len(window) - start)
+        older: List[np.ndarray] = []
+        while need > 0:
+            page = min(need, PAGE_LIMIT)
+            rows = self._fetch(fetcher, {"symbol": symbol, "interval": interval,
+                                         "endTime": cursor - 1, "limit": page})
+            rows = rows[(rows[:, 0] < cursor) & (rows[:, 0] > hole_open)] if len(rows) else rows
+            if not len(rows):
+                break
+            older.append(rows)
+            need -= len(rows)
+            cursor = int(rows[0, 0])
+            if len(rows) < page:
+                break
+        if not older:
+            # 交易所本身缺失这段 K 线，记住断档，不再反复请求
+            self._holes[key] = hole_open
+            return
+        older.reverse()
+        cut = len(data) - len(window) + start
+        self._stats["holes_filled"] += 1
+        self._rewrite(key, _to_rows_concat([np.asarray(data[:cut])] + older + [np.asarray(data[cut:])]))
+
+    def _backfill_to(self, key: StoreKey, count: int, fetcher: KlineFetcher,
+                     start_ms: Optional[int] = None):
+        """向前补齐历史，直到至少 count 根或覆盖到 start_ms"""
+        symbol, interval = key
+        data = self._map(key)
+        if data is None:
+            return
+        older: List[np.ndarray] = []
+        have = len(data)
+        first_open = int(data[0, 0])
+        while (start_ms is not None and first_open > start_ms) or (start_ms is None and have < count):
+            need = PAGE_LIMIT if start_ms is not None else min(count - have, PAGE_LIMIT)
+            rows = self._fetch(fetcher, {"symbol": symbol, "interval": interval,
+                                         "endTime": first_open - 1, "limit": need})
+            rows = rows[rows[:, 0] < first_open] if len(rows) else rows
+            if not len(rows):
+                break
+            older.append(rows)
+            have += len(rows)
+            first_open = int(rows[0, 0])
+            if len(rows) < need:
+                break
+        if older:
+            older.reverse()
+            self._rewrite(key, np.concatenate(older + [np.asarray(data)]))
+
+    def backfill(self, symbol: str, interval: str, start_ms: int, fetcher: KlineFetcher) -> int:
+        """
+        补齐 start_ms 以来的全部历史（回测/形态检测用）
+
+        Returns:
+            本地存储的 K 线数量
+        """
+        key = (_normalize_symbol(symbol), interval)
+        with self._key_lock(key):
+            with _FileLock(self._path(key).with_suffix(".lock")):
+                self._sync(key, 1, fetcher)
+                self._backfill_to(key, 0, fetcher, start_ms=start_ms)
+            data = self._map(key)
+        return len(data) if data is not None else 0
+
+    def _write_tail(self, key: StoreKey, offset: int, rows: np.ndarray):
+        """从第 offset 行起原地覆盖并追加（文件不会变短）"""
+        with open(self._path(key), "r+b") as fh:
+            fh.seek(offset * ROW_BYTES)
+            fh.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+
+    def _rewrite(self, key: StoreKey, rows: np.ndarray):
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+        os.replace(tmp, path)
+        self._maps.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["series"] = len(self._maps)
+        return stats
+
+
+def _tail_start(rows: np.ndarray, step: int) -> int:
+    """rows 中最后一段开盘时间连续的起始下标"""
+    if len(rows) < 2:
+        return 0
+    breaks = np.flatnonzero(np.diff(rows[:, 0]) != step)
+    return int(breaks[-1]) + 1 if len(breaks) else 0
+
+
+def _to_rows_concat(pages: List[np.ndarray]) -> np.ndarray:
+    rows = np.concatenate(pages) if len(pages) > 1 else pages[0]
+    _, index = np.unique(rows[:, 0], return_index=True)
+    return rows[index]
+
+
+def to_frame(rows: np.ndarray):
+    """
+    转为图表使用的 DataFrame：timestamp(datetime) + open/high/low/close/volume
+
+    价格与成交量列直接引用 rows（memmap）的内存，只有 timestamp 列是新数组。
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(rows[:, 1:6], columns=["open", "high", "low", "close", "volume"], copy=False)
+    df.insert(0, "timestamp", pd.to_datetime(rows[:, 0].astype("int64"), unit="ms"))
+    return df
+
+
+def to_dicts(rows: np.ndarray) -> List[Dict[str, Any]]:
+    """转为 Binance K 线字段的字典列表"""
+    return [
+        {
+            "open_time": int(r[0]),
+            "open": float(r[1]),
+            "high": float(r[2]),
+            "low": float(r[3]),
+            "close": float(r[4]),
+            "volume": float(r[5]),
+            "close_time": int(r[6]),
+            "quote_volume": float(r[7]),
+            "trades": int(r[8]),
+        }
+        for r in rows.tolist()
+    ]
+
+
+_store_instance: Optional[KlineStore] = None
+_store_lock = threading.Lock()
+
+
+def store_enabled() -> bool:
+    if os.getenv("VALUESCAN_KLINE_STORE", "1") == "0":
+        return False
+    try:
+        import config as signal_config
+        return bool(getattr(signal_config, "ENABLE_KLINE_STORE", True))
+    except Exception:
+        return True
+
+
+def get_kline_store() -> KlineStore:
+    """获取全局 K 线存储实例（单例模式）"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                directory = os.getenv("VALUESCAN_KLINE_STORE_DIR") or None
+                max_catchup_pages = 5
+                try:
+                    import config as signal_config
+                    directory = directory or getattr(signal_config, "KLINE_STORE_DIR", None)
+                    max_catchup_pages = int(getattr(signal_config, "KLINE_STORE_MAX_CATCHUP_PAGES", max_catchup_pages))
+                except Exception:
+                    pass
+                _store_instance = KlineStore(directory, max_catchup_pages=max_catchup_pages)
+                logger.info(f"📦 K线本地存储已初始化: {_store_instance.directory}")
+    return _store_instance
+
+
+def load_klines(symbol: str, interval: str, limit: int, fetcher: KlineFetcher) -> Optional[np.ndarray]:
+    """
+    从本地存储读取最近 limit 根 K 线（增量同步）；存储未启用或不可用时返回 None，调用方回退 REST
+    """
+    if not store_enabled():
+        return None
+    try:
+        rows = get_kline_store().get(symbol, interval, limit, fetcher)
+    except Exception as exc:
+        logger.warning(f"[KlineStore] 读取 {symbol} {interval} 失败: {exc}")
+        return None
+    if rows is None or not len(rows):
+        return None
+    return rows
@@ -0,0 +1,459 @@
+"""
+LLM 调用网关
+AI 单币简评、AI 市场总结、AI 市场分析以及交易端的 AI 进化 / AI 持仓代理共用的 Chat Completions 调用：
+
+- 进程内共享连接池会话，不再每次调用新建 Session（同样显式禁用系统代理）
+- 并发上限（信号量），信号密集时排队而不是同时打开几十个长连接
+- 流式读取响应；要求 JSON 的调用方在第一个完整 JSON 对象结束时立即返回，不等待后续输出
+  （接口以 400/422 拒绝 stream 参数时改用普通请求重试一次，并按接口地址记住，之后不再流式请求）
+- 完全相同的请求并发时只发起一次，其余调用方等待结果；成功结果按请求哈希短时间缓存
+- 按调用方统计耗时、首字延迟、token 用量、缓存/合并命中
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from logger import logger
+except ImportError:
+    # 交易端以 signal_monitor.llm_gateway 导入时 logger 模块不在路径上
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+def _read_env_or_config(env_key: str, config_key: str, default: Any) -> Any:
+    raw = os.getenv(env_key)
+    if raw is not None and str(raw).strip() != "":
+        return raw
+    try:
+        import config as local_config
+        value = getattr(local_config, config_key, None)
+        return default if value is None else value
+    except Exception:
+        return default
+
+
+def _read_float(env_key: str, default: float) -> float:
+    try:
+        return float(_read_env_or_config(env_key, env_key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _read_bool(env_key: str, default: bool) -> bool:
+    value = _read_env_or_config(env_key, env_key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+# 同时进行中的 LLM 请求上限（超出的调用排队等待）
+MAX_CONCURRENCY = max(int(_read_float("AI_LLM_MAX_CONCURRENCY", 4)), 1)
+# 是否使用流式响应（服务端不支持时自动按普通 JSON 响应处理）
+STREAM_ENABLED = _read_bool("AI_LLM_STREAM", True)
+# 相同请求的结果缓存时间（秒），<=0 关闭缓存
+CACHE_TTL = _read_float("AI_LLM_CACHE_TTL", 300)
+CACHE_SIZE = 128
+# 建立连接超时（秒）；读取超时由调用方的 timeout 决定
+CONNECT_TIMEOUT = _read_float("AI_LLM_CONNECT_TIMEOUT", 10)
+
+
+# ==================== 连接与并发 ====================
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(MAX_CONCURRENCY)
+# 拒绝流式参数的接口地址（降级为普通请求）
+_non_stream_urls: set = set()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # 显式禁用代理直接连接 AI API
+            session.trust_env = False
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENCY * 2, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+# ==================== 统计 ====================
+
+class _CallerStats:
+    __slots__ = ("calls", "requests", "errors", "cache_hits", "dedup_hits", "early_stops",
+                 "latency_total", "latency_max", "first_token_total", "first_token_count",
+                 "queue_wait_total", "prompt_tokens", "completion_tokens", "last_error")
+
+    def __init__(self):
+        self.calls = 0
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.dedup_hits = 0
+        self.early_stops = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.first_token_total = 0.0
+        self.first_token_count = 0
+        self.queue_wait_total = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.last_error: Optional[str] = None
+
+
+_stats: Dict[str, _CallerStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _caller_stats(caller: str) -> _CallerStats:
+    stats = _stats.get(caller)
+    if stats is None:
+        stats = _stats.setdefault(caller, _CallerStats())
+    return stats
+
+
+def _record(caller: str, **fields: Any) -> None:
+    with _stats_lock:
+        stats = _caller_stats(caller)
+        for name, value in fields.items():
+            if name == "latency":
+                stats.latency_total += value
+                stats.latency_max = max(stats.latency_max, value)
+            elif name == "first_token":
+                stats.first_token_total += value
+                stats.first_token_count += 1
+            elif name == "last_error":
+                stats.last_error = value
+            else:
+                setattr(stats, name, getattr(stats, name) + value)
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """按调用方返回 LLM 调用统计"""
+    with _stats_lock:
+        result = {}
+        for caller, s in _stats.items():
+            result[caller] = {
+                "calls": s.calls,
+                "requests": s.requests,
+                "errors": s.errors,
+                "cache_hits": s.cache_hits,
+                "dedup_hits": s.dedup_hits,
+                "early_stops": s.early_stops,
+                "avg_latency": round(s.latency_total / s.requests, 2) if s.requests else None,
+                "max_latency": round(s.latency_max, 2),
+                "avg_first_token": (
+                    round(s.first_token_total / s.first_token_count, 2) if s.first_token_count else None
+                ),
+                "avg_queue_wait": round(s.queue_wait_total / s.requests, 2) if s.requests else None,
+                "prompt_tokens": s.prompt_tokens,
+                "completion_tokens": s.completion_tokens,
+                "last_error": s.last_error,
+            }
+    with _cache_lock:
+        cached = len(_cache)
+    return {"max_concurrency": MAX_CONCURRENCY, "cached": cached, "callers": result}
+
+
+# ==================== 流式 JSON 提取 ====================
+
+class _JsonObjectScanner:
+    """增量扫描模型输出，找到第一个完整的顶层 JSON 对象后返回其结束位置"""
+
+    def __init__(self):
+        self.pos: Optional[int] = None  # 扫描起点确定前为 None（等待 <think> 块结束）
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def _reset(self) -> None:
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text: str) -> Optional[int]:
+        if self.pos is None:
+            head = text.lstrip()
+            if "<think>".startswith(head):
+                return None
+            if head.startswith("<think>"):
+                close = text.find("</think>")
+                if close == -1:
+                    return None
+                self.pos = close + len("</think>")
+            else:
+                self.pos = 0
+
+        i = self.pos
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            if self.start < 0:
+                if ch == "{":
+                    self.start = i
+                    self.depth = 1
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    end = i + 1
+                    try:
+                        json.loads(text[self.start:end])
+                    except ValueError:
+                        # 正文中的花括号，不是 JSON，继续向后找
+                        self._reset()
+                    else:
+                        self.pos = end
+                        return end
+            i += 1
+        self.pos = n
+        return None
+
+
+# ==================== 请求 ====================
+
+def _apply_usage(caller: str, usage: Any) -> None:
+    if not isinstance(usage, dict):
+        return
+    _record(
+        caller,
+        prompt_tokens=int(usage.get("prompt_tokens") or 0),
+        completion_tokens=int(usage.get("completion_tokens") or 0),
+    )
+
+
+def _read_stream(resp: requests.Response, caller: str, started: float, deadline: float,
+                 expect_json: bool) -> Optional[str]:
+    parts: List[str] = []
+    text = ""
+    scanner = _JsonObjectScanner() if expect_json else None
+    first_token = True
+    try:
+        for raw_line in resp.iter_lines():
+            if time.monotonic() > deadline:
+                raise TimeoutError("stream deadline exceeded")
+            if not raw_line:
+                continue
+            line = raw_line.decode("utf-8", errors="replace") if isinstance(raw_line, bytes) else raw_line
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            _apply_usage(caller, event.get("usage"))
+            choices = event.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or choices[0].get("message") or {}
+            piece = delta.get("content")
+            if not piece:
+                continue
+            if first_token:
+                _record(caller, first_token=time.monotonic() - started)
+                first_token = False
+            parts.append(piece)
+            if scanner is not None:
+                text = "".join(parts)
+                parts = [text]
+                end = scanner.feed(text)
+                if end is not None:
+                    # 已拿到完整 JSON，断开连接，不再等待模型的后续输出
+                    _record(caller, early_stops=1)
+                    return text[:end]
+    finally:
+        resp.close()
+    return "".join(parts)
+
+
+def _post(api_url: str, headers: Dict[str, str], payload: Dict[str, Any], caller: str,
+          timeout: float, expect_json: bool, stream: bool) -> Optional[str]:
+    started = time.monotonic()
+    deadline = started + timeout
+    stream = stream and api_url not in _non_stream_urls
+    body = dict(payload)
+    if stream:
+        body["stream"] = True
+        # 流式响应默认不带 usage，需显式要求在最后一个事件中返回
+        body["stream_options"] = {"include_usage": True}
+    resp = _get_session().post(
+        api_url,
+        headers=headers,
+        json=body,
+        timeout=(min(CONNECT_TIMEOUT, timeout), timeout),
+        stream=stream,
+    )
+    if resp.status_code != 200:
+        message = f"{resp.status_code} - {resp.text[:200]}"
+        resp.close()
+        if stream and resp.status_code in (400, 422):
+            # 部分 OpenAI 兼容代理不支持 stream / stream_options，改用普通请求重试一次
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("no time left to retry without streaming")
+            content = _post(api_url, headers, payload, caller, remaining, expect_json, False)
+            _non_stream_urls.add(api_url)
+            logger.warning("[LLM] %s 接口拒绝流式请求（%s），改用普通请求", api_url, message[:80])
+            return content
+        raise RuntimeError(message)
+
+    content_type = (resp.headers.get("Content-Type") or "").lower()
+    if stream and "text/event-stream" in content_type:
+        content = _read_stream(resp, caller, started, deadline, expect_json)
+    else:
+        # 非流式（或服务端忽略了 stream 参数）
+        data = resp.json()
+        _apply_usage(caller, data.get("usage"))
+        content = (data.get("choices") or [{}])[0].get("message", {}).get("content", "")
+        _record(caller, first_token=time.monotonic() - started)
+    return content.strip() if content else None
+
+
+# ==================== 合并与缓存 ====================
+
+_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_inflight: Dict[str, Tuple[threading.Event, List[Optional[str]]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _request_key(api_url: str, payload: Dict[str, Any], expect_json: bool) -> str:
+    raw = json.dumps([api_url, payload, expect_json], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def chat_completion(
+    api_url: str,
+    api_key: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    caller: str = "default",
+    max_tokens: int = 4000,
+    temperature: float = 0.3,
+    timeout: float = 120,
+    expect_json: bool = False,
+    use_cache: bool = True,
+    stream: Optional[bool] = None,
+) -> Optional[str]:
+    """
+    调用 OpenAI 兼容的 Chat Completions 接口
+
+    Args:
+        api_url: 完整接口地址（.../v1/chat/completions）
+        api_key: Bearer Token
+        model: 模型名称
+        messages: 消息列表
+        caller: 调用方名称，用于统计
+        max_tokens / temperature: 透传给接口
+        timeout: 单次调用总时限（秒，含排队时间）
+        expect_json: 输出为 JSON 对象时设为 True，流式读取到第一个完整 JSON 对象即返回
+        use_cache: 是否使用结果缓存（并发相同请求的合并不受影响）
+        stream: 是否流式读取，None 表示使用 AI_LLM_STREAM 配置
+
+    Returns:
+        模型输出文本（已去除首尾空白），失败返回 None
+    """
+    if not api_url or not api_key or not model:
+        return None
+
+    _record(caller, calls=1)
+    payload = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    key = _request_key(api_url, payload, expect_json)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if use_cache and CACHE_TTL > 0 and entry and time.monotonic() - entry[0] < CACHE_TTL:
+            _cache.move_to_end(key)
+            hit: Optional[str] = entry[1]
+        else:
+            hit = None
+            inflight = _inflight.get(key)
+            if inflight is None:
+                inflight = (threading.Event(), [None])
+                _inflight[key] = inflight
+                owner = True
+            else:
+                owner = False
+    if hit is not None:
+        _record(caller, cache_hits=1)
+        return hit
+
+    event, holder = inflight
+    if not owner:
+        # 相同请求正在进行中，等待其结果
+        _record(caller, dedup_hits=1)
+        event.wait(timeout * 2)
+        return holder[0]
+
+    result: Optional[str] = None
+    try:
+        result = _call(api_url, api_key, payload, caller, timeout, expect_json,
+                       STREAM_ENABLED if stream is None else stream)
+        return result
+    finally:
+        holder[0] = result
+        with _cache_lock:
+            if result and CACHE_TTL > 0:
+                _cache[key] = (time.monotonic(), result)
+                _cache.move_to_end(key)
+                while len(_cache) > CACHE_SIZE:
+                    _cache.popitem(last=False)
+            _inflight.pop(key, None)
+        event.set()
+
+
+def _call(api_url: str, api_key: str, payload: Dict[str, Any], caller: str, timeout: float,
+          expect_json: bool, stream: bool) -> Optional[str]:
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+    wait_start = time.monotonic()
+    if not _semaphore.acquire(timeout=timeout):
+        _record(caller, errors=1, last_error="queue timeout")
+        logger.warning("[LLM] %s 排队超时（并发上限 %s）", caller, MAX_CONCURRENCY)
+        return None
+    queue_wait = time.monotonic() - wait_start
+    start = time.monotonic()
+    try:
+        remaining = timeout - queue_wait
+        if remaining <= 0:
+            raise TimeoutError("no time left after queue wait")
+        content = _post(api_url, headers, payload, caller, remaining, expect_json, stream)
+        _record(caller, requests=1, queue_wait_total=queue_wait, latency=time.monotonic() - start)
+        return content
+    except Exception as exc:
+        _record(caller, requests=1, errors=1, queue_wait_total=queue_wait,
+                latency=time.monotonic() - start, last_error=str(exc)[:200])
+        logger.warning("[LLM] %s 调用失败: %s", caller, exc)
+        return None
+    finally:
+        _semaphore.release()
@@ -0,0 +1,275 @@
+"""
+行情数据共享缓存模块
+同一信号会被图表、AI 分析、补充数据等多个模块重复请求相同的 Binance 数据，
+本模块在进程内按 (endpoint, symbol, interval, limit) 缓存原始 JSON 响应：
+
+- 按数据类型设置 TTL（深度几秒，资金费率一分钟）
+- 并发请求同一数据时只发起一次请求，其余调用方等待结果（请求合并）
+- LRU 淘汰，统计命中/未命中/合并次数
+- 列表型数据（K线、资金费率历史等）可由 limit 更大的缓存截取尾部返回
+- 每个调用方拿到的是缓存值的副本，修改返回值不会影响缓存和其他调用方
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    from .logger import logger
+except ImportError:
+    from logger import logger
+
+
+# 按接口路径设置的缓存时间（秒）；未列出的接口不缓存
+DEFAULT_TTLS = {
+    "/fapi/v1/klines": 15,
+    "/api/v3/klines": 15,
+    "/fapi/v1/depth": 3,
+    "/api/v3/depth": 3,
+    "/fapi/v1/ticker/24hr": 5,
+    "/api/v3/ticker/24hr": 5,
+    "/fapi/v1/fundingRate": 60,
+    "/fapi/v1/premiumIndex": 5,
+    "/fapi/v1/openInterest": 10,
+    "/futures/data/openInterestHist": 60,
+    "/futures/data/takerlongshortRatio": 30,
+    "/futures/data/globalLongShortAccountRatio": 30,
+    "/futures/data/topLongShortAccountRatio": 30,
+    "/futures/data/topLongShortPositionRatio": 30,
+}
+
+# 长周期 K 线变化慢，可以缓存更久
+KLINE_INTERVAL_TTLS = {
+    "1h": 30,
+    "2h": 30,
+    "4h": 60,
+    "6h": 60,
+    "12h": 120,
+    "1d": 120,
+    "3d": 300,
+    "1w": 300,
+}
+
+# 参与缓存键的请求参数；带其他参数（如 startTime）的请求不缓存
+_KEY_PARAMS = {"symbol", "interval", "period", "limit"}
+
+# 等待其他线程的进行中请求的最长时间（秒）
+INFLIGHT_WAIT_TIMEOUT = 30
+
+CacheKey = Tuple[str, str, Optional[str], Optional[int]]
+
+
+def _copy_json(value: Any) -> Any:
+    """复制解析后的 JSON（dict / list 嵌套），比 copy.deepcopy 快得多"""
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    return value
+
+
+class _InFlight:
+    """进行中的请求，供合并等待"""
+
+    __slots__ = ("event", "value")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+
+class MarketDataCache:
+    """
+    进程级行情数据缓存
+
+    fetcher 返回 None 视为请求失败，不写入缓存。
+    返回值总是副本，调用方可以自由修改。
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(endpoint: str, symbol: str, interval: Optional[str] = None, limit: Optional[int] = None) -> CacheKey:
+        return (endpoint, str(symbol or "").upper(), interval, int(limit) if limit is not None else None)
+
+    def _lookup(self, key: CacheKey, now: float) -> Tuple[bool, Any]:
+        """精确命中，或由同一序列 limit 更大的列表缓存截取尾部"""
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return True, entry[1]
+        endpoint, symbol, interval, limit = key
+        if limit is None:
+            return False, None
+        for (e_endpoint, e_symbol, e_interval, e_limit), (expires_at, value) in self._entries.items():
+            if (
+                e_endpoint == endpoint
+                and e_symbol == symbol
+                and e_interval == interval
+                and e_limit is not None
+                and e_limit > limit
+                and expires_at > now
+                and isinstance(value, list)
+            ):
+                return True, value[-limit:]
+        return False, None
+
+    def _store(self, key: CacheKey, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_or_fetch(
+        self,
+        endpoint: str,
+        symbol: str,
+        fetcher: Callable[[], Any],
+        interval: Optional[str] = None,
+        limit: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        读取缓存，未命中时调用 fetcher；同一键的并发调用只执行一次 fetcher
+
+        Args:
+            endpoint: 接口路径（如 /fapi/v1/klines）
+            symbol: 交易对
+            fetcher: 无参函数，返回解析后的 JSON，失败返回 None
+            interval: K线周期 / 统计周期
+            limit: 数量
+            ttl: 缓存时间（秒），默认按 DEFAULT_TTLS
+
+        Returns:
+            缓存或新获取的数据（副本）
+        """
+        if ttl is None:
+            ttl = ttl_for(endpoint, interval)
+        if not ttl:
+            return fetcher()
+
+        key = self.make_key(endpoint, symbol, interval, limit)
+        with self._lock:
+            hit, value = self._lookup(key, time.monotonic())
+            if hit:
+                self._stats["hits"] += 1
+                return _copy_json(value)
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            inflight.event.wait(INFLIGHT_WAIT_TIMEOUT)
+            return _copy_json(inflight.value)
+
+        value = None
+        try:
+            value = fetcher()
+        finally:
+            with self._lock:
+                if value is not None:
+                    self._store(key, value, ttl)
+                self._inflight.pop(key, None)
+            inflight.value = value
+            inflight.event.set()
+        return _copy_json(value)
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """清除缓存（指定 symbol 时只清除该交易对）"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                return
+            symbol = symbol.upper()
+            for key in [k for k in self._entries if k[1] == symbol]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def ttl_for(endpoint: str, interval: Optional[str] = None) -> float:
+    """按接口路径和周期返回缓存时间，0 表示不缓存"""
+    ttl = DEFAULT_TTLS.get(endpoint, 0)
+    if ttl and endpoint.endswith("/klines") and interval:
+        ttl = KLINE_INTERVAL_TTLS.get(interval, ttl)
+    return ttl
+
+
+_cache_instance: Optional[MarketDataCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_market_data_cache() -> MarketDataCache:
+    """获取全局行情缓存实例（单例模式）"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                max_entries = 512
+                try:
+                    import config as signal_config
+                    max_entries = int(getattr(signal_config, "MARKET_DATA_CACHE_SIZE", max_entries))
+                except Exception:
+                    pass
+                _cache_instance = MarketDataCache(max_entries=max_entries)
+                logger.info(f"📦 行情数据缓存已初始化 (容量: {max_entries})")
+    return _cache_instance
+
+
+def cache_enabled() -> bool:
+    if os.getenv("VALUESCAN_MARKET_DATA_CACHE", "1") == "0":
+        return False
+    try:
+        import config as signal_config
+        return bool(getattr(signal_config, "ENABLE_MARKET_DATA_CACHE", True))
+    except Exception:
+        return True
+
+
+def cached_json(url: str, params: Optional[Dict[str, Any]], fetcher: Callable[[], Any]) -> Any:
+    """
+    按 URL 路径和请求参数走共享缓存；不可缓存的请求直接调用 fetcher
+
+    Args:
+        url: 完整请求地址
+        params: 请求参数
+        fetcher: 实际发起请求的无参函数，返回解析后的 JSON 或 None
+    """
+    params = params or {}
+    endpoint = urlparse(url).path
+    if (
+        not cache_enabled()
+        or not params.get("symbol")
+        or not ttl_for(endpoint)
+        or any(k not in _KEY_PARAMS for k in params)
+    ):
+        return fetcher()
+    return get_market_data_cache().get_or_fetch(
+        endpoint,
+        params.get("symbol"),
+        fetcher,
+        interval=params.get("interval") or params.get("period"),
+        limit=params.get("limit"),
+    )
@@ -11,7 +11,12 @@ from datetime import datetime, timezone, timedelta
 from logger import logger
 from message_types import MESSAGE_TYPE_MAP, TRADE_TYPE_MAP, FUNDS_MOVEMENT_MAP
 from telegram import send_telegram_message, format_message_for_telegram, send_confluence_alert
-from database import is_message_processed, mark_message_processed
+from database import (
+    is_message_processed,
+    mark_message_processed,
+    get_processed_message_ids,
+    flush_processed_messages,
+)
 from signal_tracker import get_signal_tracker
 
 # 北京时区 (UTC+8)
@@ -135,18 +140,25 @@ def _filter_items_by_age(items, max_age_seconds, seen_ids=None):
     cutoff_ms = now_ms - (max_age_seconds * 1000)
     filtered_items = []
     skipped_old = 0
+    old_ids = []
+    for item in items:
+        ts_ms = _get_message_timestamp_ms(item)
+        msg_id = _get_message_id(item)
+        if ts_ms and ts_ms < cutoff_ms and msg_id:
+            old_ids.append(msg_id)
+    processed_ids = get_processed_message_ids(old_ids)
 
     for item in items:
         ts_ms = _get_message_timestamp_ms(item)
         if ts_ms and ts_ms < cutoff_ms:
             skipped_old += 1
             msg_id = _get_message_id(item)
-            if msg_id and not is_message_processed(msg_id):
+            if msg_id and msg_id not in processed_ids:
                 msg_type = _get_message_type(item)
                 title = item.get("title")
                 symbol = _extract_symbol_from_item(item)
                 content = item.get("content") or item.get("message") or title
-                mark_message_processed(msg_id, msg_type, symbol, title, ts_ms, content)
+                mark_message_processed(msg_id, msg_type, symbol, title, ts_ms, content, defer=True)
             if seen_ids is not None and msg_id:
                 seen_ids.add(msg_id)
             continue
@@ -470,6 +482,10 @@ def process_response_data(response_data, send_to_telegram=False, seen_ids=None,
         new_messages = []
         duplicate_in_batch = 0
         duplicate_in_db = 0
+        # 一次查询整批消息 ID，避免逐条 SELECT
+        processed_ids = get_processed_message_ids(
+            [msg_id for msg_id in (_get_message_id(item) for item in items) if msg_id]
+        )
         
         for item in items:
             msg_id = _get_message_id(item)
@@ -482,7 +498,7 @@ def process_response_data(response_data, send_to_telegram=False, seen_ids=None,
                 continue
             
             # 检查数据库中是否已处理（持久化去重）
-            if is_message_processed(msg_id):
+            if msg_id in processed_ids:
                 duplicate_in_db += 1
                 if seen_ids is not None:
                     seen_ids.add(msg_id)
@@ -520,6 +536,8 @@ def process_response_data(response_data, send_to_telegram=False, seen_ids=None,
         else:
             logger.info(f"  本次无新消息（所有消息都已处理过）")
         
+        # 本轮新增记录在一个事务中落盘
+        flush_processed_messages()
         return new_count
     
     return 0
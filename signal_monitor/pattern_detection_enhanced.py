@@ -14,6 +14,11 @@ from typing import Dict, List, Optional, Tuple, Any
 from scipy.signal import find_peaks
 from scipy.stats import linregress
 
+try:
+    from .pattern_kernels import line_touch_indices
+except ImportError:
+    from pattern_kernels import line_touch_indices
+
 
 class PatternDetector:
     """增强版形态检测器"""
@@ -95,12 +100,7 @@ class PatternDetector:
         精确触碰计数
         返回: (触碰次数, 触碰索引列表)
         """
-        touches = []
-        for i in range(start_idx, min(start_idx + window, len(series))):
-            line_value = slope * i + intercept
-            if abs(series[i] - line_value) <= tolerance:
-                touches.append(i)
-
+        touches = line_touch_indices(series, slope, intercept, start_idx, window, tolerance).tolist()
         return len(touches), touches
 
     def _calculate_pattern_strength(self, pattern: Dict[str, Any], touch_indices_upper: List[int],
@@ -0,0 +1,204 @@
+"""
+形态检测向量化内核
+图表与形态检测模块共用的 NumPy 实现，替代逐根 K 线的 Python 循环：
+
+- 摆动高低点：滑动窗口最大/最小值（sliding_window_view）一次比较得到全部枢轴
+- 触线计数：对所有候选点一次计算到直线的距离
+- 尾部窗口回归：用累积和一次得到多个窗口（最近 w 根）的斜率/截距/R²
+
+全序列上求出的摆动点与在尾部子序列上逐个窗口重新求解结果相同
+（子序列边缘 window 根不参与判断），因此多个窗口可以共用一次计算。
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+try:
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # numpy < 1.20
+    sliding_window_view = None
+
+
+def _windows(values: np.ndarray, size: int) -> np.ndarray:
+    if sliding_window_view is not None:
+        return sliding_window_view(values, size)
+    stride = values.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        values, shape=(len(values) - size + 1, size), strides=(stride, stride), writeable=False
+    )
+
+
+def rolling_extrema(series, window: int, mode: str = "high") -> np.ndarray:
+    """
+    以每个点为中心、左右各 window 根的最大值（high）或最小值（low）
+
+    Returns:
+        长度为 len(series) - 2 * window 的数组，第 k 个元素对应 series[k + window]
+    """
+    values = np.asarray(series, dtype=float)
+    size = 2 * window + 1
+    if len(values) < size:
+        return np.empty(0, dtype=float)
+    segs = _windows(values, size)
+    return segs.max(axis=1) if mode == "high" else segs.min(axis=1)
+
+
+def swing_indices(series, window: int = 4, mode: str = "high") -> np.ndarray:
+    """
+    摆动高/低点索引：series[i] 是 [i - window, i + window] 内的最大/最小值
+
+    与逐点比较 max(seg) / min(seg) 的循环结果一致（含相等的平顶点）。
+    """
+    values = np.asarray(series, dtype=float)
+    extrema = rolling_extrema(values, window, mode)
+    if not len(extrema):
+        return np.empty(0, dtype=int)
+    center = values[window:len(values) - window]
+    mask = center >= extrema if mode == "high" else center <= extrema
+    return np.flatnonzero(mask) + window
+
+
+def find_swings(series, window: int = 4, mode: str = "high") -> List[Tuple[int, float]]:
+    """摆动点列表 [(索引, 价格), ...]"""
+    values = np.asarray(series, dtype=float)
+    idx = swing_indices(values, window, mode)
+    return list(zip(idx.tolist(), values[idx].tolist()))
+
+
+def tail_swings(idx: np.ndarray, values: np.ndarray, length: int, window_len: int, window: int):
+    """
+    从全序列摆动点中取出最近 window_len 根子序列上的摆动点（索引相对子序列）
+
+    Args:
+        idx: swing_indices 的结果
+        values: 原序列
+        length: 原序列长度
+        window_len: 尾部子序列长度
+        window: 摆动判断的左右根数
+    """
+    start = length - window_len
+    sel = idx[(idx >= start + window) & (idx < length - window)]
+    return sel - start, np.asarray(values, dtype=float)[sel]
+
+
+def count_line_touches(idx, prices, slope: float, intercept: float, tol: float) -> int:
+    """统计距直线 slope * idx + intercept 不超过 tol 的点数"""
+    idx = np.asarray(idx, dtype=float)
+    if not len(idx):
+        return 0
+    prices = np.asarray(prices, dtype=float)
+    return int(np.count_nonzero(np.abs(slope * idx + intercept - prices) <= tol))
+
+
+def line_touch_indices(series, slope: float, intercept: float, start: int, window: int, tol: float) -> np.ndarray:
+    """series[start:start + window] 中距直线不超过 tol 的点的（全局）索引"""
+    values = np.asarray(series, dtype=float)
+    end = min(start + window, len(values))
+    if end <= start:
+        return np.empty(0, dtype=int)
+    idx = np.arange(start, end)
+    return idx[np.abs(values[start:end] - (slope * idx + intercept)) <= tol]
+
+
+def tail_regressions(series, windows: Iterable[int]) -> Dict[int, Tuple[float, float, float]]:
+    """
+    对最近 w 根（x = 0..w-1）做最小二乘拟合，一次计算多个窗口
+
+    Returns:
+        {w: (slope, intercept, r2)}，数据不足的窗口不返回
+    """
+    y = np.asarray(series, dtype=float)
+    n = len(y)
+    if n == 0:
+        return {}
+    # 平移到最后一根附近再求和，减少大数相减的精度损失（斜率和 R² 不受平移影响）
+    ref = float(y[-1])
+    y = y - ref
+    gidx = np.arange(n, dtype=float)
+    # 后缀和：suffix[k] = sum(y[k:])
+    sy = np.concatenate((np.cumsum(y[::-1])[::-1], [0.0]))
+    syy = np.concatenate((np.cumsum((y * y)[::-1])[::-1], [0.0]))
+    siy = np.concatenate((np.cumsum((gidx * y)[::-1])[::-1], [0.0]))
+
+    result = {}
+    for w in windows:
+        w = int(w)
+        if w > n:
+            continue
+        if w < 2:
+            result[w] = (0.0, ref, 0.0)
+            continue
+        start = n - w
+        sum_y = sy[start]
+        sum_yy = syy[start]
+        sum_xy = siy[start] - start * sum_y  # 局部 x = 全局索引 - start
+        sum_x = w * (w - 1) / 2.0
+        sum_xx = (w - 1) * w * (2 * w - 1) / 6.0
+        sxx = sum_xx - sum_x * sum_x / w
+        sxy = sum_xy - sum_x * sum_y / w
+        syy_c = sum_yy - sum_y * sum_y / w
+        slope = sxy / sxx
+        intercept = (sum_y - slope * sum_x) / w + ref
+        ss_res = max(syy_c - slope * sxy, 0.0)
+        r2 = 1.0 - ss_res / syy_c if syy_c > 1e-12 * max(sum_yy, 1e-300) else 0.0
+        result[w] = (float(slope), float(intercept), float(r2))
+    return result
+
+
+class TailWindowFits:
+    """
+    同一组 K 线上多个尾部窗口共用的回归结果和摆动点
+
+    高/低价回归在构造时对 windows 一次算出；成交量回归、摆动点以及构造时未包含的窗口
+    按需计算并缓存。
+    """
+
+    def __init__(self, highs, lows, volumes, windows: Iterable[int], swing_window: int = 3):
+        self.highs = np.asarray(highs, dtype=float)
+        self.lows = np.asarray(lows, dtype=float)
+        self.volumes = np.asarray(volumes, dtype=float)
+        self.n = len(self.highs)
+        self.windows = tuple(int(w) for w in windows)
+        self.swing_window = swing_window
+        self.reg_h = tail_regressions(self.highs, self.windows)
+        self.reg_l = tail_regressions(self.lows, self.windows)
+        self._reg_v = None
+        self._swing_h = None
+        self._swing_l = None
+
+    def _fit(self, cache: Dict[int, Tuple[float, float, float]], series: np.ndarray, w: int):
+        w = int(w)
+        fit = cache.get(w)
+        if fit is None:
+            fit = tail_regressions(series, (w,)).get(w)
+            if fit is None:
+                raise ValueError(f"回归窗口 {w} 超过 K 线数量 {self.n}")
+            cache[w] = fit
+        return fit
+
+    def high_fit(self, w: int) -> Tuple[float, float, float]:
+        """最近 w 根高价的 (slope, intercept, r2)"""
+        return self._fit(self.reg_h, self.highs, w)
+
+    def low_fit(self, w: int) -> Tuple[float, float, float]:
+        """最近 w 根低价的 (slope, intercept, r2)"""
+        return self._fit(self.reg_l, self.lows, w)
+
+    def vol_slope(self, w: int) -> float:
+        if self._reg_v is None:
+            self._reg_v = tail_regressions(self.volumes, self.windows)
+        return self._fit(self._reg_v, self.volumes, w)[0]
+
+    def touches(self, w: int, slope_h: float, intercept_h: float,
+                slope_l: float, intercept_l: float, tol: float) -> Tuple[int, int]:
+        """最近 w 根子序列上，摆动高点触上轨、摆动低点触下轨的次数"""
+        if self._swing_h is None:
+            self._swing_h = swing_indices(self.highs, self.swing_window, "high")
+            self._swing_l = swing_indices(self.lows, self.swing_window, "low")
+        hi_idx, hi_px = tail_swings(self._swing_h, self.highs, self.n, w, self.swing_window)
+        lo_idx, lo_px = tail_swings(self._swing_l, self.lows, self.n, w, self.swing_window)
+        return (
+            count_line_touches(hi_idx, hi_px, slope_h, intercept_h, tol),
+            count_line_touches(lo_idx, lo_px, slope_l, intercept_l, tol),
+        )
@@ -18,12 +18,14 @@ import socket
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 logging.basicConfig(
@@ -40,11 +42,33 @@ try:
     REQUEST_TIMEOUT = int(os.getenv("VALUESCAN_REQUEST_TIMEOUT") or getattr(signal_config, "REQUEST_TIMEOUT", 15))
     MAX_CONSECUTIVE_FAILURES = int(os.getenv("VALUESCAN_MAX_CONSECUTIVE_FAILURES") or getattr(signal_config, "MAX_CONSECUTIVE_FAILURES", 5))
     FAILURE_COOLDOWN = int(os.getenv("VALUESCAN_FAILURE_COOLDOWN") or getattr(signal_config, "FAILURE_COOLDOWN", 60))
+    CONCURRENT_FETCH = bool(getattr(signal_config, "CONCURRENT_FETCH", True))
+    ENDPOINT_DEADLINE = float(os.getenv("VALUESCAN_ENDPOINT_DEADLINE") or getattr(signal_config, "ENDPOINT_DEADLINE", REQUEST_TIMEOUT + 5))
+    INCREMENTAL_POLLING = bool(getattr(signal_config, "INCREMENTAL_POLLING", True))
+    INCREMENTAL_LOOKBACK_SECONDS = int(os.getenv("VALUESCAN_INCREMENTAL_LOOKBACK_SECONDS") or getattr(signal_config, "INCREMENTAL_LOOKBACK_SECONDS", 120))
+    INCREMENTAL_MAX_BLOCKED_ROUNDS = int(os.getenv("VALUESCAN_INCREMENTAL_MAX_BLOCKED_ROUNDS") or getattr(signal_config, "INCREMENTAL_MAX_BLOCKED_ROUNDS", 10))
+    SIGNAL_MAX_AGE_SECONDS = int(os.getenv("VALUESCAN_SIGNAL_MAX_AGE_SECONDS") or getattr(signal_config, "SIGNAL_MAX_AGE_SECONDS", 3600))
 except ImportError:
     POLL_INTERVAL = int(os.getenv("VALUESCAN_POLL_INTERVAL", "10"))
     REQUEST_TIMEOUT = int(os.getenv("VALUESCAN_REQUEST_TIMEOUT", "15"))
     MAX_CONSECUTIVE_FAILURES = int(os.getenv("VALUESCAN_MAX_CONSECUTIVE_FAILURES", "5"))
     FAILURE_COOLDOWN = int(os.getenv("VALUESCAN_FAILURE_COOLDOWN", "60"))
+    CONCURRENT_FETCH = True
+    ENDPOINT_DEADLINE = float(os.getenv("VALUESCAN_ENDPOINT_DEADLINE") or REQUEST_TIMEOUT + 5)
+    INCREMENTAL_POLLING = True
+    INCREMENTAL_LOOKBACK_SECONDS = int(os.getenv("VALUESCAN_INCREMENTAL_LOOKBACK_SECONDS", "120"))
+    INCREMENTAL_MAX_BLOCKED_ROUNDS = int(os.getenv("VALUESCAN_INCREMENTAL_MAX_BLOCKED_ROUNDS", "10"))
+    SIGNAL_MAX_AGE_SECONDS = int(os.getenv("VALUESCAN_SIGNAL_MAX_AGE_SECONDS", "3600"))
+
+# 多信号源并发拉取：一个慢接口不再拖住其他接口，单轮耗时取决于最慢的那个
+_concurrent_fetch_env = os.getenv("VALUESCAN_CONCURRENT_FETCH")
+if _concurrent_fetch_env is not None:
+    CONCURRENT_FETCH = _concurrent_fetch_env != "0"
+
+# 增量轮询：按信号源记录已处理到的 createTime 水位，低于水位的消息在合并前直接跳过
+_incremental_env = os.getenv("VALUESCAN_INCREMENTAL_POLLING")
+if _incremental_env is not None:
+    INCREMENTAL_POLLING = _incremental_env != "0"
 
 
 WARN_API_URL = os.getenv(
@@ -200,6 +224,11 @@ def get_tokens() -> str:
 def _make_session() -> requests.Session:
     session = requests.Session()
     session.trust_env = False
+    # 所有信号源共享同一个 keep-alive 连接池，并发拉取时每个线程都能拿到连接
+    pool_size = max(4, len(SIGNAL_ENDPOINTS) * 2)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
     return session
 
 
@@ -209,16 +238,24 @@ def _request_with_proxy_fallback(
     url: str,
     headers: Dict[str, str],
     proxies: Optional[Dict[str, str]],
+    timeout: Optional[float] = None,
     **kwargs,
 ) -> requests.Response:
+    timeout = REQUEST_TIMEOUT if timeout is None else timeout
     if proxies:
         try:
             return session.request(
-                method, url, headers=headers, proxies=proxies, timeout=REQUEST_TIMEOUT, **kwargs
+                method, url, headers=headers, proxies=proxies, timeout=timeout, **kwargs
             )
         except requests.RequestException as exc:
             logger.warning(f"Proxy request failed, fallback to direct: {exc}")
-    return session.request(method, url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+    return session.request(method, url, headers=headers, timeout=timeout, **kwargs)
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
 
 
 def _extract_items_from_payload(payload: dict) -> list:
@@ -299,7 +336,11 @@ def _fetch_from_endpoint(
     source_name: str,
     method: str = "GET",
     json_payload: Optional[dict] = None,
+    deadline: Optional[float] = None,
 ) -> Tuple[Optional[dict], str]:
+    """
+    deadline 为 time.monotonic() 时间点；超过后不再发起重试，请求超时也会被截断到剩余时间。
+    """
     headers = {
         "Authorization": f"Bearer {account_token}",
         "Content-Type": "application/json",
@@ -307,7 +348,19 @@ def _fetch_from_endpoint(
         "User-Agent": USER_AGENT,
     }
 
+    def _retry_wait() -> bool:
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 2:
+            return False
+        time.sleep(2)
+        return True
+
     for attempt in range(3):
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"[{source_name}] 已超过截止时间，放弃本轮请求")
+            return None, "retry"
+        timeout = REQUEST_TIMEOUT if remaining is None else max(0.5, min(REQUEST_TIMEOUT, remaining))
         try:
             logger.debug(
                 "[%s] 正在请求 API... (尝试 %s/3, method=%s)",
@@ -322,14 +375,17 @@ def _fetch_from_endpoint(
                     url,
                     headers,
                     proxies,
+                    timeout=timeout,
                     json=json_payload or {},
                 )
             else:
-                resp = _request_with_proxy_fallback(session, "GET", url, headers, proxies)
+                resp = _request_with_proxy_fallback(
+                    session, "GET", url, headers, proxies, timeout=timeout
+                )
         except requests.exceptions.Timeout:
             logger.warning(f"[{source_name}] 请求超时 (尝试 {attempt + 1}/3)")
-            if attempt < 2:
-                time.sleep(2)
+            if attempt < 2 and not _retry_wait():
+                return None, "retry"
             continue
         except requests.exceptions.RequestException as exc:
             logger.warning(f"[{source_name}] 请求异常: {exc}")
@@ -341,8 +397,7 @@ def _fetch_from_endpoint(
 
         if resp.status_code != 200:
             logger.warning(f"[{source_name}] API 返回状态码: {resp.status_code}")
-            if attempt < 2:
-                time.sleep(2)
+            if attempt < 2 and _retry_wait():
                 continue
             return None, "retry"
 
@@ -369,45 +424,136 @@ def _fetch_from_endpoint(
     return None, "retry"
 
 
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    if _fetch_executor is None:
+        # 预留一倍余量：上一轮超时仍在收尾的请求不会占满本轮的 worker
+        _fetch_executor = ThreadPoolExecutor(
+            max_workers=max(2, len(SIGNAL_ENDPOINTS) * 2),
+            thread_name_prefix="signal-fetch",
+        )
+    return _fetch_executor
+
+
+def _fetch_endpoint_entry(
+    session: requests.Session,
+    account_token: str,
+    proxies: Optional[Dict[str, str]],
+    entry: tuple,
+    idx: int,
+) -> Tuple[Optional[dict], str]:
+    source_name, url = entry[0], entry[1]
+    method = entry[2] if len(entry) >= 3 else "GET"
+    json_payload = entry[3] if len(entry) >= 4 else None
+
+    logger.info(f"[{idx}/{len(SIGNAL_ENDPOINTS)}] 正在从 [{source_name}] 获取数据...")
+    logger.info(f"  URL: {url}")
+    logger.info(f"  方法: {method}")
+
+    return _fetch_from_endpoint(
+        session,
+        account_token,
+        proxies,
+        url,
+        source_name,
+        method=method,
+        json_payload=json_payload,
+        deadline=time.monotonic() + ENDPOINT_DEADLINE,
+    )
+
+
+def _fetch_all_endpoints(
+    session: requests.Session,
+    account_token: str,
+    proxies: Optional[Dict[str, str]],
+) -> List[Tuple[str, Optional[dict], str]]:
+    """
+    拉取所有信号源，返回 [(source_name, payload, status)]，顺序与 SIGNAL_ENDPOINTS 一致。
+    并发模式下所有信号源同时发出，单个信号源超过 ENDPOINT_DEADLINE 视为本轮失败。
+    """
+    if not CONCURRENT_FETCH or len(SIGNAL_ENDPOINTS) <= 1:
+        results = []
+        for idx, entry in enumerate(SIGNAL_ENDPOINTS, 1):
+            payload, status = _fetch_endpoint_entry(session, account_token, proxies, entry, idx)
+            results.append((entry[0], payload, status))
+            if status == "expired":
+                break
+        return results
+
+    executor = _get_fetch_executor()
+    futures = [
+        executor.submit(_fetch_endpoint_entry, session, account_token, proxies, entry, idx)
+        for idx, entry in enumerate(SIGNAL_ENDPOINTS, 1)
+    ]
+    # 给 deadline 额外 1 秒让 worker 自己退出并记录日志
+    wait(futures, timeout=ENDPOINT_DEADLINE + 1)
+
+    results = []
+    for entry, future in zip(SIGNAL_ENDPOINTS, futures):
+        source_name = entry[0]
+        if not future.done():
+            future.cancel()
+            logger.warning(f"[{source_name}] 超过 {ENDPOINT_DEADLINE:.0f}s 截止时间，本轮跳过")
+            results.append((source_name, None, "retry"))
+            continue
+        try:
+            payload, status = future.result()
+        except Exception as exc:
+            logger.warning(f"[{source_name}] 获取数据异常: {exc}")
+            payload, status = None, "retry"
+        results.append((source_name, payload, status))
+    return results
+
+
+def _watermark_floor(watermark: int) -> int:
+    """水位回看窗口，容忍服务端稍晚写入的旧 createTime 消息（重复项由数据库去重兜底）。"""
+    if watermark <= 0:
+        return 0
+    lookback = INCREMENTAL_LOOKBACK_SECONDS
+    # createTime 可能是秒或毫秒
+    return watermark - (lookback * 1000 if watermark > 1e11 else lookback)
+
+
+def _message_id_from_key(key: str) -> Optional[str]:
+    return key[3:] if key.startswith("id:") else None
+
+
 def fetch_signals(
     session: requests.Session,
     account_token: str,
     proxies: Optional[Dict[str, str]],
+    watermarks: Optional[Dict[str, int]] = None,
 ) -> Tuple[Optional[dict], str]:
     """
     Fetch signals from all configured endpoints and merge duplicates.
 
+    Endpoints are fetched concurrently unless CONCURRENT_FETCH is disabled.
+    When ``watermarks`` ({source: createTime}) is given, items older than the
+    source's watermark are dropped before dedupe/sort, and the payload carries
+    ``watermark_candidates`` for advance_watermarks().
     Returns (payload, status) where status is one of: ok/expired/retry.
     """
     logger.info("=" * 60)
     logger.info("开始获取信号数据")
     logger.info(f"配置的信号源数量: {len(SIGNAL_ENDPOINTS)}")
     logger.info(f"使用代理: {proxies is not None}")
+    logger.info(f"并发拉取: {CONCURRENT_FETCH}")
 
     combined_messages = []
     seen_keys = set()
     source_counts: Dict[str, int] = {}
     duplicate_count = 0
+    below_watermark = 0
+    watermark_candidates: Dict[str, List[Tuple[int, Optional[str]]]] = {}
     statuses = []
+    started = time.monotonic()
 
-    for idx, entry in enumerate(SIGNAL_ENDPOINTS, 1):
-        source_name, url = entry[0], entry[1]
-        method = entry[2] if len(entry) >= 3 else "GET"
-        json_payload = entry[3] if len(entry) >= 4 else None
-
-        logger.info(f"[{idx}/{len(SIGNAL_ENDPOINTS)}] 正在从 [{source_name}] 获取数据...")
-        logger.info(f"  URL: {url}")
-        logger.info(f"  方法: {method}")
-
-        payload, status = _fetch_from_endpoint(
-            session,
-            account_token,
-            proxies,
-            url,
-            source_name,
-            method=method,
-            json_payload=json_payload,
-        )
+    results = _fetch_all_endpoints(session, account_token, proxies)
+
+    for source_name, payload, status in results:
         statuses.append(status)
 
         if status == "expired":
@@ -421,8 +567,15 @@ def fetch_signals(
         source_counts[source_name] = len(items)
         logger.info(f"[{source_name}] 成功获取 {len(items)} 条信号")
 
+        floor = _watermark_floor(watermarks.get(source_name, 0)) if watermarks is not None else 0
+        candidates = watermark_candidates.setdefault(source_name, [])
         for item in items:
+            ts = _message_sort_key(item)
+            if floor and ts and ts < floor:
+                below_watermark += 1
+                continue
             key = _make_dedupe_key(item)
+            candidates.append((ts, _message_id_from_key(key)))
             if key in seen_keys:
                 duplicate_count += 1
                 continue
@@ -436,12 +589,15 @@ def fetch_signals(
     combined_messages.sort(key=_message_sort_key)
     if duplicate_count:
         logger.info(f"合并过程中跳过 {duplicate_count} 条重复信号")
+    if below_watermark:
+        logger.info(f"增量轮询跳过 {below_watermark} 条水位以下的已处理信号")
 
     logger.info("=" * 60)
     logger.info(f"✓ 信号数据获取完成")
     logger.info(f"  总计: {len(combined_messages)} 条消息")
     logger.info(f"  来源分布: {source_counts}")
     logger.info(f"  去重数量: {duplicate_count}")
+    logger.info(f"  耗时: {time.monotonic() - started:.2f}s")
     logger.info("=" * 60)
 
     aggregated_payload = {
@@ -450,9 +606,64 @@ def fetch_signals(
         "data": combined_messages,
         "source_counts": source_counts,
     }
+    if watermarks is not None:
+        aggregated_payload["watermark_candidates"] = watermark_candidates
     return aggregated_payload, "ok"
 
 
+# 挡住水位的消息: source -> (message_id, 连续挡住的轮数)
+_watermark_blocks: Dict[str, Tuple[str, int]] = {}
+
+
+def _may_pass_blocked(source_name: str, ts: int, msg_id: str) -> bool:
+    """未入库的消息连续挡住水位 INCREMENTAL_MAX_BLOCKED_ROUNDS 轮，或已超过信号最大年龄时允许越过"""
+    blocked = _watermark_blocks.get(source_name)
+    rounds = blocked[1] + 1 if blocked and blocked[0] == msg_id else 1
+    age = time.time() - (ts / 1000 if ts > 1e11 else ts)
+    too_old = SIGNAL_MAX_AGE_SECONDS > 0 and age > SIGNAL_MAX_AGE_SECONDS
+    if rounds < max(INCREMENTAL_MAX_BLOCKED_ROUNDS, 1) and not too_old:
+        _watermark_blocks[source_name] = (msg_id, rounds)
+        return False
+    _watermark_blocks.pop(source_name, None)
+    reason = f"已超过 {SIGNAL_MAX_AGE_SECONDS}s" if too_old else f"连续 {rounds} 轮未处理成功"
+    logger.warning(f"[{source_name}] 消息 {msg_id} {reason}，轮询水位越过该消息")
+    return True
+
+
+def advance_watermarks(
+    message_db: Any,
+    watermarks: Dict[str, int],
+    candidates: Optional[Dict[str, List[Tuple[int, Optional[str]]]]],
+) -> None:
+    """
+    按时间顺序推进每个信号源的水位，只越过已写入 processed_messages 的消息，
+    发送失败（未入库）的消息会挡住水位，下一轮仍会被拉取重试；
+    同一条消息连续挡住多轮或已过期时放行并记录警告，避免水位永久停住。
+    """
+    if not candidates:
+        return
+    processed_ids = message_db.get_processed_ids(
+        [msg_id for entries in candidates.values() for _, msg_id in entries if msg_id]
+    )
+    for source_name, entries in candidates.items():
+        current = watermarks.get(source_name, 0)
+        new_mark, new_id = current, None
+        blocked = False
+        for ts, msg_id in sorted(entries, key=lambda e: e[0]):
+            if not ts or msg_id is None:
+                continue
+            if msg_id not in processed_ids and not _may_pass_blocked(source_name, ts, msg_id):
+                blocked = True
+                break
+            if ts > new_mark:
+                new_mark, new_id = ts, msg_id
+        if not blocked:
+            _watermark_blocks.pop(source_name, None)
+        if new_mark > current and message_db.set_watermark(source_name, new_mark, new_id):
+            watermarks[source_name] = new_mark
+            logger.debug(f"[{source_name}] 轮询水位推进到 {new_mark}")
+
+
 def fetch_movement_list(
     session: requests.Session,
     account_token: str,
@@ -512,6 +723,8 @@ def main():
     logger.info("启动主动轮询监控...")
     logger.info(f"轮询间隔: {POLL_INTERVAL} 秒")
     logger.info(f"请求超时: {REQUEST_TIMEOUT} 秒")
+    logger.info(f"并发拉取: {CONCURRENT_FETCH} (单源截止 {ENDPOINT_DEADLINE:.0f} 秒)")
+    logger.info(f"增量轮询: {INCREMENTAL_POLLING} (回看 {INCREMENTAL_LOOKBACK_SECONDS} 秒)")
     logger.info(f"信号源: {[entry[0] for entry in SIGNAL_ENDPOINTS]}")
     for entry in SIGNAL_ENDPOINTS:
         name, url = entry[0], entry[1]
@@ -563,6 +776,13 @@ def main():
     except Exception as exc:
         logger.warning(f"导入异动榜单缓存失败: {exc}")
 
+    # 预先拉起图表渲染进程，第一条信号不承担进程启动与模板构建耗时
+    try:
+        from chart_render_pool import start_chart_render_pool
+        start_chart_render_pool()
+    except Exception as exc:
+        logger.warning(f"启动图表渲染进程池失败: {exc}")
+
     # 导入 AI 市场总结模块
     ai_summary_check = None
     try:
@@ -572,6 +792,19 @@ def main():
     except Exception as exc:
         logger.warning(f"导入 AI 市场总结模块失败: {exc}")
 
+    # 增量轮询水位，存放在 valuescan.db 中，重启后继续生效
+    message_db = None
+    watermarks: Optional[Dict[str, int]] = None
+    if INCREMENTAL_POLLING and process_response_data:
+        try:
+            from database import get_database
+            message_db = get_database()
+            watermarks = message_db.get_watermarks()
+            logger.info(f"✅ 增量轮询水位已加载: {watermarks or '无（首次全量拉取）'}")
+        except Exception as exc:
+            logger.warning(f"加载增量轮询水位失败，使用全量拉取: {exc}")
+            message_db, watermarks = None, None
+
     proxy_url, proxies = _load_signal_config_proxies()
     if proxy_url:
         logger.info(f"🌐 使用代理: {proxy_url}")
@@ -612,7 +845,7 @@ def main():
                     last_movement_update = time.time()
 
             if ENABLE_SIGNALS:
-                payload, status = fetch_signals(session, account_token, proxies)
+                payload, status = fetch_signals(session, account_token, proxies, watermarks=watermarks)
 
                 if status == "ok" and payload and process_response_data:
                     consecutive_failures = 0
@@ -626,6 +859,8 @@ def main():
                         )
                         if isinstance(new_count, int) and new_count > 0:
                             logger.info(f"处理了 {new_count} 条新消息")
+                        if message_db is not None and watermarks is not None:
+                            advance_watermarks(message_db, watermarks, payload.get("watermark_candidates"))
                     else:
                         logger.debug("本次无消息")
                 elif status == "expired":
@@ -20,6 +20,12 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
+try:
+    from market_data_cache import cached_json
+except ImportError:
+    def cached_json(url, params, fetcher):
+        return fetcher()
+
 # 代理配置
 try:
     from config import SOCKS5_PROXY, HTTP_PROXY
@@ -39,6 +45,14 @@ def _get_proxies() -> Optional[Dict[str, str]]:
     return None
 
 
+def _binance_get_json(url: str, params: Dict[str, Any], timeout: int = 10) -> Any:
+    """GET Binance 接口，返回 JSON（非 200 返回 None），结果走共享行情缓存"""
+    def _fetch():
+        resp = requests.get(url, params=params, timeout=timeout, proxies=_get_proxies())
+        return resp.json() if resp.status_code == 200 else None
+    return cached_json(url, params, _fetch)
+
+
 def get_funding_rate(symbol: str) -> Optional[Dict[str, Any]]:
     """
     获取币安永续合约资金费率
@@ -50,15 +64,9 @@ def get_funding_rate(symbol: str) -> Optional[Dict[str, Any]]:
             clean_symbol += "USDT"
         
         url = "https://fapi.binance.com/fapi/v1/fundingRate"
-        resp = requests.get(
-            url,
-            params={"symbol": clean_symbol, "limit": 10},
-            timeout=10,
-            proxies=_get_proxies()
-        )
+        data = _binance_get_json(url, {"symbol": clean_symbol, "limit": 10})
         
-        if resp.status_code == 200:
-            data = resp.json()
+        if data is not None:
             if data:
                 latest = data[-1]
                 rate = float(latest.get("fundingRate", 0))
@@ -86,15 +94,9 @@ def get_open_interest(symbol: str) -> Optional[Dict[str, Any]]:
             clean_symbol += "USDT"
         
         url = "https://fapi.binance.com/fapi/v1/openInterest"
-        resp = requests.get(
-            url,
-            params={"symbol": clean_symbol},
-            timeout=10,
-            proxies=_get_proxies()
-        )
+        data = _binance_get_json(url, {"symbol": clean_symbol})
         
-        if resp.status_code == 200:
-            data = resp.json()
+        if data is not None:
             oi = float(data.get("openInterest", 0))
             return {
                 "symbol": clean_symbol,
@@ -120,14 +122,8 @@ def get_long_short_ratio(symbol: str) -> Optional[Dict[str, Any]]:
         
         # 大户账户多空比
         url = "https://fapi.binance.com/futures/data/topLongShortAccountRatio"
-        resp = requests.get(
-            url,
-            params={"symbol": clean_symbol, "period": "1h", "limit": 1},
-            timeout=10,
-            proxies=_get_proxies()
-        )
-        if resp.status_code == 200:
-            data = resp.json()
+        data = _binance_get_json(url, {"symbol": clean_symbol, "period": "1h", "limit": 1})
+        if data is not None:
             if data:
                 result["top_trader_accounts"] = {
                     "long_ratio": float(data[0].get("longAccount", 0)),
@@ -137,14 +133,8 @@ def get_long_short_ratio(symbol: str) -> Optional[Dict[str, Any]]:
         
         # 大户持仓多空比
         url = "https://fapi.binance.com/futures/data/topLongShortPositionRatio"
-        resp = requests.get(
-            url,
-            params={"symbol": clean_symbol, "period": "1h", "limit": 1},
-            timeout=10,
-            proxies=_get_proxies()
-        )
-        if resp.status_code == 200:
-            data = resp.json()
+        data = _binance_get_json(url, {"symbol": clean_symbol, "period": "1h", "limit": 1})
+        if data is not None:
             if data:
                 result["top_trader_positions"] = {
                     "long_ratio": float(data[0].get("longPosition", 0)),
@@ -154,14 +144,8 @@ def get_long_short_ratio(symbol: str) -> Optional[Dict[str, Any]]:
         
         # 全市场多空比
         url = "https://fapi.binance.com/futures/data/globalLongShortAccountRatio"
-        resp = requests.get(
-            url,
-            params={"symbol": clean_symbol, "period": "1h", "limit": 1},
-            timeout=10,
-            proxies=_get_proxies()
-        )
-        if resp.status_code == 200:
-            data = resp.json()
+        data = _binance_get_json(url, {"symbol": clean_symbol, "period": "1h", "limit": 1})
+        if data is not None:
             if data:
                 result["global_accounts"] = {
                     "long_ratio": float(data[0].get("longAccount", 0)),
@@ -44,7 +44,6 @@ except ImportError:
 
 # 北京时区 (UTC+8)
 BEIJING_TZ = timezone(timedelta(hours=8))
-_PRO_CHART_LOCK = threading.Lock()
 _BULLISH_SIGNAL_TYPES = {100, 101, 108, 110, 111}
 _BEARISH_SIGNAL_TYPES = {102, 103, 109, 112}
 
@@ -2122,30 +2121,14 @@ def send_message_with_async_chart(message_text, symbol, pin_message=False, signa
     if enable_pro_chart:
         def generate_and_edit_chart():
             try:
-                from chart_pro_v10 import generate_chart_v10
+                from chart_render_pool import render_chart
                 from ai_key_levels_cache import wait_for_levels
                 logger.info(f"[Chart] Pro chart start: ${symbol}")
 
-                import signal
-
-                def timeout_handler(signum, frame):
-                    raise TimeoutError(f"Chart generation timeout (30s): ${symbol}")
-
-                try:
-                    signal.signal(signal.SIGALRM, timeout_handler)
-                    signal.alarm(30)
-                except Exception:
-                    pass
-
                 if ai_allowed:
                     wait_for_levels(symbol, timeout_sec=8, poll_sec=0.3)
-                with _PRO_CHART_LOCK:
-                    chart_data = generate_chart_v10(symbol, "1h", 200, allow_ai_overlays=ai_allowed)
-
-                try:
-                    signal.alarm(0)
-                except Exception:
-                    pass
+                # 渲染在独立进程中进行，超时/队列已满时返回 None
+                chart_data = render_chart(symbol, "1h", 200, allow_ai_overlays=ai_allowed)
 
                 if chart_data:
                     with state["lock"]:
@@ -2159,8 +2142,6 @@ def send_message_with_async_chart(message_text, symbol, pin_message=False, signa
                     _schedule_update("chart_ready")
                 else:
                     logger.warning(f"[Chart] Empty chart data: ${symbol}")
-            except TimeoutError as e:
-                logger.error(f"[Chart] Timeout: {e}")
             except Exception as e:
                 logger.error(f"[Chart] Failed: {e}")
                 import traceback
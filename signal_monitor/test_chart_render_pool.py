@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+测试 Pro 图表渲染进程池的截止时间：超时的子进程被终止并替换，后续任务照常出图
+"""
+import os
+import sys
+import tempfile
+import time
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+import chart_render_pool
+from chart_render_pool import ChartRenderPool
+
+FAKE_CHART = '''
+import os
+import time
+
+
+def warm_chart_template():
+    pass
+
+
+def generate_chart_v10(symbol, interval, limit, allow_ai_overlays=True, ai_levels=None, ai_analysis=None):
+    if symbol == "SLOW":
+        time.sleep(60)
+    return f"{symbol}:{os.getpid()}:{ai_analysis}".encode()
+'''
+
+
+def _pool(tmp, workers=1, timeout=3):
+    with open(os.path.join(tmp, "chart_pro_v10.py"), "w", encoding="utf-8") as fh:
+        fh.write(FAKE_CHART)
+    # 子进程从临时目录导入假的图表模块
+    chart_render_pool._BASE_DIR = tmp
+    pool = ChartRenderPool(workers=workers, queue_size=4, timeout=timeout)
+    pool.start()
+    return pool
+
+
+def test_render_returns_png_bytes():
+    """正常任务经管道返回子进程的结果，AI 分析随任务传入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp)
+        try:
+            first = pool.render("BTC", ai_analysis={"trend": "up"})
+            second = pool.render("ETH")
+        finally:
+            pool.shutdown()
+    assert first.startswith(b"BTC:") and first.endswith(b"{'trend': 'up'}")
+    assert second.startswith(b"ETH:")
+    # 同一个子进程连续处理
+    assert first.split(b":")[1] == second.split(b":")[1]
+
+
+def test_deadline_kills_and_replaces_worker():
+    """超过截止时间的渲染由主进程终止子进程并换新进程，之后的任务正常完成"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, timeout=3)
+        try:
+            before = pool.render("BTC")
+            started = time.monotonic()
+            assert pool.render("SLOW") is None
+            assert time.monotonic() - started < 5
+            assert pool.replaced == 1
+            after = pool.render("BTC")
+        finally:
+            pool.shutdown()
+    assert before and after
+    assert before.split(b":")[1] != after.split(b":")[1]
+
+
+if __name__ == '__main__':
+    test_render_returns_png_bytes()
+    test_deadline_kills_and_replaces_worker()
+    print("[OK] 全部通过")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+测试 Pro 图表模板复用：连续出图的 PNG 与首次出图逐字节一致
+"""
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+# ValuScan 主力位不走网络
+sys.modules["valuescan_api"] = types.SimpleNamespace(
+    get_keyword=lambda *args, **kwargs: None,
+    get_main_force=lambda *args, **kwargs: {},
+    get_hold_cost=lambda *args, **kwargs: {},
+)
+
+import chart_pro_v10
+
+
+def _integrated_data(seed, base_price):
+    rng = np.random.default_rng(seed)
+    close = base_price * np.exp(np.cumsum(rng.normal(0, 0.004, 200)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.003, 200)) * close
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=200, freq="h"),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.uniform(100, 1000, 200),
+    })
+    last = float(close[-1])
+    return {
+        "df": df,
+        "tick": {"priceChangePercent": "1.5", "highPrice": str(last * 1.02), "lowPrice": str(last * 0.98),
+                 "quoteVolume": "123456789", "openPrice": str(last * 0.99)},
+        "fund": [{"fundingRate": "0.0001"}],
+        "oi": {"current": 12345.0, "delta_1h": 0.8},
+        "taker_flow": None,
+        "vs_flow": {},
+        "liq": None,
+        "ls": [{"longShortRatio": "1.1"}],
+        "ai_lvls": None,
+        "ob": {"bids": [[last * (1 - i / 1000), 5.0] for i in range(1, 20)],
+               "asks": [[last * (1 + i / 1000), 5.0] for i in range(1, 20)]},
+    }
+
+
+def _render(symbol, data):
+    chart_pro_v10.get_integrated_data = lambda *args, **kwargs: data
+    return chart_pro_v10.generate_chart_v10(symbol, allow_ai_overlays=False)
+
+
+def test_template_renders_are_identical():
+    """同一份数据连续出图结果一致；中间插入其他币种的出图不留下残影"""
+    btc = _integrated_data(1, 40000.0)
+    eth = _integrated_data(2, 2500.0)
+
+    first = _render("BTC", btc)
+    assert first and first.startswith(b"\x89PNG")
+    assert chart_pro_v10._TEMPLATE is not None
+
+    second = _render("BTC", btc)
+    assert second == first
+
+    other = _render("ETH", eth)
+    assert other and other != first
+    assert _render("BTC", btc) == first
+    # 模板锁已释放，下次出图仍复用同一个模板
+    assert not chart_pro_v10._TEMPLATE_LOCK.locked()
+
+
+if __name__ == '__main__':
+    test_template_renders_are_identical()
+    print("[OK] 全部通过")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试消息数据库的落盘与缓存一致性
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import MessageDatabase
+
+
+def _stored_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute('SELECT message_id FROM processed_messages')}
+    finally:
+        conn.close()
+
+
+def test_add_message_commits_before_return():
+    """默认 add_message 返回前已提交，其他连接立即可见"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'messages.db')
+        db = MessageDatabase(db_path)
+        assert db.add_message('m1', 110, 'BTC', 'title')
+        assert _stored_ids(db_path) == {'m1'}
+        assert not db.add_message('m1', 110, 'BTC', 'title')
+        db.close()
+
+
+def test_deferred_rows_flush_in_one_batch():
+    """defer=True 的记录在 flush() 前只在内存中，flush() 后落盘"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'messages.db')
+        db = MessageDatabase(db_path)
+        for i in range(5):
+            assert db.add_message(f'old-{i}', 110, 'ETH', 'title', defer=True)
+        assert db.is_processed('old-3')
+        assert _stored_ids(db_path) == set()
+
+        assert db.flush() == 5
+        assert _stored_ids(db_path) == {f'old-{i}' for i in range(5)}
+        db.close()
+
+        reopened = MessageDatabase(db_path)
+        assert reopened.get_processed_ids(['old-0', 'old-4', 'new']) == {'old-0', 'old-4'}
+        reopened.close()
+
+
+def test_write_behind_auto_flush_at_batch_size():
+    """write_behind 模式下待写队列达到批量大小时自动落盘"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'messages.db')
+        db = MessageDatabase(db_path, write_behind=True, flush_batch_size=3)
+        db.add_message('a')
+        db.add_message('b')
+        assert _stored_ids(db_path) == set()
+        db.add_message('c')
+        assert _stored_ids(db_path) == {'a', 'b', 'c'}
+        db.close()
+
+
+def test_cache_invalidated_after_delete():
+    """清理/清空后缓存不再把已删除的 ID 当作已处理"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'messages.db')
+        db = MessageDatabase(db_path)
+        db.add_message('stale')
+        db.add_message('fresh')
+        db.cursor.execute(
+            'UPDATE processed_messages SET processed_time = ? WHERE message_id = ?',
+            (int(time.time()) - 40 * 24 * 3600, 'stale')
+        )
+        db.conn.commit()
+
+        assert db.clean_old_messages(30) == 1
+        assert db.get_processed_ids(['stale', 'fresh']) == {'fresh'}
+
+        db.add_message('queued', defer=True)
+        assert db.clear_all() == 1
+        assert db.get_processed_ids(['fresh', 'queued']) == set()
+        assert db.flush() == 0
+        db.close()
+
+
+if __name__ == '__main__':
+    test_add_message_commits_before_return()
+    test_deferred_rows_flush_in_one_batch()
+    test_write_behind_auto_flush_at_batch_size()
+    test_cache_invalidated_after_delete()
+    print("[OK] 全部通过")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+测试 IPC 发件箱的补发、过期丢弃与桥接端去重
+"""
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ipc_client import IPCChannel
+from ipc_protocol import HANDSHAKE, SeenMessageStore, dedupe_key, encode_frame, read_frame
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeBridge:
+    """最小长连接桥接端：记录收到的批次；drop_first=True 时第一批不回 ack 直接断开"""
+
+    def __init__(self, port, drop_first=False):
+        self.batches = []
+        self.drop_first = drop_first
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", port))
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            if conn.recv(len(HANDSHAKE)) != HANDSHAKE:
+                return
+            while True:
+                frame = read_frame(conn)
+                if frame is None:
+                    return
+                self.batches.append(frame["items"])
+                if self.drop_first and len(self.batches) == 1:
+                    return
+                conn.sendall(encode_frame({"op": "ack", "seq": frame["seq"]}))
+
+    def close(self):
+        self._server.close()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _channel(port, outbox, **kwargs):
+    return IPCChannel(
+        host="127.0.0.1", port=port, outbox_path=outbox,
+        linger=0, ack_timeout=2, retry_delay=0.1, **kwargs
+    )
+
+
+def test_outbox_replays_after_bridge_starts():
+    """桥接端不可用期间的信号留在发件箱，桥接端启动后补发并删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        channel = _channel(port, os.path.join(tmp, "outbox.db"))
+        try:
+            assert channel.enqueue({"message_type": 110, "message_id": "a"})
+            assert channel.enqueue({"message_type": "AI_SIGNAL", "symbol": "BTC"})
+            time.sleep(0.3)
+            assert channel.pending_count() == 2
+
+            bridge = FakeBridge(port)
+            try:
+                assert channel.flush(timeout=5)
+                delivered = [item for batch in bridge.batches for item in batch]
+                assert [p.get("message_id") for p in delivered] == ["a", None]
+                assert all(p.get("ipc_id") for p in delivered)
+            finally:
+                bridge.close()
+        finally:
+            channel.close()
+
+
+def test_expired_signals_are_not_replayed():
+    """超过 max_age 仍未送达的信号直接丢弃"""
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        outbox = os.path.join(tmp, "outbox.db")
+        channel = _channel(port, outbox, max_age=60)
+        try:
+            channel.enqueue({"message_type": 110, "message_id": "stale"})
+            channel.enqueue({"message_type": 110, "message_id": "fresh"})
+            with channel._db_lock:
+                channel._db.execute(
+                    "UPDATE outbox SET created_at = ? WHERE payload LIKE '%stale%'", (time.time() - 120,)
+                )
+                channel._db.commit()
+
+            bridge = FakeBridge(port)
+            try:
+                assert channel.flush(timeout=5)
+                delivered = [item["message_id"] for batch in bridge.batches for item in batch]
+                assert delivered == ["fresh"]
+            finally:
+                bridge.close()
+        finally:
+            channel.close()
+
+
+def test_resend_keeps_ipc_id_and_bridge_dedupes():
+    """未收到 ack 的批次重发时 ipc_id 不变，桥接端持久化的去重表跳过重复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        bridge = FakeBridge(port, drop_first=True)
+        channel = _channel(port, os.path.join(tmp, "outbox.db"))
+        try:
+            channel.enqueue({"message_type": "AI_SIGNAL", "symbol": "ETH"})
+            assert channel.flush(timeout=5)
+        finally:
+            channel.close()
+            bridge.close()
+
+        assert len(bridge.batches) == 2
+        first, second = bridge.batches[0][0], bridge.batches[1][0]
+        assert first["ipc_id"] == second["ipc_id"]
+
+        seen_path = os.path.join(tmp, "seen.db")
+        store = SeenMessageStore(seen_path)
+        assert store.add(dedupe_key(first))
+        assert not store.add(dedupe_key(second))
+        store.close()
+
+        # 桥接进程重启后去重表仍然有效
+        reopened = SeenMessageStore(seen_path)
+        assert not reopened.add(dedupe_key(second))
+        assert reopened.add(dedupe_key({"message_type": 110, "message_id": "other"}))
+        reopened.close()
+
+
+def test_seen_store_prunes_to_limit():
+    """去重表只保留最近 limit 条"""
+    with tempfile.TemporaryDirectory() as tmp:
+        seen_path = os.path.join(tmp, "seen.db")
+        store = SeenMessageStore(seen_path, limit=3, prune_every=5)
+        for i in range(10):
+            assert store.add(f"110:{i}")
+        store.close()
+        conn = sqlite3.connect(seen_path)
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM seen_messages").fetchone()[0]
+        finally:
+            conn.close()
+        assert count == 3
+
+
+if __name__ == "__main__":
+    test_outbox_replays_after_bridge_starts()
+    test_expired_signals_are_not_replayed()
+    test_resend_keeps_ipc_id_and_bridge_dedupes()
+    test_seen_store_prunes_to_limit()
+    print("[OK] 全部通过")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+测试本地 K 线存储的增量同步与断档处理
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from kline_store import KlineStore
+
+STEP = 60_000
+
+
+def _kline(open_time, price):
+    return [open_time, price, price + 1, price - 1, price, 10.0,
+            open_time + STEP - 1, 100.0, 5, 4.0, 40.0]
+
+
+class FakeFetcher:
+    """按 startTime / endTime / limit 返回 [first, last] 范围内的 1m K 线"""
+
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(dict(params))
+        limit = params["limit"]
+        if "startTime" in params:
+            start = max(self.first, params["startTime"] // STEP * STEP)
+            times = range(start, min(self.last, start + (limit - 1) * STEP) + 1, STEP)
+        else:
+            end = min(self.last, params.get("endTime", self.last) // STEP * STEP)
+            start = max(self.first, end - (limit - 1) * STEP)
+            times = range(start, end + 1, STEP)
+        return [_kline(t, float(t // STEP % 1000)) for t in times]
+
+
+def test_incremental_sync_appends_new_bars():
+    """短断档从最后一根开始补齐并追加"""
+    now = int(time.time() * 1000) // STEP * STEP
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KlineStore(tmp)
+        store.get("BTC", "1m", 50, FakeFetcher(now - 200 * STEP, now - 10 * STEP), max_age=0)
+        fetcher = FakeFetcher(now - 200 * STEP, now)
+        rows = store.get("BTC", "1m", 50, fetcher, max_age=0)
+        assert int(rows[-1, 0]) == now
+        assert fetcher.calls[0]["startTime"] == now - 10 * STEP
+        assert len(store.read("BTC", "1m")) == 60
+
+
+def test_gap_keeps_backfilled_history():
+    """断档超过补齐上限时最新 K 线追加在旧数据之后，已补齐的历史不丢弃"""
+    now = int(time.time() * 1000) // STEP * STEP
+    old_last = now - 5000 * STEP
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KlineStore(tmp, max_catchup_pages=1)
+        old = FakeFetcher(old_last - 3000 * STEP, old_last)
+        assert store.backfill("ETH", "1m", old_last - 3000 * STEP, old) == 3001
+
+        rows = store.get("ETH", "1m", 100, FakeFetcher(old_last - 3000 * STEP, now), max_age=0)
+        assert len(rows) == 100
+        assert int(rows[0, 0]) == now - 99 * STEP and int(rows[-1, 0]) == now
+
+        stored = store.read("ETH", "1m")
+        assert len(stored) == 3101
+        assert int(stored[0, 0]) == old_last - 3000 * STEP
+        assert int(stored[3000, 0]) == old_last
+        assert (stored[1:, 0] > stored[:-1, 0]).all()
+        assert store.get_stats()["gaps"] == 1
+
+
+def test_window_across_gap_is_filled():
+    """断档后请求更多 K 线时向前补齐断档后半段，返回的开盘时间连续"""
+    now = int(time.time() * 1000) // STEP * STEP
+    old_last = now - 5000 * STEP
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KlineStore(tmp, max_catchup_pages=1)
+        fetcher = FakeFetcher(old_last - 3000 * STEP, now)
+        store.backfill("SOL", "1m", old_last - 3000 * STEP, FakeFetcher(old_last - 3000 * STEP, old_last))
+        store.get("SOL", "1m", 100, fetcher, max_age=0)
+
+        rows = store.get("SOL", "1m", 300, fetcher, max_age=60)
+        assert len(rows) == 300
+        assert int(rows[0, 0]) == now - 299 * STEP and int(rows[-1, 0]) == now
+        assert (np.diff(rows[:, 0]) == STEP).all()
+        assert fetcher.calls[-1]["endTime"] == now - 99 * STEP - 1
+        assert len(store.read("SOL", "1m")) == 3301
+        assert store.get_stats()["holes_filled"] == 1
+
+
+def test_missing_exchange_range_returns_contiguous_tail():
+    """交易所本身缺失的断档补不齐时只返回断档之后的部分，且不再重复请求"""
+    now = int(time.time() * 1000) // STEP * STEP
+    old_last = now - 5000 * STEP
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KlineStore(tmp, max_catchup_pages=1)
+        store.backfill("XRP", "1m", old_last - 3000 * STEP, FakeFetcher(old_last - 3000 * STEP, old_last))
+        store.get("XRP", "1m", 100, FakeFetcher(now - 99 * STEP, now), max_age=0)
+
+        fetcher = FakeFetcher(now - 99 * STEP, now)
+        rows = store.get("XRP", "1m", 300, fetcher, max_age=60)
+        assert len(rows) == 100 and int(rows[0, 0]) == now - 99 * STEP
+        requests = len(fetcher.calls)
+        rows = store.get("XRP", "1m", 300, fetcher, max_age=60)
+        assert len(rows) == 100 and len(fetcher.calls) == requests
+
+
+if __name__ == '__main__':
+    test_incremental_sync_appends_new_bars()
+    test_gap_keeps_backfilled_history()
+    test_window_across_gap_is_filled()
+    test_missing_exchange_range_returns_contiguous_tail()
+    print("[OK] 全部通过")
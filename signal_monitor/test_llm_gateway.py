@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+测试 LLM 网关的流式降级：接口以 400 拒绝 stream 参数时改用普通请求，并按接口地址记住
+"""
+import os
+import sys
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+import llm_gateway
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, text=""):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = text
+        self.headers = {"Content-Type": "application/json"}
+
+    def json(self):
+        return self._data
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """带 stream 参数的请求返回 400，普通请求返回 JSON"""
+
+    def __init__(self, reject_plain=False):
+        self.bodies = []
+        self.reject_plain = reject_plain
+
+    def post(self, url, headers=None, json=None, timeout=None, stream=False):
+        self.bodies.append(json)
+        if "stream" in json or "stream_options" in json:
+            return FakeResponse(400, text='{"error": "Unrecognized request argument: stream_options"}')
+        if self.reject_plain:
+            return FakeResponse(400, text='{"error": "model not found"}')
+        return FakeResponse(200, {
+            "choices": [{"message": {"content": " ok "}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+        })
+
+
+def _chat(url, session):
+    llm_gateway._get_session = lambda: session
+    return llm_gateway.chat_completion(
+        url, "key", "model", [{"role": "user", "content": "hi"}],
+        caller="test", use_cache=False, stream=True,
+    )
+
+
+def test_stream_rejection_falls_back_and_is_remembered():
+    """首次 400 后不带 stream 重试成功；同一接口之后直接发普通请求"""
+    session = FakeSession()
+    url = "http://proxy.local/v1/chat/completions"
+    assert _chat(url, session) == "ok"
+    assert [("stream" in body) for body in session.bodies] == [True, False]
+    assert "stream_options" not in session.bodies[1]
+
+    assert _chat(url, session) == "ok"
+    assert len(session.bodies) == 3 and "stream" not in session.bodies[2]
+
+
+def test_other_errors_do_not_downgrade():
+    """普通请求同样失败时返回 None，不记住降级"""
+    session = FakeSession(reject_plain=True)
+    url = "http://broken.local/v1/chat/completions"
+    assert _chat(url, session) is None
+    assert url not in llm_gateway._non_stream_urls
+    assert _chat(url, session) is None
+    assert "stream" in session.bodies[2]
+
+
+if __name__ == '__main__':
+    test_stream_rejection_falls_back_and_is_remembered()
+    test_other_errors_do_not_downgrade()
+    print("[OK] 全部通过")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+测试增量轮询水位推进：处理失败的消息挡住水位，连续多轮或过期后放行
+"""
+import os
+import sys
+import time
+
+# 添加当前目录到路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+import polling_monitor
+from polling_monitor import advance_watermarks
+
+
+class FakeDB:
+    def __init__(self, processed):
+        self.processed = set(processed)
+        self.marks = {}
+
+    def get_processed_ids(self, ids):
+        return {i for i in ids if i in self.processed}
+
+    def set_watermark(self, source, created_time, message_id=None):
+        self.marks[source] = (created_time, message_id)
+        return True
+
+
+def _reset(max_rounds=3):
+    polling_monitor._watermark_blocks.clear()
+    polling_monitor.INCREMENTAL_MAX_BLOCKED_ROUNDS = max_rounds
+    polling_monitor.SIGNAL_MAX_AGE_SECONDS = 3600
+
+
+def test_blocking_message_is_passed_after_max_rounds():
+    """未入库的消息挡住水位，连续 INCREMENTAL_MAX_BLOCKED_ROUNDS 轮后越过"""
+    _reset(max_rounds=3)
+    now_ms = int(time.time() * 1000)
+    candidates = {"warn": [(now_ms - 3000, "a"), (now_ms - 2000, "stuck"), (now_ms - 1000, "c")]}
+    db = FakeDB({"a", "c"})
+    watermarks = {}
+
+    for _ in range(2):
+        advance_watermarks(db, watermarks, candidates)
+        assert watermarks == {"warn": now_ms - 3000}
+
+    advance_watermarks(db, watermarks, candidates)
+    assert watermarks == {"warn": now_ms - 1000}
+    assert db.marks["warn"] == (now_ms - 1000, "c")
+    assert polling_monitor._watermark_blocks == {}
+
+
+def test_expired_message_is_passed_immediately():
+    """超过信号最大年龄的未入库消息不再挡住水位"""
+    _reset(max_rounds=10)
+    now_ms = int(time.time() * 1000)
+    candidates = {"ai": [(now_ms - 7200 * 1000, "old"), (now_ms - 1000, "new")]}
+    watermarks = {}
+    advance_watermarks(FakeDB({"new"}), watermarks, candidates)
+    assert watermarks == {"ai": now_ms - 1000}
+
+
+def test_block_count_resets_when_message_is_processed():
+    """挡住的消息之后处理成功时计数清零，新的阻塞重新计数"""
+    _reset(max_rounds=3)
+    now = int(time.time())
+    db = FakeDB({"a"})
+    watermarks = {}
+    candidates = {"warn": [(now - 30, "a"), (now - 20, "b"), (now - 10, "c")]}
+
+    advance_watermarks(db, watermarks, candidates)
+    advance_watermarks(db, watermarks, candidates)
+    assert polling_monitor._watermark_blocks["warn"] == ("b", 2)
+
+    db.processed.add("b")
+    advance_watermarks(db, watermarks, candidates)
+    assert watermarks == {"warn": now - 20}
+    assert polling_monitor._watermark_blocks["warn"] == ("c", 1)
+
+
+if __name__ == '__main__':
+    test_blocking_message_is_passed_after_max_rounds()
+    test_expired_message_is_passed_immediately()
+    test_block_count_resets_when_message_is_processed()
+    print("[OK] 全部通过")
@@ -37,6 +37,13 @@ def main():
         logger.info(f"  Chrome数据: ./chrome-debug-profile")
         logger.info("⚠️  无头模式使用相同的用户目录，共享登录状态")
     
+    # 预先拉起图表渲染进程，第一条信号不承担进程启动与模板构建耗时
+    try:
+        from chart_render_pool import start_chart_render_pool
+        start_chart_render_pool()
+    except Exception as exc:
+        logger.warning(f"启动图表渲染进程池失败: {exc}")
+
     logger.info("正在连接并开始监听...")
     
     capture_api_request(headless=HEADLESS_MODE)
@@ -0,0 +1,456 @@
+"""
+ValuScan 数据快照
+AI 单币简评（ai_signal_analysis）与 AI 市场分析（ai_market_analysis）共用的
+ValuScan 数据采集：
+
+- 主力位、主力成本、资金流、巨鲸、机会/风险信号、持仓、链等十余个数据源并发请求
+- 每个数据源单独限时，超时或失败的数据源直接跳过，其余结果照常返回
+- 按 (symbol, days) 缓存快照，同一币种短时间内的多次信号复用同一份数据；
+  与币种无关的全局数据源（代币资金流、巨鲸、机会/风险信号）单独缓存，所有币种共用
+- 同一快照的并发请求只采集一次，其余调用方等待结果
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .logger import logger
+except ImportError:
+    from logger import logger
+
+
+def _read_float_env_or_config(env_key: str, config_key: str, default: float) -> float:
+    raw = os.getenv(env_key)
+    if raw is not None and str(raw).strip() != "":
+        try:
+            return float(raw)
+        except Exception:
+            return default
+    try:
+        import config as signal_config
+        value = getattr(signal_config, config_key, None)
+        if value is None:
+            return default
+        return float(value)
+    except Exception:
+        return default
+
+
+# 快照缓存时间（秒），<=0 关闭缓存
+SNAPSHOT_TTL = _read_float_env_or_config("VALUESCAN_SNAPSHOT_TTL", "VALUESCAN_SNAPSHOT_TTL", 120)
+# 单个数据源的等待上限（秒）；主力位/主力成本是 AI 分析的核心数据，单独放宽
+SOURCE_TIMEOUT = _read_float_env_or_config("VALUESCAN_SNAPSHOT_SOURCE_TIMEOUT", "VALUESCAN_SNAPSHOT_SOURCE_TIMEOUT", 6)
+KEY_SOURCE_TIMEOUT = _read_float_env_or_config(
+    "VALUESCAN_SNAPSHOT_KEY_SOURCE_TIMEOUT", "VALUESCAN_SNAPSHOT_KEY_SOURCE_TIMEOUT", 10
+)
+SNAPSHOT_WORKERS = int(_read_float_env_or_config("VALUESCAN_SNAPSHOT_WORKERS", "VALUESCAN_SNAPSHOT_WORKERS", 16))
+SNAPSHOT_CACHE_SIZE = 256
+
+_KEY_SOURCES = ("main_force", "hold_cost")
+# 结果字段顺序与原串行采集一致（Prompt 中按此顺序输出）
+_SOURCE_ORDER = (
+    "main_force", "hold_cost", "token_flow", "trade_inflow", "detailed_inflow", "whale_flow",
+    "opportunity_signals", "risk_signals", "exchange_flow_detail", "fund_flow_history",
+    "fund_volume_history", "holders_top", "chains",
+)
+
+
+# ==================== 数据整理 ====================
+
+def _extract_valuescan_list(payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not isinstance(payload, dict):
+        return []
+    data = payload.get("data")
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    if isinstance(data, dict):
+        for key in ("list", "records", "items", "data"):
+            items = data.get(key)
+            if isinstance(items, list):
+                return [item for item in items if isinstance(item, dict)]
+    return []
+
+
+def _normalize_flow_period(value: Any) -> str:
+    if value is None:
+        return ""
+    key = str(value).strip().lower().replace(" ", "")
+    aliases = {
+        "h1": "1h",
+        "h4": "4h",
+        "h12": "12h",
+        "h24": "24h",
+        "1d": "24h",
+        "d1": "24h",
+        "d": "24h",
+        "m15": "15m",
+    }
+    return aliases.get(key, key)
+
+
+def _first_float(item: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[float]:
+    for key in keys:
+        value = item.get(key)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except Exception:
+            continue
+    return None
+
+
+def _extract_flow_items(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    if isinstance(data, dict):
+        for key in ("list", "records", "items"):
+            items = data.get(key)
+            if isinstance(items, list):
+                return [item for item in items if isinstance(item, dict)]
+        items: List[Dict[str, Any]] = []
+        for key, value in data.items():
+            if isinstance(value, dict):
+                item = dict(value)
+                item.setdefault("timeType", key)
+                items.append(item)
+        return items
+    return []
+
+
+def normalize_exchange_flow_detail(resp: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    if not isinstance(resp, dict) or resp.get("code") != 200:
+        return {}
+    items = _extract_flow_items(resp.get("data"))
+    result: Dict[str, Dict[str, float]] = {}
+    for item in items:
+        period = _normalize_flow_period(
+            item.get("timeType")
+            or item.get("period")
+            or item.get("time")
+            or item.get("timeParticle")
+        )
+        if not period:
+            continue
+        in_val = _first_float(item, ("inFlowValue", "inFlow", "tradeIn", "stopTradeIn", "contractTradeIn"))
+        out_val = _first_float(item, ("outFlowValue", "outFlow", "tradeOut", "stopTradeOut", "contractTradeOut"))
+        net_val = _first_float(
+            item,
+            ("netFlowValue", "netFlow", "tradeInflow", "stopTradeInflow", "contractTradeInflow"),
+        )
+        if net_val is None and in_val is not None and out_val is not None:
+            net_val = in_val - out_val
+        if in_val is None and out_val is None and net_val is None:
+            continue
+        total = (in_val or 0.0) + (out_val or 0.0)
+        ratio = (in_val or 0.0) / total if total > 0 else 0.5
+        result[period] = {
+            "in": float(in_val or 0.0),
+            "out": float(out_val or 0.0),
+            "net": float(net_val or 0.0),
+            "ratio": float(ratio),
+        }
+    return result
+
+
+def compact_valuescan_history(resp: Optional[Dict[str, Any]], limit: int = 60) -> List[Dict[str, Any]]:
+    items = _extract_valuescan_list(resp)
+    if not items:
+        return []
+    return items[:limit]
+
+
+def compact_holder_items(resp: Optional[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
+    items = _extract_valuescan_list(resp)
+    if not items:
+        return []
+    trimmed: List[Dict[str, Any]] = []
+    for item in items[:limit]:
+        trimmed.append({
+            "address": item.get("address"),
+            "balance": item.get("balance"),
+            "balancePercent": item.get("balancePercent"),
+            "price": item.get("price"),
+            "profit": item.get("profit"),
+            "cost": item.get("cost"),
+            "chainName": item.get("chainName"),
+            "labelName": item.get("labelName") or item.get("label"),
+        })
+    return trimmed
+
+
+def compact_chain_items(resp: Optional[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
+    items = _extract_valuescan_list(resp)
+    if not items:
+        return []
+    trimmed: List[Dict[str, Any]] = []
+    for item in items[:limit]:
+        trimmed.append({
+            "chainName": item.get("chainName"),
+            "contractAddress": item.get("contractAddress"),
+            "coinKey": item.get("coinKey"),
+            "holderCount": item.get("holderCount"),
+        })
+    return trimmed
+
+
+def _parse_main_force(resp: Dict[str, Any]) -> Dict[str, Any]:
+    if resp.get("code") != 200:
+        return {}
+    levels = []
+    for item in resp.get("data", []) or []:
+        price = item.get("price")
+        if price is None:
+            continue
+        try:
+            levels.append(float(price))
+        except Exception:
+            continue
+    if not levels:
+        return {}
+    return {"main_force_levels": levels, "current_main_force": levels[-1]}
+
+
+def _parse_hold_cost(resp: Dict[str, Any]) -> Dict[str, Any]:
+    if resp.get("code") != 200:
+        return {}
+    hc_data = resp.get("data", {}).get("holdingPrice", [])
+    if not hc_data:
+        return {}
+    return {"main_cost": float(hc_data[-1]["val"])}
+
+
+def _data_field(field: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def _parse(resp: Dict[str, Any]) -> Dict[str, Any]:
+        if resp.get("code") != 200:
+            return {}
+        return {field: resp.get("data", {})}
+    return _parse
+
+
+def _non_empty(field: str, transform: Callable[[Any], Any]) -> Callable[[Any], Dict[str, Any]]:
+    def _parse(resp: Any) -> Dict[str, Any]:
+        value = transform(resp)
+        return {field: value} if value else {}
+    return _parse
+
+
+# ==================== 采集 ====================
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_cache: Dict[Tuple[str, int], Tuple[float, Optional[Dict[str, Any]]]] = {}
+_global_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_inflight: Dict[Tuple[str, int], threading.Event] = {}
+_cache_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0, "source_timeouts": 0, "source_errors": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(SNAPSHOT_WORKERS, 1), thread_name_prefix="valuescan-snapshot")
+        return _executor
+
+
+def _load_api():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    import valuescan_api
+    return valuescan_api
+
+
+def _symbol_sources(api, symbol: str, days: int) -> Dict[str, Tuple[Callable[[], Any], Callable[[Any], Dict[str, Any]]]]:
+    """币种相关数据源: name -> (请求函数, 解析函数)"""
+    return {
+        # 1. 主力位（阻力位）
+        "main_force": (lambda: api.get_main_force(symbol, days), _parse_main_force),
+        # 2. 主力成本（支撑位）
+        "hold_cost": (lambda: api.get_hold_cost(symbol, days), _parse_hold_cost),
+        # 3.1 交易资金流向（币种级）
+        "trade_inflow": (lambda: api.get_inflow(symbol), _data_field("trade_inflow")),
+        # 3.2 详细资金流向（多周期）
+        "detailed_inflow": (lambda: api.get_detailed_inflow(symbol), _data_field("detailed_inflow")),
+        # 6. Exchange flow detail (multi-period)
+        "exchange_flow_detail": (
+            lambda: api.get_exchange_flow_detail(symbol),
+            _non_empty("exchange_flow_detail", normalize_exchange_flow_detail),
+        ),
+        # 7. Fund flow/volume history
+        "fund_flow_history": (
+            lambda: api.get_fund_trade_history_total(
+                symbol, time_particle="12h", limit_size=60, flow=True, trade_type=2,
+            ),
+            _non_empty("fund_flow_history", lambda resp: compact_valuescan_history(resp, limit=60)),
+        ),
+        "fund_volume_history": (
+            lambda: api.get_fund_trade_history_total(
+                symbol, time_particle="12h", limit_size=60, flow=False, trade_type=2,
+            ),
+            _non_empty("fund_volume_history", lambda resp: compact_valuescan_history(resp, limit=60)),
+        ),
+        # 8. Holder and chain data
+        "holders_top": (
+            lambda: api.get_holder_page(symbol, page=1, page_size=10),
+            _non_empty("holders_top", lambda resp: compact_holder_items(resp, limit=5)),
+        ),
+        "chains": (
+            lambda: api.get_chain_page(symbol, page=1, page_size=10),
+            _non_empty("chains", lambda resp: compact_chain_items(resp, limit=10)),
+        ),
+    }
+
+
+def _global_sources(api) -> Dict[str, Tuple[Callable[[], Any], Callable[[Any], Dict[str, Any]]]]:
+    """与币种无关的数据源"""
+    return {
+        # 3. 代币资金流向
+        "token_flow": (lambda: api.get_token_flow("H12", 1, 20), _data_field("token_flow")),
+        # 4. 巨鲸资金流向
+        "whale_flow": (lambda: api.get_whale_flow(1, "m5", 1, 20), _data_field("whale_flow")),
+        # 5. 机会/风险信号
+        "opportunity_signals": (lambda: api.get_opportunity_signals(1, 10), _data_field("opportunity_signals")),
+        "risk_signals": (lambda: api.get_risk_signals(1, 10), _data_field("risk_signals")),
+    }
+
+
+def _collect(sources: Dict[str, Tuple[Callable[[], Any], Callable[[Any], Dict[str, Any]]]]) -> Dict[str, Dict[str, Any]]:
+    """并发请求各数据源，返回 name -> 解析结果；超时/失败的数据源不出现在结果中"""
+    executor = _get_executor()
+    start = time.monotonic()
+    futures = {name: executor.submit(fetch) for name, (fetch, _) in sources.items()}
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, future in futures.items():
+        timeout = KEY_SOURCE_TIMEOUT if name in _KEY_SOURCES else SOURCE_TIMEOUT
+        remaining = max(start + timeout - time.monotonic(), 0.0)
+        try:
+            resp = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            _stats["source_timeouts"] += 1
+            logger.debug(f"ValuScan 数据源超时: {name} ({timeout:.0f}s)")
+            continue
+        except Exception as e:
+            _stats["source_errors"] += 1
+            logger.debug(f"ValuScan 数据源失败: {name}: {e}")
+            continue
+        try:
+            results[name] = sources[name][1](resp) if isinstance(resp, dict) else {}
+        except Exception as e:
+            _stats["source_errors"] += 1
+            logger.debug(f"ValuScan 数据源解析失败: {name}: {e}")
+    return results
+
+
+def _get_global_data(api) -> Dict[str, Dict[str, Any]]:
+    now = time.monotonic()
+    sources = _global_sources(api)
+    with _cache_lock:
+        cached = {
+            name: entry[1] for name, entry in _global_cache.items()
+            if SNAPSHOT_TTL > 0 and now - entry[0] < SNAPSHOT_TTL
+        }
+    missing = {name: src for name, src in sources.items() if name not in cached}
+    if missing:
+        fetched = _collect(missing)
+        with _cache_lock:
+            for name, value in fetched.items():
+                _global_cache[name] = (time.monotonic(), value)
+        cached.update(fetched)
+    return cached
+
+
+def _build_snapshot(symbol: str, days: int) -> Optional[Dict[str, Any]]:
+    api = _load_api()
+    keyword = api.get_keyword(symbol, blocking=False)
+    if not keyword:
+        logger.debug(f"ValuScan: No keyword found for {symbol}")
+        return None
+
+    result: Dict[str, Any] = {"symbol": symbol, "days": days, "keyword": keyword}
+    executor = _get_executor()
+    global_future = executor.submit(_get_global_data, api)
+    collected = _collect(_symbol_sources(api, symbol, days))
+    try:
+        collected.update(global_future.result(timeout=SOURCE_TIMEOUT + 1))
+    except Exception:
+        pass
+
+    for name in _SOURCE_ORDER:
+        result.update(collected.get(name) or {})
+
+    if "current_main_force" in result:
+        logger.info(f"ValuScan: {symbol} 主力位 ${result['current_main_force']:,.2f}")
+    if "main_cost" in result:
+        logger.info(f"ValuScan: {symbol} 主力成本 ${result['main_cost']:,.2f}")
+    return result if len(result) > 3 else None
+
+
+def get_valuescan_snapshot(symbol: str, days: int, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    获取币种的 ValuScan 数据快照
+
+    Args:
+        symbol: 币种符号（BTC / BTCUSDT / $BTC 均可）
+        days: 主力位 / 主力成本查询天数
+        use_cache: False 时强制重新采集
+
+    Returns:
+        与原 get_valuescan_data 相同结构的字典；无 keyword 或无任何数据时返回 None。
+        返回值为缓存共享对象，调用方不要修改。
+    """
+    clean_symbol = symbol.upper().replace("USDT", "").replace("$", "").strip()
+    key = (clean_symbol, int(days))
+
+    while True:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if use_cache and SNAPSHOT_TTL > 0 and entry and time.monotonic() - entry[0] < SNAPSHOT_TTL:
+                _stats["hits"] += 1
+                return entry[1]
+            waiter = _inflight.get(key)
+            if waiter is None:
+                waiter = threading.Event()
+                _inflight[key] = waiter
+                owner = True
+            else:
+                owner = False
+        if owner:
+            break
+        # 其他线程正在采集同一快照
+        waiter.wait(KEY_SOURCE_TIMEOUT + SOURCE_TIMEOUT)
+        with _cache_lock:
+            entry = _cache.get(key)
+        if entry and time.monotonic() - entry[0] < max(SNAPSHOT_TTL, 1):
+            _stats["hits"] += 1
+            return entry[1]
+        use_cache = False
+
+    _stats["misses"] += 1
+    snapshot = None
+    try:
+        snapshot = _build_snapshot(clean_symbol, int(days))
+        return snapshot
+    finally:
+        with _cache_lock:
+            # 无 keyword（可能正在后台解析）时不缓存，下次重试
+            if snapshot is not None:
+                _cache[key] = (time.monotonic(), snapshot)
+                while len(_cache) > SNAPSHOT_CACHE_SIZE:
+                    oldest = min(_cache, key=lambda k: _cache[k][0])
+                    del _cache[oldest]
+            _inflight.pop(key, None)
+        waiter.set()
+
+
+def get_snapshot_stats() -> Dict[str, Any]:
+    with _cache_lock:
+        return {**_stats, "cached": len(_cache)}
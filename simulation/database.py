@@ -174,6 +174,29 @@ class SimulationDatabase:
         finally:
             cursor.close()
     
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager grouping several statements into a single transaction.
+
+        Statements run on the yielded cursor are committed together on exit,
+        or rolled back together if any of them fails.
+
+        Yields:
+            sqlite3.Cursor: Database cursor
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            yield cursor
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Transaction rolled back: {e}")
+            raise
+        finally:
+            cursor.close()
+
     def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
         """
         Execute a SQL query.
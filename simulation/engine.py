@@ -200,27 +200,27 @@ class SimulationEngine:
         Returns:
             List of closed trades (if any)
         """
-        closed_trades = []
-        positions = self.position_manager.get_positions_by_symbol(symbol)
+        return self.apply_prices({symbol: price}).get(symbol, [])
+    
+    def apply_prices(self, prices: Dict[str, float]) -> Dict[str, List[PaperTrade]]:
+        """
+        Apply a price tick to all open positions of the given symbols.
         
-        for position in positions:
-            # Get trader for fee rate
-            trader = self.trader_repo.get_trader(position.trader_id)
-            fee_rate = trader.fee_rate if trader else 0.0004
-            
-            # Check exit conditions
-            exit_reason = self.position_manager.check_exit_conditions(position, price)
-            
-            if exit_reason:
-                # Close position
-                trade = self.position_manager.close_position(position, price, exit_reason)
-                closed_trades.append(trade)
-                logger.info(f"Position {position.id} closed: {exit_reason} at {price}")
-            else:
-                # Update unrealized PnL
-                self.position_manager.update_position_price(position, price, fee_rate)
+        Entry point for pushed prices (e.g. a price stream) as well as the
+        polling loop. All traders' PnL updates and exits for the tick are
+        written in one database transaction.
         
-        return closed_trades
+        Args:
+            prices: Mapping of symbol to current price
+            
+        Returns:
+            Dict mapping symbol to list of closed trades
+        """
+        closed_by_symbol = self.position_manager.update_prices_batch(prices)
+        for symbol, trades in closed_by_symbol.items():
+            for trade in trades:
+                logger.info(f"Position {trade.position_id} closed: {trade.exit_reason} at {trade.exit_price}")
+        return closed_by_symbol
     
     def update_all_positions(self) -> Dict[str, List[PaperTrade]]:
         """
@@ -232,8 +232,7 @@ class SimulationEngine:
             Dict mapping symbol to list of closed trades
         """
         # Get all unique symbols with open positions
-        all_positions = self.position_manager.get_open_positions()
-        symbols = list(set(p.symbol for p in all_positions))
+        symbols = self.position_manager.get_open_symbols()
         
         if not symbols:
             return {}
@@ -241,14 +240,7 @@ class SimulationEngine:
         # Fetch prices
         prices = self.price_tracker.get_prices(symbols)
         
-        # Update positions for each symbol
-        closed_by_symbol = {}
-        for symbol, price in prices.items():
-            closed = self.update_positions(symbol, price)
-            if closed:
-                closed_by_symbol[symbol] = closed
-        
-        return closed_by_symbol
+        return self.apply_prices(prices)
     
     def handle_risk_signal(self, symbol: str) -> int:
         """
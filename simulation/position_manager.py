@@ -8,7 +8,9 @@ Includes PnL calculation and exit condition checking.
 import uuid
 import time
 import logging
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
+
+import numpy as np
 
 from .database import SimulationDatabase
 from .models import VirtualTrader, SimulatedPosition, PaperTrade
@@ -149,36 +151,7 @@ class PositionManager:
         trader = self._get_trader(position.trader_id)
         fee_rate = trader.fee_rate if trader else 0.0004
         
-        # Calculate realized PnL
-        realized_pnl, fees = self.calculate_pnl(
-            position, exit_price, fee_rate
-        )
-        
-        # Create trade record
-        closed_at = int(time.time() * 1000)
-        trade = PaperTrade(
-            id=str(uuid.uuid4()),
-            trader_id=position.trader_id,
-            position_id=position.id,
-            symbol=position.symbol,
-            side=position.side,
-            entry_price=position.entry_price,
-            exit_price=exit_price,
-            quantity=position.quantity,
-            leverage=position.leverage,
-            realized_pnl=realized_pnl,
-            fees=fees,
-            duration_ms=closed_at - position.opened_at,
-            exit_reason=exit_reason,
-            opened_at=position.opened_at,
-            closed_at=closed_at,
-        )
-        
-        # Update position status
-        position.status = 'CLOSED'
-        position.current_price = exit_price
-        position.unrealized_pnl = realized_pnl
-        position.last_updated = closed_at
+        trade = self._apply_close(position, exit_price, exit_reason, fee_rate)
         self._update_position(position)
         
         # Save trade record
@@ -186,10 +159,10 @@ class PositionManager:
         
         # Update trader balance
         if trader:
-            new_balance = trader.current_balance + realized_pnl
+            new_balance = trader.current_balance + trade.realized_pnl
             self._update_trader_balance(trader.id, new_balance)
         
-        logger.info(f"Closed position {position.id}: PnL={realized_pnl:.2f}, reason={exit_reason}")
+        logger.info(f"Closed position {position.id}: PnL={trade.realized_pnl:.2f}, reason={exit_reason}")
         return trade
     
     def partial_close_position(
@@ -213,22 +186,117 @@ class PositionManager:
         Returns:
             PaperTrade record for the closed portion, or None if failed
         """
+        if not self._can_partial_close(position, close_ratio):
+            return None
+        
+        # Get trader for fee calculation
+        trader = self._get_trader(position.trader_id)
+        fee_rate = trader.fee_rate if trader else 0.0004
+        
+        trade = self._apply_partial_close(position, close_ratio, exit_price, exit_reason, fee_rate)
+        
+        # Save trade record
+        self._save_trade(trade)
+        
+        # Update database
+        self.db.execute(
+            'UPDATE simulated_positions SET quantity = ?, last_updated = ? WHERE id = ?',
+            (position.quantity, position.last_updated, position.id)
+        )
+        
+        # Update trader balance
+        if trader:
+            new_balance = trader.current_balance + trade.realized_pnl
+            self._update_trader_balance(trader.id, new_balance)
+        
+        logger.info(
+            f"Partially closed position {position.id}: "
+            f"{close_ratio*100:.0f}% closed, PnL={trade.realized_pnl:.2f}, "
+            f"remaining quantity={position.quantity:.4f}"
+        )
+        
+        return trade
+
+    def _can_partial_close(self, position: SimulatedPosition, close_ratio: float) -> bool:
+        """Validate a partial close request, logging the reason when rejected."""
         if close_ratio <= 0 or close_ratio >= 1:
             logger.error(f"Invalid close_ratio: {close_ratio}, must be between 0 and 1")
-            return None
+            return False
         
         if position.status != 'OPEN':
             logger.warning(f"Cannot partially close position {position.id}: status is {position.status}")
-            return None
+            return False
         
-        # Get trader for fee calculation
-        trader = self._get_trader(position.trader_id)
-        fee_rate = trader.fee_rate if trader else 0.0004
+        return True
+    
+    def _apply_close(
+        self,
+        position: SimulatedPosition,
+        exit_price: float,
+        exit_reason: str,
+        fee_rate: float,
+        closed_at: Optional[int] = None
+    ) -> PaperTrade:
+        """
+        Close a position in memory and build its trade record (no DB writes).
+        
+        Args:
+            position: Position to close (marked CLOSED in place)
+            exit_price: Exit price
+            exit_reason: Reason for exit (TP/SL/MANUAL)
+            fee_rate: Trader fee rate
+            closed_at: Close timestamp in ms (default: now)
+            
+        Returns:
+            PaperTrade record
+        """
+        realized_pnl, fees = self.calculate_pnl(position, exit_price, fee_rate)
+        
+        if closed_at is None:
+            closed_at = int(time.time() * 1000)
+        trade = PaperTrade(
+            id=str(uuid.uuid4()),
+            trader_id=position.trader_id,
+            position_id=position.id,
+            symbol=position.symbol,
+            side=position.side,
+            entry_price=position.entry_price,
+            exit_price=exit_price,
+            quantity=position.quantity,
+            leverage=position.leverage,
+            realized_pnl=realized_pnl,
+            fees=fees,
+            duration_ms=closed_at - position.opened_at,
+            exit_reason=exit_reason,
+            opened_at=position.opened_at,
+            closed_at=closed_at,
+        )
+        
+        position.status = 'CLOSED'
+        position.current_price = exit_price
+        position.unrealized_pnl = realized_pnl
+        position.last_updated = closed_at
+        return trade
+    
+    def _apply_partial_close(
+        self,
+        position: SimulatedPosition,
+        close_ratio: float,
+        exit_price: float,
+        exit_reason: str,
+        fee_rate: float,
+        closed_at: Optional[int] = None
+    ) -> PaperTrade:
+        """
+        Reduce a position in memory and build the trade record for the closed
+        portion (no DB writes). Caller must validate with _can_partial_close.
         
-        # Calculate PnL for the portion being closed
+        Returns:
+            PaperTrade record for the closed portion
+        """
         closed_quantity = position.quantity * close_ratio
         
-        # Create a temporary position for PnL calculation
+        # Temporary position for PnL calculation of the closed portion
         temp_position = SimulatedPosition(
             id=position.id,
             trader_id=position.trader_id,
@@ -245,11 +313,10 @@ class PositionManager:
             current_price=exit_price,
             last_updated=int(time.time() * 1000)
         )
-        
         realized_pnl, fees = self.calculate_pnl(temp_position, exit_price, fee_rate)
         
-        # Create trade record for closed portion
-        closed_at = int(time.time() * 1000)
+        if closed_at is None:
+            closed_at = int(time.time() * 1000)
         trade = PaperTrade(
             id=str(uuid.uuid4()),
             trader_id=position.trader_id,
@@ -268,31 +335,8 @@ class PositionManager:
             closed_at=closed_at,
         )
         
-        # Save trade record
-        self._save_trade(trade)
-        
-        # Update position: reduce quantity
-        remaining_quantity = position.quantity * (1 - close_ratio)
-        position.quantity = remaining_quantity
+        position.quantity = position.quantity * (1 - close_ratio)
         position.last_updated = closed_at
-        
-        # Update database
-        self.db.execute(
-            'UPDATE simulated_positions SET quantity = ?, last_updated = ? WHERE id = ?',
-            (position.quantity, position.last_updated, position.id)
-        )
-        
-        # Update trader balance
-        if trader:
-            new_balance = trader.current_balance + realized_pnl
-            self._update_trader_balance(trader.id, new_balance)
-        
-        logger.info(
-            f"Partially closed position {position.id}: "
-            f"{close_ratio*100:.0f}% closed, PnL={realized_pnl:.2f}, "
-            f"remaining quantity={remaining_quantity:.4f}"
-        )
-        
         return trade
 
     def calculate_pnl(
@@ -443,10 +487,39 @@ class PositionManager:
         Returns:
             Updated position
         """
+        pyramiding_trigger = self._apply_price(position, current_price, fee_rate)
+        if pyramiding_trigger:
+            tp_price, close_ratio = pyramiding_trigger
+            # Execute partial close
+            self.partial_close_position(
+                position=position,
+                close_ratio=close_ratio,
+                exit_price=current_price,
+                exit_reason=f"PYRAMIDING_TP_{int(tp_price)}PCT"
+            )
+        
+        self._update_position(position)
+        return position
+
+    def _apply_price(
+        self,
+        position: SimulatedPosition,
+        current_price: float,
+        fee_rate: float,
+        now: Optional[int] = None
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Mark a position to a new price in memory: unrealized PnL, trailing stop
+        extreme and pyramiding level bookkeeping (no DB writes).
+        
+        Returns:
+            Tuple of (level_pct, close_ratio) if a pyramiding level triggered
+            (already marked executed), None otherwise
+        """
         pnl, _ = self.calculate_pnl(position, current_price, fee_rate)
         position.current_price = current_price
         position.unrealized_pnl = pnl
-        position.last_updated = int(time.time() * 1000)
+        position.last_updated = now if now is not None else int(time.time() * 1000)
         
         # Update trailing stop highest price
         if position.trailing_stop_enabled:
@@ -457,7 +530,7 @@ class PositionManager:
                 if position.highest_price is None or current_price < position.highest_price:
                     position.highest_price = current_price
         
-        # Check and execute pyramiding levels
+        # Check pyramiding levels
         pyramiding_trigger = self.check_pyramiding_levels(position, current_price)
         if pyramiding_trigger:
             tp_price, close_ratio = pyramiding_trigger
@@ -468,17 +541,129 @@ class PositionManager:
                 if level['price'] == tp_price and not level.get('executed'):
                     level['executed'] = True
                     break
+        return pyramiding_trigger
+
+    def update_prices_batch(self, prices: Dict[str, float]) -> Dict[str, List[PaperTrade]]:
+        """
+        Apply a price tick to every open position of the given symbols at once.
+        
+        Loads open positions and traders with one query each, evaluates exit
+        conditions per symbol on arrays, and writes all PnL updates, closes,
+        trade records and balance changes in a single transaction.
+        Results match calling check_exit_conditions / close_position /
+        update_position_price position by position.
+        
+        Args:
+            prices: Mapping of symbol to current price
             
-            # Execute partial close
-            self.partial_close_position(
-                position=position,
-                close_ratio=close_ratio,
-                exit_price=current_price,
-                exit_reason=f"PYRAMIDING_TP_{int(tp_price)}PCT"
+        Returns:
+            Dict mapping symbol to list of closed trades (pyramiding partial
+            closes are persisted but not returned, as with update_position_price)
+        """
+        prices = {symbol: float(price) for symbol, price in prices.items() if price}
+        if not prices:
+            return {}
+        
+        placeholders = ','.join('?' * len(prices))
+        rows = self.db.fetchall(
+            f'SELECT * FROM simulated_positions WHERE status = ? AND symbol IN ({placeholders})',
+            ('OPEN', *prices.keys())
+        )
+        if not rows:
+            return {}
+        
+        by_symbol: Dict[str, List[SimulatedPosition]] = {}
+        for row in rows:
+            position = self._row_to_position(row)
+            by_symbol.setdefault(position.symbol, []).append(position)
+        
+        # trader_id -> [current_balance, fee_rate]
+        traders = {
+            row['id']: [row['current_balance'], row['fee_rate']]
+            for row in self.db.fetchall('SELECT id, current_balance, fee_rate FROM virtual_traders')
+        }
+        
+        now = int(time.time() * 1000)
+        closed_by_symbol: Dict[str, List[PaperTrade]] = {}
+        new_trades: List[PaperTrade] = []
+        touched_traders = set()
+        
+        for symbol, positions in by_symbol.items():
+            price = prices[symbol]
+            exit_reasons = self._exit_reasons(positions, price)
+            
+            for position, exit_reason in zip(positions, exit_reasons):
+                trader = traders.get(position.trader_id)
+                fee_rate = trader[1] if trader else 0.0004
+                
+                trade = None
+                if exit_reason:
+                    trade = self._apply_close(position, price, exit_reason, fee_rate, now)
+                    closed_by_symbol.setdefault(symbol, []).append(trade)
+                    logger.info(
+                        f"Closed position {position.id}: PnL={trade.realized_pnl:.2f}, reason={exit_reason}"
+                    )
+                else:
+                    pyramiding_trigger = self._apply_price(position, price, fee_rate, now)
+                    if pyramiding_trigger:
+                        tp_price, close_ratio = pyramiding_trigger
+                        if self._can_partial_close(position, close_ratio):
+                            trade = self._apply_partial_close(
+                                position, close_ratio, price,
+                                f"PYRAMIDING_TP_{int(tp_price)}PCT", fee_rate, now
+                            )
+                
+                if trade is not None:
+                    new_trades.append(trade)
+                    if trader:
+                        trader[0] += trade.realized_pnl
+                        touched_traders.add(position.trader_id)
+        
+        with self.db.transaction() as cursor:
+            cursor.executemany(
+                self._UPDATE_POSITION_SQL,
+                [self._position_update_params(p) for positions in by_symbol.values() for p in positions]
             )
+            if new_trades:
+                cursor.executemany(
+                    self._INSERT_TRADE_SQL,
+                    [self._trade_params(trade) for trade in new_trades]
+                )
+            if touched_traders:
+                cursor.executemany(
+                    'UPDATE virtual_traders SET current_balance = ? WHERE id = ?',
+                    [(traders[trader_id][0], trader_id) for trader_id in touched_traders]
+                )
+        
+        return closed_by_symbol
+    
+    def _exit_reasons(self, positions: List[SimulatedPosition], price: float) -> List[Optional[str]]:
+        """
+        Vectorized check_exit_conditions for open positions sharing one price.
         
-        self._update_position(position)
-        return position
+        Same priority as check_exit_conditions: SL, trailing stop, then TP.
+        """
+        is_long = np.array([p.side == 'LONG' for p in positions])
+        direction = np.where(is_long, 1.0, -1.0)
+        stop_loss = np.array([p.stop_loss or 0.0 for p in positions], dtype=float)
+        take_profit = np.array([p.take_profit or 0.0 for p in positions], dtype=float)
+        trailing = np.array([bool(p.trailing_stop_enabled) for p in positions])
+        highest = np.array([p.highest_price or 0.0 for p in positions], dtype=float)
+        callback = np.array([p.trailing_callback_pct or 0.0 for p in positions], dtype=float)
+        
+        sl_hit = (stop_loss != 0) & np.where(is_long, price <= stop_loss, price >= stop_loss)
+        
+        # LONG: pullback below highest; SHORT: bounce above lowest
+        threshold = highest * (1 - direction * callback / 100)
+        trailing_hit = (
+            trailing & (highest != 0) & (callback != 0)
+            & np.where(is_long, price <= threshold, price >= threshold)
+        )
+        
+        tp_hit = (take_profit != 0) & np.where(is_long, price >= take_profit, price <= take_profit)
+        
+        reasons = np.select([sl_hit, trailing_hit, tp_hit], ['SL', 'TRAILING_STOP', 'TP'], default='')
+        return [reason or None for reason in reasons.tolist()]
 
     def get_open_positions(self, trader_id: Optional[str] = None) -> List[SimulatedPosition]:
         """
@@ -518,6 +703,19 @@ class PositionManager:
         )
         return [self._row_to_position(row) for row in rows]
     
+    def get_open_symbols(self) -> List[str]:
+        """
+        Get distinct symbols that have open positions.
+        
+        Returns:
+            List of trading pairs
+        """
+        rows = self.db.fetchall(
+            'SELECT DISTINCT symbol FROM simulated_positions WHERE status = ?',
+            ('OPEN',)
+        )
+        return [row['symbol'] for row in rows]
+    
     def get_trades(self, trader_id: str) -> List[PaperTrade]:
         """
         Get all trades for a trader.
@@ -559,37 +757,48 @@ class PositionManager:
             position.highest_price
         ))
     
+    _UPDATE_POSITION_SQL = '''
+            UPDATE simulated_positions SET
+                status = ?, unrealized_pnl = ?, current_price = ?, last_updated = ?,
+                quantity = ?, pyramiding_levels = ?, highest_price = ?
+            WHERE id = ?
+        '''
+    
+    _INSERT_TRADE_SQL = '''
+            INSERT INTO paper_trades (
+                id, trader_id, position_id, symbol, side, entry_price, exit_price,
+                quantity, leverage, realized_pnl, fees, duration_ms, exit_reason,
+                opened_at, closed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+    
     def _update_position(self, position: SimulatedPosition) -> None:
         """Update position in database."""
+        self.db.execute(self._UPDATE_POSITION_SQL, self._position_update_params(position))
+    
+    def _position_update_params(self, position: SimulatedPosition) -> tuple:
+        """Parameters for _UPDATE_POSITION_SQL."""
         import json
         
         pyramiding_json = json.dumps(position.pyramiding_levels) if position.pyramiding_levels else None
-        
-        self.db.execute('''
-            UPDATE simulated_positions SET
-                status = ?, unrealized_pnl = ?, current_price = ?, last_updated = ?,
-                quantity = ?, pyramiding_levels = ?, highest_price = ?
-            WHERE id = ?
-        ''', (
+        return (
             position.status, position.unrealized_pnl, position.current_price,
             position.last_updated, position.quantity, pyramiding_json, 
             position.highest_price, position.id
-        ))
+        )
     
     def _save_trade(self, trade: PaperTrade) -> None:
         """Save trade to database."""
-        self.db.execute('''
-            INSERT INTO paper_trades (
-                id, trader_id, position_id, symbol, side, entry_price, exit_price,
-                quantity, leverage, realized_pnl, fees, duration_ms, exit_reason,
-                opened_at, closed_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        self.db.execute(self._INSERT_TRADE_SQL, self._trade_params(trade))
+    
+    def _trade_params(self, trade: PaperTrade) -> tuple:
+        """Parameters for _INSERT_TRADE_SQL."""
+        return (
             trade.id, trade.trader_id, trade.position_id, trade.symbol, trade.side,
             trade.entry_price, trade.exit_price, trade.quantity, trade.leverage,
             trade.realized_pnl, trade.fees, trade.duration_ms, trade.exit_reason,
             trade.opened_at, trade.closed_at
-        ))
+        )
 
     def _get_trader(self, trader_id: str) -> Optional[VirtualTrader]:
         """Get trader from database."""
@@ -9,6 +9,8 @@ Tests the virtual trading system by:
 4. Monitoring position updates and exits
 """
 
+import copy
+import random
 import sys
 import time
 from pathlib import Path
@@ -24,6 +26,97 @@ from simulation import (
 )
 from simulation.trader_repository import TraderRepository
 from simulation.database import SimulationDatabase
+from simulation.models import VirtualTrader
+from simulation.position_manager import PositionManager
+
+
+def _per_position_tick(manager: PositionManager, symbol: str, price: float):
+    """Apply one tick position by position (the pre-batch engine loop)."""
+    closed_trades = []
+    for position in manager.get_positions_by_symbol(symbol):
+        trader = manager._get_trader(position.trader_id)
+        fee_rate = trader.fee_rate if trader else 0.0004
+        exit_reason = manager.check_exit_conditions(position, price)
+        if exit_reason:
+            closed_trades.append(manager.close_position(position, price, exit_reason))
+        else:
+            manager.update_position_price(position, price, fee_rate)
+    return closed_trades
+
+
+def _snapshot(db: SimulationDatabase):
+    """Trades, balances and positions without ids/timestamps that differ per run."""
+    trades = sorted(
+        (row['position_id'], row['exit_reason'], round(row['quantity'], 9),
+         round(row['exit_price'], 9), round(row['realized_pnl'], 6))
+        for row in db.fetchall('SELECT * FROM paper_trades')
+    )
+    balances = {
+        row['id']: round(row['current_balance'], 6)
+        for row in db.fetchall('SELECT id, current_balance FROM virtual_traders')
+    }
+    positions = {
+        row['id']: (row['status'], round(row['quantity'], 9), round(row['unrealized_pnl'], 6),
+                    row['highest_price'], row['pyramiding_levels'])
+        for row in db.fetchall('SELECT * FROM simulated_positions')
+    }
+    return trades, balances, positions
+
+
+def test_batched_ticks_match_per_position_path():
+    """update_prices_batch gives the same trades and balances as the per-position loop."""
+    rng = random.Random(20240611)
+    batched_db = SimulationDatabase(':memory:')
+    single_db = SimulationDatabase(':memory:')
+    batched = PositionManager(batched_db)
+    single = PositionManager(single_db)
+    
+    traders = [
+        VirtualTrader(name=f"T{i}", initial_balance=10000.0, current_balance=10000.0,
+                      leverage=leverage, fee_rate=fee_rate)
+        for i, (leverage, fee_rate) in enumerate([(1, 0.0004), (5, 0.0002), (10, 0.0005)])
+    ]
+    for trader in traders:
+        TraderRepository(batched_db).save_trader(trader)
+        TraderRepository(single_db).save_trader(trader)
+    
+    prices = {'BTCUSDT': 50000.0, 'ETHUSDT': 3000.0, 'SOLUSDT': 150.0}
+    for symbol, price in prices.items():
+        for trader in traders:
+            for side in ('LONG', 'SHORT'):
+                position, error = batched.open_position(
+                    trader, symbol, side, price, quantity=1000.0 / price,
+                    stop_loss=price * (1 - 0.06) if side == 'LONG' else price * (1 + 0.06),
+                    take_profit=price * (1 + 0.10) if side == 'LONG' else price * (1 - 0.10),
+                    enable_trailing_stop=rng.random() < 0.5,
+                    enable_pyramiding=rng.random() < 0.7,
+                )
+                assert error is None
+                single._save_position(copy.deepcopy(position))
+    # Wider trailing callback so positions live long enough to hit pyramiding levels
+    for db in (batched_db, single_db):
+        db.execute('UPDATE simulated_positions SET trailing_callback_pct = 3.0')
+    
+    closed_batched = closed_single = 0
+    for _ in range(60):
+        tick = {}
+        for symbol in rng.sample(sorted(prices), rng.randint(1, len(prices))):
+            prices[symbol] *= 1 + rng.gauss(0.001, 0.012)
+            tick[symbol] = prices[symbol]
+        closed_batched += sum(len(trades) for trades in batched.update_prices_batch(tick).values())
+        closed_single += sum(len(_per_position_tick(single, symbol, price)) for symbol, price in tick.items())
+    
+    trades, balances, positions = _snapshot(batched_db)
+    assert closed_batched == closed_single
+    assert (trades, balances, positions) == _snapshot(single_db)
+    # The random walk must exercise closes, pyramiding partial closes and open positions
+    assert closed_batched > 0
+    assert any(reason.startswith('PARTIAL_') for _, reason, *_ in trades)
+    assert any(status == 'OPEN' for status, *_ in positions.values())
+    
+    batched_db.close()
+    single_db.close()
+    print("✅ Batched price ticks match the per-position path")
 
 
 def test_simulation():
@@ -177,6 +270,7 @@ def test_simulation():
 
 
 if __name__ == "__main__":
+    test_batched_ticks_match_per_position_path()
     try:
         test_simulation()
     except KeyboardInterrupt:
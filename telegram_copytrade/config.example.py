@@ -109,6 +109,12 @@ SYMBOL_BLACKLIST = []
 # 信号延迟容忍（秒），超过此时间的信号忽略
 MAX_SIGNAL_DELAY = 60
 
+# 重复信号合并窗口（秒）：同一币种同类型同方向的信号在窗口内只执行一次
+COPYTRADE_DEDUP_WINDOW = 30
+
+# 跟单执行线程数：同一币种的信号按顺序执行，不同币种并行下单
+COPYTRADE_EXECUTOR_WORKERS = 4
+
 # ============ 币安 API 配置 ============
 # 可以单独配置，也可以复用 binance_trader 的配置
 # 如果留空，将尝试从 binance_trader/config.py 读取
@@ -17,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from telegram_copytrade.signal_parser import TradeSignal
 from telegram_copytrade.telegram_client import TelegramMonitor
+from telegram_copytrade.trade_executor import SignalExecutor
 
 try:
     from telegram_copytrade import config
@@ -50,6 +51,7 @@ class CopyTradeSystem:
             self.trader = None
             self.trailing_stop_manager = None
             self.telegram_monitor = None
+            self.executor = None
             self.last_position_monitor = time.time()
             self.positions_tracked = {}
             return
@@ -135,7 +137,15 @@ class CopyTradeSystem:
         )
         self.telegram_monitor.set_monitor_group_ids(config.MONITOR_GROUP_IDS)
         self.telegram_monitor.set_signal_user_ids(getattr(config, 'SIGNAL_USER_IDS', []))
-        self.telegram_monitor.set_signal_callback(self._on_signal)
+
+        # 5. 初始化跟单执行器：下单在工作线程中进行，不阻塞 Telegram 事件循环
+        self.executor = SignalExecutor(
+            handler=self._on_signal,
+            workers=getattr(config, 'COPYTRADE_EXECUTOR_WORKERS', 4),
+            dedup_window=getattr(config, 'COPYTRADE_DEDUP_WINDOW', 30),
+            max_signal_delay=getattr(config, 'MAX_SIGNAL_DELAY', 60)
+        )
+        self.telegram_monitor.set_signal_callback(self.executor.submit)
         
         # 状态跟踪
         self.last_position_monitor = time.time()
@@ -362,8 +372,8 @@ class CopyTradeSystem:
             # 清理移动止损
             if self.trailing_stop_manager:
                 symbol_base = signal.symbol.replace("USDT", "")
-                if symbol_base in self.trailing_stop_manager.positions:
-                    del self.trailing_stop_manager.positions[symbol_base]
+                # 持仓监控的安全平仓也可能已移除该币种
+                self.trailing_stop_manager.positions.pop(symbol_base, None)
         else:
             self.logger.error(f"❌ 平仓失败: {signal.symbol}")
     
@@ -382,11 +392,16 @@ class CopyTradeSystem:
                 await asyncio.sleep(60)
 
         self.logger.info("📡 启动 Telegram 跟单系统...")
+        self.executor.start()
 
-        # 启动位置监控任务
+        # 启动位置监控任务：作为独占任务在执行器中运行，不阻塞消息接收，
+        # 也不与开仓/平仓并发（安全平仓与跟单平仓不会同时操作同一持仓）
         async def position_monitor_loop():
             while True:
-                self.monitor_positions()
+                try:
+                    await asyncio.wrap_future(self.executor.run_exclusive(self.monitor_positions))
+                except Exception as e:
+                    self.logger.error(f"持仓监控异常: {e}")
                 await asyncio.sleep(10)
 
         monitor_task = asyncio.create_task(position_monitor_loop())
@@ -420,8 +435,10 @@ class CopyTradeSystem:
                 await asyncio.sleep(backoff)
         finally:
             monitor_task.cancel()
-            with contextlib.suppress(Exception):
+            with contextlib.suppress(asyncio.CancelledError, Exception):
                 await monitor_task
+            self.executor.stop()
+            self.logger.info(f"📊 跟单执行统计: {self.executor.get_stats()}")
 
 
 def main():
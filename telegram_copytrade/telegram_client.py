@@ -57,7 +57,7 @@ class TelegramMonitor:
         self.last_signal_time: Optional[datetime] = None
     
     def set_signal_callback(self, callback: Callable[[TradeSignal], None]):
-        """设置信号回调函数"""
+        """设置信号回调函数（在事件循环中调用，必须立即返回，如 SignalExecutor.submit）"""
         self.signal_callback = callback
     
     def set_monitor_group_ids(self, group_ids: List[int]):
@@ -124,6 +124,9 @@ class TelegramMonitor:
         if signal:
             self.signals_parsed += 1
             self.last_signal_time = datetime.now()
+            # 以消息发送时间作为信号时间，用于过期判断和端到端延迟统计
+            if message.date:
+                signal.timestamp = message.date
             
             self.logger.info(
                 f"📊 收到{signal.signal_type}信号: "
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+跟单执行器测试
+
+- 同一交易对的信号按到达顺序执行，重复信号在窗口内合并
+- OPEN → CLOSE → OPEN 的重新入场不被去重吞掉
+- 独占任务（持仓监控）不与信号执行并发，并保持先后顺序
+"""
+
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telegram_copytrade.signal_parser import TradeSignal
+from telegram_copytrade.trade_executor import SignalExecutor
+
+
+def _signal(signal_type, symbol, direction="LONG"):
+    return TradeSignal(
+        signal_type=signal_type, symbol=symbol, direction=direction, leverage=10,
+        position_size=0.0, entry_price=1.0, current_price=1.0, margin=0.0,
+        margin_type="CROSSED", timestamp=datetime.now()
+    )
+
+
+class RecordingHandler:
+    """记录执行顺序与当前正在执行的任务数"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def enter(self, label):
+        with self._lock:
+            self.active += 1
+            self.calls.append(label)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+
+    def __call__(self, signal):
+        self.enter((signal.signal_type, signal.symbol))
+
+
+def test_per_symbol_order_and_dedup():
+    """同一交易对按顺序执行；窗口内的重复开仓只执行一次"""
+    handler = RecordingHandler()
+    executor = SignalExecutor(handler, workers=3, dedup_window=30)
+    executor.start()
+    try:
+        now = time.time()
+        assert executor.submit(_signal("OPEN", "ETHUSDT"), received_at=now)
+        assert not executor.submit(_signal("OPEN", "ETHUSDT"), received_at=now + 1)
+        assert executor.submit(_signal("OPEN", "ETHUSDT", "SHORT"), received_at=now + 2)
+        assert executor.submit(_signal("OPEN", "ETHUSDT"), received_at=now + 31)
+    finally:
+        executor.stop()
+
+    assert handler.calls == [("OPEN", "ETHUSDT")] * 3
+    stats = executor.get_stats()
+    assert stats["submitted"] == 3 and stats["collapsed"] == 1 and stats["executed"] == 3
+
+
+def test_reentry_after_close_is_not_collapsed():
+    """OPEN → CLOSE → OPEN 在去重窗口内依次执行，重新入场不被合并"""
+    handler = RecordingHandler()
+    executor = SignalExecutor(handler, workers=2, dedup_window=30)
+    executor.start()
+    try:
+        now = time.time()
+        assert executor.submit(_signal("OPEN", "BTCUSDT"), received_at=now)
+        assert executor.submit(_signal("CLOSE", "BTCUSDT"), received_at=now + 5)
+        assert not executor.submit(_signal("CLOSE", "BTCUSDT"), received_at=now + 6)
+        assert executor.submit(_signal("OPEN", "BTCUSDT"), received_at=now + 10)
+        assert executor.submit(_signal("OPEN", "SOLUSDT"), received_at=now + 11)
+    finally:
+        executor.stop()
+
+    btc = [call for call in handler.calls if call[1] == "BTCUSDT"]
+    assert btc == [("OPEN", "BTCUSDT"), ("CLOSE", "BTCUSDT"), ("OPEN", "BTCUSDT")]
+    assert ("OPEN", "SOLUSDT") in handler.calls
+
+
+def test_exclusive_task_does_not_overlap_signals():
+    """独占任务在此前入队的信号执行完后运行，期间没有信号在执行"""
+    handler = RecordingHandler(delay=0.05)
+    executor = SignalExecutor(handler, workers=4, dedup_window=0)
+    executor.start()
+    try:
+        symbols = ["AUSDT", "BUSDT", "CUSDT", "DUSDT", "EUSDT", "FUSDT"]
+        for symbol in symbols:
+            executor.submit(_signal("OPEN", symbol))
+        running = []
+
+        def monitor():
+            running.append(handler.active)
+            handler.enter("monitor")
+            return "done"
+
+        future = executor.run_exclusive(monitor)
+        for symbol in symbols:
+            executor.submit(_signal("CLOSE", symbol))
+        assert future.result(timeout=5) == "done"
+    finally:
+        executor.stop()
+
+    assert running == [0]
+    monitor_at = handler.calls.index("monitor")
+    assert sorted(handler.calls[:monitor_at]) == sorted(("OPEN", s) for s in symbols)
+    assert sorted(handler.calls[monitor_at + 1:]) == sorted(("CLOSE", s) for s in symbols)
+
+
+def test_exclusive_task_error_reaches_caller():
+    """独占任务的异常通过 Future 返回，工作线程继续处理后续信号"""
+    handler = RecordingHandler()
+    executor = SignalExecutor(handler, workers=2, dedup_window=0)
+    executor.start()
+    try:
+        def boom():
+            raise RuntimeError("monitor failed")
+
+        future = executor.run_exclusive(boom)
+        try:
+            future.result(timeout=5)
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        executor.submit(_signal("OPEN", "XRPUSDT"))
+    finally:
+        executor.stop()
+
+    assert handler.calls == [("OPEN", "XRPUSDT")]
+
+
+if __name__ == '__main__':
+    test_per_symbol_order_and_dedup()
+    test_reentry_after_close_is_not_collapsed()
+    test_exclusive_task_does_not_overlap_signals()
+    test_exclusive_task_error_reaches_caller()
+    print("[OK] 全部通过")
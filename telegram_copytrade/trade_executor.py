@@ -0,0 +1,226 @@
+"""
+跟单执行器
+Telethon 事件循环只负责接收和解析消息，信号投递到这里后由工作线程调用交易器下单，
+下单期间不会阻塞后续消息的读取。
+
+- 按交易对分片：同一交易对的信号总进入同一个工作线程队列，保持先后顺序；不同交易对并行执行
+- 去重：同一交易对 + 信号类型 + 方向在 dedup_window 秒内只执行一次（转发/重复推送的消息）；
+  同一交易对收到另一类信号（开仓↔平仓）后重新计算，OPEN → CLOSE → OPEN 的重新入场照常执行
+- 独占任务：run_exclusive 在各分片队列中插入屏障，所有工作线程暂停后执行（持仓监控），
+  与下单互不并发，且保持与前后信号的先后顺序
+- 过期丢弃：开始执行时距消息时间超过 max_signal_delay 秒的信号不再执行
+- 延迟统计：消息时间 → 入队 → 开始执行 → 交易器返回，逐条记录日志并汇总
+"""
+
+import logging
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .signal_parser import TradeSignal
+
+
+_STOP = object()
+
+
+class _Exclusive:
+    """独占任务：每个工作线程到达屏障后等待，由最后到达的线程执行"""
+
+    def __init__(self, func: Callable[[], Any], parties: int):
+        self.func = func
+        self.future: Future = Future()
+        self.barrier = threading.Barrier(parties, action=self._run)
+
+    def _run(self):
+        # 等待方已取消（如系统退出）时不再执行
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            self.future.set_result(self.func())
+        except Exception as e:
+            self.future.set_exception(e)
+
+
+class SignalExecutor:
+    """跟单信号执行器"""
+
+    def __init__(
+        self,
+        handler: Callable[[TradeSignal], Any],
+        workers: int = 4,
+        dedup_window: float = 30.0,
+        max_signal_delay: Optional[float] = None
+    ):
+        """
+        初始化执行器
+
+        Args:
+            handler: 实际处理信号的函数（在工作线程中调用，可阻塞）
+            workers: 工作线程数
+            dedup_window: 重复信号合并窗口（秒），0 表示不去重
+            max_signal_delay: 信号最大延迟（秒），None/0 表示不限制
+        """
+        self.logger = logging.getLogger(__name__)
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.dedup_window = max(0.0, float(dedup_window or 0))
+        self.max_signal_delay = float(max_signal_delay) if max_signal_delay else None
+
+        self._queues: List[queue.Queue] = [queue.Queue() for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._recent: Dict[Tuple[str, str, str], float] = {}
+
+        # 统计
+        self.submitted = 0
+        self.collapsed = 0
+        self.expired = 0
+        self.executed = 0
+        self.failed = 0
+        self.latency_count = 0
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.last_latency_ms: Optional[float] = None
+
+    def start(self):
+        """启动工作线程"""
+        if self._threads:
+            return
+        for idx, work_queue in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(work_queue,),
+                name=f"CopyTradeExecutor-{idx}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"⚙️ 跟单执行器已启动: {self.workers} 个工作线程")
+
+    def stop(self, timeout: float = 10.0):
+        """停止工作线程（已入队的信号执行完后退出）"""
+        for work_queue in self._queues:
+            work_queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, signal: TradeSignal, received_at: Optional[float] = None) -> bool:
+        """
+        投递信号（非阻塞，可在事件循环中直接调用）
+
+        Args:
+            signal: 解析后的信号，signal.timestamp 为消息时间
+            received_at: 收到消息的本地时间戳（默认当前时间）
+
+        Returns:
+            是否入队（重复信号被合并时返回 False）
+        """
+        received_at = received_at or time.time()
+        key = (signal.signal_type, signal.symbol, signal.direction)
+
+        with self._lock:
+            if self.dedup_window > 0:
+                last = self._recent.get(key)
+                if last is not None and received_at - last < self.dedup_window:
+                    self.collapsed += 1
+                    self.logger.info(
+                        f"🔁 合并重复信号: {signal.signal_type} {signal.symbol} {signal.direction} "
+                        f"({received_at - last:.1f}s 内已收到)"
+                    )
+                    return False
+                self._recent[key] = received_at
+                # 状态切换：清除同一交易对另一类信号的去重记录
+                for other in [k for k in self._recent if k[1] == signal.symbol and k[0] != signal.signal_type]:
+                    del self._recent[other]
+                # 清理过期的去重记录
+                if len(self._recent) > 1000:
+                    cutoff = received_at - self.dedup_window
+                    self._recent = {k: v for k, v in self._recent.items() if v >= cutoff}
+            self.submitted += 1
+
+        shard = zlib.crc32(signal.symbol.encode("utf-8")) % self.workers
+        self._queues[shard].put((signal, received_at))
+        return True
+
+    def run_exclusive(self, func: Callable[[], Any]) -> Future:
+        """
+        投递独占任务：已入队的信号执行完、所有工作线程暂停后执行 func，期间不执行任何信号
+
+        Returns:
+            func 的结果（concurrent.futures.Future）
+        """
+        task = _Exclusive(func, self.workers)
+        for work_queue in self._queues:
+            work_queue.put(task)
+        return task.future
+
+    def _worker(self, work_queue: queue.Queue):
+        while True:
+            item = work_queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, _Exclusive):
+                try:
+                    item.barrier.wait()
+                except threading.BrokenBarrierError:
+                    pass
+                continue
+            signal, received_at = item
+            try:
+                self._execute(signal, received_at)
+            except Exception as e:
+                self.failed += 1
+                self.logger.error(f"跟单信号执行失败 {signal.symbol}: {e}")
+
+    def _execute(self, signal: TradeSignal, received_at: float):
+        message_ts = signal.timestamp.timestamp() if signal.timestamp else received_at
+        started_at = time.time()
+
+        if self.max_signal_delay and started_at - message_ts > self.max_signal_delay:
+            self.expired += 1
+            self.logger.warning(
+                f"⌛ 信号已过期，跳过: {signal.signal_type} {signal.symbol} "
+                f"(距消息 {started_at - message_ts:.1f}s > {self.max_signal_delay:.0f}s)"
+            )
+            return
+
+        self.handler(signal)
+        finished_at = time.time()
+        self.executed += 1
+        self._record_latency(signal, message_ts, received_at, started_at, finished_at)
+
+    def _record_latency(self, signal: TradeSignal, message_ts: float, received_at: float,
+                        started_at: float, finished_at: float):
+        total_ms = (finished_at - message_ts) * 1000
+        with self._lock:
+            self.latency_count += 1
+            self.latency_total_ms += total_ms
+            self.latency_max_ms = max(self.latency_max_ms, total_ms)
+            self.last_latency_ms = total_ms
+        self.logger.info(
+            f"⏱️ {signal.signal_type} {signal.symbol} 延迟: 消息→下单返回 {total_ms:.0f}ms "
+            f"(接收 {(received_at - message_ts) * 1000:.0f}ms, "
+            f"排队 {(started_at - received_at) * 1000:.0f}ms, "
+            f"执行 {(finished_at - started_at) * 1000:.0f}ms)"
+        )
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        avg = self.latency_total_ms / self.latency_count if self.latency_count else None
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "collapsed": self.collapsed,
+            "expired": self.expired,
+            "executed": self.executed,
+            "failed": self.failed,
+            "pending": sum(q.qsize() for q in self._queues),
+            "latency_avg_ms": round(avg, 1) if avg is not None else None,
+            "latency_max_ms": round(self.latency_max_ms, 1) if self.latency_count else None,
+            "latency_last_ms": round(self.last_latency_ms, 1) if self.last_latency_ms is not None else None,
+        }
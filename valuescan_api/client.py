@@ -5,11 +5,14 @@ ValuScan API 客户端 - 统一数据获取接口
 """
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 import requests
+from requests.adapters import HTTPAdapter
 
 # 基础配置
 # ==================== Signals ====================
@@ -19,6 +22,11 @@ API_BASE = os.getenv("VALUESCAN_API_BASE", "https://api.valuescan.io").rstrip("/
 TIMEOUT = float(os.getenv("VALUESCAN_API_TIMEOUT", "15"))
 API_BASES_ENV = os.getenv("VALUESCAN_API_BASES", "").strip()
 ACCESS_TICKET_FALLBACK = (os.getenv("VALUESCAN_ACCESS_TICKET_FALLBACK") or "LNe1VTyHk0bij3cyWB2gxg==").strip()
+# 币种详情：并发请求数（<=1 为串行）、缓存有效期（<=0 关闭缓存）、过期后仍可先返回旧数据的时长、最大缓存条数
+COIN_DETAIL_WORKERS = int(os.getenv("VALUESCAN_COIN_DETAIL_WORKERS", "9"))
+COIN_DETAIL_TTL = float(os.getenv("VALUESCAN_COIN_DETAIL_TTL", "60"))
+COIN_DETAIL_STALE_TTL = float(os.getenv("VALUESCAN_COIN_DETAIL_STALE_TTL", "600"))
+COIN_DETAIL_CACHE_SIZE = int(os.getenv("VALUESCAN_COIN_DETAIL_CACHE_SIZE", "500"))
 
 
 def _build_api_bases() -> List[str]:
@@ -48,6 +56,182 @@ def _build_api_bases() -> List[str]:
 
 API_BASES = _build_api_bases()
 
+# 接口地址选择：冷却时间（秒，连续失败按指数递增）、后台探测间隔、连接池大小
+BASE_COOLDOWN = float(os.getenv("VALUESCAN_BASE_COOLDOWN", "30"))
+BASE_MAX_COOLDOWN = float(os.getenv("VALUESCAN_BASE_MAX_COOLDOWN", "900"))
+BASE_PROBE_INTERVAL = float(os.getenv("VALUESCAN_BASE_PROBE_INTERVAL", "30"))
+# 探测用信号轮询接口（每轮都会请求，所有地址都应提供）
+BASE_PROBE_PATH = os.getenv("VALUESCAN_BASE_PROBE_PATH", "/api/account/message/getWarnMessage")
+HTTP_POOL_MAXSIZE = int(os.getenv("VALUESCAN_HTTP_POOL_MAXSIZE", "32"))
+
+
+class _BaseState:
+    __slots__ = ("requests", "successes", "failures", "consecutive_failures",
+                 "cooldown_until", "latency_ms", "last_error")
+
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.latency_ms: Optional[float] = None  # EWMA
+        self.last_error: Optional[str] = None
+
+
+class BaseSelector:
+    """
+    API 地址健康选择器（进程内共享）
+
+    - 记住最近一次成功的地址，下次请求优先使用
+    - 地址失败后进入冷却，连续失败时冷却时间指数递增，冷却中的地址排到最后（仍作兜底）
+    - 单个接口路径 404/405 只说明该地址没有这个接口，不计入地址失败
+    - 后台线程定期探测冷却中的地址，恢复后解除冷却
+    """
+
+    def __init__(self, bases: List[str]):
+        self.bases = list(bases)
+        self._states: Dict[str, _BaseState] = {base: _BaseState() for base in self.bases}
+        self._preferred: Optional[str] = None
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_fn = None
+
+    def ordered(self) -> List[str]:
+        """按健康度排序的候选地址"""
+        now = time.monotonic()
+        with self._lock:
+            preferred = self._preferred
+            healthy = [b for b in self.bases if self._states[b].cooldown_until <= now]
+            cooling = [b for b in self.bases if self._states[b].cooldown_until > now]
+        if preferred in healthy:
+            healthy.remove(preferred)
+            healthy.insert(0, preferred)
+        cooling.sort(key=lambda b: self._states[b].cooldown_until)
+        return healthy + cooling
+
+    def record_success(self, base: str, latency: float) -> None:
+        with self._lock:
+            state = self._states.get(base)
+            if state is None:
+                return
+            state.requests += 1
+            state.successes += 1
+            state.consecutive_failures = 0
+            state.cooldown_until = 0.0
+            self._update_latency(state, latency)
+            self._preferred = base
+
+    def record_failure(self, base: str, latency: float, error: str) -> None:
+        with self._lock:
+            state = self._states.get(base)
+            if state is None:
+                return
+            state.requests += 1
+            state.failures += 1
+            state.consecutive_failures += 1
+            state.last_error = error
+            self._update_latency(state, latency)
+            cooldown = min(BASE_COOLDOWN * (2 ** (state.consecutive_failures - 1)), BASE_MAX_COOLDOWN)
+            state.cooldown_until = time.monotonic() + cooldown
+            if self._preferred == base:
+                self._preferred = None
+        self._ensure_probe_thread()
+
+    @staticmethod
+    def _update_latency(state: _BaseState, latency: float) -> None:
+        ms = latency * 1000.0
+        state.latency_ms = ms if state.latency_ms is None else state.latency_ms * 0.8 + ms * 0.2
+
+    def set_probe(self, probe_fn) -> None:
+        """设置探测函数 probe_fn(base) -> bool（地址可用返回 True）"""
+        self._probe_fn = probe_fn
+
+    def _ensure_probe_thread(self) -> None:
+        if self._probe_fn is None or BASE_PROBE_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._probe_thread and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="valuescan-base-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(BASE_PROBE_INTERVAL)
+            now = time.monotonic()
+            with self._lock:
+                cooling = [b for b in self.bases if self._states[b].cooldown_until > 0]
+                due = [b for b in cooling if self._states[b].cooldown_until <= now + BASE_PROBE_INTERVAL]
+            if not cooling:
+                return  # 全部恢复，下次失败时重新启动
+            for base in due:
+                start = time.monotonic()
+                try:
+                    ok = bool(self._probe_fn(base))
+                except Exception as exc:
+                    ok = False
+                    error = str(exc)
+                else:
+                    error = "probe_failed"
+                latency = time.monotonic() - start
+                with self._lock:
+                    state = self._states[base]
+                    if ok:
+                        state.consecutive_failures = 0
+                        state.cooldown_until = 0.0
+                        self._update_latency(state, latency)
+                    else:
+                        state.last_error = error
+                        cooldown = min(BASE_COOLDOWN * (2 ** state.consecutive_failures), BASE_MAX_COOLDOWN)
+                        state.cooldown_until = time.monotonic() + cooldown
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "preferred": self._preferred,
+                "bases": {
+                    base: {
+                        "requests": state.requests,
+                        "successes": state.successes,
+                        "failures": state.failures,
+                        "avg_latency_ms": round(state.latency_ms, 1) if state.latency_ms is not None else None,
+                        "cooldown_remaining": round(max(state.cooldown_until - now, 0.0), 1),
+                        "last_error": state.last_error,
+                    }
+                    for base, state in self._states.items()
+                },
+            }
+
+
+_base_selector = BaseSelector(API_BASES)
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """所有 ValuScanClient 共用的连接池会话（不做自动重试，换地址由 BaseSelector 负责）"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            session.trust_env = False
+            adapter = HTTPAdapter(
+                pool_connections=max(len(API_BASES), 4),
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _shared_session = session
+        return _shared_session
+
+
+def get_base_selector() -> BaseSelector:
+    return _base_selector
+
+
 
 class ValuScanClient:
     """ValuScan API 客户端"""
@@ -90,12 +274,23 @@ class ValuScanClient:
     
     def __init__(self, token_file: Optional[Path] = None, proxy: Optional[str] = None):
         self.token_file = token_file or TOKEN_FILE
-        self.session = requests.Session()
-        self.session.trust_env = False
+        self.session = get_shared_session()
         self.proxy = proxy or os.getenv("VALUESCAN_PROXY") or os.getenv("SOCKS5_PROXY")
         self._token_cache: Optional[str] = None
         self._token_expiry: Optional[int] = None
         self._access_ticket_cache: Optional[str] = None
+        # token 文件解析结果按 (mtime, size) 缓存，请求头按 (token, ticket) 缓存
+        self._token_file_sig: Optional[Tuple[int, int]] = None
+        self._token_file_data: Optional[Dict[str, Any]] = None
+        self._headers_key: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._headers_cache: Optional[Dict[str, str]] = None
+        if _base_selector._probe_fn is None:
+            _base_selector.set_probe(self._probe_base)
+        # 币种详情缓存: keyword -> (获取时间 monotonic, 结果)
+        self._detail_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._detail_refreshing = set()
+        self._detail_lock = threading.Lock()
+        self._detail_executor: Optional[ThreadPoolExecutor] = None
 
     @staticmethod
     def _format_coin_key(symbol: Optional[str], chain: Optional[str]) -> str:
@@ -114,13 +309,26 @@ class ValuScanClient:
             return {"http": self.proxy, "https": self.proxy}
         return {"http": self.proxy, "https": self.proxy}
     
+    def _read_token_file(self) -> Optional[Dict[str, Any]]:
+        """读取 token 文件，文件未变化时复用上次解析结果"""
+        try:
+            stat = self.token_file.stat()
+        except OSError:
+            return None
+        sig = (stat.st_mtime_ns, stat.st_size)
+        if sig != self._token_file_sig:
+            data = json.loads(self.token_file.read_text(encoding="utf-8"))
+            self._token_file_data = data if isinstance(data, dict) else {}
+            self._token_file_sig = sig
+        return self._token_file_data
+
     def _load_token(self) -> Optional[str]:
         """加载 account_token (不做本地过期检查，由服务器决定)"""
         
         try:
-            if not self.token_file.exists():
+            data = self._read_token_file()
+            if data is None:
                 return None
-            data = json.loads(self.token_file.read_text(encoding="utf-8"))
             token = (data.get("account_token") or "").strip()
             if not token and isinstance(data.get("data"), dict):
                 token = (data["data"].get("account_token") or "").strip()
@@ -138,8 +346,8 @@ class ValuScanClient:
         if self._access_ticket_cache:
             return self._access_ticket_cache
         try:
-            if self.token_file.exists():
-                data = json.loads(self.token_file.read_text(encoding="utf-8"))
+            data = self._read_token_file()
+            if data is not None:
                 for key in ("access_ticket", "accessTicket", "access-ticket", "accessTicketValue"):
                     val = data.get(key)
                     if isinstance(val, str) and val.strip():
@@ -161,6 +369,9 @@ class ValuScanClient:
         """构建请求头"""
         token = self._load_token()
         access_ticket = self._load_access_ticket()
+        key = (token, access_ticket)
+        if key == self._headers_key and self._headers_cache is not None:
+            return dict(self._headers_cache)
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
@@ -175,7 +386,26 @@ class ValuScanClient:
             headers["Authorization"] = f"Bearer {token}"
         if access_ticket:
             headers["Access-Ticket"] = access_ticket
-        return headers
+        self._headers_key = key
+        self._headers_cache = headers
+        return dict(headers)
+
+    def _probe_base(self, base: str) -> bool:
+        """后台探测：信号轮询接口能正常响应（非 404/405/5xx）即视为恢复"""
+        try:
+            resp = self.session.get(
+                f"{base}{BASE_PROBE_PATH}",
+                headers=self._build_headers(),
+                timeout=min(TIMEOUT, 10),
+                proxies=self._get_proxies(),
+            )
+        except requests.exceptions.RequestException:
+            return False
+        return resp.status_code < 500 and resp.status_code not in (404, 405)
+
+    def get_endpoint_stats(self) -> Dict[str, Any]:
+        """各 API 地址的请求数、成功/失败次数、平均延迟和冷却状态"""
+        return _base_selector.get_stats()
 
     def _request(
         self,
@@ -192,13 +422,28 @@ class ValuScanClient:
         headers_no_auth.pop("Authorization", None)
         proxies = self._get_proxies()
         if endpoint.startswith("http://") or endpoint.startswith("https://"):
+            bases: List[Optional[str]] = [None]
             urls = [endpoint]
         else:
             path = endpoint if endpoint.startswith("/") else f"/{endpoint}"
-            urls = [f"{base}{path}" for base in API_BASES]
+            bases = list(_base_selector.ordered())
+            urls = [f"{base}{path}" for base in bases]
 
         last_error: Dict[str, Any] = {"error": "request_failed"}
         def _send_with_headers(url: str, request_headers: Dict[str, str], idx: int) -> Tuple[str, Dict[str, Any]]:
+            started = time.monotonic()
+            status, payload = _send_once(url, request_headers, idx)
+            base = bases[idx]
+            if base is not None:
+                if status in ("ok", "token_expired"):
+                    _base_selector.record_success(base, time.monotonic() - started)
+                elif payload.get("code") in (404, 405):
+                    pass  # 该地址缺少这个接口路径，换地址重试，但不影响其他接口对该地址的选择
+                else:
+                    _base_selector.record_failure(base, time.monotonic() - started, str(payload.get("error")))
+            return status, payload
+
+        def _send_once(url: str, request_headers: Dict[str, str], idx: int) -> Tuple[str, Dict[str, Any]]:
             try:
                 resp = self.session.request(
                     method,
@@ -230,7 +475,7 @@ class ValuScanClient:
                 return ("error", {"error": str(e)})
 
             if resp.status_code in (404, 405) and idx < len(urls) - 1:
-                return ("retry_base", {"error": f"http_{resp.status_code}"})
+                return ("retry_base", {"error": f"http_{resp.status_code}", "code": resp.status_code})
             if resp.status_code >= 500 and idx < len(urls) - 1:
                 return ("retry_base", {"error": f"http_{resp.status_code}"})
             if resp.status_code in (401, 403):
@@ -441,8 +686,89 @@ class ValuScanClient:
     
     # ==================== 币种详情 ====================
     
-    def get_coin_detail(self, keyword: int) -> Dict[str, Any]:
-        """获取币种完整详情（聚合多个API）"""
+    def get_coin_detail(self, keyword: int, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        获取币种完整详情（聚合多个API）
+
+        - 结果按 keyword 缓存 COIN_DETAIL_TTL 秒；过期后 COIN_DETAIL_STALE_TTL 秒内
+          先返回旧数据，同时在后台刷新（stale-while-revalidate）
+        - 返回的缓存对象为共享引用，调用方不要修改
+
+        Args:
+            keyword: 币种ID
+            use_cache: False 时强制重新请求（结果仍会写入缓存）
+        """
+        if not use_cache or COIN_DETAIL_TTL <= 0:
+            return self._fetch_and_cache_coin_detail(keyword)
+
+        now = time.monotonic()
+        with self._detail_lock:
+            entry = self._detail_cache.get(keyword)
+        if entry:
+            fetched_at, result = entry
+            age = now - fetched_at
+            if age < COIN_DETAIL_TTL:
+                return result
+            if age < COIN_DETAIL_TTL + COIN_DETAIL_STALE_TTL:
+                self._refresh_coin_detail_async(keyword)
+                return result
+        return self._fetch_and_cache_coin_detail(keyword)
+
+    def invalidate_coin_detail(self, keyword: Optional[int] = None) -> None:
+        """清除币种详情缓存（keyword 为空时全部清除）"""
+        with self._detail_lock:
+            if keyword is None:
+                self._detail_cache.clear()
+            else:
+                self._detail_cache.pop(keyword, None)
+
+    def _refresh_coin_detail_async(self, keyword: int) -> None:
+        with self._detail_lock:
+            if keyword in self._detail_refreshing:
+                return
+            self._detail_refreshing.add(keyword)
+
+        def _run():
+            try:
+                self._fetch_and_cache_coin_detail(keyword)
+            except Exception:
+                pass
+            finally:
+                with self._detail_lock:
+                    self._detail_refreshing.discard(keyword)
+
+        threading.Thread(target=_run, name=f"coin-detail-refresh-{keyword}", daemon=True).start()
+
+    def _fetch_and_cache_coin_detail(self, keyword: int) -> Dict[str, Any]:
+        result = self._fetch_coin_detail(keyword)
+        detail = result.get("data") or {}
+        # 全部子请求失败时不缓存，下次重新请求
+        if COIN_DETAIL_TTL > 0 and any(value is not None for key, value in detail.items() if key != "keyword"):
+            with self._detail_lock:
+                self._detail_cache[keyword] = (time.monotonic(), result)
+                while len(self._detail_cache) > COIN_DETAIL_CACHE_SIZE:
+                    oldest = min(self._detail_cache, key=lambda k: self._detail_cache[k][0])
+                    del self._detail_cache[oldest]
+        return result
+
+    def _get_detail_executor(self) -> Optional[ThreadPoolExecutor]:
+        if COIN_DETAIL_WORKERS <= 1:
+            return None
+        with self._detail_lock:
+            if self._detail_executor is None:
+                self._detail_executor = ThreadPoolExecutor(
+                    max_workers=COIN_DETAIL_WORKERS,
+                    thread_name_prefix="coin-detail",
+                )
+            return self._detail_executor
+
+    def _fetch_coin_detail(self, keyword: int) -> Dict[str, Any]:
+        """
+        请求币种详情的全部子接口
+
+        holders / chains 依赖 queryCoin 返回的 symbol/chain，其余 7 个请求互不依赖；
+        并发模式下先同时发出独立请求，queryCoin 返回后立即发出依赖请求。
+        """
         detail = {
             "keyword": keyword,
             "basic": None,
@@ -455,74 +781,82 @@ class ValuScanClient:
             "holders_top": None,
             "chains": None,
         }
-        token_symbol = None
-        token_chain = None
-        
-        # 基础信息
-        basic = self._request("POST", "/api/vs-token/queryCoin", json_body={
-            "keyword": keyword
-        })
-        if basic.get("code") == 200:
-            detail["basic"] = basic.get("data")
-            if isinstance(detail["basic"], dict):
-                token_symbol = detail["basic"].get("symbol") or detail["basic"].get("tokenSymbol")
-                token_chain = detail["basic"].get("chain") or detail["basic"].get("chainName")
-        
-        # AI 分析摘要
-        ai = self._request("GET", f"/api/ai/getAiCoinSummarize?vsTokenId={keyword}")
-        if ai.get("code") == 200:
-            detail["ai_summary"] = ai.get("data")
-        
-        # 资金流入数据
-        inflow = self._request("GET", f"/api/trade/getCoinTradeInflow?keyword={keyword}")
-        if inflow.get("code") == 200:
-            detail["trade_inflow"] = inflow.get("data")
-        
-        # 交易所信息
-        exchange = self._request("GET", f"/api/track/judge/getExchangeCoinInfo?keyword={keyword}")
-        if exchange.get("code") == 200:
-            detail["exchange_info"] = exchange.get("data")
 
-        flow_detail = self.get_exchange_flow_detail(keyword)
-        if flow_detail.get("code") == 200:
-            detail["exchange_flow_detail"] = flow_detail.get("data")
+        def _basic():
+            # 基础信息
+            return self._request("POST", "/api/vs-token/queryCoin", json_body={
+                "keyword": keyword
+            })
 
-        flow_history = self.get_fund_trade_history_total(
-            keyword,
-            time_particle="12h",
-            limit_size=60,
-            flow=True,
-            trade_type=2,
-        )
-        if flow_history.get("code") == 200:
-            detail["fund_flow_history"] = flow_history.get("data")
+        independent = {
+            # AI 分析摘要
+            "ai_summary": lambda: self._request("GET", f"/api/ai/getAiCoinSummarize?vsTokenId={keyword}"),
+            # 资金流入数据
+            "trade_inflow": lambda: self._request("GET", f"/api/trade/getCoinTradeInflow?keyword={keyword}"),
+            # 交易所信息
+            "exchange_info": lambda: self._request("GET", f"/api/track/judge/getExchangeCoinInfo?keyword={keyword}"),
+            "exchange_flow_detail": lambda: self.get_exchange_flow_detail(keyword),
+            "fund_flow_history": lambda: self.get_fund_trade_history_total(
+                keyword,
+                time_particle="12h",
+                limit_size=60,
+                flow=True,
+                trade_type=2,
+            ),
+            "fund_volume_history": lambda: self.get_fund_trade_history_total(
+                keyword,
+                time_particle="12h",
+                limit_size=60,
+                flow=False,
+                trade_type=2,
+            ),
+        }
 
-        volume_history = self.get_fund_trade_history_total(
-            keyword,
-            time_particle="12h",
-            limit_size=60,
-            flow=False,
-            trade_type=2,
-        )
-        if volume_history.get("code") == 200:
-            detail["fund_volume_history"] = volume_history.get("data")
+        def _dependent(basic_data: Any) -> Dict[str, Any]:
+            token_symbol = None
+            token_chain = None
+            if isinstance(basic_data, dict):
+                token_symbol = basic_data.get("symbol") or basic_data.get("tokenSymbol")
+                token_chain = basic_data.get("chain") or basic_data.get("chainName")
+            return {
+                "holders_top": lambda: self.get_holder_page(
+                    keyword,
+                    page=1,
+                    page_size=20,
+                    symbol=token_symbol,
+                    chain=token_chain,
+                ),
+                "chains": lambda: self.get_chain_page(symbol=token_symbol or "", page=1, page_size=20),
+            }
 
-        holders = self.get_holder_page(
-            keyword,
-            page=1,
-            page_size=20,
-            symbol=token_symbol,
-            chain=token_chain,
-        )
-        if holders.get("code") == 200:
-            detail["holders_top"] = holders.get("data")
+        def _store(field: str, resp: Any) -> None:
+            if isinstance(resp, dict) and resp.get("code") == 200:
+                detail[field] = resp.get("data")
 
-        chains = self.get_chain_page(symbol=token_symbol or "", page=1, page_size=20)
-        if chains.get("code") == 200:
-            detail["chains"] = chains.get("data")
-        
+        executor = self._get_detail_executor()
+        if executor is None:
+            _store("basic", _basic())
+            for field, call in independent.items():
+                _store(field, call())
+            for field, call in _dependent(detail["basic"]).items():
+                _store(field, call())
+            return {"code": 200, "data": detail}
+
+        basic_future = executor.submit(_basic)
+        futures = {executor.submit(call): field for field, call in independent.items()}
+        try:
+            _store("basic", basic_future.result())
+        except Exception:
+            pass
+        futures.update({executor.submit(call): field for field, call in _dependent(detail["basic"]).items()})
+        for future, field in futures.items():
+            try:
+                _store(field, future.result())
+            except Exception:
+                pass
+
         return {"code": 200, "data": detail}
-    
+
     def get_coin_by_symbol(self, symbol: str) -> Dict[str, Any]:
         """通过币种符号获取详情"""
         # 先搜索获取 keyword
@@ -5,23 +5,24 @@ ValuScan 币种详情查询模块
 提供简洁的接口供其他组件通过币种名称获取详细数据
 """
 import json
+import queue
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # 导入客户端
 try:
     from .client import ValuScanClient
+    from .symbol_registry import SymbolRegistry, coin_keyword, get_symbol_registry, normalize_symbol
 except ImportError:
     from client import ValuScanClient
+    from symbol_registry import SymbolRegistry, coin_keyword, get_symbol_registry, normalize_symbol
 
 
 # 全局客户端实例
 _client: Optional[ValuScanClient] = None
 
-# 币种名称到 keyword 的映射缓存
-_symbol_cache: Dict[str, int] = {}
-
 
 def _extract_dense_points(resp: Dict[str, Any]) -> List[Dict[str, Any]]:
     if not isinstance(resp, dict):
@@ -72,59 +73,26 @@ def _get_client() -> ValuScanClient:
     return _client
 
 
-def _load_symbol_cache():
-    """加载币种符号缓存"""
-    global _symbol_cache
-    if _symbol_cache:
-        return
-    
-    # 尝试从缓存文件加载
-    cache_file = Path(__file__).parent / "data" / "symbol_cache.json"
-    if cache_file.exists():
-        try:
-            _symbol_cache = json.loads(cache_file.read_text(encoding="utf-8"))
-            return
-        except Exception:
-            pass
-    
-    # 从 API 加载
-    client = _get_client()
-    page = 1
-    while True:
-        resp = client.list_all_coins(page=page, page_size=100)
-        if resp.get("code") != 200:
-            break
-        
-        coins = resp.get("data", {}).get("list", [])
-        if not coins:
-            break
-        
-        for coin in coins:
-            symbol = (coin.get("symbol") or "").upper()
-            keyword = coin.get("vsTokenId") or coin.get("keyword")
-            if symbol and keyword:
-                _symbol_cache[symbol] = int(keyword)
-        
-        total = resp.get("data", {}).get("total", 0)
-        if len(_symbol_cache) >= total:
-            break
-        page += 1
-    
-    # 保存缓存
-    cache_file.parent.mkdir(exist_ok=True)
-    cache_file.write_text(json.dumps(_symbol_cache, ensure_ascii=False), encoding="utf-8")
-
+_sync_started = False
+_sync_lock = threading.Lock()
 
 
-def get_keyword(symbol: str) -> Optional[int]:
-    """???????? keyword (ID)."""
-    _load_symbol_cache()
-    symbol = symbol.upper().strip()
+def _get_registry() -> SymbolRegistry:
+    """获取币种注册表，首次调用时启动后台全量同步线程"""
+    global _sync_started
+    registry = get_symbol_registry()
+    if not _sync_started:
+        with _sync_lock:
+            if not _sync_started:
+                registry.start_background_sync(
+                    lambda page, page_size: _get_client().list_all_coins(page=page, page_size=page_size)
+                )
+                _sync_started = True
+    return registry
 
-    # ?????
-    if symbol in _symbol_cache:
-        return _symbol_cache[symbol]
 
+def _search_remote_keyword(symbol: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """远程搜索 symbol 对应的 keyword，返回 (keyword, 币种条目)"""
     client = _get_client()
     resp = client.search_keyword(symbol, page=1, page_size=20)
     if resp.get("code") == 200:
@@ -137,12 +105,11 @@ def get_keyword(symbol: str) -> Optional[int]:
         for coin in items or []:
             symbol_val = (coin.get("symbol") or coin.get("tokenSymbol") or "").upper()
             if symbol_val == symbol:
-                keyword = int(coin.get("vsTokenId") or coin.get("keyword") or 0)
+                keyword = coin_keyword(coin)
                 if keyword:
-                    _symbol_cache[symbol] = keyword
-                    return keyword
+                    return keyword, coin
 
-    # ?????????????
+    # 关键字搜索未命中时用 queryCoin 搜索
     resp = client._request("POST", "/api/vs-token/queryCoin", json_body={
         "search": symbol,
         "page": 1,
@@ -153,14 +120,111 @@ def get_keyword(symbol: str) -> Optional[int]:
         coins = resp.get("data", {}).get("list", [])
         for coin in coins:
             if (coin.get("symbol") or "").upper() == symbol:
-                keyword = int(coin.get("vsTokenId") or coin.get("keyword") or 0)
+                keyword = coin_keyword(coin)
                 if keyword:
-                    _symbol_cache[symbol] = keyword
-                    return keyword
+                    return keyword, coin
 
     return None
 
 
+def _resolve_remote(symbol: str) -> Optional[int]:
+    """远程解析并写回注册表（命中写入索引，未命中写入负缓存）"""
+    registry = _get_registry()
+    try:
+        found = _search_remote_keyword(symbol)
+    except Exception:
+        return None  # 网络异常不写负缓存
+    if found is None:
+        registry.record_miss(symbol)
+        return None
+    keyword, coin = found
+    coin_symbol = normalize_symbol(coin.get("symbol") or coin.get("tokenSymbol") or symbol)
+    registry.record(
+        coin_symbol,
+        keyword,
+        name=coin.get("name"),
+        chain=coin.get("chain") or coin.get("chainName"),
+        market_cap=_to_float_or_none(coin.get("marketCap")),
+        alias=symbol if coin_symbol != symbol else None,
+    )
+    return keyword
+
+
+def _to_float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# 未知符号的后台解析：单个工作线程 + 有界队列，队列满时直接丢弃（下次调用会再次入队）
+RESOLVE_QUEUE_SIZE = 256
+
+_pending_lock = threading.Lock()
+_pending_symbols: set = set()
+_resolve_queue: "queue.Queue[str]" = queue.Queue(maxsize=RESOLVE_QUEUE_SIZE)
+_resolve_worker: Optional[threading.Thread] = None
+
+
+def _resolve_loop() -> None:
+    while True:
+        symbol = _resolve_queue.get()
+        try:
+            _resolve_remote(symbol)
+        except Exception:
+            pass
+        finally:
+            with _pending_lock:
+                _pending_symbols.discard(symbol)
+
+
+def _resolve_in_background(symbol: str) -> None:
+    global _resolve_worker
+    with _pending_lock:
+        if symbol in _pending_symbols:
+            return
+        try:
+            _resolve_queue.put_nowait(symbol)
+        except queue.Full:
+            return
+        _pending_symbols.add(symbol)
+        if _resolve_worker is None:
+            _resolve_worker = threading.Thread(target=_resolve_loop, name="keyword-resolve", daemon=True)
+            _resolve_worker.start()
+
+
+def get_keyword(symbol: str, chain: Optional[str] = None, name: Optional[str] = None,
+                blocking: bool = True) -> Optional[int]:
+    """
+    通过币种符号获取 keyword (ID)
+
+    先查本地注册表（含别名，如 1000PEPE -> PEPE）；负缓存内的未知符号直接返回 None；
+    其余情况远程搜索并写回注册表。
+
+    Args:
+        symbol: 币种符号，如 "BTC"、"ETHUSDT"
+        chain: 同名币种按链区分（可选）
+        name: 同名币种按名称区分（可选）
+        blocking: False 时本地未命中立即返回 None，远程解析在后台进行，
+                  供 AI 分析 / 图表等不能等待网络的调用方使用
+    """
+    symbol = normalize_symbol(symbol)
+    if not symbol:
+        return None
+
+    registry = _get_registry()
+    keyword = registry.lookup(symbol, chain=chain, name=name)
+    if keyword:
+        return keyword
+    if registry.is_known_miss(symbol):
+        return None
+
+    if not blocking:
+        _resolve_in_background(symbol)
+        return None
+    return _resolve_remote(symbol)
+
+
 def get_detail(symbol: str) -> Dict[str, Any]:
     """
     通过币种符号获取完整详情
@@ -662,7 +726,6 @@ def save_all_coins(filepath: Optional[str] = None) -> str:
     Returns:
         保存的文件路径
     """
-    import json
     from datetime import datetime
     
     coins = get_all_coins()
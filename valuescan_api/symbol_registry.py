@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ValuScan 币种符号注册表
+symbol -> keyword (vsTokenId) 的本地持久化索引（SQLite）：
+
+- 启动时把索引载入内存，查询不访问网络也不读盘
+- 空库时先从随包的 data/all_coins.json / symbol_cache.json 导入，再由后台线程
+  分页拉取 list_all_coins 全量同步（常驻线程只启动一次，按 SYNC_INTERVAL 定期刷新）
+- 同一符号对应多个币种时按市值取最大者，可按 chain / name 指定
+- 远程搜索命中写回注册表；未命中记入负缓存，NEGATIVE_TTL 内不再请求
+- 合约前缀别名（1000PEPE -> PEPE、1MBABYDOGE -> BABYDOGE）自动解析
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+REGISTRY_DB = Path(os.getenv("VALUESCAN_SYMBOL_REGISTRY_DB") or DATA_DIR / "symbol_registry.db")
+# 全量同步间隔（秒）、负缓存有效期（秒）
+SYNC_INTERVAL = float(os.getenv("VALUESCAN_SYMBOL_SYNC_INTERVAL", str(24 * 3600)))
+NEGATIVE_TTL = float(os.getenv("VALUESCAN_SYMBOL_NEGATIVE_TTL", str(6 * 3600)))
+# 同步失败后的重试间隔（秒）
+SYNC_RETRY_INTERVAL = float(os.getenv("VALUESCAN_SYMBOL_SYNC_RETRY_INTERVAL", "1800"))
+
+_ALIAS_PREFIX = re.compile(r"^(1000000|100000|10000|1000|1M)(?=[A-Z])")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """统一符号格式：大写，去掉 $ 和 USDT 后缀"""
+    value = (symbol or "").upper().replace("$", "").strip()
+    if value.endswith("USDT") and len(value) > 4:
+        value = value[:-4]
+    return value
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def coin_keyword(coin: Dict[str, Any]) -> int:
+    """从接口返回的币种条目中取 keyword"""
+    try:
+        return int(coin.get("vsTokenId") or coin.get("keyword") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class SymbolRegistry:
+    """symbol -> keyword 持久化索引"""
+
+    def __init__(self, db_path: Path = REGISTRY_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._best: Dict[str, int] = {}
+        self._aliases: Dict[str, str] = {}
+        self._misses: Dict[str, float] = {}
+        self._sync_thread: Optional[threading.Thread] = None
+        self._init_schema()
+        self._load()
+
+    # ------------------------------------------------------------------ 存储
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS coins (
+                    keyword INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    name TEXT,
+                    chain TEXT,
+                    market_cap REAL DEFAULT 0,
+                    updated_at INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_coins_symbol ON coins(symbol)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS aliases (
+                    alias TEXT PRIMARY KEY,
+                    symbol TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS misses (
+                    symbol TEXT PRIMARY KEY,
+                    checked_at INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+
+    def _load(self) -> None:
+        with self._lock:
+            best: Dict[str, int] = {}
+            rows = self._conn.execute(
+                "SELECT symbol, keyword FROM coins ORDER BY symbol, market_cap DESC, keyword"
+            ).fetchall()
+            for row in rows:
+                best.setdefault(row["symbol"], row["keyword"])
+            self._best = best
+            self._aliases = {
+                row["alias"]: row["symbol"]
+                for row in self._conn.execute("SELECT alias, symbol FROM aliases")
+            }
+            now = time.time()
+            self._misses = {
+                row["symbol"]: row["checked_at"]
+                for row in self._conn.execute("SELECT symbol, checked_at FROM misses")
+                if now - row["checked_at"] < NEGATIVE_TTL
+            }
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._best)
+
+    # ------------------------------------------------------------------ 查询
+
+    def lookup(self, symbol: str, chain: Optional[str] = None, name: Optional[str] = None) -> Optional[int]:
+        """
+        本地解析 keyword（不访问网络）
+
+        Args:
+            symbol: 币种符号
+            chain: 指定链（多币同名时用于区分）
+            name: 指定币种名称（多币同名时用于区分）
+        """
+        symbol = normalize_symbol(symbol)
+        if not symbol:
+            return None
+        with self._lock:
+            target = self._resolve_alias(symbol)
+            if target is None:
+                return None
+            if chain or name:
+                return self._lookup_exact(target, chain, name) or self._best.get(target)
+            return self._best.get(target)
+
+    def _resolve_alias(self, symbol: str) -> Optional[str]:
+        if symbol in self._best:
+            return symbol
+        alias = self._aliases.get(symbol)
+        if alias and alias in self._best:
+            return alias
+        stripped = _ALIAS_PREFIX.sub("", symbol)
+        if stripped != symbol and stripped in self._best:
+            return stripped
+        return None
+
+    def _lookup_exact(self, symbol: str, chain: Optional[str], name: Optional[str]) -> Optional[int]:
+        clauses = ["symbol = ?"]
+        params: List[Any] = [symbol]
+        if chain:
+            clauses.append("UPPER(chain) = ?")
+            params.append(chain.upper().strip())
+        if name:
+            clauses.append("LOWER(name) = ?")
+            params.append(name.lower().strip())
+        row = self._conn.execute(
+            f"SELECT keyword FROM coins WHERE {' AND '.join(clauses)} ORDER BY market_cap DESC LIMIT 1",
+            params,
+        ).fetchone()
+        return row["keyword"] if row else None
+
+    def candidates(self, symbol: str) -> List[Dict[str, Any]]:
+        """同一符号下的全部币种（按市值降序）"""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT keyword, symbol, name, chain, market_cap FROM coins WHERE symbol = ? ORDER BY market_cap DESC",
+                (symbol,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def is_known_miss(self, symbol: str) -> bool:
+        """符号在负缓存有效期内查询过且不存在"""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            checked_at = self._misses.get(symbol)
+            if checked_at is None:
+                return False
+            if time.time() - checked_at >= NEGATIVE_TTL:
+                self._misses.pop(symbol, None)
+                return False
+            return True
+
+    # ------------------------------------------------------------------ 写入
+
+    def record(self, symbol: str, keyword: int, name: Optional[str] = None,
+               chain: Optional[str] = None, market_cap: Optional[float] = None,
+               alias: Optional[str] = None) -> None:
+        """写入一条解析结果（远程搜索命中时调用）"""
+        symbol = normalize_symbol(symbol)
+        if not symbol or not keyword:
+            return
+        self.bulk_upsert([{
+            "symbol": symbol,
+            "vsTokenId": keyword,
+            "name": name,
+            "chain": chain,
+            "marketCap": market_cap,
+        }], preserve_market_cap=market_cap is None)
+        alias = normalize_symbol(alias) if alias else ""
+        with self._lock, self._conn:
+            if alias and alias != symbol:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO aliases (alias, symbol) VALUES (?, ?)", (alias, symbol)
+                )
+                self._aliases[alias] = symbol
+            self._conn.execute("DELETE FROM misses WHERE symbol IN (?, ?)", (symbol, alias or symbol))
+            self._misses.pop(symbol, None)
+            self._misses.pop(alias, None)
+
+    def record_miss(self, symbol: str) -> None:
+        symbol = normalize_symbol(symbol)
+        if not symbol:
+            return
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO misses (symbol, checked_at) VALUES (?, ?)", (symbol, now)
+            )
+            self._misses[symbol] = now
+
+    def bulk_upsert(self, coins: Iterable[Dict[str, Any]], preserve_market_cap: bool = False) -> int:
+        """
+        批量写入接口返回的币种条目（单事务）
+
+        Args:
+            coins: list_all_coins / search 返回的条目
+            preserve_market_cap: 条目不含市值时保留库中已有市值
+        """
+        now = int(time.time())
+        rows: List[Tuple] = []
+        for coin in coins:
+            keyword = coin_keyword(coin)
+            symbol = normalize_symbol(coin.get("symbol") or coin.get("tokenSymbol") or "")
+            if not keyword or not symbol:
+                continue
+            chain = coin.get("chain") or coin.get("chainName")
+            rows.append((
+                keyword, symbol, coin.get("name"), chain.upper() if isinstance(chain, str) else None,
+                _to_float(coin.get("marketCap")), now,
+            ))
+        if not rows:
+            return 0
+        market_cap_sql = "market_cap" if preserve_market_cap else "excluded.market_cap"
+        with self._lock, self._conn:
+            self._conn.executemany(f"""
+                INSERT INTO coins (keyword, symbol, name, chain, market_cap, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(keyword) DO UPDATE SET
+                    symbol = excluded.symbol,
+                    name = COALESCE(excluded.name, name),
+                    chain = COALESCE(excluded.chain, chain),
+                    market_cap = {market_cap_sql},
+                    updated_at = excluded.updated_at
+            """, rows)
+            symbols = {row[1] for row in rows}
+            self._conn.executemany("DELETE FROM misses WHERE symbol = ?", [(s,) for s in symbols])
+            for symbol in symbols:
+                self._misses.pop(symbol, None)
+                best = self._conn.execute(
+                    "SELECT keyword FROM coins WHERE symbol = ? ORDER BY market_cap DESC, keyword LIMIT 1",
+                    (symbol,),
+                ).fetchone()
+                if best:
+                    self._best[symbol] = best["keyword"]
+        return len(rows)
+
+    # ------------------------------------------------------------------ 导入与同步
+
+    def seed_from_files(self, data_dir: Path = DATA_DIR) -> int:
+        """空库时从随包数据文件导入（all_coins.json 含市值，优先使用）"""
+        if len(self):
+            return 0
+        count = 0
+        all_coins = data_dir / "all_coins.json"
+        if all_coins.exists():
+            try:
+                data = json.loads(all_coins.read_text(encoding="utf-8"))
+                coins = data.get("coins") if isinstance(data, dict) else data
+                count += self.bulk_upsert(coins or [])
+            except Exception as exc:
+                logger.warning(f"导入 all_coins.json 失败: {exc}")
+        legacy = data_dir / "symbol_cache.json"
+        if legacy.exists():
+            try:
+                mapping = json.loads(legacy.read_text(encoding="utf-8"))
+                with self._lock:
+                    known = set(self._best)
+                count += self.bulk_upsert(
+                    {"symbol": s, "vsTokenId": k} for s, k in mapping.items() if normalize_symbol(s) not in known
+                )
+            except Exception as exc:
+                logger.warning(f"导入 symbol_cache.json 失败: {exc}")
+        if count:
+            logger.info(f"币种注册表已从本地文件导入 {count} 条")
+        return count
+
+    def _seconds_since_sync(self) -> float:
+        last = self._get_meta("last_sync")
+        try:
+            return time.time() - float(last or 0)
+        except ValueError:
+            return float("inf")
+
+    def needs_sync(self) -> bool:
+        return self._seconds_since_sync() >= SYNC_INTERVAL
+
+    def sync(self, fetch_page: Callable[[int, int], Dict[str, Any]], page_size: int = 100,
+             export_path: Optional[Path] = DATA_DIR / "symbol_cache.json") -> int:
+        """
+        分页拉取全量币种列表写入注册表
+
+        Args:
+            fetch_page: fetch_page(page, page_size) -> list_all_coins 响应
+            export_path: 同步完成后导出 symbol -> keyword JSON（兼容直接读文件的调用方）
+        """
+        page = 1
+        fetched = 0
+        while True:
+            resp = fetch_page(page, page_size)
+            if not isinstance(resp, dict) or resp.get("code") != 200:
+                break
+            data = resp.get("data") or {}
+            coins = data.get("list") or []
+            if not coins:
+                break
+            self.bulk_upsert(coins)
+            fetched += len(coins)
+            total = data.get("total") or 0
+            if fetched >= total:
+                break
+            page += 1
+        if fetched:
+            self._set_meta("last_sync", str(time.time()))
+            if export_path is not None:
+                self.export_json(export_path)
+            logger.info(f"币种注册表同步完成: {fetched} 条")
+        return fetched
+
+    def start_background_sync(self, fetch_page: Callable[[int, int], Dict[str, Any]]) -> None:
+        """启动常驻同步线程（重复调用无操作）：到期时全量同步，之后按 SYNC_INTERVAL 定期刷新"""
+        with self._lock:
+            if self._sync_thread is not None:
+                return
+            self._sync_thread = threading.Thread(
+                target=self._sync_loop, args=(fetch_page,), name="symbol-registry-sync", daemon=True
+            )
+            self._sync_thread.start()
+
+    def _sync_loop(self, fetch_page: Callable[[int, int], Dict[str, Any]]) -> None:
+        while True:
+            elapsed = self._seconds_since_sync()
+            if elapsed < SYNC_INTERVAL:
+                time.sleep(SYNC_INTERVAL - elapsed)
+                continue
+            try:
+                synced = self.sync(fetch_page)
+            except Exception as exc:
+                logger.warning(f"币种注册表同步失败: {exc}")
+                synced = 0
+            if not synced:
+                time.sleep(min(SYNC_RETRY_INTERVAL, SYNC_INTERVAL))
+
+    def export_json(self, path: Path) -> None:
+        with self._lock:
+            mapping = dict(self._best)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(mapping, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+_registry: Optional[SymbolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_symbol_registry() -> SymbolRegistry:
+    """获取全局注册表（首次调用时从本地文件导入）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SymbolRegistry()
+            _registry.seed_from_files()
+        return _registry